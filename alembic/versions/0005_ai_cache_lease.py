@@ -0,0 +1,36 @@
+"""Add generation lease columns to ai_analysis_cache
+
+Revision ID: 0005_ai_cache_lease
+Revises: 140c_purchase_token_unique
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0005_ai_cache_lease"
+down_revision = "140c_purchase_token_unique"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "ai_analysis_cache",
+        sa.Column("lease_owner", sa.String(length=128), nullable=True),
+    )
+    op.add_column(
+        "ai_analysis_cache",
+        sa.Column("lease_expires_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(
+        "ix_ai_analysis_cache_status_lease",
+        "ai_analysis_cache",
+        ["status", "lease_expires_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ai_analysis_cache_status_lease", table_name="ai_analysis_cache")
+    op.drop_column("ai_analysis_cache", "lease_expires_at")
+    op.drop_column("ai_analysis_cache", "lease_owner")
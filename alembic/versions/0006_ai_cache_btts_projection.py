@@ -0,0 +1,66 @@
+"""Add projected BTTS badge columns to ai_analysis_cache
+
+Revision ID: 0006_ai_cache_btts_projection
+Revises: 0005_ai_cache_lease
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0006_ai_cache_btts_projection"
+down_revision = "0005_ai_cache_lease"
+branch_labels = None
+depends_on = None
+
+
+BACKFILL_SQL = """
+UPDATE ai_analysis_cache AS c
+SET
+    btts_yes_pct = CASE WHEN jsonb_typeof(b.btts -> 'yes_pct') = 'number'
+        THEN (b.btts ->> 'yes_pct')::double precision END,
+    btts_no_pct = CASE WHEN jsonb_typeof(b.btts -> 'no_pct') = 'number'
+        THEN (b.btts ->> 'no_pct')::double precision END,
+    btts_badge = jsonb_build_object(
+        'yes_pct', b.btts -> 'yes_pct',
+        'no_pct', b.btts -> 'no_pct',
+        'recommended', COALESCE(b.btts -> 'recommended_btts_market', b.btts -> 'recommended'),
+        'confidence', COALESCE(b.btts -> 'confidence_pct', b.btts -> 'confidence'),
+        'reasoning_short', COALESCE(
+            b.btts -> 'reasoning_short',
+            c.analysis_json -> 'analysis' -> 'reasoning_short',
+            c.analysis_json -> 'analysis' -> 'summary'
+        ),
+        'avoid_flags', CASE WHEN jsonb_typeof(b.btts -> 'avoid_flags') = 'array'
+            THEN b.btts -> 'avoid_flags' ELSE '[]'::jsonb END
+    )
+FROM (
+    SELECT id, analysis_json #> '{analysis,btts}' AS btts
+    FROM ai_analysis_cache
+    WHERE jsonb_typeof(analysis_json #> '{analysis,btts}') = 'object'
+) AS b
+WHERE c.id = b.id
+"""
+
+
+def upgrade() -> None:
+    op.add_column("ai_analysis_cache", sa.Column("btts_yes_pct", sa.Float(), nullable=True))
+    op.add_column("ai_analysis_cache", sa.Column("btts_no_pct", sa.Float(), nullable=True))
+    op.add_column(
+        "ai_analysis_cache",
+        sa.Column("btts_badge", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    )
+    op.create_index(
+        "ix_ai_analysis_cache_app_fixture_status",
+        "ai_analysis_cache",
+        ["app_id", "fixture_id", "status"],
+    )
+    op.execute(BACKFILL_SQL)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ai_analysis_cache_app_fixture_status", table_name="ai_analysis_cache")
+    op.drop_column("ai_analysis_cache", "btts_badge")
+    op.drop_column("ai_analysis_cache", "btts_no_pct")
+    op.drop_column("ai_analysis_cache", "btts_yes_pct")
@@ -0,0 +1,38 @@
+"""Add upstream_usage_hourly (API-Football / OpenAI usage accounting)
+
+Revision ID: 0007_upstream_usage_hourly
+Revises: 0006_ai_cache_btts_projection
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0007_upstream_usage_hourly"
+down_revision = "0006_ai_cache_btts_projection"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "upstream_usage_hourly",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("hour", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("source", sa.String(length=32), nullable=False),
+        sa.Column("family", sa.String(length=128), nullable=False),
+        sa.Column("route", sa.String(length=200), nullable=False),
+        sa.Column("app_id", sa.String(length=64), nullable=False),
+        sa.Column("unit", sa.String(length=32), nullable=False),
+        sa.Column("value", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint(
+            "hour", "source", "family", "route", "app_id", "unit", name="uq_upstream_usage_hourly_series"
+        ),
+    )
+    op.create_index("ix_upstream_usage_hourly_hour", "upstream_usage_hourly", ["hour"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_upstream_usage_hourly_hour", table_name="upstream_usage_hourly")
+    op.drop_table("upstream_usage_hourly")
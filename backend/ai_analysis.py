@@ -1,14 +1,35 @@
 import json
-from typing import Any, Dict, List, Literal, Optional, Tuple, TypedDict
+import time
+from typing import Any, Dict, Iterator, List, Literal, Optional, Tuple, TypedDict
 
 from openai import OpenAI
 
+from . import metrics, tracing
+from .observability import add_usage
 from .config import settings
 
 
 # Inicijalizacija OpenAI klijenta (ili None ako nema ključa)
 client = OpenAI(api_key=settings.openai_api_key) if settings.openai_api_key else None
 
+AI_MODEL = "gpt-4.1-mini"
+
+
+def _record_llm(kind: str, status: str, started: float) -> None:
+    metrics.inc("llm_requests_total", {"kind": kind, "status": status})
+    metrics.observe("llm_request_duration_ms", (time.perf_counter() - started) * 1000, {"kind": kind})
+    add_usage("openai", f"{kind}:{AI_MODEL}")
+
+
+def _record_llm_tokens(kind: str, usage: Any) -> None:
+    """Tokeni iz `completion.usage` (za stream: poslednji chunk uz `include_usage`)."""
+    if usage is None:
+        return
+    for unit in ("prompt_tokens", "completion_tokens"):
+        value = getattr(usage, unit, None)
+        if isinstance(value, int) and value > 0:
+            add_usage("openai", f"{kind}:{AI_MODEL}", unit, value)
+
 SYSTEM_PROMPT = """You are a football betting analyst.
 
 Strictly follow these rules:
@@ -287,13 +308,8 @@ def compute_btts_yes_probability_v1(
     return yes_pct, factors, avoid_flags
 
 
-def build_btts_v1_analysis(full_match: dict[str, Any]) -> dict[str, Any]:
-    """
-    Returns strict JSON block:
-    {"btts": {yes_pct,no_pct,recommended_btts_market,confidence_pct,key_factors,avoid_flags,reasoning_short}}
-    """
-    yes_pct, factors, avoid_flags = compute_btts_yes_probability_v1(full_match)
-
+def build_btts_v1_block(yes_pct: int, factors: list[str], avoid_flags: list[str]) -> BTTSBlock:
+    """Pretvara (yes_pct, key_factors, avoid_flags) u strict BTTS blok (deli ga i batch scorer)."""
     no_pct = 100 - yes_pct
     recommended: BTTSMarket = "YES" if yes_pct >= 55 else "NO"
     confidence = yes_pct if recommended == "YES" else no_pct
@@ -309,19 +325,25 @@ def build_btts_v1_analysis(full_match: dict[str, Any]) -> dict[str, Any]:
         )
 
     # keep it tight: max 5 faktora
-    factors = factors[:5]
-    avoid_flags = avoid_flags[:5]
-
-    btts: BTTSBlock = {
+    return {
         "yes_pct": int(yes_pct),
         "no_pct": int(no_pct),
         "recommended_btts_market": recommended,
         "confidence_pct": int(confidence),
-        "key_factors": factors,
-        "avoid_flags": avoid_flags,
+        "key_factors": factors[:5],
+        "avoid_flags": avoid_flags[:5],
         "reasoning_short": reasoning_short,
     }
-    return {"btts": btts}
+
+
+def build_btts_v1_analysis(full_match: dict[str, Any]) -> dict[str, Any]:
+    """
+    Returns strict JSON block:
+    {"btts": {yes_pct,no_pct,recommended_btts_market,confidence_pct,key_factors,avoid_flags,reasoning_short}}
+    """
+    yes_pct, factors, avoid_flags = compute_btts_yes_probability_v1(full_match)
+    return {"btts": build_btts_v1_block(yes_pct, factors, avoid_flags)}
+
 
 def _fallback_response(reason: str) -> Dict[str, Any]:
     """Minimal valid schema kada je AI isključen ili odgovori loše."""
@@ -394,25 +416,10 @@ def build_fallback_analysis(reason: str) -> Dict[str, Any]:
     return _fallback_response(reason)
 
 
-def run_ai_analysis(
+def _build_analysis_messages(
     full_match: dict[str, Any],
     user_question: str | None = None,
-    *,
-    prompt_version: str = "v1",
-) -> Any:
-    """Generate structured AI analysis for a single match.
-
-    Args:
-        full_match: JSON kontekst iz ``match_full.build_full_match``.
-        user_question: Opcioni dodatni fokus (npr. "naglasite defanzivu").
-    """
-    # BTTS deterministic path (no LLM)
-    if (prompt_version or "").lower().startswith("btts"):
-        return build_btts_v1_analysis(full_match)
-
-    if client is None:
-        return _fallback_response("no OPENAI_API_KEY configured")
-
+) -> List[Dict[str, str]]:
     # Ovo je payload koji šaljemo modelu – čitav meč kao JSON string
     match_json_str = json.dumps(full_match, ensure_ascii=False)
 
@@ -438,35 +445,11 @@ def run_ai_analysis(
                 ),
             }
         )
+    return messages
 
-    try:
-        completion = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=messages,
-            response_format={"type": "json_object"},
-        )
-    except Exception as e:
-        # Ako bilo šta pukne na API strani, vrati fallback da ne sruši backend
-        return _fallback_response(f"OpenAI error: {e}")
-
-    # U novom OpenAI SDK-u, uz response_format=json_object,
-    # message.content je JSON string.
-    try:
-        raw_content = completion.choices[0].message.content
-        if isinstance(raw_content, list):
-            # Za svaki slučaj – ako se vrati kao list of parts
-            text = "".join(part.get("text", "") for part in raw_content if isinstance(part, dict))
-        else:
-            text = str(raw_content)
-    except Exception:
-        return _fallback_response("cannot read AI message content")
-
-    try:
-        parsed = json.loads(text)
-    except json.JSONDecodeError:
-        return _fallback_response("AI output is not valid JSON")
 
-    # Minimalna validacija ključnih polja; ako nešto fali, dopuni default vrednostima
+def _normalize_analysis(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """Minimalna validacija ključnih polja; ako nešto fali, dopuni default vrednostima."""
     return {
         "preview": parsed.get("preview", ""),
         "key_factors": parsed.get("key_factors", []) or [],
@@ -518,6 +501,115 @@ def run_ai_analysis(
     }
 
 
+def parse_ai_analysis_text(text: str) -> Dict[str, Any]:
+    """Parsira kompletan JSON tekst modela u normalizovan analysis blok (ili fallback)."""
+    try:
+        parsed = json.loads(text)
+    except json.JSONDecodeError:
+        return _fallback_response("AI output is not valid JSON")
+    if not isinstance(parsed, dict):
+        return _fallback_response("AI output is not a JSON object")
+    return _normalize_analysis(parsed)
+
+
+def run_ai_analysis(
+    full_match: dict[str, Any],
+    user_question: str | None = None,
+    *,
+    prompt_version: str = "v1",
+) -> Any:
+    """Generate structured AI analysis for a single match.
+
+    Args:
+        full_match: JSON kontekst iz ``match_full.build_full_match``.
+        user_question: Opcioni dodatni fokus (npr. "naglasite defanzivu").
+    """
+    # BTTS deterministic path (no LLM)
+    if (prompt_version or "").lower().startswith("btts"):
+        return build_btts_v1_analysis(full_match)
+
+    if client is None:
+        return _fallback_response("no OPENAI_API_KEY configured")
+
+    messages = _build_analysis_messages(full_match, user_question)
+
+    started = time.perf_counter()
+    try:
+        with tracing.span("openai.chat", kind="analysis", model=AI_MODEL):
+            completion = client.chat.completions.create(
+                model=AI_MODEL,
+                messages=messages,
+                response_format={"type": "json_object"},
+            )
+    except Exception as e:
+        # Ako bilo šta pukne na API strani, vrati fallback da ne sruši backend
+        _record_llm("analysis", "error", started)
+        return _fallback_response(f"OpenAI error: {e}")
+    _record_llm("analysis", "ok", started)
+    _record_llm_tokens("analysis", getattr(completion, "usage", None))
+
+    # U novom OpenAI SDK-u, uz response_format=json_object,
+    # message.content je JSON string.
+    try:
+        raw_content = completion.choices[0].message.content
+        if isinstance(raw_content, list):
+            # Za svaki slučaj – ako se vrati kao list of parts
+            text = "".join(part.get("text", "") for part in raw_content if isinstance(part, dict))
+        else:
+            text = str(raw_content)
+    except Exception:
+        return _fallback_response("cannot read AI message content")
+
+    return parse_ai_analysis_text(text)
+
+
+def stream_ai_analysis(
+    full_match: dict[str, Any],
+    user_question: str | None = None,
+) -> Iterator[str]:
+    """Streaming varijanta ``run_ai_analysis``: yield-uje sirove tekstualne delte modela.
+
+    Pozivalac skuplja delte i na kraju ih predaje ``parse_ai_analysis_text``.
+    Ako klijent nije konfigurisan, yield-uje kompletan fallback JSON u jednom komadu.
+    """
+    if client is None:
+        yield json.dumps(_fallback_response("no OPENAI_API_KEY configured"), ensure_ascii=False)
+        return
+
+    messages = _build_analysis_messages(full_match, user_question)
+    started = time.perf_counter()
+    status = "error"
+    # generator: span se ne aktivira (contextvar ne sme da "curi" pozivaocu između yield-ova)
+    span = tracing.start_span("openai.chat", kind="stream", model=AI_MODEL)
+    chunks = 0
+    usage = None
+    try:
+        stream = client.chat.completions.create(
+            model=AI_MODEL,
+            messages=messages,
+            response_format={"type": "json_object"},
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        for chunk in stream:
+            usage = getattr(chunk, "usage", None) or usage
+            choices = getattr(chunk, "choices", None) or []
+            if not choices:
+                continue
+            delta = getattr(choices[0], "delta", None)
+            text = getattr(delta, "content", None) if delta is not None else None
+            if text:
+                chunks += 1
+                yield text
+        status = "ok"
+    finally:
+        _record_llm("stream", status, started)
+        _record_llm_tokens("stream", usage)
+        span.set_tag("chunks", chunks)
+        span.set_tag("status", status)
+        span.finish()
+
+
 def run_live_ai_analysis(
     full_match: Dict[str, Any],
     user_question: Optional[str] = None,
@@ -550,14 +642,19 @@ def run_live_ai_analysis(
             }
         )
 
+    started = time.perf_counter()
     try:
-        completion = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=messages,
-            response_format={"type": "json_object"},
-        )
+        with tracing.span("openai.chat", kind="live", model=AI_MODEL):
+            completion = client.chat.completions.create(
+                model=AI_MODEL,
+                messages=messages,
+                response_format={"type": "json_object"},
+            )
     except Exception as e:
+        _record_llm("live", "error", started)
         return _fallback_live_response(f"OpenAI error: {e}")
+    _record_llm("live", "ok", started)
+    _record_llm_tokens("live", getattr(completion, "usage", None))
 
     try:
         raw_content = completion.choices[0].message.content
@@ -17,6 +17,7 @@ from .config import (
     SKIP_STATUS,
 )
 
+from . import metrics, tracing
 from .cache import (
     begin_inflight,
     cache_get,
@@ -25,7 +26,7 @@ from .cache import (
     resolve_inflight,
     wait_for_inflight,
 )
-from .observability import add_api_ms, add_upstream_call
+from .observability import add_api_ms, add_upstream_call, add_usage
 
 logger = logging.getLogger("naksir.go_premium.api_football")
 
@@ -33,6 +34,8 @@ DEFAULT_TIMEOUT = 15  # seconds
 RATE_LIMIT_WINDOW = 60  # seconds
 RATE_LIMIT_THRESHOLD = 5
 MAX_BACKOFF = 10
+QUOTA_CACHE_KEY = "usage:api_football:quota"
+QUOTA_CACHE_TTL_SECONDS = 2 * 24 * 3600
 
 SESSION = requests.Session()
 RATE_LIMIT_EVENTS: Deque[float] = deque()
@@ -94,36 +97,73 @@ def _get_ttl_for_endpoint(endpoint: str) -> int:
     return 0
 
 
-def _circuit_open(endpoint: str) -> bool:
+def _circuit_open(endpoint: str, params: Optional[Dict[str, Any]] = None) -> bool:
     now = time.time()
     _prune_rate_limits(now)
-    if endpoint.strip("/") == "fixtures":
+    # slate/live/by-id fixtures su kritični i ne gase se; istorija tima (`team=&last=`) je opciona
+    if endpoint.strip("/") == "fixtures" and "team" not in (params or {}):
         return False
     return len(RATE_LIMIT_EVENTS) >= RATE_LIMIT_THRESHOLD
 
 
+def _record_upstream(endpoint: str, status: object, start_call: float) -> None:
+    duration_ms = (time.perf_counter() - start_call) * 1000
+    add_api_ms(duration_ms)
+    metrics.inc("upstream_requests_total", {"endpoint": endpoint, "status": status})
+    metrics.observe("upstream_request_duration_ms", duration_ms, {"endpoint": endpoint})
+
+
+def _note_quota(headers: Any) -> None:
+    """Poslednje stanje dnevne kvote iz API-Football headera (za `/_debug/usage`)."""
+    remaining = headers.get("x-ratelimit-requests-remaining")
+    if remaining is None:
+        return
+    try:
+        limit = headers.get("x-ratelimit-requests-limit")
+        snapshot = {"limit": int(limit) if limit else None, "remaining": int(remaining), "seen_at": time.time()}
+    except (TypeError, ValueError):
+        return
+    cache_set(QUOTA_CACHE_KEY, snapshot, QUOTA_CACHE_TTL_SECONDS)
+
+
 def _call_api(
     endpoint: str,
     params: Optional[Dict[str, Any]] = None,
     *,
     safe: bool = True,
+    ttl: Optional[int] = None,
 ) -> Dict[str, Any]:
     """
     Low–level wrapper oko API-FOOTBALL poziva.
 
+    `ttl` zamenjuje podrazumevani TTL endpoint-a (npr. kratak TTL za `fixtures?live=all`).
+
     Ako je `safe=True`, greške se loguju i vraća se prazan dict umesto exception-a.
     Ovo je bitno za opcione blokove u `/matches/{fixture_id}/full` – bolje da jedan
     blok izostane nego da cela ruta pukne.
     """
-    params = dict(params or {})
+    with tracing.span("api_football.call", endpoint=endpoint) as span:
+        return _call_api_traced(span, endpoint, dict(params or {}), safe=safe, ttl=ttl)
+
+
+def _call_api_traced(
+    span: Any,
+    endpoint: str,
+    params: Dict[str, Any],
+    *,
+    safe: bool,
+    ttl: Optional[int],
+) -> Dict[str, Any]:
     url = _build_url(endpoint)
     cache_key = make_cache_key(endpoint, params)
     cached = cache_get(cache_key)
+    span.set_tag("cache", "hit" if cached else "miss")
 
-    if cached and _circuit_open(endpoint):
+    if cached and _circuit_open(endpoint, params):
         logger.warning("API-Football circuit open for %s, serving cached payload", endpoint)
         return cached
-    if _circuit_open(endpoint):
+    if _circuit_open(endpoint, params):
+        span.set_tag("circuit", "open")
         logger.warning("API-Football circuit open for %s, no cache available", endpoint)
         return cached or {}
 
@@ -132,8 +172,10 @@ def _call_api(
 
     inflight, owns_execution = begin_inflight(cache_key)
     if not owns_execution:
+        span.set_tag("inflight", "follower")
         try:
-            return wait_for_inflight(inflight)
+            with tracing.span("api_football.inflight_wait", endpoint=endpoint):
+                return wait_for_inflight(inflight)
         except Exception:
             if safe:
                 return cached or {}
@@ -144,12 +186,15 @@ def _call_api(
         while True:
             start_call = time.perf_counter()
             add_upstream_call()
+            add_usage("api_football", endpoint)
             try:
-                resp = SESSION.get(
-                    url, headers=HEADERS, params=params, timeout=DEFAULT_TIMEOUT
-                )
+                with tracing.span("api_football.http", endpoint=endpoint) as http_span:
+                    resp = SESSION.get(
+                        url, headers=HEADERS, params=params, timeout=DEFAULT_TIMEOUT
+                    )
+                    http_span.set_tag("http.status_code", resp.status_code)
             except Exception as exc:  # network / timeout / SSL...
-                add_api_ms((time.perf_counter() - start_call) * 1000)
+                _record_upstream(endpoint, "error", start_call)
                 logger.warning(
                     "API-Football request failed (%s, params=%s): %s",
                     endpoint,
@@ -162,7 +207,8 @@ def _call_api(
                 resolve_inflight(inflight, error=exc)
                 raise
 
-            add_api_ms((time.perf_counter() - start_call) * 1000)
+            _record_upstream(endpoint, resp.status_code, start_call)
+            _note_quota(resp.headers)
             if resp.status_code == 429:
                 RATE_LIMIT_EVENTS.append(time.time())
                 if cached:
@@ -217,9 +263,8 @@ def _call_api(
                 resolve_inflight(inflight, error=exc)
                 raise
 
-            ttl = _get_ttl_for_endpoint(endpoint)
             if data:
-                cache_set(cache_key, data, ttl)
+                cache_set(cache_key, data, ttl if ttl is not None else _get_ttl_for_endpoint(endpoint))
             resolve_inflight(inflight, value=data or {})
             return data or {}
     finally:
@@ -286,6 +331,26 @@ def get_fixtures_by_date(date_str: str, *, include_finished: bool = False) -> Li
     return filtered
 
 
+LIVE_FIXTURES_PARAMS = {"live": "all", "timezone": TIMEZONE}
+LIVE_FIXTURES_TTL_SECONDS = 10
+
+
+def live_fixtures_from_payload(data: Optional[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+    """None kad payload nije validan odgovor (greška/prazan cache) – razlikuje se od 0 live mečeva."""
+    if not isinstance(data, dict) or not isinstance(data.get("response"), list):
+        return None
+    return [fx for fx in data["response"] if (fx.get("league") or {}).get("id") in ALLOW_LIST]
+
+
+def get_live_fixtures() -> Optional[List[Dict[str, Any]]]:
+    """
+    Svi mečevi koji su trenutno u toku (`fixtures?live=all`), jedan poziv za ceo svet,
+    filtrirani po ALLOW_LIST. Kratak TTL: live poller je jedini redovni potrošač.
+    """
+    data = _call_api("fixtures", dict(LIVE_FIXTURES_PARAMS), safe=True, ttl=LIVE_FIXTURES_TTL_SECONDS)
+    return live_fixtures_from_payload(data)
+
+
 def get_fixtures_today(*, include_finished: bool = False) -> List[Dict[str, Any]]:
     """Public helper: svi *dozvoljeni* fixture-i za današnji dan."""
     return get_fixtures_by_date(_today_str(), include_finished=include_finished)
@@ -408,6 +473,21 @@ def get_teams(
     return _extract_response_list(data)
 
 
+def get_team_last_fixtures(
+    team_id: int,
+    last: int = 10,
+    season: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    /fixtures?team=&last= – poslednjih N odigranih mečeva tima (za rolling forme).
+    """
+    params: Dict[str, Any] = {"team": team_id, "last": last, "timezone": TIMEZONE}
+    if season is not None:
+        params["season"] = season
+    data = _call_api("fixtures", params, safe=True)
+    return _extract_response_list(data)
+
+
 def get_team_by_id(team_id: int) -> Optional[Dict[str, Any]]:
     """
     /teams – single team lookup by ID.
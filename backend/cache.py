@@ -6,12 +6,14 @@ import threading
 import time
 from dataclasses import dataclass
 from datetime import date, datetime
-from typing import Any, Dict, Optional, Protocol
+from typing import Any, Callable, Dict, Optional, Protocol
 
 import fakeredis
 from redis import Redis
+from redis.exceptions import ResponseError, WatchError
 from redis.lock import Lock
 
+from . import metrics
 from .config import settings
 from .observability import add_cache_hit, add_cache_miss
 
@@ -21,6 +23,12 @@ CACHE_PREFIX = "naksir:cache:"
 LOCK_PREFIX = "naksir:lock:"
 DEFAULT_APP_ID = "naksir.go_premium"
 
+# compare-and-extend lease-a u jednom koraku: PEXPIRE samo ako je ključ i dalje naš
+_EXTEND_IF_OWNER_LUA = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then "
+    "return redis.call('pexpire', KEYS[1], ARGV[2]) end return 0"
+)
+
 
 def _json_default(value: object) -> str:
     if isinstance(value, (datetime, date)):
@@ -42,6 +50,10 @@ def make_cache_key(
     return f"{CACHE_PREFIX}{app_id}:{base_key}"
 
 
+# read-modify-write: dobija trenutnu vrednost (ili None), vraća novu ili None = bez upisa
+CacheUpdateFn = Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]
+
+
 @dataclass
 class InflightHandle:
     key: str
@@ -57,6 +69,21 @@ class CacheBackend(Protocol):
     def set(self, key: str, value: Dict[str, Any], ttl_seconds: float) -> None:
         ...
 
+    def delete(self, key: str) -> None:
+        ...
+
+    def claim(self, key: str, owner: str, ttl_seconds: float) -> bool:
+        ...
+
+    def incr_fields(self, key: str, increments: Dict[str, float], ttl_seconds: float) -> None:
+        ...
+
+    def get_fields(self, key: str) -> Dict[str, float]:
+        ...
+
+    def update(self, key: str, fn: CacheUpdateFn, ttl_seconds: Optional[float]) -> Optional[Dict[str, Any]]:
+        ...
+
     def begin_inflight(self, key: str) -> tuple[InflightHandle, bool]:
         ...
 
@@ -76,6 +103,8 @@ class RedisCacheBackend:
             self.client = fakeredis.FakeRedis(decode_responses=False)
         else:
             self.client = Redis.from_url(redis_url, decode_responses=False, socket_timeout=5)
+        self._extend_if_owner = self.client.register_script(_EXTEND_IF_OWNER_LUA)
+        self._scripting = True
 
     def _namespaced(self, key: str) -> str:
         if key.startswith(CACHE_PREFIX):
@@ -107,6 +136,92 @@ class RedisCacheBackend:
         payload = json.dumps(value, default=_json_default, ensure_ascii=False)
         self.client.setex(self._namespaced(key), int(ttl_seconds), payload)
 
+    def delete(self, key: str) -> None:
+        self.client.delete(self._namespaced(key))
+
+    def claim(self, key: str, owner: str, ttl_seconds: float) -> bool:
+        # SET NX (novi vlasnik) ili atomsko produženje ako je već naš
+        lock_key = self._lock_key(key)
+        ttl_ms = max(1, int(ttl_seconds * 1000))
+        if self.client.set(lock_key, owner, nx=True, px=ttl_ms):
+            return True
+        return self._extend(lock_key, owner, ttl_ms)
+
+    def _extend(self, lock_key: str, owner: str, ttl_ms: int) -> bool:
+        # GET pa zaseban PEXPIRE nije atomski: ako ključ istekne između, a drugi worker ga uzme
+        # (SET NX), produžili bismo tuđi lease i imali dva lidera.
+        if self._scripting:
+            try:
+                return bool(self._extend_if_owner(keys=[lock_key], args=[owner, ttl_ms]))
+            except ResponseError as exc:
+                if "unknown command" not in str(exc).lower():
+                    raise
+                # fakeredis bez Lua podrške – isti compare-and-extend preko WATCH/MULTI
+                self._scripting = False
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(lock_key)
+                current = pipe.get(lock_key)
+                if current is None or current.decode() != owner:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.pexpire(lock_key, ttl_ms)
+                pipe.execute()
+                return True
+            except WatchError:
+                # ključ se promenio između GET i EXEC (istekao/preuzet) – nismo više vlasnik
+                return False
+
+    def incr_fields(self, key: str, increments: Dict[str, float], ttl_seconds: float) -> None:
+        # atomski zbir iz više procesa (HINCRBYFLOAT), jedan round-trip
+        name = self._namespaced(key)
+        pipe = self.client.pipeline(transaction=False)
+        for field, value in increments.items():
+            pipe.hincrbyfloat(name, field, value)
+        pipe.expire(name, int(ttl_seconds))
+        pipe.execute()
+
+    def get_fields(self, key: str) -> Dict[str, float]:
+        raw = self.client.hgetall(self._namespaced(key))
+        return {
+            (k.decode() if isinstance(k, bytes) else k): float(v)
+            for k, v in raw.items()
+        }
+
+    def update(self, key: str, fn: CacheUpdateFn, ttl_seconds: Optional[float]) -> Optional[Dict[str, Any]]:
+        # optimistički CAS: WATCH -> GET -> fn -> MULTI/SETEX; ako je neko upisao u međuvremenu, ponovo
+        name = self._namespaced(key)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(name)
+                    raw = pipe.get(name)
+                    try:
+                        current = json.loads(raw) if raw is not None else None
+                    except json.JSONDecodeError:
+                        current = None
+                    new = fn(current)
+                    if new is None:
+                        pipe.unwatch()
+                        return current
+                    payload = json.dumps(new, default=_json_default, ensure_ascii=False)
+                    if ttl_seconds is None:
+                        # zadrži preostali TTL; ključ koji je nestao se ne vaskrsava
+                        remaining_ms = pipe.pttl(name)
+                        if remaining_ms is None or remaining_ms <= 0:
+                            pipe.unwatch()
+                            return current
+                        pipe.multi()
+                        pipe.psetex(name, remaining_ms, payload)
+                    else:
+                        pipe.multi()
+                        pipe.setex(name, int(ttl_seconds), payload)
+                    pipe.execute()
+                    return new
+                except WatchError:
+                    continue
+
     def begin_inflight(self, key: str) -> tuple[InflightHandle, bool]:
         lock = self.client.lock(self._lock_key(key), timeout=30, blocking_timeout=5)
         acquired = lock.acquire(blocking=False)
@@ -141,6 +256,8 @@ class LocalCacheBackend:
         self._cache: Dict[str, Dict[str, Any]] = {}
         self._expiry: Dict[str, float] = {}
         self._inflight: Dict[str, InflightHandle] = {}
+        self._claims: Dict[str, tuple[str, float]] = {}
+        self._fields: Dict[str, Dict[str, float]] = {}
 
     def get(self, key: str) -> Optional[Dict[str, Any]]:
         now = time.time()
@@ -160,6 +277,50 @@ class LocalCacheBackend:
             self._cache[key] = value
             self._expiry[key] = expires_at
 
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+            self._expiry.pop(key, None)
+            self._fields.pop(key, None)
+
+    def claim(self, key: str, owner: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        with self._lock:
+            holder = self._claims.get(key)
+            if holder is None or holder[1] < now or holder[0] == owner:
+                self._claims[key] = (owner, now + ttl_seconds)
+                return True
+            return False
+
+    def incr_fields(self, key: str, increments: Dict[str, float], ttl_seconds: float) -> None:
+        with self._lock:
+            fields = self._fields.setdefault(key, {})
+            for field, value in increments.items():
+                fields[field] = fields.get(field, 0.0) + value
+
+    def get_fields(self, key: str) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._fields.get(key, {}))
+
+    def update(self, key: str, fn: CacheUpdateFn, ttl_seconds: Optional[float]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            expires_at = self._expiry.get(key)
+            current = self._cache.get(key)
+            if expires_at and expires_at < time.time():
+                current = None
+            new = fn(current)
+            if new is None:
+                return current
+            if ttl_seconds is None:
+                if current is not None:
+                    self._cache[key] = new
+                    return new
+                return current
+            if ttl_seconds > 0:
+                self._cache[key] = new
+                self._expiry[key] = time.time() + ttl_seconds
+            return new
+
     def begin_inflight(self, key: str) -> tuple[InflightHandle, bool]:
         with self._lock:
             if key in self._inflight:
@@ -204,6 +365,10 @@ def cache_get(key: str) -> Optional[Dict[str, Any]]:
         add_cache_miss()
     else:
         add_cache_hit()
+    metrics.inc(
+        "cache_requests_total",
+        {"family": metrics.cache_family(key, CACHE_PREFIX), "result": "miss" if cached is None else "hit"},
+    )
     return cached
 
 
@@ -211,6 +376,35 @@ def cache_set(key: str, value: Dict[str, Any], ttl_seconds: float) -> None:
     _BACKEND.set(key, value, ttl_seconds)
 
 
+def cache_delete(key: str) -> None:
+    _BACKEND.delete(key)
+
+
+def cache_claim(key: str, owner: str, ttl_seconds: float) -> bool:
+    """Leader lease: True ako je `owner` (i dalje) vlasnik ključa narednih ttl_seconds."""
+    return _BACKEND.claim(key, owner, ttl_seconds)
+
+
+def cache_incr_fields(key: str, increments: Dict[str, float], ttl_seconds: float) -> None:
+    """Sabira numerička polja u deljenom hash-u (metrike iz svih workera)."""
+    if increments:
+        _BACKEND.incr_fields(key, increments, ttl_seconds)
+
+
+def cache_get_fields(key: str) -> Dict[str, float]:
+    return _BACKEND.get_fields(key)
+
+
+def cache_update(key: str, fn: CacheUpdateFn, ttl_seconds: Optional[float]) -> Optional[Dict[str, Any]]:
+    """
+    Atomski read-modify-write jednog ključa (Redis WATCH/MULTI). `fn` može biti pozvan više
+    puta (retry posle konflikta), pa mora biti bez side-effect-a. Vraća upisanu vrednost,
+    odnosno trenutnu ako `fn` vrati None. `ttl_seconds=None` zadržava preostali TTL ključa
+    (patch ne produžava život unosa); ako ključ ne postoji, ništa se ne upisuje.
+    """
+    return _BACKEND.update(key, fn, ttl_seconds)
+
+
 def cache_get_json(key: str) -> Optional[Dict[str, Any]]:
     cached = cache_get(key)
     if cached is None:
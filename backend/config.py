@@ -168,8 +168,8 @@ def get_google_service_account_info() -> Optional[Dict[str, Any]]:
     except Exception:
         return None
 
-# Glavni endpoint
-API_FOOTBALL_BASE_URL = "https://v3.football.api-sports.io"
+# Glavni endpoint (override samo za load testove / replay stand-in, vidi scripts/api_football_stand_in.py)
+API_FOOTBALL_BASE_URL = os.getenv("API_FOOTBALL_BASE_URL", "https://v3.football.api-sports.io")
 
 # Headers za API-Football pozive
 HEADERS = {"x-apisports-key": settings.api_football_key}
@@ -33,11 +33,15 @@ class BttsTicket(BaseModel):
 
     total_odds: float = Field(..., ge=1.0)
     confidence: int = Field(..., ge=0, le=100)
+    expected_value: Optional[float] = None
 
     matches: List[BttsMatchPick]
 
 
 class DailyBttsTicketsResponse(BaseModel):
     date: date
+    version: Optional[int] = None
     yes_ticket: BttsTicket
     no_ticket: BttsTicket
+    yes_alternatives: List[BttsTicket] = Field(default_factory=list)
+    no_alternatives: List[BttsTicket] = Field(default_factory=list)
@@ -1,14 +1,19 @@
 from __future__ import annotations
 
 import os
-
+import re
 import time
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Optional, TypeVar, Union
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 
+from . import metrics, tracing
 from .config import settings
-from .observability import add_db_ms
+from .observability import add_db_query
 
 
 def _normalize_database_url(raw_url: str) -> str:
@@ -39,11 +44,139 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
 
 
+def _async_database_url(sync_url: str) -> Optional[str]:
+    """
+    URL za async engine: `ASYNC_DATABASE_URL` ako je zadat, inače isti psycopg URL
+    (psycopg3 ima i async API). Za dialect bez async drajvera (sqlite bez aiosqlite) -> None.
+    """
+    override = os.getenv("ASYNC_DATABASE_URL", "").strip()
+    if override:
+        return _normalize_database_url(override)
+    if sync_url.startswith("postgresql+psycopg://"):
+        return sync_url
+    return None
+
+
+ASYNC_DATABASE_URL = _async_database_url(DATABASE_URL)
+
+# Async pool ne drži thread po konekciji, pa može biti veći od sync pool-a; granica je
+# max_connections na Postgres-u (po workeru: pool_size + max_overflow).
+async_engine: Optional[AsyncEngine] = (
+    create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_pre_ping=True,
+        pool_size=int(os.getenv("DB_ASYNC_POOL_SIZE", "20")),
+        max_overflow=int(os.getenv("DB_ASYNC_MAX_OVERFLOW", "20")),
+        pool_timeout=float(os.getenv("DB_ASYNC_POOL_TIMEOUT", "10")),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    )
+    if ASYNC_DATABASE_URL
+    else None
+)
+
+AsyncSessionLocal: Optional[async_sessionmaker[AsyncSession]] = (
+    async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False) if async_engine is not None else None
+)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_BIND_PARAM = re.compile(r"%\(\w+\)s|%s|\$\d+|:\w+")
+FINGERPRINT_MAX_CHARS = 500
+
+
+@lru_cache(maxsize=1024)
+def statement_fingerprint(statement: str) -> str:
+    """Oblik upita bez literala/parametara: `SELECT … WHERE id = ?` -> ključ za N+1 i slowest."""
+    sql = _STRING_LITERAL.sub("?", statement)
+    sql = _BIND_PARAM.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    sql = _PARAM_LIST.sub("(?)", sql)
+    return sql[:FINGERPRINT_MAX_CHARS]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    span = tracing.start_span("db.statement")
+    conn.info.setdefault("query_started", []).append((time.perf_counter(), span))
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    started_at, span = started.pop()
+    duration_ms = (time.perf_counter() - started_at) * 1000
+    fingerprint = statement_fingerprint(statement)
+    add_db_query(fingerprint, duration_ms)
+    metrics.observe("db_query_duration_ms", duration_ms)
+    span.set_tag("db.statement", fingerprint)
+    span.finish()
+
+
+def _handle_error(exception_context) -> None:
+    # neuspeli statement ne prolazi after_cursor_execute -> skini njegov start
+    conn = exception_context.connection
+    started = conn.info.get("query_started") if conn is not None else None
+    if started:
+        _started_at, span = started.pop()
+        span.finish(error=exception_context.original_exception)
+
+
+def instrument_engine(target) -> None:
+    """Meri svaki SQL statement (ne životni vek sesije) i pripisuje ga tekućem request-u."""
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+    event.listen(target, "handle_error", _handle_error)
+
+
+instrument_engine(engine)
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine)
+
+
 def get_db():
     db = SessionLocal()
-    start = time.perf_counter()
     try:
         yield db
     finally:
         db.close()
-        add_db_ms((time.perf_counter() - start) * 1000)
+
+
+T = TypeVar("T")
+
+
+class ThreadedSession:
+    """
+    Fallback za `get_async_db` kada nema async drajvera: isti `run_sync` API kao
+    AsyncSession, ali sync Session radi u threadpool-u (ponašanje kao sync ruta).
+    """
+
+    def __init__(self) -> None:
+        self.sync_session: Session = SessionLocal()
+
+    async def run_sync(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+
+AsyncDbSession = Union[AsyncSession, ThreadedSession]
+
+
+async def get_async_db() -> AsyncIterator[AsyncDbSession]:
+    """
+    Session za async rute. Postojeći sync servisi se zovu kroz `await session.run_sync(fn, ...)`:
+    na AsyncSession-u to radi u greenlet-u nad async konekcijom, bez zauzimanja threadpool slota.
+    """
+    if AsyncSessionLocal is None:
+        session = ThreadedSession()
+        try:
+            yield session
+        finally:
+            await session.close()
+        return
+    async with AsyncSessionLocal() as async_session:
+        yield async_session
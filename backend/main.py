@@ -6,11 +6,20 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
+from backend.apps.registry import get_app_config
 from backend.config import TIMEZONE, settings
 from backend.monitoring import install_monitoring_hooks
 from backend.observability import ObservabilityMiddleware
-from backend.routers import ai, billing, btts_tickets, debug_ops, matches, meta, players, teams
+from backend.routers import ai, billing, btts_tickets, debug_ops, live, matches, meta, players, teams
 from backend.routers.btts import router as btts_router
+from backend.services.ai_analysis_cache_service import start_lease_sweeper
+from backend.services import btts_service
+from backend.services.archive_pipeline import start_archive_worker
+from backend.services.btts_ticket_builder import start_ticket_scheduler
+from backend.services.live_poller import start_live_poller
+from backend.services.metrics_aggregator import start_metrics_flusher
+from backend.services.usage_accounting import start_usage_flusher
+from backend.tracing import TracedJSONResponse
 
 logger = logging.getLogger("naksir.go_premium.api")
 logging.basicConfig(
@@ -27,6 +36,7 @@ def create_app() -> FastAPI:
             "Glavni fokus: lagani JSON feedovi za mobilni front (Expo / React Native)."
         ),
         version="1.0.0",
+        default_response_class=TracedJSONResponse,
     )
 
     app.add_middleware(
@@ -72,6 +82,24 @@ def create_app() -> FastAPI:
             logger.info("%-6s %s", ",".join(visible_methods), route.path)
         logger.info("======================")
 
+    @app.on_event("startup")
+    def start_background_workers() -> None:
+        # AI_LEASE_SWEEP_INTERVAL_SECONDS=0 isključuje sweeper
+        start_lease_sweeper()
+        # HISTORY_ARCHIVE_DIR uključuje arhiviranje završenih dana
+        start_archive_worker()
+        # BTTS_TICKETS_REFRESH_SECONDS=0 isključuje precompute tiketa
+        start_ticket_scheduler(
+            btts_service.get_btts_today_fixtures,
+            top_league_ids=set(get_app_config("btts.predictor").top_league_ids or []),
+        )
+        # LIVE_POLL_SECONDS=0 isključuje live poller
+        start_live_poller()
+        # METRICS_FLUSH_SECONDS=0: metrike se sabiraju samo na scrape
+        start_metrics_flusher()
+        # USAGE_FLUSH_SECONDS=0: potrošnja se upisuje u Redis samo pri `/_debug/usage`
+        start_usage_flusher()
+
     app.include_router(meta.router)
     app.include_router(matches.router)
     app.include_router(ai.router)
@@ -81,6 +109,7 @@ def create_app() -> FastAPI:
     app.include_router(debug_ops.router)
     app.include_router(btts_router)
     app.include_router(btts_tickets.router)
+    app.include_router(live.router)
 
     return app
 
@@ -4,10 +4,11 @@ import logging
 from datetime import datetime
 from typing import Any, Dict, Optional
 
-from . import api_football
+from . import api_football, tracing
 from .config import TIMEZONE
 from .odds_normalizer import normalize_odds
 from .odds_summary import build_odds_probabilities, build_odds_summary
+from .services.feature_extraction import FeatureSlate
 
 
 logger = logging.getLogger("naksir.go_premium.match_full")
@@ -36,11 +37,13 @@ def _safe_call(label: str, func: Optional[callable], *args: Any, **kwargs: Any)
             _MISSING_HELPERS.add(label)
         return None
 
-    try:
-        return func(*args, **kwargs)
-    except Exception as exc:  # noqa: BLE001
-        logger.warning("match_full: %s failed: %s", label, exc)
-        return None
+    with tracing.span(f"match_full.{label}") as span:
+        try:
+            return func(*args, **kwargs)
+        except Exception as exc:  # noqa: BLE001
+            span.set_tag("error", str(exc)[:200])
+            logger.warning("match_full: %s failed: %s", label, exc)
+            return None
 
 
 def _get_fixture_core(fixture: Dict[str, Any]) -> Dict[str, Any]:
@@ -174,6 +177,8 @@ full_context = {
     "players": players,
     "predictions": predictions,
     "injuries": injuries,
+    "form": form,  # rolling last-N (btts_rate, scored_pg, ...)
+    "statistics": statistics,  # sezonski teams/statistics agregati
     "odds": odds_block,  # summary + raw + "flat" snapshot
     }
 
@@ -181,7 +186,12 @@ full_context = {
     Sve sekcije koje ne možemo da dohvatimo ili koje failuju su jednostavno None.
     Front (i AI layer) samo preskače None.
     """
+    fixture_id = (fixture.get("fixture") or {}).get("id")
+    with tracing.span("match_full.build", fixture_id=fixture_id, sections=",".join(sorted(sections or [])) or None):
+        return _build_full_match(fixture, sections)
 
+
+def _build_full_match(fixture: Dict[str, Any], sections: Optional[set[str]]) -> Dict[str, Any]:
     core = _get_fixture_core(fixture)
 
     fx = core["fixture"]
@@ -456,6 +466,14 @@ full_context = {
         )
         injuries = _safe_call("injuries", injuries_helper, fixture_id)
 
+    # ---- Rolling forma (poslednjih N + teams/statistics), keširano po timu+sezoni ---
+
+    match_sections = None
+    if _should_include("form", sections):
+        match_sections = _safe_call("form", FeatureSlate().match_sections, fixture)
+    form = (match_sections or {}).get("form")
+    statistics = (match_sections or {}).get("statistics")
+
     # ---- Odds (raw + normalizovani marketi) --------------------------------------
 
     odds_raw = None
@@ -467,19 +485,20 @@ full_context = {
         odds_raw = _safe_call("odds_all", odds_helper, fixture_id)
 
     if odds_raw:
-        try:
-            odds_summary = normalize_odds(odds_raw)
-        except Exception as exc:  # noqa: BLE001
-            logger.warning("match_full: normalize_odds failed: %s", exc)
-        try:
-            odds_flat = build_odds_summary(odds_raw)
-        except Exception as exc:  # noqa: BLE001
-            logger.warning("match_full: build_odds_summary failed: %s", exc)
-        try:
-            if odds_flat:
-                odds_flat_probabilities = build_odds_probabilities(odds_flat)
-        except Exception as exc:  # noqa: BLE001
-            logger.warning("match_full: build_odds_probabilities failed: %s", exc)
+        with tracing.span("match_full.odds_normalize"):
+            try:
+                odds_summary = normalize_odds(odds_raw)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("match_full: normalize_odds failed: %s", exc)
+            try:
+                odds_flat = build_odds_summary(odds_raw)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("match_full: build_odds_summary failed: %s", exc)
+            try:
+                if odds_flat:
+                    odds_flat_probabilities = build_odds_probabilities(odds_flat)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("match_full: build_odds_probabilities failed: %s", exc)
 
     odds_block = None
     if odds_raw is not None:
@@ -526,6 +545,8 @@ full_context = {
         "players": players,
         "predictions": predictions,
         "injuries": injuries,
+        "form": form,
+        "statistics": statistics,
         "odds": odds_block,
     }
 
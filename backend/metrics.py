@@ -0,0 +1,210 @@
+"""
+In-process metrics registry (counteri + histogrami), bez spoljnih zavisnosti.
+
+Svaki proces skuplja delte lokalno (lock + dict inkrement, jeftino na hot path-u);
+`services/metrics_aggregator.py` ih periodično sabira u deljeni cache (Redis), pa
+scrape endpoint vidi zbir svih workera. Render je Prometheus text exposition format.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import threading
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+# ms; poslednji bucket je +Inf
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+Labels = Tuple[Tuple[str, str], ...]
+SeriesKey = Tuple[str, Labels]
+
+_FIELD_SEP = "\x1f"
+
+
+def _labels(labels: Optional[Mapping[str, object]]) -> Labels:
+    if not labels:
+        return ()
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS) -> None:
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[SeriesKey, float] = {}
+        # po seriji: [count po bucket-u..., +Inf, sum]
+        self._histograms: Dict[SeriesKey, List[float]] = {}
+
+    def inc(self, name: str, labels: Optional[Mapping[str, object]] = None, value: float = 1.0) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, labels: Optional[Mapping[str, object]] = None) -> None:
+        key = (name, _labels(labels))
+        idx = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                idx = i
+                break
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = [0.0] * (len(self.buckets) + 2)
+            series[idx] += 1
+            series[-1] += value
+
+    def drain(self) -> Dict[str, float]:
+        """Vraća i briše lokalne delte kao flat polja (`encode_field`) za deljeni zbir."""
+        with self._lock:
+            counters, histograms = self._counters, self._histograms
+            self._counters, self._histograms = {}, {}
+        fields: Dict[str, float] = {}
+        for (name, labels), value in counters.items():
+            fields[encode_field("c", name, labels, "")] = value
+        for (name, labels), series in histograms.items():
+            for i, count in enumerate(series[:-1]):
+                if count:
+                    fields[encode_field("h", name, labels, str(i))] = count
+            fields[encode_field("h", name, labels, "sum")] = series[-1]
+        return fields
+
+    def restore(self, fields: Mapping[str, float]) -> None:
+        """Vraća drain-ovane delte (flush u deljeni cache nije uspeo)."""
+        with self._lock:
+            for field, value in fields.items():
+                kind, name, labels, suffix = decode_field(field)
+                key = (name, labels)
+                if kind == "c":
+                    self._counters[key] = self._counters.get(key, 0.0) + value
+                    continue
+                series = self._histograms.get(key)
+                if series is None:
+                    series = self._histograms[key] = [0.0] * (len(self.buckets) + 2)
+                series[-1 if suffix == "sum" else int(suffix)] += value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+def encode_field(kind: str, name: str, labels: Labels, suffix: str) -> str:
+    return _FIELD_SEP.join((kind, name, json.dumps(labels), suffix))
+
+
+def decode_field(field: str) -> Tuple[str, str, Labels, str]:
+    kind, name, labels, suffix = field.split(_FIELD_SEP)
+    return kind, name, tuple(tuple(pair) for pair in json.loads(labels)), suffix  # type: ignore[misc]
+
+
+class Snapshot:
+    """Sabrani metrici (iz deljenog cache-a) u obliku pogodnom za render i kvantile."""
+
+    def __init__(self, fields: Mapping[str, float], buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS) -> None:
+        self.buckets = buckets
+        self.counters: Dict[SeriesKey, float] = {}
+        self.histograms: Dict[SeriesKey, List[float]] = {}
+        for field, value in fields.items():
+            try:
+                kind, name, labels, suffix = decode_field(field)
+            except ValueError:
+                continue
+            key = (name, labels)
+            if kind == "c":
+                self.counters[key] = self.counters.get(key, 0.0) + value
+                continue
+            series = self.histograms.setdefault(key, [0.0] * (len(buckets) + 2))
+            if suffix == "sum":
+                series[-1] += value
+            elif suffix.isdigit() and int(suffix) < len(buckets) + 1:
+                series[int(suffix)] += value
+
+    def quantile(self, name: str, q: float, labels: Optional[Mapping[str, object]] = None) -> Optional[float]:
+        series = self.histograms.get((name, _labels(labels)))
+        return histogram_quantile(q, self.buckets, series[:-1]) if series else None
+
+    def series(self, name: str) -> Iterable[Tuple[Labels, List[float]]]:
+        for (series_name, labels), series in sorted(self.histograms.items()):
+            if series_name == name:
+                yield labels, series
+
+
+def histogram_quantile(q: float, buckets: Tuple[float, ...], counts: List[float]) -> Optional[float]:
+    """Linearna interpolacija unutar bucket-a (isto kao Prometheus histogram_quantile)."""
+    total = sum(counts)
+    if total <= 0:
+        return None
+    rank = q * total
+    cumulative = 0.0
+    for i, count in enumerate(counts):
+        if cumulative + count >= rank and count > 0:
+            if i >= len(buckets):
+                return float(buckets[-1])  # +Inf bucket: najbolja procena je poslednja granica
+            lower = buckets[i - 1] if i > 0 else 0.0
+            return lower + (buckets[i] - lower) * ((rank - cumulative) / count)
+        cumulative += count
+    return float(buckets[-1])
+
+
+def _fmt_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else f"{value:.6g}"
+
+
+def render_prometheus(snapshot: Snapshot) -> str:
+    lines: List[str] = []
+    typed: set = set()
+    for (name, labels), value in sorted(snapshot.counters.items()):
+        if name not in typed:
+            lines.append(f"# TYPE {name} counter")
+            typed.add(name)
+        lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+    for (name, labels), series in sorted(snapshot.histograms.items()):
+        if name not in typed:
+            lines.append(f"# TYPE {name} histogram")
+            typed.add(name)
+        cumulative = 0.0
+        for i, bound in enumerate(list(snapshot.buckets) + [math.inf]):
+            cumulative += series[i]
+            lines.append(f"{name}_bucket{_fmt_labels(labels, ('le', _fmt_value(bound)))} {_fmt_value(cumulative)}")
+        lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_value(series[-1])}")
+        lines.append(f"{name}_count{_fmt_labels(labels)} {_fmt_value(cumulative)}")
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def inc(name: str, labels: Optional[Mapping[str, object]] = None, value: float = 1.0) -> None:
+    REGISTRY.inc(name, labels, value)
+
+
+def observe(name: str, value: float, labels: Optional[Mapping[str, object]] = None) -> None:
+    REGISTRY.observe(name, value, labels)
+
+
+def cache_family(key: str, prefix: str = "") -> str:
+    """Porodica cache ključa (najviše 2 segmenta, bez JSON parametara/datuma): `fixtures`, `btts:tickets`."""
+    if prefix and key.startswith(prefix):
+        key = key[len(prefix):]
+    segments: List[str] = []
+    for segment in key.split(":"):
+        if not segment or segment.startswith("{") or segment[0].isdigit() or len(segments) == 2:
+            break
+        segments.append(segment)
+    return ":".join(segments) or "other"
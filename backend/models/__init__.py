@@ -6,6 +6,7 @@ from .billing import Product, Purchase, Entitlement
 from .usage_and_coins import AIUsageDaily, AIUsagePeriod, CoinsWallet, CoinsLedger
 from .ads import AdsConsent
 from .ai_analysis_cache import AiAnalysisCache
+from .upstream_usage import UpstreamUsageHourly
 
 __all__ = [
     "Base",
@@ -20,4 +21,5 @@ __all__ = [
     "CoinsLedger",
     "AdsConsent",
     "AiAnalysisCache",
+    "UpstreamUsageHourly",
 ]
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import DateTime, Integer, String, Text, UniqueConstraint
+from sqlalchemy import DateTime, Float, Index, Integer, String, Text, UniqueConstraint
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -34,6 +34,15 @@ class AiAnalysisCache(Base):
     lang: Mapped[str] = mapped_column(String(10), nullable=False, default="en")
     model: Mapped[str] = mapped_column(String(80), nullable=False, default="default")
 
+    # Projekcija BTTS badge-a (puni se u save_ok) – list upiti ne čitaju analysis_json
+    btts_yes_pct: Mapped[float | None] = mapped_column(Float, nullable=True)
+    btts_no_pct: Mapped[float | None] = mapped_column(Float, nullable=True)
+    btts_badge: Mapped[dict[str, Any] | None] = mapped_column(JSONB, nullable=True)
+
+    # Generation lease: ko trenutno generiše red i do kada (heartbeat ga produžava)
+    lease_owner: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    lease_expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, default=datetime.utcnow
     )
@@ -47,4 +56,6 @@ class AiAnalysisCache(Base):
             "cache_key",
             name="uq_ai_analysis_cache_app_id_cache_key",
         ),
+        Index("ix_ai_analysis_cache_status_lease", "status", "lease_expires_at"),
+        Index("ix_ai_analysis_cache_app_fixture_status", "app_id", "fixture_id", "status"),
     )
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class UpstreamUsageHourly(Base):
+    """Satni zbir potrošnje API-Football / OpenAI (izvor istine je Redis; ovde trajna kopija)."""
+
+    __tablename__ = "upstream_usage_hourly"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    hour: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)  # UTC početak sata
+    source: Mapped[str] = mapped_column(String(32), nullable=False)  # api_football | openai
+    family: Mapped[str] = mapped_column(String(128), nullable=False)  # endpoint ili kind:model
+    route: Mapped[str] = mapped_column(String(200), nullable=False)
+    app_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    unit: Mapped[str] = mapped_column(String(32), nullable=False)  # calls | prompt_tokens | completion_tokens
+    value: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("hour", "source", "family", "route", "app_id", "unit", name="uq_upstream_usage_hourly_series"),
+    )
@@ -1,11 +1,9 @@
 from __future__ import annotations
 
 import logging
-import time
-from typing import Callable
 
 import requests
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 
 from .config import settings
 
@@ -13,21 +11,10 @@ logger = logging.getLogger("naksir.go_premium.monitoring")
 
 
 def install_monitoring_hooks(app: FastAPI) -> None:
-    """Attach lightweight monitoring/alerting hooks to the FastAPI app."""
-
-    @app.middleware("http")
-    async def log_latency(request: Request, call_next: Callable):  # type: ignore[override]
-        start = time.perf_counter()
-        response = await call_next(request)
-        duration_ms = (time.perf_counter() - start) * 1000
-        logger.info(
-            "HTTP %s %s -> %s in %.2fms",
-            request.method,
-            request.url.path,
-            getattr(response, "status_code", "?"),
-            duration_ms,
-        )
-        return response
+    """Attach lightweight monitoring/alerting hooks to the FastAPI app.
+
+    Request latency/access log radi `observability.ObservabilityMiddleware` (jedan ASGI sloj).
+    """
 
     if settings.alert_webhook:
         try:
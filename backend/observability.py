@@ -1,16 +1,28 @@
 from __future__ import annotations
 
 import logging
+import os
+import threading
 import time
 import uuid
+from collections import Counter
+from contextlib import contextmanager
 from contextvars import ContextVar
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Iterator
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend import metrics, profiler, tracing, usage
+from backend.apps.registry import APP_ID_HEADER, DEFAULT_APP_ID
 
 logger = logging.getLogger("naksir.go_premium.observability")
 
+# isti oblik upita više od K puta u jednom request-u -> N+1 upozorenje
+N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "10"))
+
 
 @dataclass
 class RequestMetrics:
@@ -19,6 +31,17 @@ class RequestMetrics:
     upstream_calls: int = 0
     db_ms: float = 0.0
     api_ms: float = 0.0
+    db_queries: int = 0
+    slowest_query_ms: float = 0.0
+    slowest_query: str | None = None
+    query_shapes: dict[str, int] = field(default_factory=dict)
+    # (source, family, unit) -> potrošnja spoljnih servisa u ovom request-u
+    usage: Counter = field(default_factory=Counter)
+    # samo uz X-Profile: threadovi koji su radili za ovaj request (filter za request profil)
+    profile_threads: set[int] | None = None
+
+    def n_plus_one(self) -> dict[str, int]:
+        return {fp: n for fp, n in self.query_shapes.items() if n > N_PLUS_ONE_THRESHOLD}
 
 
 _request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
@@ -33,28 +56,77 @@ def get_request_metrics() -> RequestMetrics | None:
     return _metrics.get()
 
 
+def _note_thread(metrics: RequestMetrics) -> None:
+    if metrics.profile_threads is not None:
+        metrics.profile_threads.add(threading.get_ident())
+
+
 def add_cache_hit() -> None:
     metrics = _metrics.get()
     if metrics:
         metrics.cache_hits += 1
+        _note_thread(metrics)
 
 
 def add_cache_miss() -> None:
     metrics = _metrics.get()
     if metrics:
         metrics.cache_misses += 1
+        _note_thread(metrics)
 
 
 def add_upstream_call() -> None:
     metrics = _metrics.get()
     if metrics:
         metrics.upstream_calls += 1
+        _note_thread(metrics)
 
 
-def add_db_ms(duration_ms: float) -> None:
+def add_db_query(fingerprint: str, duration_ms: float) -> None:
+    """Jedan SQL statement (engine eventi u db.py): broj, ukupno vreme, najsporiji, N+1."""
     metrics = _metrics.get()
-    if metrics:
-        metrics.db_ms += duration_ms
+    if not metrics:
+        return
+    _note_thread(metrics)
+    metrics.db_queries += 1
+    metrics.db_ms += duration_ms
+    if duration_ms > metrics.slowest_query_ms:
+        metrics.slowest_query_ms = duration_ms
+        metrics.slowest_query = fingerprint
+    count = metrics.query_shapes.get(fingerprint, 0) + 1
+    metrics.query_shapes[fingerprint] = count
+    if count == N_PLUS_ONE_THRESHOLD + 1:
+        logger.warning(
+            "RID=%s possible N+1: statement ran >%s times: %s",
+            _request_id.get(),
+            N_PLUS_ONE_THRESHOLD,
+            fingerprint[:300],
+        )
+
+
+def add_usage(source: str, family: str, unit: str = "calls", value: float = 1.0) -> None:
+    """Potrošnja upstream/LLM servisa; van request-a ide direktno u ledger kao `background`."""
+    metrics = _metrics.get()
+    if metrics is None:
+        usage.LEDGER.add(source, family, unit, value)
+        return
+    metrics.usage[(source, family, unit)] += value
+
+
+@contextmanager
+def usage_scope(route: str, app_id: str) -> Iterator[RequestMetrics]:
+    """
+    Potrošnja iz thread-a koji radi za request (npr. SSE producer) pripisuje se ruti i app_id-u
+    tog request-a, ne `background`-u. Thread može da nadživi request (klijent se otkači), pa ima
+    sopstveni brojač koji se upisuje u ledger kad thread završi.
+    """
+    scoped = RequestMetrics()
+    token = _metrics.set(scoped)
+    try:
+        yield scoped
+    finally:
+        _metrics.reset(token)
+        usage.LEDGER.add_request(route, app_id, scoped.usage)
 
 
 def add_api_ms(duration_ms: float) -> None:
@@ -63,39 +135,125 @@ def add_api_ms(duration_ms: float) -> None:
         metrics.api_ms += duration_ms
 
 
-class ObservabilityMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        rid = request.headers.get("x-request-id") or uuid.uuid4().hex[:12]
+def _route_template(scope: dict) -> str:
+    # template rute (`/matches/{fixture_id}`), ne konkretan path -> ograničen broj serija
+    return getattr(scope.get("route"), "path", None) or "unmatched"
+
+
+def _record_http(scope: dict, method: str, status: int, duration_ms: float, request_metrics: RequestMetrics) -> None:
+    route = _route_template(scope)
+    metrics.inc("http_requests_total", {"route": route, "method": method, "status": status})
+    metrics.observe("http_request_duration_ms", duration_ms, {"route": route, "method": method})
+    if request_metrics.db_queries:
+        metrics.inc("http_db_queries_total", {"route": route}, request_metrics.db_queries)
+    if request_metrics.n_plus_one():
+        metrics.inc("db_n_plus_one_total", {"route": route})
+
+
+def _store_profile(rid: str, request_profiler: profiler.SamplingProfiler, thread_ids: set[int] | None) -> None:
+    try:
+        profiler.store_request_profile(rid, request_profiler, thread_ids)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("RID=%s storing request profile failed: %s", rid, exc)
+
+
+def _finish_root_span(
+    span: tracing.Span, scope: dict, method: str, status: int | None, request_metrics: RequestMetrics
+) -> None:
+    route = getattr(scope.get("route"), "path", None)
+    if route:
+        span.name = f"{method} {route}"
+    span.set_tag("http.path", scope.get("path", ""))
+    span.set_tag("http.status_code", status or 500)
+    span.set_tag("cache.hits", request_metrics.cache_hits)
+    span.set_tag("cache.misses", request_metrics.cache_misses)
+    span.set_tag("upstream.calls", request_metrics.upstream_calls)
+    span.set_tag("db.queries", request_metrics.db_queries)
+    span.finish()
+
+
+class ObservabilityMiddleware:
+    """
+    Čist ASGI middleware: request id, timing, X-* metrics headeri, metrike i access log
+    u jednom prolazu. Za razliku od BaseHTTPMiddleware ne pravi dodatni task niti omotava
+    body stream, pa SSE/streaming odgovori idu do klijenta bez baferovanja.
+
+    Headeri se upisuju u `http.response.start` (za obične odgovore endpoint je tada završio;
+    za streaming to je vreme do prvog bajta). Log i histogram mere ceo odgovor.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        rid = request_headers.get("x-request-id") or uuid.uuid4().hex[:12]
         request_id_token = _request_id.set(rid)
         metrics_token = _metrics.set(RequestMetrics())
+        request_metrics = _metrics.get() or RequestMetrics()
         start = time.perf_counter()
-        response = None
+        status_code: int | None = None
+        method = scope.get("method", "")
+        root_span = tracing.start_trace(f"{method} {scope.get('path', '')}", request_id=rid)
+        span_token = tracing.activate(root_span)
+        request_profiler = profiler.start_request_profile(request_headers.get("x-profile"))
+        if request_profiler is not None:
+            request_metrics.profile_threads = {threading.get_ident()}
+
+        async def send_with_headers(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                duration_ms = (time.perf_counter() - start) * 1000
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-Id"] = rid
+                headers["X-Response-Time-Ms"] = f"{duration_ms:.2f}"
+                headers["X-Cache-Hits"] = str(request_metrics.cache_hits)
+                headers["X-Cache-Misses"] = str(request_metrics.cache_misses)
+                headers["X-Upstream-Calls"] = str(request_metrics.upstream_calls)
+                headers["X-DB-Time-Ms"] = f"{request_metrics.db_ms:.2f}"
+                headers["X-DB-Queries"] = str(request_metrics.db_queries)
+                headers["X-API-Time-Ms"] = f"{request_metrics.api_ms:.2f}"
+                if root_span is not None:
+                    headers["X-Trace-Id"] = root_span.trace_id
+                if request_profiler is not None:
+                    headers["X-Profile-Id"] = rid
+            await send(message)
+
         try:
-            response = await call_next(request)
-            return response
+            await self.app(scope, receive, send_with_headers)
         finally:
             duration_ms = (time.perf_counter() - start) * 1000
-            metrics = _metrics.get() or RequestMetrics()
-            if response is not None:
-                response.headers["X-Request-Id"] = rid
-                response.headers["X-Response-Time-Ms"] = f"{duration_ms:.2f}"
-                response.headers["X-Cache-Hits"] = str(metrics.cache_hits)
-                response.headers["X-Cache-Misses"] = str(metrics.cache_misses)
-                response.headers["X-Upstream-Calls"] = str(metrics.upstream_calls)
-                response.headers["X-DB-Time-Ms"] = f"{metrics.db_ms:.2f}"
-                response.headers["X-API-Time-Ms"] = f"{metrics.api_ms:.2f}"
+            if request_profiler is not None:
+                # join sampler thread-a + Redis upis ne smeju da blokiraju event loop
+                await run_in_threadpool(_store_profile, rid, request_profiler, request_metrics.profile_threads)
+            _record_http(scope, method, status_code or 500, duration_ms, request_metrics)
+            if request_metrics.usage:
+                app_id = (request_headers.get(APP_ID_HEADER) or "").strip() or DEFAULT_APP_ID
+                usage.LEDGER.add_request(_route_template(scope), app_id, request_metrics.usage)
             logger.info(
-                "RID=%s %s %s -> %s in %.2fms cache=HIT:%s MISS:%s upstream_calls=%s db_ms=%.2f api_ms=%.2f",
+                "RID=%s %s %s -> %s in %.2fms cache=HIT:%s MISS:%s upstream_calls=%s "
+                "db_queries=%s db_ms=%.2f slowest_db=%.2fms[%s] api_ms=%.2f",
                 rid,
-                request.method,
-                request.url.path,
-                getattr(response, "status_code", "ERR"),
+                method,
+                scope.get("path", ""),
+                status_code or "ERR",
                 duration_ms,
-                metrics.cache_hits,
-                metrics.cache_misses,
-                metrics.upstream_calls,
-                metrics.db_ms,
-                metrics.api_ms,
+                request_metrics.cache_hits,
+                request_metrics.cache_misses,
+                request_metrics.upstream_calls,
+                request_metrics.db_queries,
+                request_metrics.db_ms,
+                request_metrics.slowest_query_ms,
+                (request_metrics.slowest_query or "-")[:120],
+                request_metrics.api_ms,
             )
+            if root_span is not None:
+                _finish_root_span(root_span, scope, method, status_code, request_metrics)
+            tracing.deactivate(span_token)
             _request_id.reset(request_id_token)
             _metrics.reset(metrics_token)
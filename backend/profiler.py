@@ -0,0 +1,167 @@
+"""
+Sampling profiler (stdlib, `sys._current_frames`) za dijagnostiku CPU-a u produkciji.
+
+Pozadinski thread na svakih `interval` sekundi uzima stack svih ostalih threadova ovog
+worker procesa i broji ih u collapsed formatu (`thread;frame;frame N`), koji direktno
+čitaju flamegraph.pl / speedscope / inferno. Trošak je jedan stack walk po uzorku,
+bez tracing hook-ova po pozivu, pa je bezbedno pokrenuti ga na živom workeru.
+
+Dva ulaza:
+- `GET /_debug/profile?seconds=N` – profil celog workera N sekundi,
+- `X-Profile: <PROFILE_TOKEN>` header – profil tokom jednog request-a; rezultat se čuva
+  u cache-u i čita sa `GET /_debug/profile/{request_id}`.
+U jednom procesu istovremeno radi najviše jedan profiler.
+
+Sampler ne zna koji stack pripada kom request-u, pa se request profil filtrira po
+threadovima koji su radili za taj request: event loop thread middleware-a + threadpool
+threadovi koji su beležili cache/DB/upstream rad (`RequestMetrics.profile_threads`).
+Ti threadovi u istom periodu služe i druge request-e, zato profil nosi `scope`:
+`request-threads` (filtrirano) ili `worker` (ništa nije označeno -> ceo worker).
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+DEFAULT_INTERVAL_SECONDS = 0.005
+MAX_STACK_DEPTH = 128
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_TTL_SECONDS = 3600
+
+# leaf frame-ovi u kojima thread samo čeka (uslovi, event loop select, queue)
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_BUSY = threading.Lock()
+_FRAME_LABELS: Dict[object, str] = {}
+
+
+def _frame_label(code) -> str:
+    label = _FRAME_LABELS.get(code)
+    if label is None:
+        filename = code.co_filename
+        if filename.startswith(_ROOT):
+            short = os.path.relpath(filename, _ROOT)
+        else:
+            short = os.path.join(*filename.split(os.sep)[-2:]) if os.sep in filename else filename
+        label = f"{code.co_name} ({short}:{code.co_firstlineno})"
+        _FRAME_LABELS[code] = label
+    return label
+
+
+class SamplingProfiler:
+    def __init__(self, interval_seconds: float = DEFAULT_INTERVAL_SECONDS, include_idle: bool = False) -> None:
+        self.interval_seconds = max(0.001, interval_seconds)
+        self.include_idle = include_idle
+        self.samples = 0
+        self.thread_stacks: Dict[int, Counter[str]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        """False ako u procesu već radi drugi profiler."""
+        if not _BUSY.acquire(blocking=False):
+            return False
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            _BUSY.release()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.sample()
+
+    def sample(self) -> None:
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        self.samples += 1
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            code = frame.f_code
+            if not self.include_idle and (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                continue
+            labels = []
+            while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            labels.append(names.get(thread_id, f"thread-{thread_id}"))
+            self.thread_stacks.setdefault(thread_id, Counter())[";".join(reversed(labels))] += 1
+
+    def stacks(self, thread_ids: Optional[Iterable[int]] = None) -> Counter[str]:
+        """Zbir po stack-u; `thread_ids` ograničava na date threadove."""
+        wanted = None if thread_ids is None else set(thread_ids)
+        total: Counter[str] = Counter()
+        for thread_id, counts in self.thread_stacks.items():
+            if wanted is None or thread_id in wanted:
+                total.update(counts)
+        return total
+
+    def collapsed(self, thread_ids: Optional[Iterable[int]] = None) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks(thread_ids).most_common())
+
+
+def run_for(seconds: float, interval_seconds: float = DEFAULT_INTERVAL_SECONDS, include_idle: bool = False) -> Optional[SamplingProfiler]:
+    """Blokira pozivaoca `seconds`; None ako je profiler već zauzet."""
+    profiler = SamplingProfiler(interval_seconds, include_idle)
+    if not profiler.start():
+        return None
+    profiler._stop.wait(seconds)
+    return profiler.stop()
+
+
+def start_request_profile(header_value: Optional[str]) -> Optional[SamplingProfiler]:
+    """Per-request opt-in: `X-Profile` mora da se poklopi sa `PROFILE_TOKEN` (prazan -> isključeno)."""
+    if not PROFILE_TOKEN or header_value != PROFILE_TOKEN:
+        return None
+    profiler = SamplingProfiler()
+    return profiler if profiler.start() else None
+
+
+def _profile_key(profile_id: str) -> str:
+    return f"profile:{profile_id}"
+
+
+def store_request_profile(
+    profile_id: str,
+    profiler: SamplingProfiler,
+    thread_ids: Optional[Iterable[int]] = None,
+) -> None:
+    """Blokira (join sampler thread-a + cache_set): iz async koda zvati preko threadpool-a."""
+    from backend.cache import cache_set  # local import to avoid cycles (cache -> observability)
+
+    profiler.stop()
+    collapsed = profiler.collapsed(thread_ids) if thread_ids else ""
+    scope = "request-threads" if collapsed else "worker"
+    cache_set(
+        _profile_key(profile_id),
+        {
+            "samples": profiler.samples,
+            "scope": scope,
+            "threads": len(set(thread_ids or ())),
+            "collapsed": collapsed or profiler.collapsed(),
+        },
+        PROFILE_TTL_SECONDS,
+    )
+
+
+def load_request_profile(profile_id: str) -> Optional[Dict[str, object]]:
+    from backend.cache import cache_get  # local import to avoid cycles (cache -> observability)
+
+    return cache_get(_profile_key(profile_id))
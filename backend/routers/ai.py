@@ -1,36 +1,55 @@
 from __future__ import annotations
 
 import logging
+import threading
 from datetime import datetime
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
 
-from fastapi import APIRouter, Body, Depends, Header, HTTPException, Path, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Path, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from backend import api_football
-from backend.ai_analysis import build_fallback_analysis, run_ai_analysis, run_live_ai_analysis
+from backend.ai_analysis import (
+    build_fallback_analysis,
+    parse_ai_analysis_text,
+    run_ai_analysis,
+    run_live_ai_analysis,
+    stream_ai_analysis,
+)
 from backend.apps.models import AppContext
 from backend.config import TIMEZONE
 from backend.contracts.live_ai_unavailable import LiveAiUnavailable
-from backend.db import get_db
+from backend.db import AsyncDbSession, SessionLocal, get_async_db, get_db
 from backend.dependencies import require_app_context
 from backend.match_full import build_full_match, build_match_summary
+from backend.observability import usage_scope
 from backend.services.ai_analysis_cache_service import (
     READY_STATUSES,
+    LeaseHeartbeat,
     get_cached_ok,
     get_cached_row,
+    is_lease_expired,
     make_cache_key,
+    new_lease_owner,
     save_failed,
     save_ok,
     try_mark_generating,
     wait_for_ready,
     list_cached_ready_for_fixture_ids,
 )
+from backend.services.ai_stream_service import (
+    AnalysisStream,
+    IncrementalAnalysisParser,
+    format_sse,
+    get_inflight_stream,
+    open_stream,
+)
 from backend.services.app_feature_flags import is_live_ai_enabled
 from backend.services.live_ai_policy import compute_15m_bucket_ts, is_live_ai_allowed_for_league
-from backend.services.users_service import get_or_create_user
+from backend.services.users_service import get_user_identity
 
 router = APIRouter(tags=["ai"])
 logger = logging.getLogger("naksir.go_premium.api")
@@ -89,17 +108,17 @@ def _is_fixture_live(fixture: dict[str, Any] | None) -> bool:
     summary="Cached AI analiza meča (read-only)",
     response_model=None,
 )
-def get_match_ai_analysis(
+async def get_match_ai_analysis(
     fixture_id: int = Path(..., description="API-Football fixture ID"),
     mode: Optional[str] = Query(None, description="Optional mode override (e.g. live)"),
     install_id: Optional[str] = Header(None, alias="X-Install-Id"),
     app_ctx: AppContext = Depends(require_app_context),
-    session: Session = Depends(get_db),
+    session: AsyncDbSession = Depends(get_async_db),
 ) -> Any:
     _require_install_id(install_id)
 
     app_id = app_ctx.app_id
-    get_or_create_user(session, install_id)
+    await session.run_sync(get_user_identity, install_id)
 
     is_live = (mode or "").lower() == "live"
     live_enabled = is_live_ai_enabled(app_id)
@@ -109,7 +128,7 @@ def get_match_ai_analysis(
             prompt_version="v1",
             locale="en",
         )
-        row = get_cached_row(session, cache_key, app_id=app_id)
+        row = await session.run_sync(get_cached_row, cache_key, app_id=app_id)
         if row and row.status in READY_STATUSES and row.analysis_json:
             logger.info("AI cache HIT fixture_id=%s cache_key=%s", fixture_id, cache_key)
             payload = {
@@ -127,7 +146,7 @@ def get_match_ai_analysis(
     if is_live:
         fixture = None
         try:
-            fixture = api_football.get_fixture_by_id(fixture_id)
+            fixture = await run_in_threadpool(api_football.get_fixture_by_id, fixture_id)
         except Exception as exc:  # noqa: BLE001
             logger.warning(
                 "Failed to fetch fixture_id=%s for live eligibility: %s",
@@ -147,7 +166,7 @@ def get_match_ai_analysis(
             prompt_version="v1",
             locale="en",
         )
-    row = get_cached_row(session, cache_key, app_id=app_id)
+    row = await session.run_sync(get_cached_row, cache_key, app_id=app_id)
     if not row:
         logger.info("AI cache MISS fixture_id=%s cache_key=%s", fixture_id, cache_key)
         return JSONResponse(
@@ -169,6 +188,15 @@ def get_match_ai_analysis(
         }
         return JSONResponse(status_code=200, content=payload, headers=_cache_headers(cache_key, "HIT"))
 
+    if row.status == "generating" and is_lease_expired(row):
+        # vlasnik generacije je nestao; sledeći POST preuzima lease
+        logger.info("AI cache STALE fixture_id=%s cache_key=%s", fixture_id, cache_key)
+        return JSONResponse(
+            status_code=404,
+            content={"status": "not_found", "reason": "stale_generation"},
+            headers=_cache_headers(cache_key, "MISS"),
+        )
+
     if row.status == "generating":
         logger.info("AI cache WAIT fixture_id=%s cache_key=%s", fixture_id, cache_key)
         return JSONResponse(
@@ -222,7 +250,7 @@ def post_match_ai_analysis(
     _require_install_id(install_id)
 
     app_id = app_ctx.app_id
-    get_or_create_user(session, install_id)
+    get_user_identity(session, install_id)
 
     is_live = (mode or "").lower() == "live"
     live_enabled = is_live_ai_enabled(app_id)
@@ -289,6 +317,7 @@ def post_match_ai_analysis(
             headers=_cache_headers(cache_key, "HIT"),
         )
 
+    lease_owner = new_lease_owner()
     acquired = try_mark_generating(
         session,
         fixture_id=fixture_id,
@@ -297,6 +326,7 @@ def post_match_ai_analysis(
         locale="en",
         model="default",
         app_id=app_id,
+        owner_id=lease_owner,
     )
     if not acquired:
         row = get_cached_row(session, cache_key, app_id=app_id)
@@ -364,13 +394,27 @@ def post_match_ai_analysis(
                 },
                 headers=_cache_headers(cache_key, "FAIL"),
             )
-        logger.info("AI cache WAIT fixture_id=%s cache_key=%s", fixture_id, cache_key)
-        return JSONResponse(
-            status_code=202,
-            content={"status": "generating"},
-            headers=_cache_headers(cache_key, "WAIT"),
-        )
+        if ready is not None and is_lease_expired(ready):
+            # prethodni worker je pao usred generacije – preuzimamo lease
+            acquired = try_mark_generating(
+                session,
+                fixture_id=fixture_id,
+                cache_key=cache_key,
+                prompt_version=prompt_version,
+                locale="en",
+                model="default",
+                app_id=app_id,
+                owner_id=lease_owner,
+            )
+        if not acquired:
+            logger.info("AI cache WAIT fixture_id=%s cache_key=%s", fixture_id, cache_key)
+            return JSONResponse(
+                status_code=202,
+                content={"status": "generating"},
+                headers=_cache_headers(cache_key, "WAIT"),
+            )
 
+    heartbeat = LeaseHeartbeat(cache_key, owner_id=lease_owner, app_id=app_id).start()
     try:
         if fixture is None:
             try:
@@ -421,7 +465,8 @@ def post_match_ai_analysis(
                     )
                 )
 
-        save_ok(
+        # Izgubljen lease = drugi worker je preuzeo generaciju; odgovor dobija samo ovaj klijent.
+        saved = not heartbeat.lost and save_ok(
             session,
             cache_key=cache_key,
             fixture_id=fixture_id,
@@ -430,8 +475,9 @@ def post_match_ai_analysis(
                 "odds_probabilities": odds_probabilities,
             },
             app_id=app_id,
+            owner_id=lease_owner,
         )
-        cache_status = "LIVE" if is_live else "MISS"
+        cache_status = ("LIVE" if is_live else "MISS") if saved else "LOST"
         logger.info(
             "AI cache %s fixture_id=%s cache_key=%s",
             "LIVE" if is_live else "MISS",
@@ -453,13 +499,15 @@ def post_match_ai_analysis(
             headers=_cache_headers(cache_key, cache_status),
         )
     except Exception as exc:  # noqa: BLE001
-        if not is_live:
+        if not is_live and not heartbeat.lost:
+            session.rollback()
             save_failed(
                 session,
                 cache_key=cache_key,
                 fixture_id=fixture_id,
                 error=str(exc),
                 app_id=app_id,
+                owner_id=lease_owner,
             )
         logger.exception("AI analysis failed fixture_id=%s cache_key=%s", fixture_id, cache_key)
         return JSONResponse(
@@ -467,16 +515,294 @@ def post_match_ai_analysis(
             content={"status": "failed", "message": "AI analysis failed"},
             headers=_cache_headers(cache_key, "FAIL"),
         )
+    finally:
+        heartbeat.stop()
+
+
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _cached_stream_payload(
+    fixture_id: int,
+    cache_key: str,
+    analysis_json: dict[str, Any] | None,
+    user_question: str | None,
+) -> dict[str, Any]:
+    cached_payload = analysis_json or {}
+    return {
+        "fixture_id": fixture_id,
+        "generated_at": datetime.now().isoformat(),
+        "timezone": TIMEZONE,
+        "question": user_question,
+        "analysis": cached_payload.get("analysis", cached_payload),
+        "odds_probabilities": cached_payload.get("odds_probabilities"),
+        "cached": True,
+        "cache_key": cache_key,
+    }
+
+
+def _single_event_stream(event: str, data: Any) -> Iterator[str]:
+    yield format_sse(event, data, event_id=0)
+
+
+def _wait_remote_stream(
+    fixture_id: int,
+    cache_key: str,
+    app_id: str,
+    user_question: str | None,
+) -> Iterator[str]:
+    """Generacija teče u drugom workeru – javimo status odmah, pa čekamo DB red."""
+    yield format_sse("status", {"status": "generating", "cache_key": cache_key}, event_id=0)
+    ready = wait_for_ready(cache_key, app_id=app_id)
+    if ready and ready.status in READY_STATUSES and ready.analysis_json:
+        payload = _cached_stream_payload(fixture_id, cache_key, ready.analysis_json, user_question)
+        yield format_sse("result", payload, event_id=1)
+        return
+    if ready and ready.status == "failed":
+        message = ready.error or "AI analysis temporarily unavailable."
+        yield format_sse("error", {"status": "failed", "message": message}, event_id=1)
+        return
+    yield format_sse("status", {"status": "generating", "retry": True}, event_id=1)
+
+
+def _produce_analysis_stream(
+    stream: AnalysisStream,
+    *,
+    fixture_id: int,
+    fixture: dict[str, Any] | None,
+    fixture_error_reason: str | None,
+    user_question: str | None,
+    app_id: str,
+    lease_owner: str,
+) -> None:
+    """Background producer: streamuje model output u AnalysisStream i na kraju radi save_ok."""
+    cache_key = stream.cache_key
+    stream.publish("status", {"status": "generating", "cache_key": cache_key})
+    session = SessionLocal()
+    heartbeat = LeaseHeartbeat(cache_key, owner_id=lease_owner, app_id=app_id).start()
+    try:
+        if fixture is None:
+            try:
+                fixture = api_football.get_fixture_by_id(fixture_id)
+            except Exception as exc:  # noqa: BLE001
+                fixture_error_reason = f"API-Football fetch failed: {exc}"
+
+        odds_probabilities = None
+        full_context = None
+        context_error_reason = fixture_error_reason or "fixture not found or API-Football unavailable"
+        if fixture:
+            try:
+                full_context = build_full_match(fixture)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning(
+                    "Failed to build full match context for fixture_id=%s: %s",
+                    fixture_id,
+                    exc,
+                )
+                context_error_reason = f"context build failed: {exc}"
+
+        if not full_context:
+            analysis = build_fallback_analysis(context_error_reason)
+        else:
+            odds_section = full_context.get("odds") or {}
+            if isinstance(odds_section, dict):
+                odds_probabilities = odds_section.get("flat_probabilities")
+
+            parser = IncrementalAnalysisParser()
+            for delta in stream_ai_analysis(full_match=full_context, user_question=user_question):
+                for event, data in parser.feed(delta):
+                    stream.publish(event, data)
+            analysis = parse_ai_analysis_text(parser.text)
+
+        saved = not heartbeat.lost and save_ok(
+            session,
+            cache_key=cache_key,
+            fixture_id=fixture_id,
+            analysis_json={
+                "analysis": analysis,
+                "odds_probabilities": odds_probabilities,
+            },
+            app_id=app_id,
+            owner_id=lease_owner,
+        )
+        logger.info(
+            "AI cache STREAM%s fixture_id=%s cache_key=%s",
+            "" if saved else " (lease lost, not cached)",
+            fixture_id,
+            cache_key,
+        )
+        stream.finish(
+            "result",
+            {
+                "fixture_id": fixture_id,
+                "generated_at": datetime.now().isoformat(),
+                "timezone": TIMEZONE,
+                "question": user_question,
+                "analysis": analysis,
+                "odds_probabilities": odds_probabilities,
+                "cached": False,
+                "cache_key": cache_key,
+            },
+        )
+    except Exception as exc:  # noqa: BLE001
+        logger.exception("AI stream failed fixture_id=%s cache_key=%s", fixture_id, cache_key)
+        try:
+            session.rollback()
+            if not heartbeat.lost:
+                save_failed(
+                    session,
+                    cache_key=cache_key,
+                    fixture_id=fixture_id,
+                    error=str(exc),
+                    app_id=app_id,
+                    owner_id=lease_owner,
+                )
+        except Exception:  # noqa: BLE001
+            logger.exception("Failed to persist AI stream failure cache_key=%s", cache_key)
+        stream.finish("error", {"status": "failed", "message": "AI analysis failed"})
+    finally:
+        heartbeat.stop()
+        session.close()
+
+
+def _run_analysis_stream(usage_route: str, **kwargs: Any) -> None:
+    """Thread target: OpenAI tokeni i upstream pozivi producer-a idu na rutu/app_id stream request-a."""
+    with usage_scope(usage_route, kwargs["app_id"]):
+        _produce_analysis_stream(**kwargs)
+
+
+@router.post(
+    "/matches/{fixture_id}/ai-analysis/stream",
+    summary="AI analiza meča kao Server-Sent Events stream",
+    response_model=None,
+)
+def stream_match_ai_analysis(
+    request: Request,
+    fixture_id: int = Path(..., description="API-Football fixture ID"),
+    payload: AIAnalysisRequest = Body(
+        default_factory=AIAnalysisRequest,
+        description="Opcioni user prompt kojim se usmerava AI analiza.",
+    ),
+    install_id: Optional[str] = Header(None, alias="X-Install-Id"),
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID"),
+    app_ctx: AppContext = Depends(require_app_context),
+    session: Session = Depends(get_db),
+) -> Any:
+    """
+    Streaming varijanta POST ai-analysis (prematch).
+
+    Eventi: `status` -> `preview_delta`* -> `block`* -> `result` (ili `error`).
+    Gledaoci istog cache_key-a u istom workeru kače se na isti in-flight stream;
+    rezultat se i dalje persistira preko `save_ok`.
+    """
+    user_question = payload.question.strip() if payload.question else None
+    _require_install_id(install_id)
+
+    app_id = app_ctx.app_id
+    get_user_identity(session, install_id)
+
+    fixture: dict[str, Any] | None = None
+    fixture_error_reason: str | None = None
+    if not is_live_ai_enabled(app_id):
+        try:
+            fixture = api_football.get_fixture_by_id(fixture_id)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(
+                "Failed to fetch fixture_id=%s from API-Football for live guard: %s",
+                fixture_id,
+                exc,
+            )
+            fixture_error_reason = f"API-Football fetch failed: {exc}"
+        if _is_fixture_live(fixture):
+            return StreamingResponse(
+                _single_event_stream("result", LiveAiUnavailable().model_dump()),
+                media_type="text/event-stream",
+                headers=_SSE_HEADERS,
+            )
+
+    prompt_version = "v1"
+    cache_key = make_cache_key(fixture_id=fixture_id, prompt_version=prompt_version, locale="en")
+    headers = {**_SSE_HEADERS, **_cache_headers(cache_key, "STREAM")}
+
+    def _cached_response(row_json: dict[str, Any] | None) -> StreamingResponse:
+        body = _cached_stream_payload(fixture_id, cache_key, row_json, user_question)
+        return StreamingResponse(
+            _single_event_stream("result", body),
+            media_type="text/event-stream",
+            headers={**_SSE_HEADERS, **_cache_headers(cache_key, "HIT")},
+        )
+
+    cached = get_cached_ok(session, cache_key, app_id=app_id)
+    if cached:
+        return _cached_response(cached.analysis_json)
+
+    inflight = get_inflight_stream(app_id, cache_key)
+    if inflight is None:
+        lease_owner = new_lease_owner()
+        acquired = try_mark_generating(
+            session,
+            fixture_id=fixture_id,
+            cache_key=cache_key,
+            prompt_version=prompt_version,
+            locale="en",
+            model="default",
+            app_id=app_id,
+            owner_id=lease_owner,
+        )
+        if acquired:
+            inflight = open_stream(app_id, cache_key)
+            threading.Thread(
+                target=_run_analysis_stream,
+                name=f"ai-stream-{fixture_id}",
+                kwargs={
+                    "usage_route": getattr(request.scope.get("route"), "path", request.url.path),
+                    "stream": inflight,
+                    "fixture_id": fixture_id,
+                    "fixture": fixture,
+                    "fixture_error_reason": fixture_error_reason,
+                    "user_question": user_question,
+                    "app_id": app_id,
+                    "lease_owner": lease_owner,
+                },
+                daemon=True,
+            ).start()
+        else:
+            row = get_cached_row(session, cache_key, app_id=app_id)
+            if row and row.status in READY_STATUSES and row.analysis_json:
+                return _cached_response(row.analysis_json)
+            if row and row.status == "failed":
+                return StreamingResponse(
+                    _single_event_stream(
+                        "error",
+                        {"status": "failed", "message": row.error or "AI analysis temporarily unavailable."},
+                    ),
+                    media_type="text/event-stream",
+                    headers={**_SSE_HEADERS, **_cache_headers(cache_key, "FAIL")},
+                )
+            inflight = get_inflight_stream(app_id, cache_key)
+            if inflight is None:
+                return StreamingResponse(
+                    _wait_remote_stream(fixture_id, cache_key, app_id, user_question),
+                    media_type="text/event-stream",
+                    headers={**_SSE_HEADERS, **_cache_headers(cache_key, "WAIT")},
+                )
+
+    logger.info("AI stream attach fixture_id=%s cache_key=%s", fixture_id, cache_key)
+    return StreamingResponse(
+        inflight.subscribe(last_event_id=last_event_id),
+        media_type="text/event-stream",
+        headers=headers,
+    )
 
 
 @router.get(
     "/ai/cached-matches",
     summary="Lista mečeva (naredni dani) koji imaju cached AI analizu",
 )
-def get_cached_ai_matches(
+async def get_cached_ai_matches(
     days: int = Query(3, ge=1, le=14, description="Number of days ahead to include"),
     app_ctx: AppContext = Depends(require_app_context),
-    session: Session = Depends(get_db),
+    session: AsyncDbSession = Depends(get_async_db),
 ) -> dict[str, Any]:
     """
     Frontend koristi za 'Naksir AI' tab: prikaz samo mečeva koji već imaju cached AI analizu.
@@ -485,7 +811,7 @@ def get_cached_ai_matches(
       2) 1 DB query IN(fixture_ids) za READY cache
       3) output: items = [{fixture_id, summary, generated_at}]
     """
-    fixtures = api_football.get_fixtures_next_days(days)
+    fixtures = await run_in_threadpool(api_football.get_fixtures_next_days, days)
     fixture_ids: list[int] = []
     fixture_by_id: dict[int, Any] = {}
     for fx in fixtures:
@@ -495,8 +821,8 @@ def get_cached_ai_matches(
             fixture_by_id[fid] = fx
 
     app_id = app_ctx.app_id
-    cached_map = list_cached_ready_for_fixture_ids(
-        session,
+    cached_map = await session.run_sync(
+        list_cached_ready_for_fixture_ids,
         fixture_ids,
         app_id=app_id,
     )
@@ -1,24 +1,31 @@
 from __future__ import annotations
 
+import hashlib
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Any, Literal
 from zoneinfo import ZoneInfo
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from backend import api_football
 from backend.apps.models import AppContext
 from backend.config import TIMEZONE
 from backend.dependencies import require_app_context
-from backend.db import get_db
+from backend.db import AsyncDbSession, get_async_db
+from backend.cache import cache_get, cache_set
 from backend.services.ai_analysis_cache_service import (
-    get_cached_ok,
-    list_cached_ready_for_fixture_ids,
+    get_btts_badge_version,
+    list_btts_badges_for_fixture_ids,
     make_cache_key as make_ai_db_cache_key,
+    rank_btts_fixtures,
 )
+from backend.services.btts_board_service import DayBoard, get_day_board, state_from_fixture
 from backend.services.btts_service import get_btts_today_fixtures
+from backend.services.btts_ticket_builder import notify_fixtures
+from backend.services.slate_changelog import current_version, delta_response
 
 logger = logging.getLogger("naksir.go_premium.api")
 
@@ -36,17 +43,6 @@ def _require_btts_app(app_ctx: AppContext) -> None:
         raise HTTPException(status_code=403, detail="BTTS endpoints require X-App-Id=btts.predictor")
 
 
-def _state_from_fixture(fx: dict[str, Any]) -> str:
-    st = ((fx.get("fixture") or {}).get("status") or {})
-    short = (st.get("short") or "").upper()
-    # API-Football status mapping (pragmatično)
-    if short in {"FT", "AET", "PEN"}:
-        return "finished"
-    if short in {"1H", "2H", "HT", "ET", "BT", "P"}:
-        return "live"
-    return "prematch"
-
-
 def _build_flashscore_item(fx: dict[str, Any], *, btts_badge: dict[str, Any] | None) -> dict[str, Any]:
     fixture = fx.get("fixture") or {}
     league = fx.get("league") or {}
@@ -57,7 +53,7 @@ def _build_flashscore_item(fx: dict[str, Any], *, btts_badge: dict[str, Any] | N
     home = (teams.get("home") or {})
     away = (teams.get("away") or {})
 
-    state = _state_from_fixture(fx)
+    state = state_from_fixture(fx)
     minute = None
     if state == "live":
         minute = (fixture.get("periods") or {}).get("first")  # fallback; API-Football minute varira
@@ -97,43 +93,11 @@ def _build_flashscore_item(fx: dict[str, Any], *, btts_badge: dict[str, Any] | N
     return item
 
 
-def _badge_from_cached_ai(cached_json: dict[str, Any] | None) -> dict[str, Any] | None:
-    if not cached_json:
-        return None
-
-    analysis = cached_json.get("analysis", cached_json)
-
-    btts = None
-    if isinstance(analysis, dict):
-        btts = analysis.get("btts") or analysis.get("BTTS")
-    if not isinstance(btts, dict):
-        return None
-
-    yes_pct = btts.get("yes_pct")
-    no_pct = btts.get("no_pct")
-    rec = btts.get("recommended_btts_market") or btts.get("recommended")
-    conf = btts.get("confidence_pct") or btts.get("confidence")
-    reason_short = (
-        btts.get("reasoning_short") or analysis.get("reasoning_short") or analysis.get("summary")
-    )
-    avoid_flags = btts.get("avoid_flags")
-
-    out = {
-        "yes_pct": yes_pct,
-        "no_pct": no_pct,
-        "recommended": rec,
-        "confidence": conf,
-        "reasoning_short": reason_short,
-        "avoid_flags": avoid_flags if isinstance(avoid_flags, list) else [],
-    }
-    return out
-
-
 def _fetch_fixtures_for_day(offset_days: int) -> list[dict[str, Any]]:
     # Reuse API layer; idealno: postoji cached endpoint u api_football
     # Ako nema, koristi get_fixtures_today + get_fixtures_by_date; zavisi od tvoje implementacije.
     if offset_days == 0:
-        return get_btts_today_fixtures()
+        return get_btts_today_fixtures(cached_features_only=True)
     if offset_days == 1:
         tz = ZoneInfo(TIMEZONE)
         tomorrow = datetime.now(tz).date() + timedelta(days=1)
@@ -141,12 +105,6 @@ def _fetch_fixtures_for_day(offset_days: int) -> list[dict[str, Any]]:
     raise ValueError("offset_days must be 0 (today) or 1 (tomorrow)")
 
 
-def _filter_items(items: list[dict[str, Any]], state: FilterState) -> list[dict[str, Any]]:
-    if state == "all":
-        return items
-    return [it for it in items if (it.get("status") or {}).get("state") == state]
-
-
 def _build_btts_badge_map(
     session: Session,
     fixture_ids: list[int],
@@ -156,140 +114,226 @@ def _build_btts_badge_map(
     locale: str = "en",
 ) -> dict[int, dict[str, Any]]:
     """
-    1 DB query: uzmi sve READY cached rows za fixture_ids.
-    Zatim pretvori analysis_json u btts_badge mapu.
+    1 DB query nad projekcijom: čita samo btts_badge kolonu READY redova za fixture_ids
+    (bez učitavanja i deserijalizacije celog analysis_json-a).
     """
-    cached_rows = list_cached_ready_for_fixture_ids(session, fixture_ids, app_id=app_id)
+    return list_btts_badges_for_fixture_ids(session, fixture_ids, app_id=app_id)
 
-    out: dict[int, dict[str, Any]] = {}
-    for fid, row in cached_rows.items():
-        if not row or not row.analysis_json:
-            continue
 
-        badge = _badge_from_cached_ai(row.analysis_json)
-        if badge:
-            out[int(fid)] = badge
+TOP_BADGES_LIMIT = 3
+TOP_BADGES_TTL_SECONDS = 15 * 60
+
+
+async def _ranked_top_badges(
+    session: AsyncDbSession,
+    fixture_ids: list[int],
+    *,
+    market: Market,
+    app_id: str,
+    limit: int = TOP_BADGES_LIMIT,
+) -> list[dict[str, Any]]:
+    """
+    Top-N BTTS badge-evi za slate: jedan upit nad projekcionim kolonama
+    (procenat + btts_badge) radi i rangiranje i top-N izbor.
+
+    Rezultat je keširan po (app_id, dan, market, slate) i vezan za badge verziju,
+    pa svaki novi BTTS save_ok automatski invalidira keš.
+    """
+    if not fixture_ids:
+        return []
+    key, cached = await run_in_threadpool(_cached_top_badges, fixture_ids, market=market, app_id=app_id, limit=limit)
+    if cached is not None:
+        return cached
+
+    cache_keys = {
+        fid: make_ai_db_cache_key(fixture_id=fid, prompt_version="btts-v1", locale="en")
+        for fid in fixture_ids
+    }
+    ranked = await session.run_sync(rank_btts_fixtures, cache_keys, market=market, limit=limit, app_id=app_id)
+    out = [{"fixture_id": fid, "score": score, "badge": badge} for fid, score, badge in ranked]
+    await run_in_threadpool(cache_set, key, {"items": out}, TOP_BADGES_TTL_SECONDS)
     return out
 
 
+def _cached_top_badges(
+    fixture_ids: list[int],
+    *,
+    market: Market,
+    app_id: str,
+    limit: int,
+) -> tuple[str, list[dict[str, Any]] | None]:
+    """Ključ top-N keša (badge verzija iz Redis-a) + keširani rezultat ako postoji."""
+    day = _day_for_offset(0)
+    slate_sig = hashlib.sha1(",".join(map(str, sorted(fixture_ids))).encode()).hexdigest()[:12]
+    version = get_btts_badge_version(app_id)
+    key = f"btts:top:{app_id}:{day}:{market}:{limit}:{slate_sig}:{version}"
+    cached = cache_get(key)
+    if isinstance(cached, dict) and isinstance(cached.get("items"), list):
+        return key, cached["items"]
+    return key, None
+
+
+def _day_for_offset(offset_days: int) -> str:
+    return (datetime.now(ZoneInfo(TIMEZONE)).date() + timedelta(days=offset_days)).isoformat()
+
+
+async def _board_for_day(session: AsyncDbSession, *, app_id: str, offset_days: int) -> DayBoard:
+    """
+    Materijalizovan board za (app_id, dan). Unutar BTTS_BOARD_RESYNC_SECONDS i bez novog
+    badge-a zahtev je čist lookup; inače se fixture-i ponovo čitaju i board se
+    inkrementalno usklađuje (samo promenjeni item-i se ponovo grade).
+
+    Badge-evi se čitaju pre `board.sync` (za ceo slate, 1 upit): sync drži threading lock,
+    a async upit unutar njega bi blokirao event loop za sve ostale zahteve na tom boardu.
+    Sve što blokira (Redis badge verzija, board lock koji deli live poller, rebuild item-a)
+    ide u threadpool; na event loop-u ostaje samo async DB upit.
+    """
+    board = get_day_board(app_id, _day_for_offset(offset_days), _board_item)
+    version, stale = await run_in_threadpool(_board_sync_state, board, app_id)
+    if stale:
+        fixtures = await run_in_threadpool(_fetch_fixtures_for_day, offset_days)
+        fixture_ids = [fid for fid in ((fx.get("fixture") or {}).get("id") for fx in fixtures) if isinstance(fid, int)]
+        badges = await session.run_sync(_build_btts_badge_map, fixture_ids, app_id=app_id) if fixture_ids else {}
+        await run_in_threadpool(_sync_board, board, fixtures, badges, version=version, offset_days=offset_days)
+    return board
+
+
+def _board_sync_state(board: DayBoard, app_id: str) -> tuple[str, bool]:
+    version = get_btts_badge_version(app_id)
+    return version, board.needs_sync(version)
+
+
+def _sync_board(
+    board: DayBoard,
+    fixtures: list[dict[str, Any]],
+    badges: dict[int, dict[str, Any]],
+    *,
+    version: str,
+    offset_days: int,
+) -> None:
+    board.sync(
+        fixtures,
+        badge_version=version,
+        load_badges=lambda ids: {fid: badges[fid] for fid in ids if fid in badges},
+    )
+    if offset_days == 0:
+        # odds-change event za precomputed /btts/tickets/today
+        notify_fixtures(date.fromisoformat(board.day), fixtures)
+
+
+def _board_item(fx: dict[str, Any], badge: dict[str, Any] | None) -> dict[str, Any]:
+    return _build_flashscore_item(fx, btts_badge=badge)
+
+
 # ---------- routes ----------
+SLATE_MAX_ITEMS = 10_000
+
+
+def _slate_delta(
+    board: DayBoard,
+    *,
+    filter: FilterState,
+    include_badge: bool,
+    since: str,
+) -> tuple[str, dict[str, Any] | None]:
+    """
+    Delta nad celim danom (`all`, sa badge-om), pa filtriranje: kartica koja je promenom
+    stanja ispala iz `filter`-a ide u `removed`.
+    """
+    cards = {it["fixture_id"]: it for it in board.slice("all", limit=SLATE_MAX_ITEMS)}
+    token, delta = delta_response(f"btts:{board.app_id}", board.day, cards, since)
+    if delta is None:
+        return token, None
+    items = []
+    removed = set(delta["removed"])
+    for item in delta["items"]:
+        if filter != "all" and (item.get("status") or {}).get("state") != filter:
+            removed.add(item["fixture_id"])
+            continue
+        items.append(item if include_badge else {**item, "btts_badge": None})
+    return token, {**delta, "items": items, "removed": sorted(removed), "total": len(items), "day": "today"}
+
+
+def _today_response(
+    board: DayBoard,
+    *,
+    filter: FilterState,
+    limit: int,
+    include_badge: bool,
+    since: str | None,
+) -> dict[str, Any]:
+    if since:
+        version, delta = _slate_delta(board, filter=filter, include_badge=include_badge, since=since)
+        if delta is not None:
+            return delta
+    else:
+        cards = {it["fixture_id"]: it for it in board.slice("all", limit=SLATE_MAX_ITEMS)}
+        version = current_version(f"btts:{board.app_id}", board.day, cards)
+    items = board.slice(filter, limit=limit, include_badge=include_badge)
+    return {"items": items, "total": len(items), "day": "today", "version": version, "delta": False}
+
+
 @router.get("/matches/today")
-def btts_matches_today(
+async def btts_matches_today(
     filter: FilterState = Query("all"),
     limit: int = Query(200, ge=1, le=500),
     include_badge: bool = Query(True, description="Attach BTTS badge if cached AI exists"),
+    since: str | None = Query(None, description="`version` iz prethodnog odgovora -> samo promene"),
     app_ctx: AppContext = Depends(require_app_context),
-    session: Session = Depends(get_db),
+    session: AsyncDbSession = Depends(get_async_db),
 ) -> dict[str, Any]:
     _require_btts_app(app_ctx)
-    fixtures = _fetch_fixtures_for_day(0)
-
-    app_id = app_ctx.app_id
-
-    fixture_ids: list[int] = []
-    for fx in fixtures:
-        fid = ((fx.get("fixture") or {}).get("id"))
-        if isinstance(fid, int):
-            fixture_ids.append(fid)
-
-    badge_map: dict[int, dict[str, Any]] = {}
-    if include_badge and fixture_ids:
-        badge_map = _build_btts_badge_map(
-            session,
-            fixture_ids,
-            app_id=app_id,
-            prompt_version="btts-v1",
-            locale="en",
-        )
-
-    items: list[dict[str, Any]] = []
-    for fx in fixtures:
-        fid = ((fx.get("fixture") or {}).get("id"))
-        btts_badge = badge_map.get(fid) if isinstance(fid, int) else None
-        items.append(_build_flashscore_item(fx, btts_badge=btts_badge))
-
-    items = _filter_items(items, filter)
-    items = items[:limit]
-    return {"items": items, "total": len(items), "day": "today"}
+    board = await _board_for_day(session, app_id=app_ctx.app_id, offset_days=0)
+    # slice + hash svih kartica + changelog u Redis-u: CPU i I/O, ne na event loop-u
+    return await run_in_threadpool(
+        _today_response, board, filter=filter, limit=limit, include_badge=include_badge, since=since
+    )
 
 
 @router.get("/matches/tomorrow")
-def btts_matches_tomorrow(
+async def btts_matches_tomorrow(
     filter: FilterState = Query("all"),
     limit: int = Query(200, ge=1, le=500),
     include_badge: bool = Query(True),
     app_ctx: AppContext = Depends(require_app_context),
-    session: Session = Depends(get_db),
+    session: AsyncDbSession = Depends(get_async_db),
 ) -> dict[str, Any]:
     _require_btts_app(app_ctx)
-    fixtures = _fetch_fixtures_for_day(1)
-
-    app_id = app_ctx.app_id
-
-    fixture_ids: list[int] = []
-    for fx in fixtures:
-        fid = ((fx.get("fixture") or {}).get("id"))
-        if isinstance(fid, int):
-            fixture_ids.append(fid)
-
-    badge_map: dict[int, dict[str, Any]] = {}
-    if include_badge and fixture_ids:
-        badge_map = _build_btts_badge_map(
-            session,
-            fixture_ids,
-            app_id=app_id,
-            prompt_version="btts-v1",
-            locale="en",
-        )
-
-    items: list[dict[str, Any]] = []
-    for fx in fixtures:
-        fid = ((fx.get("fixture") or {}).get("id"))
-        btts_badge = badge_map.get(fid) if isinstance(fid, int) else None
-        items.append(_build_flashscore_item(fx, btts_badge=btts_badge))
-
-    items = _filter_items(items, filter)
-    items = items[:limit]
+    board = await _board_for_day(session, app_id=app_ctx.app_id, offset_days=1)
+    items = await run_in_threadpool(board.slice, filter, limit=limit, include_badge=include_badge)
     return {"items": items, "total": len(items), "day": "tomorrow"}
 
 
 @router.get("/matches/top3-today")
-def btts_top3_today(
+async def btts_top3_today(
     market: Market = Query("yes"),
     app_ctx: AppContext = Depends(require_app_context),
-    session: Session = Depends(get_db),
+    session: AsyncDbSession = Depends(get_async_db),
 ) -> dict[str, Any]:
     _require_btts_app(app_ctx)
-    fixtures = _fetch_fixtures_for_day(0)
+    fixtures = await run_in_threadpool(_fetch_fixtures_for_day, 0)
     app_id = app_ctx.app_id
 
-    scored: list[tuple[float, dict[str, Any]]] = []
+    fixtures_by_id: dict[int, dict[str, Any]] = {}
     for fx in fixtures:
         fid = ((fx.get("fixture") or {}).get("id"))
-        if not isinstance(fid, int):
-            continue
-        ck = make_ai_db_cache_key(fixture_id=fid, prompt_version="btts-v1", locale="en")
-        cached = get_cached_ok(session, ck, app_id=app_id)
-        if not cached or not cached.analysis_json:
-            continue
-        badge = _badge_from_cached_ai(cached.analysis_json)
-        if not badge:
-            continue
+        if isinstance(fid, int):
+            fixtures_by_id[fid] = fx
 
-        score = badge.get("yes_pct") if market == "yes" else badge.get("no_pct")
-        try:
-            score_f = float(score)
-        except Exception:
+    ranked = await _ranked_top_badges(session, list(fixtures_by_id), market=market, app_id=app_id)
+
+    top_items: list[dict[str, Any]] = []
+    for entry in ranked:
+        fx = fixtures_by_id.get(entry["fixture_id"])
+        if fx is None:
             continue
+        badge = entry["badge"]
         item = _build_flashscore_item(fx, btts_badge=badge)
         item["featured"] = {
-            "headline": f"BTTS {market.upper()} {int(score_f)}%",
+            "headline": f"BTTS {market.upper()} {int(entry['score'])}%",
             "reason_short": badge.get("reasoning_short") if isinstance(badge, dict) else None,
             "market": market,
             "avoid_flags": badge.get("avoid_flags") if isinstance(badge, dict) else [],
         }
-        scored.append((score_f, item))
-
-    scored.sort(key=lambda x: x[0], reverse=True)
-    top_items = [it for _, it in scored[:3]]
+        top_items.append(item)
     return {"items": top_items, "total": len(top_items), "day": "today", "market": market}
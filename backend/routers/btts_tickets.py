@@ -1,17 +1,21 @@
 from __future__ import annotations
 
-from datetime import datetime
-from zoneinfo import ZoneInfo
+from datetime import date
+from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 
 from backend.apps.models import AppContext
-from backend.cache import cache_get_json, cache_set_json
-from backend.config import TIMEZONE
 from backend.contracts.btts_ticket import DailyBttsTicketsResponse
 from backend.dependencies import require_app_context
-from backend.services.btts_service import get_btts_today_fixtures
-from backend.services.btts_ticket_engine import build_daily_btts_tickets
+from backend.services import btts_service
+from backend.services.btts_ticket_builder import (
+    TicketsUnavailable,
+    ensure_tickets,
+    get_history,
+    get_version,
+    today_local,
+)
 
 router = APIRouter(prefix="/btts/tickets", tags=["BTTS Tickets"])
 
@@ -22,19 +26,36 @@ def _require_btts_app(app_ctx: AppContext) -> None:
 
 
 @router.get("/today", response_model=DailyBttsTicketsResponse)
-def get_btts_tickets_today(app_ctx: AppContext = Depends(require_app_context)) -> DailyBttsTicketsResponse:
+def get_btts_tickets_today(
+    version: Optional[int] = Query(None, ge=1, description="Konkretna verzija iz /btts/tickets/history"),
+    app_ctx: AppContext = Depends(require_app_context),
+) -> DailyBttsTicketsResponse:
     _require_btts_app(app_ctx)
-    today = datetime.now(ZoneInfo(TIMEZONE)).date()
-    cache_key = f"btts:daily:tickets:{today.isoformat()}"
-
-    cached = cache_get_json(cache_key)
-    if cached:
-        return DailyBttsTicketsResponse.model_validate(cached)
-
-    fixtures = get_btts_today_fixtures()
-    top_league_ids = set(app_ctx.config.top_league_ids or [])
-
-    result = build_daily_btts_tickets(today=today, fixtures=fixtures, top_league_ids=top_league_ids)
-
-    cache_set_json(cache_key, result.model_dump(), ttl_seconds=30 * 60)
-    return result
+    today = today_local()
+
+    if version is not None:
+        artifact = get_version(today, version)
+        if artifact is None:
+            raise HTTPException(status_code=404, detail="ticket version not found")
+        return DailyBttsTicketsResponse.model_validate(artifact["response"])
+
+    # precomputed artefakt (scheduler); cold start gradi jednom, pod single-flight lock-om
+    try:
+        return ensure_tickets(
+            today,
+            btts_service.get_btts_today_fixtures,
+            top_league_ids=set(app_ctx.config.top_league_ids or []),
+        )
+    except TicketsUnavailable as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "5"}) from exc
+
+
+@router.get("/history")
+def get_btts_tickets_history(
+    day: Optional[date] = Query(None, description="YYYY-MM-DD (default: danas)"),
+    app_ctx: AppContext = Depends(require_app_context),
+) -> Dict[str, Any]:
+    _require_btts_app(app_ctx)
+    target = day or today_local()
+    versions = get_history(target)
+    return {"day": target.isoformat(), "versions": versions, "total": len(versions)}
@@ -1,16 +1,21 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Any
 from zoneinfo import ZoneInfo
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
 
-from backend import api_football
+from backend import api_football, profiler
 from backend.cache import cache_get, make_cache_key
 from backend.config import TIMEZONE, settings
+from backend.db import get_db
 from backend.dependencies import require_api_key
 from backend import cache as cache_module
+from backend.metrics import render_prometheus
+from backend.services import metrics_aggregator, usage_accounting
 
 router = APIRouter(tags=["debug"], dependencies=[Depends(require_api_key)])
 
@@ -56,3 +61,50 @@ def ops() -> dict[str, Any]:
         "redis_configured": redis_configured,
         "fixtures_next_2_days": fixtures_cache,
     }
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics() -> PlainTextResponse:
+    """Prometheus text format; zbir svih workera (metrics_aggregator)."""
+    return PlainTextResponse(
+        render_prometheus(metrics_aggregator.snapshot()),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+@router.get("/_debug/metrics")
+def metrics_summary() -> dict[str, Any]:
+    return metrics_aggregator.summary()
+
+
+@router.get("/_debug/usage")
+def usage_report(
+    day: date | None = Query(None, description="UTC dan (YYYY-MM-DD); podrazumevano danas"),
+    session: Session = Depends(get_db),
+) -> dict[str, Any]:
+    """API-Football pozivi i OpenAI tokeni po endpoint-u, ruti, app_id-u i satu + projekcija naspram kvote."""
+    usage_accounting.flush()
+    return usage_accounting.report(session, day)
+
+
+@router.get("/_debug/profile", response_class=PlainTextResponse)
+def profile_worker(
+    seconds: float = Query(10.0, gt=0, le=60),
+    interval_ms: float = Query(5.0, ge=1, le=100),
+    idle: bool = Query(False, description="Uključi i threadove koji samo čekaju (lock, select, queue)"),
+) -> PlainTextResponse:
+    """Sampling profil svih threadova ovog workera; collapsed stackovi za flamegraph."""
+    result = profiler.run_for(seconds, interval_ms / 1000, include_idle=idle)
+    if result is None:
+        raise HTTPException(status_code=409, detail="Profiler already running in this worker")
+    return PlainTextResponse(result.collapsed(), headers={"X-Profile-Samples": str(result.samples)})
+
+
+@router.get("/_debug/profile/{profile_id}", response_class=PlainTextResponse)
+def request_profile(profile_id: str) -> PlainTextResponse:
+    """Profil jednog request-a snimljen preko `X-Profile` headera (id = `X-Profile-Id`)."""
+    stored = profiler.load_request_profile(profile_id)
+    if not stored:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    headers = {"X-Profile-Samples": str(stored.get("samples", 0)), "X-Profile-Scope": str(stored.get("scope", "worker"))}
+    return PlainTextResponse(str(stored.get("collapsed") or ""), headers=headers)
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import List, Optional
+from zoneinfo import ZoneInfo
+
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+
+from backend.apps.models import AppContext
+from backend.config import TIMEZONE
+from backend.dependencies import require_app_context
+from backend.services.live_feed_service import LiveSubscription, stream_live_feed
+
+router = APIRouter(prefix="/live", tags=["Live"])
+
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@router.get(
+    "/stream",
+    summary="Live delte mečeva (SSE) za dan / lige",
+    response_model=None,
+)
+def live_stream(
+    day: Optional[date] = Query(None, description="YYYY-MM-DD (default: danas)"),
+    league_id: Optional[List[int]] = Query(None, description="Ponovljivo; bez ovoga ceo dan"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    app_ctx: AppContext = Depends(require_app_context),
+) -> StreamingResponse:
+    """
+    Eventi: `hello` | `fixture` (score, minute, state, status, red_cards) |
+    `badge` (btts_badge za app iz X-App-Id) | `resync` (klijent ponovo učitava listu).
+    """
+    target = day or datetime.now(ZoneInfo(TIMEZONE)).date()
+    subscription = LiveSubscription(
+        day=target.isoformat(),
+        league_ids=set(league_id) if league_id else None,
+        app_id=app_ctx.app_id,
+    )
+    return StreamingResponse(
+        stream_live_feed(subscription, last_event_id=last_event_id),
+        media_type="text/event-stream",
+        headers=_SSE_HEADERS,
+    )
@@ -1,43 +1,25 @@
 from __future__ import annotations
 
 import logging
+from datetime import datetime
 from typing import Any, Dict, List, Optional
+from zoneinfo import ZoneInfo
 
 from fastapi import APIRouter, Depends, HTTPException, Path, Query
 
 from backend import api_football
 from backend.cache import cache_get, make_cache_key
-from backend.config import TOP_LEAGUE_IDS
+from backend.config import TIMEZONE, TOP_LEAGUE_IDS
 from backend.dependencies import require_api_key
 from backend.match_full import build_full_match, build_match_summary
 from backend.odds_summary import build_odds_summary
+from backend.services.slate_changelog import current_version, delta_response
 
 router = APIRouter(tags=["matches"])
 logger = logging.getLogger("naksir.go_premium.api")
 
 
-@router.get(
-    "/matches/today",
-    summary="Svi današnji mečevi (card format)",
-    dependencies=[Depends(require_api_key)],
-)
-def get_today_matches(
-    cursor: int = Query(0, ge=0, description="Pagination cursor"),
-    limit: int = Query(10, ge=1, le=100, description="Page size"),
-    include_enrich: bool = Query(False, description="Include odds/standings snapshots"),
-) -> Dict[str, Any]:
-    """
-    Vrati listu svih *dozvoljenih* mečeva za današnji dan u paginiranom wrapper-u.
-
-    Interno:
-    - `get_fixtures_next_days()` radi poziv ka API-Football i filtriranje
-      (allowlist liga + izbacivanje otkazanih statusa, ali uključuje završene).
-    - `build_match_summary()` pretvara raw fixture u lagani JSON
-      spreman za karticu na frontu (liga, timovi, kickoff, status, skor, flagovi...).
-    - Lagani odds snapshot se doda samo ako već postoji u cache-u (bez novih API poziva),
-      ali samo kada je include_enrich=true.
-    """
-
+def _build_today_cards(include_enrich: bool) -> List[Dict[str, Any]]:
     fixtures = api_football.get_fixtures_next_days(2, include_finished=True)
     cards: List[Dict[str, Any]] = []
     standings_cache: Dict[tuple[int, int], List[Dict[str, Any]]] = {}
@@ -108,6 +90,45 @@ def get_today_matches(
         cards.append(card)
 
     cards.sort(key=lambda c: (c.get("summary", {}).get("kickoff") or ""))
+    return cards
+
+
+@router.get(
+    "/matches/today",
+    summary="Svi današnji mečevi (card format)",
+    dependencies=[Depends(require_api_key)],
+)
+def get_today_matches(
+    cursor: int = Query(0, ge=0, description="Pagination cursor"),
+    limit: int = Query(10, ge=1, le=100, description="Page size"),
+    include_enrich: bool = Query(False, description="Include odds/standings snapshots"),
+    since: Optional[str] = Query(None, description="`version` iz prethodnog odgovora -> samo promene"),
+) -> Dict[str, Any]:
+    """
+    Vrati listu svih *dozvoljenih* mečeva za današnji dan u paginiranom wrapper-u.
+
+    Interno:
+    - `get_fixtures_next_days()` radi poziv ka API-Football i filtriranje
+      (allowlist liga + izbacivanje otkazanih statusa, ali uključuje završene).
+    - `build_match_summary()` pretvara raw fixture u lagani JSON
+      spreman za karticu na frontu (liga, timovi, kickoff, status, skor, flagovi...).
+    - Lagani odds snapshot se doda samo ako već postoji u cache-u (bez novih API poziva),
+      ali samo kada je include_enrich=true.
+    - `since=<version>` vraća samo dodate/promenjene kartice + `removed` id-jeve (bez paginacije);
+      nepoznata/istekla verzija -> pun odgovor.
+    """
+
+    cards = _build_today_cards(include_enrich)
+    slate = "matches:enrich" if include_enrich else "matches"
+    day = datetime.now(ZoneInfo(TIMEZONE)).date().isoformat()
+    by_id = {c["fixture_id"]: c for c in cards if isinstance(c.get("fixture_id"), int)}
+    if since:
+        version, delta = delta_response(slate, day, by_id, since)
+        if delta is not None:
+            return {**delta, "next_cursor": None}
+    else:
+        version = current_version(slate, day, by_id)
+
     total = len(cards)
     start = min(cursor, total)
     end = min(start + limit, total)
@@ -116,7 +137,7 @@ def get_today_matches(
 
     logger.info("Today matches requested -> %s cards (cursor=%s, limit=%s)", total, cursor, limit)
 
-    return {"items": items, "next_cursor": next_cursor, "total": total}
+    return {"items": items, "next_cursor": next_cursor, "total": total, "version": version, "delta": False}
 
 
 @router.get(
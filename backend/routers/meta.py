@@ -6,10 +6,11 @@ from typing import Any, Dict, List
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
 
 from backend.apps.models import AppContext
 from backend.config import TIMEZONE
-from backend.db import SessionLocal
+from backend.db import AsyncDbSession, get_async_db
 from backend.dependencies import require_api_key, require_app_context
 
 router = APIRouter(tags=["meta"])
@@ -29,13 +30,19 @@ def root(ctx: AppContext = Depends(require_app_context)) -> Dict[str, Any]:
     }
 
 
+def _ping(session: Session) -> None:
+    session.execute(text("SELECT 1"))
+
+
 @router.get("/health")
-def health(ctx: AppContext = Depends(require_app_context)) -> Dict[str, str]:
+async def health(
+    ctx: AppContext = Depends(require_app_context),
+    session: AsyncDbSession = Depends(get_async_db),
+) -> Dict[str, str]:
     """Health-check endpoint za Render / uptime monitor."""
     _ = ctx
     try:
-        with SessionLocal() as session:
-            session.execute(text("SELECT 1"))
+        await session.run_sync(_ping)
     except SQLAlchemyError as exc:
         logger.exception("DB health check failed")
         raise HTTPException(status_code=503, detail="database_unavailable") from exc
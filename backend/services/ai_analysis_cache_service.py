@@ -1,20 +1,36 @@
 from __future__ import annotations
 
+import logging
+import os
+import socket
+import threading
 import time
-from datetime import datetime
+import uuid
+from datetime import datetime, timedelta, timezone
 from typing import Any
 
-from sqlalchemy import select
+from sqlalchemy import and_, or_, select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from backend.cache import cache_get, cache_set
 from backend.db import SessionLocal
 from backend.models.ai_analysis_cache import AiAnalysisCache
+from backend.services.btts_board_service import apply_btts_badge
+
+logger = logging.getLogger("naksir.go_premium.ai_cache")
 
 DEFAULT_WAIT_SECONDS = 20
 POLL_INTERVAL_SECONDS = 0.5
 DEFAULT_APP_ID = "naksir.go_premium"
 
+# Generation lease: red u statusu "generating" važi samo dok vlasnik obnavlja lease.
+LEASE_SECONDS = int(os.getenv("AI_GENERATION_LEASE_SECONDS", "90"))
+HEARTBEAT_SECONDS = max(1.0, LEASE_SECONDS / 3)
+SWEEP_INTERVAL_SECONDS = int(os.getenv("AI_LEASE_SWEEP_INTERVAL_SECONDS", "60"))
+STALE_LEASE_ERROR = "generation lease expired"
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
 
 READY_STATUSES = {"ready", "ok", "completed", "success"}
 
@@ -41,6 +57,127 @@ def list_cached_ready_for_fixture_ids(
     return {int(r.fixture_id): r for r in rows if r and r.analysis_json}
 
 
+BTTS_BADGE_VERSION_TTL_SECONDS = 7 * 24 * 60 * 60
+
+
+def _btts_badge_version_key(app_id: str) -> str:
+    return f"btts:badge_version:{app_id}"
+
+
+def get_btts_badge_version(app_id: str = DEFAULT_APP_ID) -> str:
+    """Token koji se menja kad god se upiše neki BTTS badge (invalidacija izvedenih keševa)."""
+    cached = cache_get(_btts_badge_version_key(app_id))
+    if isinstance(cached, dict) and cached.get("version"):
+        return str(cached["version"])
+    return "0"
+
+
+def bump_btts_badge_version(app_id: str = DEFAULT_APP_ID) -> None:
+    cache_set(
+        _btts_badge_version_key(app_id),
+        {"version": str(time.time_ns())},
+        BTTS_BADGE_VERSION_TTL_SECONDS,
+    )
+
+
+def btts_badge_from_analysis(analysis_json: dict[str, Any] | None) -> dict[str, Any] | None:
+    """Kompaktan BTTS badge iz analysis_json (isti oblik koji vraćaju /btts rute)."""
+    if not analysis_json:
+        return None
+
+    analysis = analysis_json.get("analysis", analysis_json)
+
+    btts = None
+    if isinstance(analysis, dict):
+        btts = analysis.get("btts") or analysis.get("BTTS")
+    if not isinstance(btts, dict):
+        return None
+
+    avoid_flags = btts.get("avoid_flags")
+    return {
+        "yes_pct": btts.get("yes_pct"),
+        "no_pct": btts.get("no_pct"),
+        "recommended": btts.get("recommended_btts_market") or btts.get("recommended"),
+        "confidence": btts.get("confidence_pct") or btts.get("confidence"),
+        "reasoning_short": (
+            btts.get("reasoning_short") or analysis.get("reasoning_short") or analysis.get("summary")
+        ),
+        "avoid_flags": avoid_flags if isinstance(avoid_flags, list) else [],
+    }
+
+
+def _pct_or_none(value: Any) -> float | None:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def btts_projection(analysis_json: dict[str, Any] | None) -> dict[str, Any]:
+    """Vrednosti projekcionih kolona (btts_yes_pct, btts_no_pct, btts_badge) za red."""
+    badge = btts_badge_from_analysis(analysis_json)
+    if badge is None:
+        return {"btts_yes_pct": None, "btts_no_pct": None, "btts_badge": None}
+    return {
+        "btts_yes_pct": _pct_or_none(badge.get("yes_pct")),
+        "btts_no_pct": _pct_or_none(badge.get("no_pct")),
+        "btts_badge": badge,
+    }
+
+
+def list_btts_badges_for_fixture_ids(
+    session: Session,
+    fixture_ids: list[int],
+    *,
+    app_id: str = DEFAULT_APP_ID,
+) -> dict[int, dict[str, Any]]:
+    """
+    fixture_id -> BTTS badge za READY redove; 1 query koji čita samo btts_badge kolonu
+    (pokriveno indeksom app_id, fixture_id, status).
+    """
+    if not fixture_ids:
+        return {}
+    rows = session.execute(
+        select(AiAnalysisCache.fixture_id, AiAnalysisCache.btts_badge).where(
+            AiAnalysisCache.app_id == app_id,
+            AiAnalysisCache.fixture_id.in_(fixture_ids),  # type: ignore[attr-defined]
+            AiAnalysisCache.status.in_(list(READY_STATUSES)),  # type: ignore[attr-defined]
+            AiAnalysisCache.btts_badge.is_not(None),
+        )
+    ).all()
+    return {int(fid): badge for fid, badge in rows if badge}
+
+
+def rank_btts_fixtures(
+    session: Session,
+    cache_keys: dict[int, str],
+    *,
+    market: str = "yes",
+    limit: int = 3,
+    app_id: str = DEFAULT_APP_ID,
+) -> list[tuple[int, float, dict[str, Any]]]:
+    """
+    Top-N (fixture_id, pct, badge) po BTTS yes/no procentu u jednom upitu.
+    Čita samo projekcione kolone; rangiranje i LIMIT radi baza.
+    """
+    if not cache_keys:
+        return []
+    pct = AiAnalysisCache.btts_yes_pct if market == "yes" else AiAnalysisCache.btts_no_pct
+    rows = session.execute(
+        select(AiAnalysisCache.fixture_id, pct, AiAnalysisCache.btts_badge)
+        .where(
+            AiAnalysisCache.app_id == app_id,
+            AiAnalysisCache.cache_key.in_(list(cache_keys.values())),  # type: ignore[attr-defined]
+            AiAnalysisCache.status.in_(list(READY_STATUSES)),  # type: ignore[attr-defined]
+            pct.is_not(None),
+            AiAnalysisCache.btts_badge.is_not(None),
+        )
+        .order_by(pct.desc(), AiAnalysisCache.fixture_id)
+        .limit(limit)
+    ).all()
+    return [(int(fid), float(value), badge) for fid, value, badge in rows]
+
+
 def make_cache_key(
     *,
     fixture_id: int,
@@ -75,6 +212,49 @@ def get_cached_row(
     ).scalars().first()
 
 
+def new_lease_owner() -> str:
+    """Jedinstven owner id za jednu generaciju (worker + nasumični sufiks)."""
+    return f"{WORKER_ID}:{uuid.uuid4().hex[:8]}"
+
+
+def _as_naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def is_lease_expired(
+    row: AiAnalysisCache,
+    *,
+    now: datetime | None = None,
+    lease_seconds: int = LEASE_SECONDS,
+) -> bool:
+    """True ako je red zaglavljen u "generating" (vlasnik nije obnovio lease)."""
+    if row.status != "generating":
+        return False
+    now = now or datetime.utcnow()
+    expires_at = row.lease_expires_at
+    if expires_at is None:
+        # redovi iz vremena pre lease kolona: računamo od poslednjeg update-a
+        if row.updated_at is None:
+            return True
+        expires_at = _as_naive_utc(row.updated_at) + timedelta(seconds=lease_seconds)
+    return _as_naive_utc(expires_at) < now
+
+
+def _expired_generating_clause(now: datetime, lease_seconds: int) -> Any:
+    return and_(
+        AiAnalysisCache.status == "generating",
+        or_(
+            AiAnalysisCache.lease_expires_at < now,
+            and_(
+                AiAnalysisCache.lease_expires_at.is_(None),
+                AiAnalysisCache.updated_at < now - timedelta(seconds=lease_seconds),
+            ),
+        ),
+    )
+
+
 def try_mark_generating(
     session: Session,
     *,
@@ -85,11 +265,16 @@ def try_mark_generating(
     model: str,
     app_id: str = DEFAULT_APP_ID,
     allow_retry: bool = True,
+    owner_id: str | None = None,
+    lease_seconds: int = LEASE_SECONDS,
 ) -> bool:
     """
-    Returns True if we acquired "generation rights" (created row with status=generating).
+    Returns True if we acquired "generation rights" (created row with status=generating,
+    or atomically took over a failed row / a generating row whose lease expired).
     Returns False if someone else already has it.
     """
+    owner_id = owner_id or new_lease_owner()
+    now = datetime.utcnow()
     row = AiAnalysisCache(
         app_id=app_id,
         fixture_id=fixture_id,
@@ -98,8 +283,10 @@ def try_mark_generating(
         analysis_version=prompt_version,
         lang=locale,
         model=model,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow(),
+        lease_owner=owner_id,
+        lease_expires_at=now + timedelta(seconds=lease_seconds),
+        created_at=now,
+        updated_at=now,
     )
     session.add(row)
     try:
@@ -109,20 +296,165 @@ def try_mark_generating(
         session.rollback()
         if not allow_retry:
             return False
-        existing = session.execute(
-            select(AiAnalysisCache).where(
+        # Atomic takeover: jedan UPDATE sa uslovom, pobeđuje samo jedan worker.
+        now = datetime.utcnow()
+        result = session.execute(
+            update(AiAnalysisCache)
+            .where(
                 AiAnalysisCache.cache_key == cache_key,
                 AiAnalysisCache.app_id == app_id,
+                or_(
+                    AiAnalysisCache.status == "failed",
+                    _expired_generating_clause(now, lease_seconds),
+                ),
             )
-        ).scalars().first()
-        if existing and existing.status == "failed":
-            existing.status = "generating"
-            existing.error = None
-            existing.updated_at = datetime.utcnow()
-            session.add(existing)
-            session.commit()
-            return True
-        return False
+            .values(
+                status="generating",
+                error=None,
+                lease_owner=owner_id,
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+                updated_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+        acquired = result.rowcount == 1
+        if acquired:
+            logger.info("AI cache lease takeover cache_key=%s owner=%s", cache_key, owner_id)
+        return acquired
+
+
+def renew_lease(
+    cache_key: str,
+    *,
+    owner_id: str,
+    app_id: str = DEFAULT_APP_ID,
+    lease_seconds: int = LEASE_SECONDS,
+) -> bool:
+    """Heartbeat: produži lease ako smo i dalje vlasnik generating reda."""
+    now = datetime.utcnow()
+    with SessionLocal() as session:
+        result = session.execute(
+            update(AiAnalysisCache)
+            .where(
+                AiAnalysisCache.cache_key == cache_key,
+                AiAnalysisCache.app_id == app_id,
+                AiAnalysisCache.status == "generating",
+                AiAnalysisCache.lease_owner == owner_id,
+            )
+            .values(lease_expires_at=now + timedelta(seconds=lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+        return result.rowcount == 1
+
+
+class LeaseHeartbeat:
+    """Background thread koji obnavlja lease dok traje duga generacija."""
+
+    def __init__(
+        self,
+        cache_key: str,
+        *,
+        owner_id: str,
+        app_id: str = DEFAULT_APP_ID,
+        interval_seconds: float = HEARTBEAT_SECONDS,
+        lease_seconds: int = LEASE_SECONDS,
+    ) -> None:
+        self.cache_key = cache_key
+        self.owner_id = owner_id
+        self.app_id = app_id
+        self.interval_seconds = interval_seconds
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "LeaseHeartbeat":
+        self._thread = threading.Thread(
+            target=self._run, name=f"ai-lease-{self.cache_key}", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def __enter__(self) -> "LeaseHeartbeat":
+        return self.start()
+
+    def __exit__(self, *_exc: object) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                renewed = renew_lease(
+                    self.cache_key,
+                    owner_id=self.owner_id,
+                    app_id=self.app_id,
+                    lease_seconds=self.lease_seconds,
+                )
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("AI cache lease renew failed cache_key=%s: %s", self.cache_key, exc)
+                continue
+            if not renewed:
+                self.lost = True
+                logger.warning(
+                    "AI cache lease lost cache_key=%s owner=%s", self.cache_key, self.owner_id
+                )
+                return
+
+
+def sweep_expired_leases(
+    session: Session,
+    *,
+    now: datetime | None = None,
+    lease_seconds: int = LEASE_SECONDS,
+) -> int:
+    """Orphaned "generating" redove (istekao lease) prebacuje u failed da bi bili retry-abilni."""
+    now = now or datetime.utcnow()
+    result = session.execute(
+        update(AiAnalysisCache)
+        .where(_expired_generating_clause(now, lease_seconds))
+        .values(
+            status="failed",
+            error=STALE_LEASE_ERROR,
+            lease_owner=None,
+            lease_expires_at=None,
+            updated_at=now,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
+    reclaimed = result.rowcount or 0
+    if reclaimed:
+        logger.warning("AI cache sweeper reclaimed %s stale generating rows", reclaimed)
+    return reclaimed
+
+
+_SWEEPER_STARTED = False
+_SWEEPER_LOCK = threading.Lock()
+
+
+def start_lease_sweeper(interval_seconds: float = SWEEP_INTERVAL_SECONDS) -> None:
+    """Pokreće (jednom po procesu) daemon thread koji periodično poziva sweep_expired_leases."""
+    global _SWEEPER_STARTED
+    with _SWEEPER_LOCK:
+        if _SWEEPER_STARTED or interval_seconds <= 0:
+            return
+        _SWEEPER_STARTED = True
+
+    def _loop() -> None:
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                with SessionLocal() as session:
+                    sweep_expired_leases(session)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("AI cache lease sweep failed: %s", exc)
+
+    threading.Thread(target=_loop, name="ai-lease-sweeper", daemon=True).start()
 
 
 def wait_for_ready(
@@ -132,7 +464,7 @@ def wait_for_ready(
     max_wait_seconds: int = DEFAULT_WAIT_SECONDS,
 ) -> AiAnalysisCache | None:
     """
-    Poll DB until row becomes ok (or failed) or timeout.
+    Poll DB until row becomes ok (or failed), its generation lease expires, or timeout.
     """
     deadline = time.monotonic() + max_wait_seconds
     while time.monotonic() < deadline:
@@ -149,32 +481,83 @@ def wait_for_ready(
                 return row
             if row.status == "failed":
                 return row
+            if is_lease_expired(row):
+                return row
         time.sleep(POLL_INTERVAL_SECONDS)
     return None
 
 
-def save_ok(
+def _fenced_update(
     session: Session,
     *,
     cache_key: str,
-    fixture_id: int,
-    analysis_json: dict[str, Any],
-    app_id: str = DEFAULT_APP_ID,
-) -> None:
-    row = session.execute(
-        select(AiAnalysisCache).where(
+    app_id: str,
+    owner_id: str,
+    values: dict[str, Any],
+) -> bool:
+    """
+    Upis rezultata samo ako smo i dalje vlasnik lease-a (status=generating, lease_owner=owner).
+    rowcount 0 znači da je lease preuzet (ili sweeper-om prebačen u failed) – rezultat se odbacuje.
+    """
+    result = session.execute(
+        update(AiAnalysisCache)
+        .where(
             AiAnalysisCache.cache_key == cache_key,
             AiAnalysisCache.app_id == app_id,
+            AiAnalysisCache.status == "generating",
+            AiAnalysisCache.lease_owner == owner_id,
         )
-    ).scalars().first()
-    if not row:
-        row = AiAnalysisCache(cache_key=cache_key, fixture_id=fixture_id, app_id=app_id)
-        session.add(row)
-    row.status = "ready"
-    row.error = None
-    row.analysis_json = analysis_json
-    row.updated_at = datetime.utcnow()
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
     session.commit()
+    if result.rowcount == 1:
+        return True
+    logger.warning(
+        "AI cache lease lost before save, dropping result cache_key=%s owner=%s status=%s",
+        cache_key,
+        owner_id,
+        values.get("status"),
+    )
+    return False
+
+
+def save_ok(
+    session: Session,
+    *,
+    cache_key: str,
+    fixture_id: int,
+    analysis_json: dict[str, Any],
+    app_id: str = DEFAULT_APP_ID,
+    owner_id: str | None = None,
+) -> bool:
+    """
+    Upisuje READY rezultat. Sa owner_id upis je fenciran lease-om (vidi `_fenced_update`)
+    i vraća False ako je lease izgubljen; bez owner_id radi bezuslovni upsert (batch/testovi).
+    """
+    projection = btts_projection(analysis_json)
+    values = {
+        "status": "ready",
+        "error": None,
+        "lease_owner": None,
+        "lease_expires_at": None,
+        "analysis_json": analysis_json,
+        "btts_yes_pct": projection["btts_yes_pct"],
+        "btts_no_pct": projection["btts_no_pct"],
+        "btts_badge": projection["btts_badge"],
+        "updated_at": datetime.utcnow(),
+    }
+    if owner_id is not None:
+        if not _fenced_update(
+            session, cache_key=cache_key, app_id=app_id, owner_id=owner_id, values=values
+        ):
+            return False
+    else:
+        _upsert_row(session, cache_key=cache_key, fixture_id=fixture_id, app_id=app_id, values=values)
+    if projection["btts_badge"] is not None:
+        bump_btts_badge_version(app_id)
+        apply_btts_badge(app_id, fixture_id, projection["btts_badge"])
+    return True
 
 
 def save_failed(
@@ -184,6 +567,30 @@ def save_failed(
     fixture_id: int,
     error: str,
     app_id: str = DEFAULT_APP_ID,
+    owner_id: str | None = None,
+) -> bool:
+    values = {
+        "status": "failed",
+        "error": error[:5000],
+        "lease_owner": None,
+        "lease_expires_at": None,
+        "updated_at": datetime.utcnow(),
+    }
+    if owner_id is not None:
+        return _fenced_update(
+            session, cache_key=cache_key, app_id=app_id, owner_id=owner_id, values=values
+        )
+    _upsert_row(session, cache_key=cache_key, fixture_id=fixture_id, app_id=app_id, values=values)
+    return True
+
+
+def _upsert_row(
+    session: Session,
+    *,
+    cache_key: str,
+    fixture_id: int,
+    app_id: str,
+    values: dict[str, Any],
 ) -> None:
     row = session.execute(
         select(AiAnalysisCache).where(
@@ -194,7 +601,83 @@ def save_failed(
     if not row:
         row = AiAnalysisCache(cache_key=cache_key, fixture_id=fixture_id, app_id=app_id)
         session.add(row)
-    row.status = "failed"
-    row.error = error[:5000]
-    row.updated_at = datetime.utcnow()
+    for field, value in values.items():
+        setattr(row, field, value)
+    session.commit()
+
+
+def bulk_save_ok(
+    session: Session,
+    rows: list[tuple[str, int, dict[str, Any]]],
+    *,
+    prompt_version: str,
+    locale: str = "en",
+    model: str = "default",
+    app_id: str = DEFAULT_APP_ID,
+) -> int:
+    """
+    Upsert više READY redova jednim INSERT ... ON CONFLICT (app_id, cache_key) DO UPDATE.
+    rows: (cache_key, fixture_id, analysis_json). Vraća broj upisanih redova.
+    """
+    if not rows:
+        return 0
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        for cache_key, fixture_id, analysis_json in rows:
+            save_ok(
+                session,
+                cache_key=cache_key,
+                fixture_id=fixture_id,
+                analysis_json=analysis_json,
+                app_id=app_id,
+            )
+        return len(rows)
+
+    now = datetime.utcnow()
+    values = [
+        {
+            "app_id": app_id,
+            "fixture_id": fixture_id,
+            "cache_key": cache_key,
+            "status": "ready",
+            "error": None,
+            "analysis_json": analysis_json,
+            "analysis_version": prompt_version,
+            "lang": locale,
+            "model": model,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "created_at": now,
+            "updated_at": now,
+            **btts_projection(analysis_json),
+        }
+        for cache_key, fixture_id, analysis_json in rows
+    ]
+    stmt = dialect_insert(AiAnalysisCache).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AiAnalysisCache.app_id, AiAnalysisCache.cache_key],
+        set_={
+            "status": stmt.excluded.status,
+            "error": None,
+            "analysis_json": stmt.excluded.analysis_json,
+            "analysis_version": stmt.excluded.analysis_version,
+            "btts_yes_pct": stmt.excluded.btts_yes_pct,
+            "btts_no_pct": stmt.excluded.btts_no_pct,
+            "btts_badge": stmt.excluded.btts_badge,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    session.execute(stmt)
     session.commit()
+    if any(value["btts_badge"] is not None for value in values):
+        bump_btts_badge_version(app_id)
+        for value in values:
+            if value["btts_badge"] is not None:
+                apply_btts_badge(app_id, value["fixture_id"], value["btts_badge"])
+    return len(values)
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+DEFAULT_HEARTBEAT_SECONDS = 15.0
+STREAMED_TEXT_KEY = "preview"
+
+_TRAILING_UNICODE_ESCAPE = re.compile(r"\\u[0-9a-fA-F]{0,3}$")
+_DECODER = json.JSONDecoder(strict=False)
+
+
+def format_sse(event: str, data: Any, *, event_id: int | str | None = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _skip(buf: str, pos: int, chars: str) -> int:
+    while pos < len(buf) and buf[pos] in chars:
+        pos += 1
+    return pos
+
+
+def _partial_json_string(raw: str) -> str:
+    """Dekodira nezavršen JSON string (bez početnog navodnika) do poslednjeg sigurnog karaktera."""
+    trimmed = _TRAILING_UNICODE_ESCAPE.sub("", raw)
+    backslashes = len(trimmed) - len(trimmed.rstrip("\\"))
+    if backslashes % 2 == 1:
+        trimmed = trimmed[:-1]
+    try:
+        value, _ = _DECODER.raw_decode(f'"{trimmed}"')
+    except ValueError:
+        return ""
+    return value if isinstance(value, str) else ""
+
+
+class IncrementalAnalysisParser:
+    """
+    Inkrementalni parser za JSON objekat koji model streamuje.
+
+    Čim se neki top-level ključ kompletira, emituje se ``block`` event.
+    Za ``preview`` ključ se dodatno emituju ``preview_delta`` eventi dok tekst još stiže,
+    tako da klijent ima šta da prikaže pre nego što je ceo JSON gotov.
+    Konačan rezultat se i dalje dobija parsiranjem celog teksta.
+    """
+
+    def __init__(self, streamed_key: str = STREAMED_TEXT_KEY) -> None:
+        self._buf = ""
+        self._pos = 0
+        self._started = False
+        self._done = False
+        self._streamed_key = streamed_key
+        self._streamed_len = 0
+
+    @property
+    def text(self) -> str:
+        return self._buf
+
+    def feed(self, chunk: str) -> list[tuple[str, dict[str, Any]]]:
+        self._buf += chunk
+        events: list[tuple[str, dict[str, Any]]] = []
+        buf = self._buf
+        while not self._done:
+            if not self._started:
+                i = _skip(buf, self._pos, " \t\r\n")
+                if i >= len(buf):
+                    break
+                if buf[i] != "{":
+                    self._done = True
+                    break
+                self._pos = i + 1
+                self._started = True
+                continue
+
+            i = _skip(buf, self._pos, " \t\r\n,")
+            if i >= len(buf):
+                break
+            if buf[i] == "}":
+                self._done = True
+                break
+            try:
+                key, j = _DECODER.raw_decode(buf, i)
+            except ValueError:
+                break
+            j = _skip(buf, j, " \t\r\n")
+            if j >= len(buf):
+                break
+            if buf[j] != ":" or not isinstance(key, str):
+                self._done = True
+                break
+            k = _skip(buf, j + 1, " \t\r\n")
+            if k >= len(buf):
+                break
+            try:
+                value, end = _DECODER.raw_decode(buf, k)
+            except ValueError:
+                if key == self._streamed_key and buf[k] == '"':
+                    self._emit_streamed_text(_partial_json_string(buf[k + 1 :]), events)
+                break
+            if end >= len(buf) and isinstance(value, (int, float)):
+                # broj na kraju bafera možda još nije kompletan
+                break
+            if key == self._streamed_key and isinstance(value, str):
+                self._emit_streamed_text(value, events)
+            events.append(("block", {"key": key, "value": value}))
+            self._pos = end
+        return events
+
+    def _emit_streamed_text(self, text: str, events: list[tuple[str, dict[str, Any]]]) -> None:
+        if len(text) > self._streamed_len:
+            events.append(("preview_delta", {"text": text[self._streamed_len :]}))
+            self._streamed_len = len(text)
+
+
+_StreamItem = tuple[int, str, Any] | None  # None = stream je završen
+
+
+@dataclass(eq=False)
+class _Subscriber:
+    """Jedan SSE gledalac: asyncio.Queue u loop-u konekcije, puni se iz producer thread-a."""
+
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue[_StreamItem]
+
+    def offer(self, item: _StreamItem) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+        except RuntimeError:
+            # loop je zatvoren (klijent otišao); odjava stiže iz finally bloka subscribe-a
+            pass
+
+
+@dataclass
+class AnalysisStream:
+    """In-flight SSE stream jedne generacije; svi gledaoci istog cache_key-a čitaju isti log eventa."""
+
+    app_id: str
+    cache_key: str
+    _events: list[tuple[str, Any]] = field(default_factory=list)
+    _finished: bool = False
+    _subscribers: list[_Subscriber] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def publish(self, event: str, data: Any) -> None:
+        with self._lock:
+            if self._finished:
+                return
+            idx = len(self._events)
+            self._events.append((event, data))
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.offer((idx, event, data))
+
+    def finish(self, event: str | None = None, data: Any = None) -> None:
+        with self._lock:
+            if self._finished:
+                return
+            idx = len(self._events)
+            if event is not None:
+                self._events.append((event, data))
+            self._finished = True
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            if event is not None:
+                subscriber.offer((idx, event, data))
+            subscriber.offer(None)
+        _unregister(self)
+
+    async def subscribe(
+        self,
+        *,
+        last_event_id: int | None = None,
+        heartbeat_seconds: float = DEFAULT_HEARTBEAT_SECONDS,
+    ) -> AsyncIterator[str]:
+        """
+        Replay od `last_event_id` pa živi eventi. Čeka na asyncio.Queue u event loop-u,
+        tako da gledalac ne drži threadpool thread dok model generiše.
+        """
+        start = (last_event_id + 1) if last_event_id is not None else 0
+        subscriber = _Subscriber(loop=asyncio.get_running_loop(), queue=asyncio.Queue())
+        with self._lock:
+            backlog = self._events[start:]
+            finished = self._finished
+            if not finished:
+                self._subscribers.append(subscriber)
+        try:
+            idx = start
+            for event, data in backlog:
+                yield format_sse(event, data, event_id=idx)
+                idx += 1
+            if finished:
+                return
+            while True:
+                try:
+                    item = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    return
+                event_idx, event, data = item
+                if event_idx < idx:
+                    continue
+                yield format_sse(event, data, event_id=event_idx)
+                idx = event_idx + 1
+        finally:
+            with self._lock:
+                if subscriber in self._subscribers:
+                    self._subscribers.remove(subscriber)
+
+
+_STREAMS: dict[tuple[str, str], AnalysisStream] = {}
+_STREAMS_LOCK = threading.Lock()
+
+
+def _unregister(stream: AnalysisStream) -> None:
+    with _STREAMS_LOCK:
+        key = (stream.app_id, stream.cache_key)
+        if _STREAMS.get(key) is stream:
+            _STREAMS.pop(key, None)
+
+
+def get_inflight_stream(app_id: str, cache_key: str) -> AnalysisStream | None:
+    with _STREAMS_LOCK:
+        return _STREAMS.get((app_id, cache_key))
+
+
+def open_stream(app_id: str, cache_key: str) -> AnalysisStream:
+    """Registruje novi in-flight stream (poziva ga samo vlasnik generation lock-a)."""
+    stream = AnalysisStream(app_id=app_id, cache_key=cache_key)
+    with _STREAMS_LOCK:
+        previous = _STREAMS.get((app_id, cache_key))
+        _STREAMS[(app_id, cache_key)] = stream
+    if previous is not None and not previous.finished:
+        previous.finish("error", {"status": "failed", "message": "superseded by a newer generation"})
+    return stream
@@ -0,0 +1,182 @@
+"""
+Arhiviranje završenih dana u lokalnu kolonarnu arhivu (history_archive).
+
+- `stage_prematch`: pre-match BTTS kvote + stats za današnje mečeve se pamte u cache-u
+  (kvote za prošle dane API-Football više ne vraća, a odds cache ima kratak TTL).
+- `archive_settled_day`: kad su svi mečevi dana završeni ili otpali (odložen, otkazan,
+  prekinut, dodeljen), jedan `fixtures?date=` poziv daje konačne rezultate; spojeno sa
+  staging-om upisuje se kao jedan dan arhive. Posle `SETTLE_CUTOFF_HOURS` dan se arhivira i
+  ako neki meč i dalje visi (SUSP/INT/TBD/zaglavljen NS) – ti mečevi se preskaču.
+- `start_archive_worker`: daemon thread koji periodično arhivira juče/prekjuče. Thread postoji
+  u svakom procesu, ali piše samo izabrani arhiver (cache_claim lease): index.json i
+  direktorijumi dana nemaju međuprocesni lock.
+
+Isključeno dok `HISTORY_ARCHIVE_DIR` nije podešen.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+from typing import Any, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from backend import api_football
+from backend.cache import cache_claim, cache_get, cache_set
+from backend.config import TIMEZONE
+from backend.services import history_archive
+
+logger = logging.getLogger("naksir.go_premium.archive")
+
+ARCHIVE_DIR = os.getenv("HISTORY_ARCHIVE_DIR") or None
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("HISTORY_ARCHIVE_INTERVAL_SECONDS", "3600"))
+ARCHIVE_LOOKBACK_DAYS = 2
+STAGING_TTL_SECONDS = 3 * 24 * 3600
+FINISHED_STATUSES = {"FT", "AET", "PEN"}
+# terminalni statusi bez odigranog rezultata: dan je za njih gotov, ali ne ulaze u arhivu
+ABANDONED_STATUSES = {"PST", "CANC", "ABD", "AWD", "WO"}
+SETTLE_CUTOFF_HOURS = float(os.getenv("HISTORY_ARCHIVE_SETTLE_CUTOFF_HOURS", "36"))
+LEADER_KEY = "history_archive:leader"
+
+_WORKER_LOCK = threading.Lock()
+_WORKER_STARTED = False
+
+
+def archive_enabled() -> bool:
+    return bool(ARCHIVE_DIR)
+
+
+def _staging_key(day: date) -> str:
+    return f"archive:staging:{day.isoformat()}"
+
+
+def stage_prematch(day: date, fixtures: List[Dict[str, Any]]) -> None:
+    """Pamti odds/stats po fixture-u za dan; cache se piše samo kad se nešto promeni."""
+    if not archive_enabled():
+        return
+    key = _staging_key(day)
+    staged = cache_get(key)
+    staged = dict(staged) if isinstance(staged, dict) else {}
+    changed = False
+    for fx in fixtures:
+        fid = (fx.get("fixture") or {}).get("id")
+        odds = fx.get("odds") if isinstance(fx.get("odds"), dict) else None
+        if not isinstance(fid, int) or not odds:
+            continue
+        entry = {"odds": odds, "stats": fx.get("stats") or {}}
+        if staged.get(str(fid)) != entry:
+            staged[str(fid)] = entry
+            changed = True
+    if changed:
+        cache_set(key, staged, STAGING_TTL_SECONDS)
+
+
+def _status(fx: Dict[str, Any]) -> str:
+    return (((fx.get("fixture") or {}).get("status") or {}).get("short") or "").upper()
+
+
+def _day_age_hours(day: date, now: datetime) -> float:
+    start = datetime.combine(day, dt_time.min, tzinfo=ZoneInfo(TIMEZONE))
+    return (now - start).total_seconds() / 3600
+
+
+def archive_settled_day(
+    day: date, *, archive_dir: Optional[str] = None, now: Optional[datetime] = None
+) -> Optional[int]:
+    """
+    Upisuje završene mečeve dana; vraća broj redova ili None (dan još nije gotov).
+
+    Dan je gotov kad nijedan meč nije u toku/na čekanju (otpali mečevi se ne čekaju), ili kad
+    je od početka dana prošlo `SETTLE_CUTOFF_HOURS` – tada se nerešeni mečevi preskaču, da
+    jedan SUSP/INT ne blokira dan dok ne ispadne iz `ARCHIVE_LOOKBACK_DAYS` prozora.
+    """
+    archive_dir = archive_dir or ARCHIVE_DIR
+    if not archive_dir:
+        return None
+    now = now or datetime.now(ZoneInfo(TIMEZONE))
+    fixtures = api_football.get_fixtures_by_date(day.isoformat(), include_finished=True)
+    pending = [
+        fx for fx in fixtures
+        if _status(fx) not in FINISHED_STATUSES and _status(fx) not in ABANDONED_STATUSES
+    ]
+    if pending:
+        if _day_age_hours(day, now) < SETTLE_CUTOFF_HOURS:
+            return None
+        logger.warning(
+            "archive: %s past %sh cutoff, skipping %s unsettled fixtures",
+            day.isoformat(),
+            SETTLE_CUTOFF_HOURS,
+            len(pending),
+        )
+    fixtures = [fx for fx in fixtures if _status(fx) in FINISHED_STATUSES]
+
+    staged = cache_get(_staging_key(day))
+    staged = staged if isinstance(staged, dict) else {}
+    merged: List[Dict[str, Any]] = []
+    for fx in fixtures:
+        fid = (fx.get("fixture") or {}).get("id")
+        extra = staged.get(str(fid)) or {}
+        merged.append({**fx, "odds": extra.get("odds") or {}, "stats": extra.get("stats") or {}})
+    rows = history_archive.write_day(archive_dir, day, merged)
+    logger.info("archive: wrote %s rows for %s", rows, day.isoformat())
+    return rows
+
+
+def archive_pending_days(
+    *, archive_dir: Optional[str] = None, today: Optional[date] = None, now: Optional[datetime] = None
+) -> List[date]:
+    archive_dir = archive_dir or ARCHIVE_DIR
+    if not archive_dir:
+        return []
+    tz = ZoneInfo(TIMEZONE)
+    if now is None:
+        # samo `today`: početak dana (konzervativno za cutoff)
+        now = datetime.combine(today, dt_time.min, tzinfo=tz) if today else datetime.now(tz)
+    today = today or now.date()
+    index = history_archive.ArchiveIndex.load(archive_dir)
+    written: List[date] = []
+    for offset in range(ARCHIVE_LOOKBACK_DAYS, 0, -1):
+        day = today - timedelta(days=offset)
+        if day.isoformat() in index.days:
+            continue
+        try:
+            if archive_settled_day(day, archive_dir=archive_dir, now=now) is not None:
+                written.append(day)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("archive: %s failed: %s", day.isoformat(), exc)
+    return written
+
+
+def archive_tick(owner: str, *, interval_seconds: float = ARCHIVE_INTERVAL_SECONDS) -> Optional[List[date]]:
+    """Jedan prolaz worker-a; None kad ovaj proces nije arhiver (lease drži drugi)."""
+    if not cache_claim(LEADER_KEY, owner, interval_seconds * 3):
+        return None
+    return archive_pending_days()
+
+
+def start_archive_worker(interval_seconds: float = ARCHIVE_INTERVAL_SECONDS) -> None:
+    """Pokreće (jednom po procesu) daemon thread koji arhivira završene dane."""
+    global _WORKER_STARTED
+    if not archive_enabled() or interval_seconds <= 0:
+        return
+    with _WORKER_LOCK:
+        if _WORKER_STARTED:
+            return
+        _WORKER_STARTED = True
+
+    owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def _loop() -> None:
+        while True:
+            try:
+                archive_tick(owner, interval_seconds=interval_seconds)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("archive: tick failed: %s", exc)
+            time.sleep(interval_seconds)
+
+    threading.Thread(target=_loop, name="history-archive", daemon=True).start()
@@ -0,0 +1,221 @@
+"""
+Istorijski backtest BTTS ticket engine-a.
+
+Dani iz lokalne arhive (history_archive: fixtures + BTTS kvote + stats + konačan rezultat)
+se propuštaju kroz `build_daily_btts_tickets` za svaki set parametara (EngineParams) i
+settle-uju se po konačnom rezultatu. Dani se obrađuju paralelno (ProcessPoolExecutor, jedan task po danu
+za ceo grid parametara, pa se dan učitava samo jednom).
+
+Izveštaj po parametrima: hit rate (tiket i leg), ROI, max drawdown i kalibracija
+`score_to_probability` (binovi + Brier score).
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from backend.services.btts_ticket_engine import (
+    DEFAULT_ENGINE_PARAMS,
+    EngineParams,
+    build_daily_btts_tickets,
+)
+from backend.services.history_archive import ArchiveIndex, load_day_fixtures
+
+CALIBRATION_BIN_WIDTH = 0.05
+
+# (probability, hit) po leg-u
+Leg = Tuple[float, bool]
+
+
+@dataclass(frozen=True)
+class SettledTicket:
+    day: str
+    type: str
+    total_odds: float
+    legs: Tuple[Leg, ...]
+
+    @property
+    def won(self) -> bool:
+        return all(hit for _, hit in self.legs)
+
+    @property
+    def profit(self) -> float:
+        # ulog 1 jedinica po tiketu
+        return self.total_odds - 1.0 if self.won else -1.0
+
+
+# ---------- archive input ----------
+
+def list_archive_days(
+    archive_dir: str | os.PathLike[str],
+    *,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> List[date]:
+    """Dani iz history_archive index-a, sortirani po datumu."""
+    return ArchiveIndex.load(archive_dir).list_days(start=start, end=end)
+
+
+# ---------- settlement ----------
+
+def btts_outcomes(fixtures: Iterable[Dict[str, Any]]) -> Dict[int, bool]:
+    """fixture_id -> da li su oba tima dala gol (samo mečevi sa konačnim rezultatom)."""
+    out: Dict[int, bool] = {}
+    for fx in fixtures:
+        fid = (fx.get("fixture") or {}).get("id")
+        goals = fx.get("goals") or {}
+        home, away = goals.get("home"), goals.get("away")
+        if isinstance(fid, int) and isinstance(home, int) and isinstance(away, int):
+            out[fid] = home > 0 and away > 0
+    return out
+
+
+def settle_ticket(day: str, ticket: Dict[str, Any], outcomes: Dict[int, bool]) -> Optional[SettledTicket]:
+    """None za prazan tiket ili tiket sa bar jednim meč bez rezultata (void)."""
+    matches = ticket.get("matches") or []
+    if not matches:
+        return None
+    want_yes = ticket.get("type") == "BTTS_YES"
+    legs: List[Leg] = []
+    for pick in matches:
+        outcome = outcomes.get(pick["fixture_id"])
+        if outcome is None:
+            return None
+        legs.append((float(pick["probability"]), outcome == want_yes))
+    return SettledTicket(day=day, type=str(ticket.get("type")), total_odds=float(ticket["total_odds"]), legs=tuple(legs))
+
+
+def backtest_day(
+    archive_dir: str,
+    day: date,
+    params_grid: Sequence[EngineParams],
+    top_league_ids: Optional[set] = None,
+) -> List[List[SettledTicket]]:
+    """Jedan dan za ceo grid; rezultat je poravnat sa `params_grid`."""
+    fixtures = load_day_fixtures(archive_dir, day)
+    outcomes = btts_outcomes(fixtures)
+    out: List[List[SettledTicket]] = []
+    for params in params_grid:
+        result = build_daily_btts_tickets(
+            today=day, fixtures=fixtures, top_league_ids=top_league_ids, params=params
+        ).model_dump()
+        settled = [settle_ticket(day.isoformat(), result[key], outcomes) for key in ("yes_ticket", "no_ticket")]
+        out.append([t for t in settled if t is not None])
+    return out
+
+
+# ---------- metrics ----------
+
+def max_drawdown(profits: Iterable[float]) -> float:
+    peak = equity = worst = 0.0
+    for p in profits:
+        equity += p
+        peak = max(peak, equity)
+        worst = max(worst, peak - equity)
+    return worst
+
+
+def calibration(legs: Sequence[Leg], *, bin_width: float = CALIBRATION_BIN_WIDTH) -> Dict[str, Any]:
+    bins: Dict[int, List[Leg]] = {}
+    for prob, hit in legs:
+        bins.setdefault(int(prob / bin_width + 1e-9), []).append((prob, hit))
+    rows = []
+    for idx in sorted(bins):
+        items = bins[idx]
+        rows.append(
+            {
+                "bin": f"{idx * bin_width:.2f}-{(idx + 1) * bin_width:.2f}",
+                "n": len(items),
+                "predicted": round(sum(p for p, _ in items) / len(items), 4),
+                "observed": round(sum(1 for _, h in items if h) / len(items), 4),
+            }
+        )
+    brier = sum((p - (1.0 if h else 0.0)) ** 2 for p, h in legs) / len(legs) if legs else None
+    return {"bins": rows, "brier": round(brier, 4) if brier is not None else None}
+
+
+def summarize_tickets(tickets: Sequence[SettledTicket]) -> Dict[str, Any]:
+    ordered = sorted(tickets, key=lambda t: (t.day, t.type))
+    legs = [leg for t in ordered for leg in t.legs]
+    wins = sum(1 for t in ordered if t.won)
+    profit = sum(t.profit for t in ordered)
+    staked = float(len(ordered))
+    return {
+        "tickets": len(ordered),
+        "wins": wins,
+        "hit_rate": round(wins / len(ordered), 4) if ordered else None,
+        "legs": len(legs),
+        "leg_hit_rate": round(sum(1 for _, h in legs if h) / len(legs), 4) if legs else None,
+        "staked": staked,
+        "profit": round(profit, 2),
+        "roi": round(profit / staked, 4) if staked else None,
+        "max_drawdown": round(max_drawdown(t.profit for t in ordered), 2),
+        "calibration": calibration(legs),
+    }
+
+
+# ---------- runner ----------
+
+def expand_grid(base: EngineParams = DEFAULT_ENGINE_PARAMS, **axes: Sequence[Any]) -> List[EngineParams]:
+    """Kartezijanski proizvod vrednosti po poljima EngineParams (npr. min_score_3=[70, 75, 80])."""
+    if not axes:
+        return [base]
+    names = list(axes)
+    return [replace(base, **dict(zip(names, combo))) for combo in itertools.product(*(axes[n] for n in names))]
+
+
+def run_backtest(
+    archive_dir: str | os.PathLike[str],
+    params_grid: Sequence[EngineParams] = (DEFAULT_ENGINE_PARAMS,),
+    *,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    workers: Optional[int] = None,
+    top_league_ids: Optional[set] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Vraća po jedan izveštaj za svaki EngineParams iz grid-a (sortirano kao grid).
+    `workers=1` radi inline (bez procesa); None = os.cpu_count().
+    """
+    grid = list(params_grid)
+    archive = str(archive_dir)
+    days = list_archive_days(archive, start=start, end=end)
+    per_params: List[List[SettledTicket]] = [[] for _ in grid]
+
+    if workers == 1 or len(days) <= 1:
+        for day in days:
+            for idx, tickets in enumerate(backtest_day(archive, day, grid, top_league_ids)):
+                per_params[idx].extend(tickets)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = pool.map(
+                backtest_day,
+                itertools.repeat(archive),
+                days,
+                itertools.repeat(grid),
+                itertools.repeat(top_league_ids),
+                chunksize=max(1, len(days) // ((workers or os.cpu_count() or 1) * 4)),
+            )
+            for day_result in futures:
+                for idx, tickets in enumerate(day_result):
+                    per_params[idx].extend(tickets)
+
+    reports: List[Dict[str, Any]] = []
+    for params, tickets in zip(grid, per_params):
+        reports.append(
+            {
+                "params": asdict(params),
+                "days": len(days),
+                "overall": summarize_tickets(tickets),
+                "by_type": {
+                    ttype: summarize_tickets([t for t in tickets if t.type == ttype])
+                    for ttype in ("BTTS_YES", "BTTS_NO")
+                },
+            }
+        )
+    return reports
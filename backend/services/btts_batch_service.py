@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from backend.ai_analysis import _clamp_int, _safe_float, _safe_int, build_btts_v1_block
+from backend.services.ai_analysis_cache_service import (
+    DEFAULT_APP_ID,
+    bulk_save_ok,
+    make_cache_key,
+)
+from backend.services.feature_extraction import FeatureSlate
+
+logger = logging.getLogger("naksir.go_premium.btts_batch")
+
+BTTS_PROMPT_VERSION = "btts-v1"
+HIGH_STAKES = {"final", "relegation", "must_win"}
+
+# Tekstovi faktora moraju biti identični onima u compute_btts_yes_probability_v1 (parity).
+F_RECENT_FORM = "Recent form: oba tima često i daju i primaju gol (BTTS trend)."
+F_HOME_ATTACK = "Matchup: jak napad domaćih protiv propusne odbrane gostiju."
+F_AWAY_ATTACK = "Matchup: jak napad gostiju protiv propusne odbrane domaćih."
+F_H2H_YES = "H2H: u poslednjim duelima često oba tima postižu gol."
+F_H2H_NO = "H2H: poslednji dueli naginju ka tome da jedan tim ostane bez gola."
+F_ABSENCES = "Izostanci: ključni defanzivci/golman mogu povećati šansu za gol protivnika."
+F_AWAY_ON_ROAD = "Gosti imaju solidan učinak u postizanju gola na strani."
+F_HOME_AT_HOME = "Domaći imaju solidan učinak u postizanju gola kod kuće."
+F_STAKES = "Ulog meča je visok, što često spušta otvorenost i BTTS tempo."
+F_LEAGUE = "Liga profil: često otvoren ritam i BTTS trend (Bundesliga-like)."
+F_ODDS_NO = "Odds signal: tržište ne favorizuje BTTS YES."
+F_ODDS_YES = "Odds signal: tržište naginje BTTS YES."
+F_ELITE_DEFENSE = "Avoid: bar jedan tim drži visok clean-sheet rate (elite defense profil)."
+F_LOW_SCORING = "Avoid: bar jedan tim ima nizak scoring output (low-scoring profil)."
+
+
+@dataclass(frozen=True)
+class BttsFeatures:
+    """Kompaktan red feature tabele za jedan meč (ulaz za batch BTTS v1 scoring)."""
+
+    fixture_id: int
+    home_btts_rate: Optional[float] = None  # 0-100
+    away_btts_rate: Optional[float] = None
+    home_scored_pg: Optional[float] = None
+    away_scored_pg: Optional[float] = None
+    home_conceded_pg: Optional[float] = None
+    away_conceded_pg: Optional[float] = None
+    home_clean_sheet_rate: Optional[float] = None  # 0-100
+    away_clean_sheet_rate: Optional[float] = None
+    home_scored_home_pg: Optional[float] = None
+    away_scored_away_pg: Optional[float] = None
+    h2h_seen: int = 0  # broj poslednjih (max 3) H2H mečeva sa poznatim rezultatom
+    h2h_btts_hits: int = 0
+    key_def_absent: bool = False
+    high_stakes: bool = False
+    bundesliga_like: bool = False
+    implied_btts_yes_pct: Optional[float] = None  # 0-100
+
+
+def _rate(obj: Any, key: str) -> Optional[float]:
+    if not isinstance(obj, dict):
+        return None
+    return _safe_float(obj.get(key))
+
+
+def btts_features_from_full_match(fixture_id: int, full_match: dict[str, Any]) -> BttsFeatures:
+    """Izvlači feature red iz full_match dict-a sa istim fallback pravilima kao scalar scorer."""
+    stats = full_match.get("statistics") or {}
+    st_home = stats.get("home") if isinstance(stats, dict) else None
+    st_away = stats.get("away") if isinstance(stats, dict) else None
+
+    form = full_match.get("form") or {}
+    f_home = form.get("home") if isinstance(form, dict) else None
+    f_away = form.get("away") if isinstance(form, dict) else None
+
+    h2h = full_match.get("h2h") or {}
+    h2h_list = (
+        h2h.get("matches") if isinstance(h2h, dict) else (h2h if isinstance(h2h, list) else [])
+    )
+    h2h_seen = 0
+    h2h_hits = 0
+    if isinstance(h2h_list, list):
+        for m in h2h_list[:3]:
+            goals = (m.get("goals") or {}) if isinstance(m, dict) else {}
+            gh = _safe_int(goals.get("home"))
+            ga = _safe_int(goals.get("away"))
+            if gh is None or ga is None:
+                continue
+            h2h_seen += 1
+            if gh > 0 and ga > 0:
+                h2h_hits += 1
+
+    absences = full_match.get("absences") or {}
+    importance = full_match.get("importance")
+    league = full_match.get("league") or {}
+    league_name = (league.get("name") or "").lower()
+
+    implied_pct: Optional[float] = None
+    odds = full_match.get("odds") or {}
+    flat_probs = odds.get("flat_probabilities") if isinstance(odds, dict) else None
+    if isinstance(flat_probs, dict):
+        imp = _safe_float(flat_probs.get("btts_yes"))
+        if imp is not None:
+            implied_pct = imp * 100 if imp <= 1.0 else imp
+
+    return BttsFeatures(
+        fixture_id=fixture_id,
+        home_btts_rate=_rate(f_home, "btts_rate"),
+        away_btts_rate=_rate(f_away, "btts_rate"),
+        home_scored_pg=_rate(f_home, "scored_pg") or _rate(st_home, "scored_pg"),
+        away_scored_pg=_rate(f_away, "scored_pg") or _rate(st_away, "scored_pg"),
+        home_conceded_pg=_rate(f_home, "conceded_pg") or _rate(st_home, "conceded_pg"),
+        away_conceded_pg=_rate(f_away, "conceded_pg") or _rate(st_away, "conceded_pg"),
+        home_clean_sheet_rate=_rate(f_home, "clean_sheet_rate") or _rate(st_home, "clean_sheet_rate"),
+        away_clean_sheet_rate=_rate(f_away, "clean_sheet_rate") or _rate(st_away, "clean_sheet_rate"),
+        home_scored_home_pg=_rate(f_home, "scored_home_pg") or _rate(st_home, "scored_home_pg"),
+        away_scored_away_pg=_rate(f_away, "scored_away_pg") or _rate(st_away, "scored_away_pg"),
+        h2h_seen=h2h_seen,
+        h2h_btts_hits=h2h_hits,
+        key_def_absent=absences.get("home_key_def_absent") is True
+        or absences.get("away_key_def_absent") is True,
+        high_stakes=isinstance(importance, str) and importance.lower() in HIGH_STAKES,
+        bundesliga_like="bundesliga" in league_name,
+        implied_btts_yes_pct=implied_pct,
+    )
+
+
+def btts_features_from_fixture(fixture: dict[str, Any], slate: FeatureSlate) -> Optional[BttsFeatures]:
+    """
+    Feature red direktno iz API-Football fixture-a (bez build_full_match):
+    forma/statistika iz FeatureSlate, implied BTTS YES iz decimalne kvote `odds.btts_yes`.
+    """
+    fixture_id = (fixture.get("fixture") or {}).get("id")
+    if not isinstance(fixture_id, int):
+        return None
+    odds = fixture.get("odds") or {}
+    btts_yes_odds = _safe_float(odds.get("btts_yes")) if isinstance(odds, dict) else None
+    implied = {"btts_yes": 1.0 / btts_yes_odds} if btts_yes_odds and btts_yes_odds > 1.0 else {}
+    compact = {
+        **slate.match_sections(fixture),
+        "league": fixture.get("league") or {},
+        "odds": {"flat_probabilities": implied},
+    }
+    return btts_features_from_full_match(fixture_id, compact)
+
+
+class _SlateScore:
+    """Kolone score/factors/avoid za ceo slate; svako pravilo je jedan prolaz preko kolona."""
+
+    def __init__(self, size: int) -> None:
+        self.score = [50.0] * size
+        self.factors: List[List[str]] = [[] for _ in range(size)]
+        self.avoid: List[List[str]] = [[] for _ in range(size)]
+
+    def apply(
+        self,
+        mask: Sequence[bool],
+        delta: float | Sequence[float],
+        *,
+        factor: str | None = None,
+        avoid: str | None = None,
+    ) -> None:
+        deltas = delta if isinstance(delta, (list, tuple)) else None
+        for i, hit in enumerate(mask):
+            if not hit:
+                continue
+            self.score[i] += deltas[i] if deltas is not None else delta  # type: ignore[operator]
+            if factor:
+                self.factors[i].append(factor)
+            if avoid:
+                self.avoid[i].append(avoid)
+
+
+def _ge(col: Sequence[Optional[float]], threshold: float) -> List[bool]:
+    return [v is not None and v >= threshold for v in col]
+
+
+def _lt(col: Sequence[Optional[float]], threshold: float) -> List[bool]:
+    return [v is not None and v < threshold for v in col]
+
+
+def _or0(col: Sequence[Optional[float]]) -> List[float]:
+    return [v or 0 for v in col]
+
+
+def score_btts_slate(features: Sequence[BttsFeatures]) -> Dict[int, Dict[str, Any]]:
+    """
+    Batch BTTS v1 scoring: isti rezultat kao compute_btts_yes_probability_v1 po meču,
+    ali jedan prolaz po pravilu preko cele feature tabele (bez per-fixture dict lookup-a).
+    Vraća fixture_id -> BTTS blok (build_btts_v1_block).
+    """
+    if not features:
+        return {}
+    cols: Dict[str, List[Any]] = {
+        f.name: [getattr(row, f.name) for row in features] for f in fields(BttsFeatures)
+    }
+    out = _SlateScore(len(features))
+
+    # A) Recent BTTS rate
+    both_rates = [
+        h is not None and a is not None for h, a in zip(cols["home_btts_rate"], cols["away_btts_rate"])
+    ]
+    rate_delta = [
+        0.25 * (h + a) if hit else 0.0
+        for hit, h, a in zip(both_rates, cols["home_btts_rate"], cols["away_btts_rate"])
+    ]
+    out.apply(both_rates, rate_delta, factor=F_RECENT_FORM)
+
+    # B) Strong attacks / leaky defenses
+    for key in ("home_scored_pg", "away_scored_pg", "home_conceded_pg", "away_conceded_pg"):
+        out.apply(_ge(cols[key], 1.1), 6)
+    home_scored0 = _or0(cols["home_scored_pg"])
+    away_scored0 = _or0(cols["away_scored_pg"])
+    home_conc0 = _or0(cols["home_conceded_pg"])
+    away_conc0 = _or0(cols["away_conceded_pg"])
+    out.apply([hs >= 1.1 and ac >= 1.1 for hs, ac in zip(home_scored0, away_conc0)], 8, factor=F_HOME_ATTACK)
+    out.apply([as_ >= 1.1 and hc >= 1.1 for as_, hc in zip(away_scored0, home_conc0)], 8, factor=F_AWAY_ATTACK)
+
+    # C) H2H
+    h2h_known = [seen >= 2 for seen in cols["h2h_seen"]]
+    out.apply([k and hits >= 2 for k, hits in zip(h2h_known, cols["h2h_btts_hits"])], 6, factor=F_H2H_YES)
+    out.apply([k and hits == 0 for k, hits in zip(h2h_known, cols["h2h_btts_hits"])], -6, factor=F_H2H_NO)
+
+    # D) Absences, E) home/away scoring, F) stakes, G) league
+    out.apply(cols["key_def_absent"], 7, factor=F_ABSENCES)
+    out.apply(_ge(cols["away_scored_away_pg"], 1.0), 4, factor=F_AWAY_ON_ROAD)
+    out.apply(_ge(cols["home_scored_home_pg"], 1.0), 4, factor=F_HOME_AT_HOME)
+    out.apply(cols["high_stakes"], -8, factor=F_STAKES)
+    out.apply(cols["bundesliga_like"], 4, factor=F_LEAGUE)
+
+    # H) Odds sanity
+    out.apply(_lt(cols["implied_btts_yes_pct"], 50), -5, factor=F_ODDS_NO)
+    out.apply(_ge(cols["implied_btts_yes_pct"], 55), 5, factor=F_ODDS_YES)
+
+    # Avoid: elite defense / low scoring
+    elite = [
+        h or a for h, a in zip(_ge(cols["home_clean_sheet_rate"], 55), _ge(cols["away_clean_sheet_rate"], 55))
+    ]
+    out.apply(elite, -10, factor=F_ELITE_DEFENSE, avoid="ELITE_DEFENSE")
+    low = [h or a for h, a in zip(_lt(cols["home_scored_pg"], 0.9), _lt(cols["away_scored_pg"], 0.9))]
+    out.apply(low, -10, factor=F_LOW_SCORING, avoid="LOW_SCORING_TEAM")
+
+    return {
+        fid: dict(build_btts_v1_block(_clamp_int(score, 5, 95), factors, avoid))
+        for fid, score, factors, avoid in zip(cols["fixture_id"], out.score, out.factors, out.avoid)
+    }
+
+
+def precompute_btts_board(
+    session: Session,
+    features: Sequence[BttsFeatures],
+    *,
+    app_id: str = DEFAULT_APP_ID,
+    locale: str = "en",
+) -> int:
+    """Skoruje ceo slate i upisuje sve BTTS v1 analize u ai_analysis_cache jednim bulk upsert-om."""
+    blocks = score_btts_slate(features)
+    rows = [
+        (
+            make_cache_key(fixture_id=fid, prompt_version=BTTS_PROMPT_VERSION, locale=locale),
+            fid,
+            {"analysis": {"btts": block}, "odds_probabilities": None},
+        )
+        for fid, block in blocks.items()
+    ]
+    written = bulk_save_ok(
+        session,
+        rows,
+        prompt_version=BTTS_PROMPT_VERSION,
+        locale=locale,
+        app_id=app_id,
+    )
+    logger.info("BTTS board precomputed app_id=%s fixtures=%s", app_id, written)
+    return written
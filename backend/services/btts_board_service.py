@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from backend.services.live_bus import BUS
+
+logger = logging.getLogger("naksir.go_premium.btts_board")
+
+BOARD_RESYNC_SECONDS = float(os.getenv("BTTS_BOARD_RESYNC_SECONDS", "15"))
+BOARD_STATES = ("prematch", "live", "finished")
+MAX_BOARDS = 8
+
+ItemBuilder = Callable[[Dict[str, Any], Optional[Dict[str, Any]]], Dict[str, Any]]
+BadgeLoader = Callable[[List[int]], Dict[int, Dict[str, Any]]]
+
+
+LIVE_STATUSES = {"1H", "2H", "HT", "ET", "BT", "P"}
+FINISHED_STATUSES = {"FT", "AET", "PEN"}
+
+
+def state_from_fixture(fx: Dict[str, Any]) -> str:
+    st = ((fx.get("fixture") or {}).get("status") or {})
+    short = (st.get("short") or "").upper()
+    # API-Football status mapping (pragmatično)
+    if short in FINISHED_STATUSES:
+        return "finished"
+    if short in LIVE_STATUSES:
+        return "live"
+    return "prematch"
+
+
+def _fixture_id(fx: Dict[str, Any]) -> Optional[int]:
+    fid = (fx.get("fixture") or {}).get("id")
+    return fid if isinstance(fid, int) else None
+
+
+def fixture_signature(fx: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Polja koja menjaju prikaz item-a: status, minut, rezultat, kickoff i kvote."""
+    fixture = fx.get("fixture") or {}
+    status = fixture.get("status") or {}
+    goals = fx.get("goals") or {}
+    odds = fx.get("odds") if isinstance(fx.get("odds"), dict) else {}
+    return (
+        status.get("short"),
+        status.get("elapsed"),
+        goals.get("home"),
+        goals.get("away"),
+        fixture.get("date"),
+        tuple(sorted((odds or {}).items())),
+    )
+
+
+class DayBoard:
+    """
+    Materijalizovan BTTS board za jedan (app_id, dan): gotovi item-i u kickoff redosledu
+    + indeks po stanju (prematch/live/finished).
+
+    Board ne radi I/O: fixture-e i badge loader dostavlja ruta, pa se ponovo grade
+    samo item-i kojima se promenio status/rezultat ili badge.
+    """
+
+    def __init__(self, app_id: str, day: str, build_item: ItemBuilder) -> None:
+        self.app_id = app_id
+        self.day = day
+        self._build_item = build_item
+        self._lock = threading.Lock()
+        self._items: Dict[int, Dict[str, Any]] = {}
+        self._signatures: Dict[int, Tuple[Any, ...]] = {}
+        self._fixtures: Dict[int, Dict[str, Any]] = {}
+        self._badges: Dict[int, Dict[str, Any]] = {}
+        self._order: List[int] = []
+        self._by_state: Dict[str, List[int]] = {state: [] for state in BOARD_STATES}
+        self._badge_version: Optional[str] = None
+        self.synced_at = 0.0
+        self.rebuilt_items = 0
+
+    def needs_sync(self, badge_version: str, *, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return badge_version != self._badge_version or now - self.synced_at >= BOARD_RESYNC_SECONDS
+
+    def sync(
+        self,
+        fixtures: Iterable[Dict[str, Any]],
+        *,
+        badge_version: str,
+        load_badges: BadgeLoader,
+    ) -> None:
+        """Inkrementalno usklađivanje sa svežim fixture listom i (po potrebi) badge-evima."""
+        fixtures_by_id: Dict[int, Dict[str, Any]] = {}
+        order: List[int] = []
+        for fx in fixtures:
+            fid = _fixture_id(fx)
+            if fid is None or fid in fixtures_by_id:
+                continue
+            fixtures_by_id[fid] = fx
+            order.append(fid)
+
+        with self._lock:
+            if badge_version != self._badge_version:
+                # badge je upisan negde u sistemu -> osveži badge-eve celog slate-a (1 upit)
+                badge_ids = order
+            else:
+                badge_ids = [fid for fid in order if fid not in self._items]
+            fresh_badges = load_badges(badge_ids) if badge_ids else {}
+
+            changed_badges = set()
+            known = set(self._items)
+            for fid in badge_ids:
+                badge = fresh_badges.get(fid)
+                if badge != self._badges.get(fid):
+                    changed_badges.add(fid)
+                    if badge is None:
+                        self._badges.pop(fid, None)
+                    else:
+                        self._badges[fid] = badge
+
+            for fid in list(self._items):
+                if fid not in fixtures_by_id:
+                    self._items.pop(fid, None)
+                    self._fixtures.pop(fid, None)
+                    self._signatures.pop(fid, None)
+                    self._badges.pop(fid, None)
+
+            for fid, fx in fixtures_by_id.items():
+                self._fixtures[fid] = fx
+                sig = fixture_signature(fx)
+                if fid in self._items and self._signatures.get(fid) == sig and fid not in changed_badges:
+                    continue
+                self._items[fid] = self._build_item(fx, self._badges.get(fid))
+                self._signatures[fid] = sig
+                self.rebuilt_items += 1
+
+            self._order = order
+            self._reindex()
+            self._badge_version = badge_version
+            self.synced_at = time.monotonic()
+            # badge upisan u drugom procesu: live feed saznaje tek ovde
+            badge_events = [
+                (fid, self._badges.get(fid), self._league_id(fid))
+                for fid in changed_badges
+                if fid in known and fid in self._items
+            ]
+
+        for fid, badge, league_id in badge_events:
+            self._publish_badge(fid, badge, league_id)
+
+    def _league_id(self, fixture_id: int) -> Optional[int]:
+        return ((self._fixtures.get(fixture_id) or {}).get("league") or {}).get("id")
+
+    def _publish_badge(self, fixture_id: int, badge: Optional[Dict[str, Any]], league_id: Optional[int]) -> None:
+        BUS.publish(
+            "badge",
+            day=self.day,
+            fixture_id=fixture_id,
+            league_id=league_id,
+            data={"app_id": self.app_id, "btts_badge": badge},
+        )
+
+    def apply_badge(self, fixture_id: int, badge: Optional[Dict[str, Any]]) -> bool:
+        """In-process hook: upisan badge za jedan meč -> zameni samo taj item. True ako se promenio."""
+        with self._lock:
+            item = self._items.get(fixture_id)
+            if item is None or self._badges.get(fixture_id) == badge:
+                return False
+            if badge is None:
+                self._badges.pop(fixture_id, None)
+            else:
+                self._badges[fixture_id] = badge
+            self._items[fixture_id] = {**item, "btts_badge": badge}
+            league_id = self._league_id(fixture_id)
+        self._publish_badge(fixture_id, badge, league_id)
+        return True
+
+    def apply_fixture(self, live_fx: Dict[str, Any]) -> bool:
+        """
+        Live delta za jedan meč (poller): status/minut/rezultat iz live payload-a, ostalo
+        (kvote, stats) ostaje iz poslednjeg sync-a. True ako je item zamenjen.
+        """
+        fid = _fixture_id(live_fx)
+        if fid is None:
+            return False
+        with self._lock:
+            if fid not in self._items:
+                return False
+            fx = {**self._fixtures[fid], "fixture": live_fx.get("fixture"), "goals": live_fx.get("goals")}
+            sig = fixture_signature(fx)
+            if self._signatures.get(fid) == sig:
+                return False
+            old_state = (self._items[fid].get("status") or {}).get("state")
+            self._fixtures[fid] = fx
+            self._items[fid] = self._build_item(fx, self._badges.get(fid))
+            self._signatures[fid] = sig
+            self.rebuilt_items += 1
+            if (self._items[fid].get("status") or {}).get("state") != old_state:
+                self._reindex()
+            return True
+
+    def _reindex(self) -> None:
+        by_state: Dict[str, List[int]] = {state: [] for state in BOARD_STATES}
+        for fid in self._order:
+            state = ((self._items[fid].get("status") or {}).get("state")) or "prematch"
+            by_state.setdefault(state, []).append(fid)
+        self._by_state = by_state
+
+    def slice(self, state: str = "all", *, limit: int = 200, include_badge: bool = True) -> List[Dict[str, Any]]:
+        with self._lock:
+            ids = self._order if state == "all" else self._by_state.get(state, [])
+            items = [self._items[fid] for fid in ids[:limit]]
+        if not include_badge:
+            return [{**it, "btts_badge": None} for it in items]
+        return items
+
+
+_BOARDS: Dict[Tuple[str, str], DayBoard] = {}
+_BOARDS_LOCK = threading.Lock()
+
+
+def get_day_board(app_id: str, day: str, build_item: ItemBuilder) -> DayBoard:
+    with _BOARDS_LOCK:
+        board = _BOARDS.get((app_id, day))
+        if board is None:
+            board = DayBoard(app_id, day, build_item)
+            _BOARDS[(app_id, day)] = board
+            # stari dani ispadaju (board drži samo nekoliko poslednjih app/dan kombinacija)
+            while len(_BOARDS) > MAX_BOARDS:
+                oldest = min(_BOARDS, key=lambda key: key[1])
+                _BOARDS.pop(oldest, None)
+        return board
+
+
+def apply_live_fixture(day: str, fx: Dict[str, Any]) -> None:
+    """Propagira live fixture u sve board-ove tog dana (svi app-ovi u procesu)."""
+    with _BOARDS_LOCK:
+        boards = [board for (_, board_day), board in _BOARDS.items() if board_day == day]
+    for board in boards:
+        board.apply_fixture(fx)
+
+
+def apply_btts_badge(app_id: str, fixture_id: int, badge: Optional[Dict[str, Any]]) -> None:
+    """save_ok hook: novi badge odmah ulazi u board-ove app-a (i live feed), bez čekanja resync-a."""
+    with _BOARDS_LOCK:
+        boards = [board for (board_app, _), board in _BOARDS.items() if board_app == app_id]
+    for board in boards:
+        board.apply_badge(fixture_id, badge)
+
+
+def reset_day_boards() -> None:
+    with _BOARDS_LOCK:
+        _BOARDS.clear()
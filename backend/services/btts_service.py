@@ -1,11 +1,17 @@
 from __future__ import annotations
 
 import logging
+from datetime import datetime
 from typing import Any, Dict, List
+from zoneinfo import ZoneInfo
 
 from backend import api_football
 from backend.cache import cache_get, make_cache_key
+from backend.config import TIMEZONE
 from backend.odds_summary import build_odds_summary
+from backend.services.archive_pipeline import stage_prematch
+from backend.services.btts_ticket_builder import request_refresh
+from backend.services.feature_extraction import FeatureSlate
 
 logger = logging.getLogger("naksir.go_premium.btts_service")
 
@@ -36,8 +42,16 @@ def _extract_btts_odds(odds_payload: Dict[str, Any] | None) -> Dict[str, float]
     return out
 
 
-def get_btts_today_fixtures() -> List[Dict[str, Any]]:
+def get_btts_today_fixtures(*, cached_features_only: bool = False) -> List[Dict[str, Any]]:
+    """
+    Današnji slate sa BTTS kvotama i rolling stats-ima.
+
+    Ticket scheduler zove bez argumenata i time greje team feature-e (upstream na promašaju).
+    List rute prosleđuju `cached_features_only=True`: koriste samo keširane feature-e, a za
+    nezagrejane timove bude scheduler umesto da upstream pozive rade unutar zahteva.
+    """
     fixtures = api_football.get_fixtures_today()
+    slate = FeatureSlate(cached_only=cached_features_only)
 
     for fixture in fixtures:
         fixture_id = (fixture.get("fixture") or {}).get("id")
@@ -53,5 +67,16 @@ def get_btts_today_fixtures() -> List[Dict[str, Any]]:
             existing = {}
         merged = {**existing, **odds}
         fixture["odds"] = merged
+        # rolling stats samo za mečeve sa kvotom (ostale ticket engine ionako preskače)
+        if "stats" not in fixture:
+            stats = slate.candidate_stats(fixture)
+            if stats:
+                fixture["stats"] = stats
+
+    if slate.missing:
+        logger.info("btts slate: %s teams without cached features, waking ticket scheduler", len(slate.missing))
+        request_refresh()
 
+    # pre-match kvote/stats za lokalnu arhivu (no-op bez HISTORY_ARCHIVE_DIR)
+    stage_prematch(datetime.now(ZoneInfo(TIMEZONE)).date(), fixtures)
     return fixtures
@@ -0,0 +1,239 @@
+"""
+Precompute `/btts/tickets/today`: endpoint uvek servira gotov, verzionisan artefakt.
+
+- `ensure_tickets`: gradi tikete pod single-flight lock-om (cache inflight), pa istovremeni
+  prvi zahtevi dana čekaju jedan build umesto da svaki pozove fixtures + engine.
+- Fingerprint = BTTS kvote (+ status) i stats ulazi u model verovatnoće kandidata; nova
+  verzija nastaje samo kad se nešto od toga promeni (npr. kad se posle hladnog starta
+  zagreju team feature-i, tiketi građeni na fallback verovatnoćama se pregrađuju).
+- Scheduler thread periodično proverava fingerprint; `notify_fixtures` (odds-change event iz
+  BTTS liste) ga budi odmah kad se kvote pomere.
+- Svaka verzija se čuva (`history`), uz kratak summary po verziji.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from zoneinfo import ZoneInfo
+
+from backend.cache import begin_inflight, cache_get, cache_set, resolve_inflight, wait_for_inflight
+from backend.config import TIMEZONE
+from backend.contracts.btts_ticket import DailyBttsTicketsResponse
+from backend.services.btts_ticket_engine import CANDIDATE_STAT_KEYS, build_daily_btts_tickets
+
+logger = logging.getLogger("naksir.go_premium.btts_ticket_builder")
+
+TICKETS_TTL_SECONDS = 2 * 24 * 3600
+REFRESH_SECONDS = float(os.getenv("BTTS_TICKETS_REFRESH_SECONDS", "300"))
+MAX_HISTORY = 50
+
+FixturesLoader = Callable[[], List[Dict[str, Any]]]
+
+
+class TicketsUnavailable(RuntimeError):
+    """Cold start: build drži drugi worker (ili je pao), a artefakta za dan još nema."""
+
+
+_scheduler_wakeup = threading.Event()
+_SCHEDULER_LOCK = threading.Lock()
+_SCHEDULER_STARTED = False
+
+
+def _current_key(day: date) -> str:
+    return f"btts:tickets:{day.isoformat()}:current"
+
+
+def _version_key(day: date, version: int) -> str:
+    return f"btts:tickets:{day.isoformat()}:v{version}"
+
+
+def _history_key(day: date) -> str:
+    return f"btts:tickets:{day.isoformat()}:history"
+
+
+def _build_key(day: date) -> str:
+    return f"btts:tickets:{day.isoformat()}:build"
+
+
+def _stats_digest(stats: Any) -> str:
+    stats = stats if isinstance(stats, dict) else {}
+    values = []
+    for key in CANDIDATE_STAT_KEYS:
+        value = stats.get(key)
+        values.append(f"{value:.3f}" if isinstance(value, (int, float)) else "-")
+    return ",".join(values)
+
+
+def inputs_fingerprint(fixtures: Iterable[Dict[str, Any]]) -> str:
+    """Stabilan hash svega što engine rangira: btts_yes/btts_no kvote, status i stats kandidata."""
+    parts: List[str] = []
+    for fx in fixtures:
+        fid = (fx.get("fixture") or {}).get("id")
+        odds = fx.get("odds") if isinstance(fx.get("odds"), dict) else {}
+        if not isinstance(fid, int) or not odds:
+            continue
+        status = ((fx.get("fixture") or {}).get("status") or {}).get("short")
+        stats = _stats_digest(fx.get("stats"))
+        parts.append(f"{fid}:{odds.get('btts_yes')}:{odds.get('btts_no')}:{status}:{stats}")
+    return hashlib.sha1("|".join(sorted(parts)).encode()).hexdigest()[:16]
+
+
+def get_current(day: date) -> Optional[Dict[str, Any]]:
+    """Trenutni artefakt: {version, fingerprint, built_at, response}."""
+    cached = cache_get(_current_key(day))
+    return cached if isinstance(cached, dict) and isinstance(cached.get("response"), dict) else None
+
+
+def get_version(day: date, version: int) -> Optional[Dict[str, Any]]:
+    cached = cache_get(_version_key(day, version))
+    return cached if isinstance(cached, dict) and isinstance(cached.get("response"), dict) else None
+
+
+def get_history(day: date) -> List[Dict[str, Any]]:
+    cached = cache_get(_history_key(day))
+    versions = cached.get("versions") if isinstance(cached, dict) else None
+    return list(versions) if isinstance(versions, list) else []
+
+
+def _summary(artifact: Dict[str, Any]) -> Dict[str, Any]:
+    response = artifact["response"]
+
+    def _ticket(key: str) -> Dict[str, Any]:
+        ticket = response.get(key) or {}
+        return {
+            "ticket_id": ticket.get("ticket_id"),
+            "total_odds": ticket.get("total_odds"),
+            "fixture_ids": [m.get("fixture_id") for m in ticket.get("matches") or []],
+        }
+
+    return {
+        "version": artifact["version"],
+        "fingerprint": artifact["fingerprint"],
+        "built_at": artifact["built_at"],
+        "yes_ticket": _ticket("yes_ticket"),
+        "no_ticket": _ticket("no_ticket"),
+    }
+
+
+def rebuild_if_changed(
+    day: date,
+    fixtures: List[Dict[str, Any]],
+    *,
+    top_league_ids: Optional[Set[int]] = None,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """Gradi novu verziju samo ako se fingerprint promenio (ili force); vraća aktuelni artefakt."""
+    fingerprint = inputs_fingerprint(fixtures)
+    current = get_current(day)
+    if current and current.get("fingerprint") == fingerprint and not force:
+        return current
+
+    result = build_daily_btts_tickets(today=day, fixtures=fixtures, top_league_ids=top_league_ids)
+    version = int(current["version"]) + 1 if current else 1
+    result.version = version
+    artifact = {
+        "version": version,
+        "fingerprint": fingerprint,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "response": result.model_dump(mode="json"),
+    }
+    cache_set(_version_key(day, version), artifact, TICKETS_TTL_SECONDS)
+    history = (get_history(day) + [_summary(artifact)])[-MAX_HISTORY:]
+    cache_set(_history_key(day), {"versions": history}, TICKETS_TTL_SECONDS)
+    cache_set(_current_key(day), artifact, TICKETS_TTL_SECONDS)
+    logger.info("btts tickets %s: built v%s (fingerprint %s)", day.isoformat(), version, fingerprint)
+    return artifact
+
+
+def refresh(
+    day: date,
+    load_fixtures: FixturesLoader,
+    *,
+    top_league_ids: Optional[Set[int]] = None,
+    force: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """
+    Single-flight rebuild: samo jedan proces/thread po danu gradi; ostali čekaju
+    i vraćaju artefakt koji je on upisao.
+    """
+    handle, is_leader = begin_inflight(_build_key(day))
+    if not is_leader:
+        wait_for_inflight(handle)
+        return get_current(day)
+    try:
+        artifact = rebuild_if_changed(day, load_fixtures(), top_league_ids=top_league_ids, force=force)
+    except Exception as exc:
+        resolve_inflight(handle, error=exc)
+        raise
+    resolve_inflight(handle, value=artifact)
+    return artifact
+
+
+def ensure_tickets(
+    day: date,
+    load_fixtures: FixturesLoader,
+    *,
+    top_league_ids: Optional[Set[int]] = None,
+) -> DailyBttsTicketsResponse:
+    """
+    Endpoint put: gotov artefakt; build samo kad ga još nema (cold start dana).
+
+    Ako lider build-a ne upiše artefakt pre isteka čekanja (ili je pao), diže
+    `TicketsUnavailable` umesto build-a bez lock-a – to bi vratilo stampede koji single-flight
+    sprečava.
+    """
+    artifact = get_current(day) or refresh(day, load_fixtures, top_league_ids=top_league_ids)
+    if artifact is None:
+        raise TicketsUnavailable(f"btts tickets for {day.isoformat()} are still being built")
+    return DailyBttsTicketsResponse.model_validate(artifact["response"])
+
+
+def notify_fixtures(day: date, fixtures: List[Dict[str, Any]]) -> None:
+    """Odds/stats-change event: ako se fingerprint razlikuje od artefakta, probudi scheduler."""
+    current = get_current(day)
+    if current is not None and current.get("fingerprint") != inputs_fingerprint(fixtures):
+        _scheduler_wakeup.set()
+
+
+def request_refresh() -> None:
+    """Probudi scheduler pre intervala (npr. slate ima nezagrejane team feature-e)."""
+    _scheduler_wakeup.set()
+
+
+def today_local() -> date:
+    return datetime.now(ZoneInfo(TIMEZONE)).date()
+
+
+def start_ticket_scheduler(
+    load_fixtures: FixturesLoader,
+    *,
+    top_league_ids: Optional[Set[int]] = None,
+    interval_seconds: float = REFRESH_SECONDS,
+) -> None:
+    """Pokreće (jednom po procesu) daemon thread koji drži današnje tikete ažurnim."""
+    global _SCHEDULER_STARTED
+    if interval_seconds <= 0:
+        return
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER_STARTED:
+            return
+        _SCHEDULER_STARTED = True
+
+    def _loop() -> None:
+        while True:
+            try:
+                refresh(today_local(), load_fixtures, top_league_ids=top_league_ids)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("btts tickets scheduler failed: %s", exc)
+            _scheduler_wakeup.wait(interval_seconds)
+            _scheduler_wakeup.clear()
+            # kratko debounce-ovanje da se niz promena kvota spoji u jedan rebuild
+            time.sleep(1.0)
+
+    threading.Thread(target=_loop, name="btts-ticket-scheduler", daemon=True).start()
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import heapq
 from dataclasses import dataclass
-from datetime import date, datetime, timezone
+from datetime import date, datetime, timedelta, timezone
 from math import prod
 from typing import Any, Dict, List, Literal, Optional, Tuple
 
@@ -42,6 +43,17 @@ class Candidate:
     is_live: bool = False
 
 
+# Candidate stats polja (fixture["stats"]) na kojima se boduje score -> probability
+CANDIDATE_STAT_KEYS = (
+    "home_scored_avg_5",
+    "away_scored_avg_5",
+    "home_conceded_avg_5",
+    "away_conceded_avg_5",
+    "both_btts_rate_10",
+    "under_tendency",
+)
+
+
 def clamp(x: float, lo: float, hi: float) -> float:
     return max(lo, min(hi, x))
 
@@ -56,107 +68,307 @@ def _round2(x: float) -> float:
 
 # ---------- Scoring (MVP heuristics) ----------
 
-def score_yes(c: Candidate) -> int:
+# Poeni po pravilu; backtest (btts_backtest_service) ih varira preko EngineParams.
+YES_WEIGHTS: Dict[str, int] = {
+    "home_scored": 15,
+    "away_scored": 15,
+    "home_conceded": 10,
+    "away_conceded": 10,
+    "btts_rate": 15,
+    "top_league": 10,
+    "under_penalty": -10,
+}
+NO_WEIGHTS: Dict[str, int] = {
+    "home_scored": 15,
+    "away_scored": 15,
+    "home_conceded": 10,
+    "away_conceded": 10,
+    "under_tendency": 15,
+    "top_league": 10,
+    "btts_penalty": -20,
+}
+
+
+def score_yes(c: Candidate, weights: Optional[Dict[str, int]] = None) -> int:
+    w = weights or YES_WEIGHTS
     s = 0
 
     # goals scored last5
     if c.home_scored_avg_5 is not None and c.home_scored_avg_5 >= 1.2:
-        s += 15
+        s += w["home_scored"]
     if c.away_scored_avg_5 is not None and c.away_scored_avg_5 >= 1.2:
-        s += 15
+        s += w["away_scored"]
 
     # goals conceded last5
     if c.home_conceded_avg_5 is not None and c.home_conceded_avg_5 >= 1.0:
-        s += 10
+        s += w["home_conceded"]
     if c.away_conceded_avg_5 is not None and c.away_conceded_avg_5 >= 1.0:
-        s += 10
+        s += w["away_conceded"]
 
     # btts rate last10 (optional)
     if c.both_btts_rate_10 is not None and c.both_btts_rate_10 >= 0.55:
-        s += 15
+        s += w["btts_rate"]
 
     if c.is_top_league:
-        s += 10
+        s += w["top_league"]
 
     # mild penalty if clearly under-ish profile
     if c.under_tendency is not None and c.under_tendency >= 0.65:
-        s -= 10
+        s += w["under_penalty"]
 
     # keep within 0..100
     return max(0, min(100, s))
 
 
-def score_no(c: Candidate) -> int:
+def score_no(c: Candidate, weights: Optional[Dict[str, int]] = None) -> int:
+    w = weights or NO_WEIGHTS
     s = 0
 
     # low scored last5
     if c.home_scored_avg_5 is not None and c.home_scored_avg_5 < 1.0:
-        s += 15
+        s += w["home_scored"]
     if c.away_scored_avg_5 is not None and c.away_scored_avg_5 < 1.0:
-        s += 15
+        s += w["away_scored"]
 
     # low conceded last5 (tight defense)
     if c.home_conceded_avg_5 is not None and c.home_conceded_avg_5 < 1.0:
-        s += 10
+        s += w["home_conceded"]
     if c.away_conceded_avg_5 is not None and c.away_conceded_avg_5 < 1.0:
-        s += 10
+        s += w["away_conceded"]
 
     # under tendency
     if c.under_tendency is not None and c.under_tendency >= 0.60:
-        s += 15
+        s += w["under_tendency"]
 
     if c.is_top_league:
-        s += 10
+        s += w["top_league"]
 
     # penalty if BTTS rate is high
     if c.both_btts_rate_10 is not None and c.both_btts_rate_10 >= 0.60:
-        s -= 20
+        s += w["btts_penalty"]
 
     return max(0, min(100, s))
 
 
-# ---------- Selection (2 or 3, aggressive with guardrails) ----------
+@dataclass(frozen=True)
+class EngineParams:
+    """Podesivi pragovi engine-a; default = produkcione vrednosti."""
+
+    min_score_2: int = 70
+    min_score_3: int = 75
+    odds_range_for_3: Tuple[float, float] = (2.20, 3.70)
+    odds_band: Tuple[float, float] = (1.30, 1.55)
+    yes_weights: Optional[Dict[str, int]] = None
+    no_weights: Optional[Dict[str, int]] = None
+
+
+DEFAULT_ENGINE_PARAMS = EngineParams()
+
+
+# ---------- Selection (2 or 3, branch & bound) ----------
+
+DEFAULT_MAX_KICKOFF_SPREAD = timedelta(hours=12)
+DEFAULT_TOP_K = 3
+# tiket uzima max 1 meč po ligi: pretraga vidi samo najboljih N (po leg vrednosti) iz svake lige.
+# Bez toga, kad izvodljivih tiketa ima manje od top_k (malo liga, kickoff/odds prozor), granica
+# ne seče ništa i DFS prolazi sve kombinacije (500 kandidata u 2-3 lige ~ sekunde).
+DEFAULT_MAX_PER_LEAGUE = 8
+Scored = Tuple[Candidate, int]
+
+
+@dataclass(frozen=True)
+class TicketConstraints:
+    legs: int
+    min_score: int
+    odds_range: Tuple[float, float] = (1.0, float("inf"))
+    max_kickoff_spread: Optional[timedelta] = DEFAULT_MAX_KICKOFF_SPREAD
+
+
+@dataclass(frozen=True)
+class RankedTicket:
+    picks: Tuple[Scored, ...]
+    expected_value: float  # prod(p_i * odds_i): očekivani povrat po uloženoj jedinici
+    total_odds: float
+
+
+def leg_value(c: Candidate, score: int) -> float:
+    return score_to_probability(score) * c.odds
+
+
+def _league_key(c: Candidate) -> Any:
+    return c.league_id or f"no_league:{c.league_name}"
+
+
+def solve_tickets(
+    candidates: List[Scored],
+    constraints: TicketConstraints,
+    *,
+    top_k: int = DEFAULT_TOP_K,
+    max_per_league: int = DEFAULT_MAX_PER_LEAGUE,
+) -> List[RankedTicket]:
+    """
+    Top-K tiketa sa tačno `constraints.legs` mečeva po EV = prod(p_i * odds_i).
+
+    Iz svake lige ulazi samo `max_per_league` kandidata sa najvećom leg vrednošću; tiket iz
+    slabijeg meča lige bira se samo ako svih N boljih pada na odds/kickoff prozoru.
+
+    Branch & bound nad kandidatima sortiranim po score-u:
+      - max 1 meč po ligi, total odds u `odds_range`, kickoff raspon <= `max_kickoff_spread`
+      - gornja granica grane = trenutni EV * najveće preostale leg vrednosti iz sufiksa (po jedna
+        po ligi); čim padne ispod K-tog najboljeg tiketa, ili sufiks nema dovoljno različitih
+        liga, ostatak sufiksa se odseca (granica je monotona)
+      - odds prozor se odseca preko min/max kvote u sufiksu
+    """
+    legs = constraints.legs
+    lo, hi = constraints.odds_range
+    spread = constraints.max_kickoff_spread
+    per_league: Dict[Any, List[Scored]] = {}
+    for c, sc in candidates:
+        if sc >= constraints.min_score:
+            per_league.setdefault(_league_key(c), []).append((c, sc))
+    pool = sorted(
+        (
+            x
+            for group in per_league.values()
+            for x in heapq.nlargest(max_per_league, group, key=lambda g: (leg_value(*g), -g[0].fixture_id))
+        ),
+        key=lambda x: (-x[1], -x[0].odds, x[0].fixture_id),
+    )
+    n = len(pool)
+    if legs <= 0 or n < legs or top_k <= 0:
+        return []
+
+    values = [leg_value(c, sc) for c, sc in pool]
+    odds = [c.odds for c, _ in pool]
+    leagues = [_league_key(c) for c, _ in pool]
+    kickoffs = [c.kickoff_utc for c, _ in pool]
+
+    # suffix_best[i][r-1] = proizvod r najvećih leg vrednosti u pool[i:], najviše jedna po ligi
+    # (tiket uzima max 1 meč po ligi); 0.0 = u sufiksu nema r različitih liga
+    suffix_best: List[List[float]] = [[0.0] * legs for _ in range(n + 1)]
+    suffix_min_odds = [float("inf")] * (n + 1)
+    suffix_max_odds = [0.0] * (n + 1)
+    league_best: Dict[Any, float] = {}
+    for i in range(n - 1, -1, -1):
+        if values[i] > league_best.get(leagues[i], 0.0):
+            league_best[leagues[i]] = values[i]
+        top = heapq.nlargest(legs, league_best.values())
+        acc = 1.0
+        for r in range(legs):
+            acc = acc * top[r] if r < len(top) else 0.0
+            suffix_best[i][r] = acc
+        suffix_min_odds[i] = min(odds[i], suffix_min_odds[i + 1])
+        suffix_max_odds[i] = max(odds[i], suffix_max_odds[i + 1])
+
+    heap: List[Tuple[float, Tuple[int, ...], Tuple[int, ...]]] = []
+
+    def threshold() -> float:
+        return heap[0][0] if len(heap) >= top_k else -1.0
+
+    def dfs(
+        start: int,
+        chosen: Tuple[int, ...],
+        ev: float,
+        total: float,
+        used: frozenset,
+        first: Optional[datetime],
+        last: Optional[datetime],
+    ) -> None:
+        remaining = legs - len(chosen)
+        if remaining == 0:
+            if total < lo:
+                return
+            entry = (ev, tuple(-i for i in chosen), chosen)
+            if len(heap) < top_k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+            return
+        for j in range(start, n - remaining + 1):
+            bound = suffix_best[j][remaining - 1]
+            if bound == 0.0 or ev * bound <= threshold():
+                break
+            if total * suffix_min_odds[j] ** remaining > hi:
+                break
+            if total * suffix_max_odds[j] ** remaining < lo:
+                break
+            if leagues[j] in used:
+                continue
+            new_total = total * odds[j]
+            if new_total > hi:
+                continue
+            k = kickoffs[j]
+            new_first = k if first is None or k < first else first
+            new_last = k if last is None or k > last else last
+            if spread is not None and new_last - new_first > spread:
+                continue
+            dfs(j + 1, chosen + (j,), ev * values[j], new_total, used | {leagues[j]}, new_first, new_last)
+
+    dfs(0, (), 1.0, 1.0, frozenset(), None, None)
+
+    ranked = sorted(heap, reverse=True)
+    return [
+        RankedTicket(
+            picks=tuple(pool[i] for i in idx),
+            expected_value=ev,
+            total_odds=prod(odds[i] for i in idx),
+        )
+        for ev, _, idx in ranked
+    ]
+
+
+def select_ranked_tickets(
+    candidates: List[Scored],
+    *,
+    min_score_2: int = 70,
+    min_score_3: int = 75,
+    odds_range_for_3: Tuple[float, float] = (2.20, 3.70),
+    max_kickoff_spread: Optional[timedelta] = DEFAULT_MAX_KICKOFF_SPREAD,
+    top_k: int = DEFAULT_TOP_K,
+) -> List[RankedTicket]:
+    """
+    Rangirani tiketi: najbolji 3-leg tiketi (score >= min_score_3, total odds u prozoru),
+    dopunjeni 2-leg tiketima (score >= min_score_2) kad 3-leg kombinacija ima manje od top_k.
+    """
+    ranked = solve_tickets(
+        candidates,
+        TicketConstraints(3, min_score_3, odds_range_for_3, max_kickoff_spread),
+        top_k=top_k,
+    )
+    if len(ranked) < top_k:
+        ranked += solve_tickets(
+            candidates,
+            TicketConstraints(2, min_score_2, max_kickoff_spread=max_kickoff_spread),
+            top_k=top_k - len(ranked),
+        )
+    return ranked
+
 
 def select_2_or_3(
-    candidates: List[Tuple[Candidate, int]],
+    candidates: List[Scored],
     *,
     min_score_2: int = 70,
     min_score_3: int = 75,
     odds_range_for_3: Tuple[float, float] = (2.20, 3.70),
-) -> List[Tuple[Candidate, int]]:
+    max_kickoff_spread: Optional[timedelta] = DEFAULT_MAX_KICKOFF_SPREAD,
+) -> List[Scored]:
     """
-    candidates: list of (Candidate, score) sorted desc
+    candidates: list of (Candidate, score)
     Constraints:
       - max 1 match per league in the final ticket
-      - try 3 only if top3 >= min_score_3 and total_odds in range
-      - else fallback to 2 with >= min_score_2
+      - 3 legs (all >= min_score_3) with total_odds in range, max EV
+      - else fallback to 2 legs with >= min_score_2, max EV
+      - kickoff spread <= max_kickoff_spread
     """
-    # Helper: pick with league diversification
-    def pick_n(n: int, threshold: int) -> List[Tuple[Candidate, int]]:
-        picked: List[Tuple[Candidate, int]] = []
-        used_leagues: set = set()
-        for c, sc in candidates:
-            if sc < threshold:
-                continue
-            lid = c.league_id or f"no_league:{c.league_name}"
-            if lid in used_leagues:
-                continue
-            used_leagues.add(lid)
-            picked.append((c, sc))
-            if len(picked) == n:
-                break
-        return picked
-
-    # Try 3
-    top3 = pick_n(3, min_score_3)
-    if len(top3) == 3:
-        total = prod([x[0].odds for x in top3])
-        if odds_range_for_3[0] <= total <= odds_range_for_3[1]:
-            return top3
-
-    # Fallback to 2
-    top2 = pick_n(2, min_score_2)
-    return top2
+    ranked = select_ranked_tickets(
+        candidates,
+        min_score_2=min_score_2,
+        min_score_3=min_score_3,
+        odds_range_for_3=odds_range_for_3,
+        max_kickoff_spread=max_kickoff_spread,
+        top_k=1,
+    )
+    return list(ranked[0].picks) if ranked else []
 
 
 # ---------- Candidate extraction (plug into your existing data) ----------
@@ -166,6 +378,7 @@ def build_daily_btts_tickets(
     today: date,
     fixtures: List[Dict[str, Any]],
     top_league_ids: Optional[set] = None,
+    params: EngineParams = DEFAULT_ENGINE_PARAMS,
 ) -> DailyBttsTicketsResponse:
     """
     fixtures: should already be TODAY-only fixtures, ideally enriched with odds + logos.
@@ -173,23 +386,51 @@ def build_daily_btts_tickets(
     """
     top_league_ids = top_league_ids or set()
 
-    yes_candidates = extract_candidates_from_fixtures(fixtures, "BTTS_YES", top_league_ids)
-    no_candidates = extract_candidates_from_fixtures(fixtures, "BTTS_NO", top_league_ids)
+    yes_candidates = extract_candidates_from_fixtures(fixtures, "BTTS_YES", top_league_ids, odds_band=params.odds_band)
+    no_candidates = extract_candidates_from_fixtures(fixtures, "BTTS_NO", top_league_ids, odds_band=params.odds_band)
 
-    yes_scored = sorted([(c, score_yes(c)) for c in yes_candidates], key=lambda x: x[1], reverse=True)
-    no_scored = sorted([(c, score_no(c)) for c in no_candidates], key=lambda x: x[1], reverse=True)
+    yes_scored = sorted(
+        [(c, score_yes(c, params.yes_weights)) for c in yes_candidates], key=lambda x: x[1], reverse=True
+    )
+    no_scored = sorted(
+        [(c, score_no(c, params.no_weights)) for c in no_candidates], key=lambda x: x[1], reverse=True
+    )
 
-    yes_selected = select_2_or_3(yes_scored)
-    no_selected = select_2_or_3(no_scored)
+    selection = {
+        "min_score_2": params.min_score_2,
+        "min_score_3": params.min_score_3,
+        "odds_range_for_3": params.odds_range_for_3,
+    }
+    yes_ranked = select_ranked_tickets(yes_scored, **selection)
+    no_ranked = select_ranked_tickets(no_scored, **selection)
+
+    return DailyBttsTicketsResponse(
+        date=today,
+        yes_ticket=build_ranked_ticket(today, "BTTS_YES", yes_ranked[0] if yes_ranked else None),
+        no_ticket=build_ranked_ticket(today, "BTTS_NO", no_ranked[0] if no_ranked else None),
+        yes_alternatives=[
+            build_ranked_ticket(today, "BTTS_YES", t, rank=i) for i, t in enumerate(yes_ranked[1:], start=2)
+        ],
+        no_alternatives=[
+            build_ranked_ticket(today, "BTTS_NO", t, rank=i) for i, t in enumerate(no_ranked[1:], start=2)
+        ],
+    )
 
-    yes_ticket = build_ticket(today, "BTTS_YES", yes_selected)
-    no_ticket = build_ticket(today, "BTTS_NO", no_selected)
 
-    return DailyBttsTicketsResponse(date=today, yes_ticket=yes_ticket, no_ticket=no_ticket)
+def build_ranked_ticket(
+    today: date, ttype: TicketType, ranked: Optional[RankedTicket], *, rank: int = 1
+) -> BttsTicket:
+    if ranked is None:
+        return build_ticket(today, ttype, [], rank=rank)
+    ticket = build_ticket(today, ttype, list(ranked.picks), rank=rank)
+    ticket.expected_value = _round2(ranked.expected_value)
+    return ticket
 
 
-def build_ticket(today: date, ttype: TicketType, selected: List[Tuple[Candidate, int]]) -> BttsTicket:
-    ticket_id = f"{ttype.replace('_', '')}-{today.strftime('%Y%m%d')}-01"
+def build_ticket(
+    today: date, ttype: TicketType, selected: List[Tuple[Candidate, int]], *, rank: int = 1
+) -> BttsTicket:
+    ticket_id = f"{ttype.replace('_', '')}-{today.strftime('%Y%m%d')}-{rank:02d}"
 
     picks: List[BttsMatchPick] = []
     for c, sc in selected:
@@ -225,6 +466,8 @@ def extract_candidates_from_fixtures(
     fixtures: List[Dict[str, Any]],
     ttype: TicketType,
     top_league_ids: set,
+    *,
+    odds_band: Tuple[float, float] = (1.30, 1.55),
 ) -> List[Candidate]:
     """
     IMPORTANT: Adapt this function to your real fixture schema.
@@ -267,7 +510,7 @@ def extract_candidates_from_fixtures(
 
             odds = float(odds)
             # hard odds range
-            if not (1.30 <= odds <= 1.55):
+            if not (odds_band[0] <= odds <= odds_band[1]):
                 continue
 
             # optional stats (if present)
@@ -287,12 +530,7 @@ def extract_candidates_from_fixtures(
                     away_name=str(away.get("name") or "Away"),
                     away_logo=away.get("logo"),
                     odds=odds,
-                    home_scored_avg_5=stats.get("home_scored_avg_5"),
-                    away_scored_avg_5=stats.get("away_scored_avg_5"),
-                    home_conceded_avg_5=stats.get("home_conceded_avg_5"),
-                    away_conceded_avg_5=stats.get("away_conceded_avg_5"),
-                    both_btts_rate_10=stats.get("both_btts_rate_10"),
-                    under_tendency=stats.get("under_tendency"),
+                    **{key: stats.get(key) for key in CANDIDATE_STAT_KEYS},
                     is_top_league=is_top,
                     is_live=False,
                 )
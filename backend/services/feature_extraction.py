@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from backend import api_football
+from backend.cache import cache_get, cache_set, make_cache_key
+from backend.config import TIMEZONE
+from backend.services import archive_pipeline, history_archive
+
+logger = logging.getLogger("naksir.go_premium.feature_extraction")
+
+TEAM_FEATURES_TTL_SECONDS = 6 * 60 * 60
+# prazan/neuspeo rezultat (nema istorije, greška, otvoren circuit) se kešira kratko,
+# da isti tim ne okida upstream pri svakom slate-u
+TEAM_FEATURES_EMPTY_TTL_SECONDS = int(os.getenv("TEAM_FEATURES_EMPTY_TTL_SECONDS", "600"))
+FORM_WINDOW = 10
+SHORT_WINDOW = 5
+FINISHED_STATUSES = {"FT", "AET", "PEN"}
+
+
+@dataclass(frozen=True)
+class TeamFeatures:
+    """
+    Rolling feature-i jednog tima (poslednjih N odigranih + teams/statistics za sezonu).
+
+    Stope su u procentima (0-100) kao što očekuje compute_btts_yes_probability_v1,
+    osim *_10 / under_rate_10 koji su 0..1 kao u btts_ticket_engine.Candidate.
+    """
+
+    team_id: int
+    season: Optional[int]
+    matches: int = 0
+    scored_pg: Optional[float] = None
+    conceded_pg: Optional[float] = None
+    btts_rate: Optional[float] = None
+    clean_sheet_rate: Optional[float] = None
+    scored_home_pg: Optional[float] = None
+    scored_away_pg: Optional[float] = None
+    scored_avg_5: Optional[float] = None
+    conceded_avg_5: Optional[float] = None
+    btts_rate_10: Optional[float] = None
+    under_rate_10: Optional[float] = None
+    # sezonski agregati iz /teams/statistics
+    season_scored_pg: Optional[float] = None
+    season_conceded_pg: Optional[float] = None
+    season_scored_home_pg: Optional[float] = None
+    season_scored_away_pg: Optional[float] = None
+    season_clean_sheet_rate: Optional[float] = None
+
+
+def _avg(values: List[float]) -> Optional[float]:
+    if not values:
+        return None
+    return round(sum(values) / len(values), 3)
+
+
+def _pct(hits: int, total: int) -> Optional[float]:
+    if total <= 0:
+        return None
+    return round(100.0 * hits / total, 1)
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        if value is None:
+            return None
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _team_results(team_id: int, fixtures: List[Dict[str, Any]]) -> List[Tuple[int, int, bool]]:
+    """(scored, conceded, is_home) za završene mečeve, najnoviji prvi."""
+    rows: List[Tuple[str, int, int, bool]] = []
+    for fx in fixtures:
+        info = fx.get("fixture") or {}
+        status = ((info.get("status") or {}).get("short") or "").upper()
+        if status not in FINISHED_STATUSES:
+            continue
+        teams = fx.get("teams") or {}
+        goals = fx.get("goals") or {}
+        gh, ga = goals.get("home"), goals.get("away")
+        if not isinstance(gh, int) or not isinstance(ga, int):
+            continue
+        is_home = (teams.get("home") or {}).get("id") == team_id
+        if not is_home and (teams.get("away") or {}).get("id") != team_id:
+            continue
+        scored, conceded = (gh, ga) if is_home else (ga, gh)
+        rows.append((info.get("date") or "", scored, conceded, is_home))
+    rows.sort(key=lambda r: r[0], reverse=True)
+    return [(scored, conceded, is_home) for _, scored, conceded, is_home in rows]
+
+
+def compute_team_features(
+    team_id: int,
+    season: Optional[int],
+    last_fixtures: List[Dict[str, Any]],
+    team_statistics: Optional[Dict[str, Any]] = None,
+) -> TeamFeatures:
+    """Čista funkcija: raw API-Football payload -> TeamFeatures (bez I/O)."""
+    results = _team_results(team_id, last_fixtures)[:FORM_WINDOW]
+    short = results[:SHORT_WINDOW]
+    scored = [float(s) for s, _, _ in results]
+    conceded = [float(c) for _, c, _ in results]
+
+    season_values: Dict[str, Optional[float]] = {}
+    if isinstance(team_statistics, dict):
+        goals = team_statistics.get("goals") or {}
+        avg_for = (goals.get("for") or {}).get("average") or {}
+        avg_against = (goals.get("against") or {}).get("average") or {}
+        played = _to_float(((team_statistics.get("fixtures") or {}).get("played") or {}).get("total"))
+        clean = _to_float((team_statistics.get("clean_sheet") or {}).get("total"))
+        season_values = {
+            "season_scored_pg": _to_float(avg_for.get("total")),
+            "season_conceded_pg": _to_float(avg_against.get("total")),
+            "season_scored_home_pg": _to_float(avg_for.get("home")),
+            "season_scored_away_pg": _to_float(avg_for.get("away")),
+            "season_clean_sheet_rate": _pct(int(clean), int(played)) if clean is not None and played else None,
+        }
+
+    return TeamFeatures(
+        team_id=team_id,
+        season=season,
+        matches=len(results),
+        scored_pg=_avg(scored),
+        conceded_pg=_avg(conceded),
+        btts_rate=_pct(sum(1 for s, c, _ in results if s > 0 and c > 0), len(results)),
+        clean_sheet_rate=_pct(sum(1 for _, c, _ in results if c == 0), len(results)),
+        scored_home_pg=_avg([float(s) for s, _, home in results if home]),
+        scored_away_pg=_avg([float(s) for s, _, home in results if not home]),
+        scored_avg_5=_avg([float(s) for s, _, _ in short]),
+        conceded_avg_5=_avg([float(c) for _, c, _ in short]),
+        btts_rate_10=(
+            round(sum(1 for s, c, _ in results if s > 0 and c > 0) / len(results), 3) if results else None
+        ),
+        under_rate_10=round(sum(1 for s, c, _ in results if s + c <= 2) / len(results), 3) if results else None,
+        **season_values,
+    )
+
+
+def _team_features_cache_key(team_id: int, season: Optional[int], league_id: Optional[int]) -> str:
+    return make_cache_key("team_features", {"team": team_id, "season": season, "league": league_id})
+
+
+def _archived_last_fixtures(team_id: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Forma iz lokalne arhive kad je ažurna (arhiviran i jučerašnji dan) i ima pun prozor;
+    inače None -> API-Football.
+    """
+    archive_dir = archive_pipeline.ARCHIVE_DIR
+    if not archive_dir:
+        return None
+    try:
+        index = history_archive.ArchiveIndex.load(archive_dir)
+        latest = index.latest_day()
+        if latest is None or latest < datetime.now(ZoneInfo(TIMEZONE)).date() - timedelta(days=1):
+            return None
+        fixtures = history_archive.team_last_fixtures(archive_dir, team_id, last=FORM_WINDOW)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("feature_extraction: archive read failed team=%s: %s", team_id, exc)
+        return None
+    return fixtures if len(fixtures) >= FORM_WINDOW else None
+
+
+def cached_team_features(
+    team_id: int,
+    season: Optional[int],
+    league_id: Optional[int],
+) -> Optional[TeamFeatures]:
+    """Samo cache (i negativan unos); None -> tim još nije zagrejan."""
+    cached = cache_get(_team_features_cache_key(team_id, season, league_id))
+    if isinstance(cached, dict):
+        try:
+            return TeamFeatures(**cached)
+        except TypeError:
+            pass
+    return None
+
+
+def load_team_features(
+    team_id: int,
+    season: Optional[int],
+    league_id: Optional[int],
+) -> TeamFeatures:
+    """
+    Per team+season feature-i, keširani u Redis/local cache (TTL 6h; prazan rezultat
+    TEAM_FEATURES_EMPTY_TTL_SECONDS). Na promašaju do 2 upstream poziva – za pozadinske
+    poslove (ticket scheduler), ne za list rute.
+    """
+    cached = cached_team_features(team_id, season, league_id)
+    if cached is not None:
+        return cached
+
+    key = _team_features_cache_key(team_id, season, league_id)
+    last_fixtures = _archived_last_fixtures(team_id)
+    if last_fixtures is None:
+        try:
+            last_fixtures = api_football.get_team_last_fixtures(team_id, last=FORM_WINDOW)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("feature_extraction: last fixtures failed team=%s: %s", team_id, exc)
+            last_fixtures = []
+    team_statistics = None
+    if league_id and season:
+        try:
+            team_statistics = api_football.get_team_stats(league_id, season, team_id)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("feature_extraction: team stats failed team=%s: %s", team_id, exc)
+
+    features = compute_team_features(team_id, season, last_fixtures, team_statistics)
+    ttl = TEAM_FEATURES_TTL_SECONDS if features.matches or team_statistics else TEAM_FEATURES_EMPTY_TTL_SECONDS
+    cache_set(key, asdict(features), ttl)
+    return features
+
+
+def _form_block(tf: Optional[TeamFeatures]) -> Optional[Dict[str, Any]]:
+    if tf is None or not tf.matches:
+        return None
+    return {
+        "matches": tf.matches,
+        "btts_rate": tf.btts_rate,
+        "scored_pg": tf.scored_pg,
+        "conceded_pg": tf.conceded_pg,
+        "clean_sheet_rate": tf.clean_sheet_rate,
+        "scored_home_pg": tf.scored_home_pg,
+        "scored_away_pg": tf.scored_away_pg,
+    }
+
+
+def _statistics_block(tf: Optional[TeamFeatures]) -> Optional[Dict[str, Any]]:
+    if tf is None or tf.season_scored_pg is None:
+        return None
+    return {
+        "scored_pg": tf.season_scored_pg,
+        "conceded_pg": tf.season_conceded_pg,
+        "clean_sheet_rate": tf.season_clean_sheet_rate,
+        "scored_home_pg": tf.season_scored_home_pg,
+        "scored_away_pg": tf.season_scored_away_pg,
+    }
+
+
+class FeatureSlate:
+    """
+    Memo za jedan slate (dan): svaki tim se računa jednom, bez obzira u koliko mečeva se pojavljuje.
+    Ispod memo-a je cache po team+season, pa i sledeći slate-ovi reuse-uju feature-e.
+
+    `cached_only=True` (request path) nikad ne zove upstream: nezagrejan tim dobija prazne
+    feature-e i završava u `missing`; puni ih pozadinski posao koji koristi `cached_only=False`.
+    """
+
+    def __init__(self, *, cached_only: bool = False) -> None:
+        self.cached_only = cached_only
+        self.missing: List[Tuple[int, Optional[int], Optional[int]]] = []
+        self._teams: Dict[Tuple[int, Optional[int]], TeamFeatures] = {}
+
+    def team(self, team_id: int, season: Optional[int], league_id: Optional[int]) -> TeamFeatures:
+        memo_key = (team_id, season)
+        tf = self._teams.get(memo_key)
+        if tf is None:
+            if self.cached_only:
+                tf = cached_team_features(team_id, season, league_id)
+                if tf is None:
+                    self.missing.append((team_id, season, league_id))
+                    tf = TeamFeatures(team_id=team_id, season=season)
+            else:
+                tf = load_team_features(team_id, season, league_id)
+            self._teams[memo_key] = tf
+        return tf
+
+    def teams_for_fixture(self, fixture: Dict[str, Any]) -> Tuple[Optional[TeamFeatures], Optional[TeamFeatures]]:
+        league = fixture.get("league") or {}
+        teams = fixture.get("teams") or {}
+        season = league.get("season")
+        league_id = league.get("id")
+        home_id = (teams.get("home") or {}).get("id")
+        away_id = (teams.get("away") or {}).get("id")
+        home = self.team(home_id, season, league_id) if isinstance(home_id, int) else None
+        away = self.team(away_id, season, league_id) if isinstance(away_id, int) else None
+        return home, away
+
+    def match_sections(self, fixture: Dict[str, Any]) -> Dict[str, Any]:
+        """`form` i `statistics` sekcije u obliku koji čita compute_btts_yes_probability_v1."""
+        home, away = self.teams_for_fixture(fixture)
+        form = {"home": _form_block(home), "away": _form_block(away)}
+        statistics = {"home": _statistics_block(home), "away": _statistics_block(away)}
+        return {
+            "form": form if any(form.values()) else None,
+            "statistics": statistics if any(statistics.values()) else None,
+        }
+
+    def candidate_stats(self, fixture: Dict[str, Any]) -> Dict[str, Any]:
+        """`stats` ključevi koje btts_ticket_engine.extract_candidates_from_fixtures prosleđuje u Candidate."""
+        home, away = self.teams_for_fixture(fixture)
+        if home is None or away is None or not home.matches or not away.matches:
+            return {}
+        both_btts = [v for v in (home.btts_rate_10, away.btts_rate_10) if v is not None]
+        under = [v for v in (home.under_rate_10, away.under_rate_10) if v is not None]
+        return {
+            "home_scored_avg_5": home.scored_avg_5,
+            "away_scored_avg_5": away.scored_avg_5,
+            "home_conceded_avg_5": home.conceded_avg_5,
+            "away_conceded_avg_5": away.conceded_avg_5,
+            "both_btts_rate_10": _avg(both_btts),
+            "under_tendency": _avg(under),
+        }
@@ -0,0 +1,364 @@
+"""
+Lokalna kolonarna arhiva dnevnih fixture-a, BTTS kvota, konačnih rezultata i feature-a.
+
+Layout (`HISTORY_ARCHIVE_DIR`):
+
+    index.json                  dani -> broj redova / lige / timovi; lige i timovi -> dani
+    2026-10-19/columns.bin      int64 pa float64 kolone, svaka `rows * 8` bajtova (mmap)
+    2026-10-19/meta.json        redosled kolona, broj redova, byteorder i string kolone
+
+Numeričke kolone se čitaju kroz `mmap` + `memoryview.cast` bez parsiranja, pa backtest,
+kalibracija, feature extraction i h2h čitaju istoriju lokalno, bez API-Football kvote.
+Modul nema zavisnosti od config/cache sloja (koristi ga i backtest worker proces).
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import mmap
+import os
+import shutil
+import sys
+import threading
+from array import array
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+ARCHIVE_VERSION = 1
+MISSING_INT = -1
+
+INT_COLUMNS = (
+    "fixture_id",
+    "kickoff_ts",
+    "league_id",
+    "season",
+    "home_id",
+    "away_id",
+    "goals_home",
+    "goals_away",
+)
+STAT_KEYS = (
+    "home_scored_avg_5",
+    "away_scored_avg_5",
+    "home_conceded_avg_5",
+    "away_conceded_avg_5",
+    "both_btts_rate_10",
+    "under_tendency",
+)
+FLOAT_COLUMNS = ("odds_btts_yes", "odds_btts_no") + STAT_KEYS
+STRING_COLUMNS = ("status_short", "league_name", "home_name", "away_name")
+
+_INDEX_LOCK = threading.Lock()
+
+
+def _int_or_missing(value: Any) -> int:
+    try:
+        return int(value) if value is not None else MISSING_INT
+    except (TypeError, ValueError):
+        return MISSING_INT
+
+
+def _float_or_nan(value: Any) -> float:
+    try:
+        return float(value) if value is not None else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _kickoff_ts(fixture: Dict[str, Any]) -> int:
+    ts = fixture.get("timestamp")
+    if isinstance(ts, int):
+        return ts
+    raw = fixture.get("date")
+    if isinstance(raw, str) and raw:
+        try:
+            return int(datetime.fromisoformat(raw.replace("Z", "+00:00")).timestamp())
+        except ValueError:
+            pass
+    return MISSING_INT
+
+
+def flatten_fixtures(fixtures: Sequence[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """API-Football fixture (+ `odds`/`stats`) -> kolone; redovi bez fixture id se preskaču."""
+    cols: Dict[str, List[Any]] = {name: [] for name in INT_COLUMNS + FLOAT_COLUMNS + STRING_COLUMNS}
+    for fx in fixtures:
+        fixture = fx.get("fixture") or {}
+        fid = fixture.get("id")
+        if not isinstance(fid, int):
+            continue
+        league = fx.get("league") or {}
+        teams = fx.get("teams") or {}
+        home, away = teams.get("home") or {}, teams.get("away") or {}
+        goals = fx.get("goals") or {}
+        odds = fx.get("odds") if isinstance(fx.get("odds"), dict) else {}
+        stats = fx.get("stats") if isinstance(fx.get("stats"), dict) else {}
+
+        ints = {
+            "fixture_id": fid,
+            "kickoff_ts": _kickoff_ts(fixture),
+            "league_id": _int_or_missing(league.get("id")),
+            "season": _int_or_missing(league.get("season")),
+            "home_id": _int_or_missing(home.get("id")),
+            "away_id": _int_or_missing(away.get("id")),
+            "goals_home": _int_or_missing(goals.get("home")),
+            "goals_away": _int_or_missing(goals.get("away")),
+        }
+        for name, value in ints.items():
+            cols[name].append(value)
+        cols["odds_btts_yes"].append(_float_or_nan(odds.get("btts_yes")))
+        cols["odds_btts_no"].append(_float_or_nan(odds.get("btts_no")))
+        for key in STAT_KEYS:
+            cols[key].append(_float_or_nan(stats.get(key)))
+        cols["status_short"].append((fixture.get("status") or {}).get("short"))
+        cols["league_name"].append(league.get("name"))
+        cols["home_name"].append(home.get("name"))
+        cols["away_name"].append(away.get("name"))
+    return cols
+
+
+# ---------- write ----------
+
+def write_day(archive_dir: str | os.PathLike[str], day: date, fixtures: Sequence[Dict[str, Any]]) -> int:
+    """Upisuje (ili zamenjuje) dan i ažurira index; vraća broj redova."""
+    root = Path(archive_dir)
+    root.mkdir(parents=True, exist_ok=True)
+    cols = flatten_fixtures(fixtures)
+    rows = len(cols["fixture_id"])
+
+    tmp_dir = root / f".{day.isoformat()}.tmp-{os.getpid()}-{threading.get_ident()}"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    with open(tmp_dir / "columns.bin", "wb") as fh:
+        for name in INT_COLUMNS:
+            array("q", cols[name]).tofile(fh)
+        for name in FLOAT_COLUMNS:
+            array("d", cols[name]).tofile(fh)
+    meta = {
+        "version": ARCHIVE_VERSION,
+        "date": day.isoformat(),
+        "rows": rows,
+        "byteorder": sys.byteorder,
+        "int_columns": list(INT_COLUMNS),
+        "float_columns": list(FLOAT_COLUMNS),
+        "strings": {name: cols[name] for name in STRING_COLUMNS},
+    }
+    (tmp_dir / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+    target = root / day.isoformat()
+    if target.exists():
+        shutil.rmtree(target)
+    os.replace(tmp_dir, target)
+
+    leagues = sorted({v for v in cols["league_id"] if v != MISSING_INT})
+    teams = sorted({v for v in cols["home_id"] + cols["away_id"] if v != MISSING_INT})
+    _update_index(root, day.isoformat(), {"rows": rows, "leagues": leagues, "teams": teams})
+    return rows
+
+
+def _update_index(root: Path, day: str, entry: Dict[str, Any]) -> None:
+    with _INDEX_LOCK:
+        index = ArchiveIndex.load(root)
+        index.days[day] = entry
+        payload = {"version": ARCHIVE_VERSION, "days": dict(sorted(index.days.items()))}
+        tmp = root / f".index.json.tmp-{os.getpid()}"
+        tmp.write_text(json.dumps(payload), encoding="utf-8")
+        os.replace(tmp, root / "index.json")
+
+
+# ---------- read ----------
+
+class ArchiveIndex:
+    """index.json: dani sa brojem redova, ligama i timovima; obrnuti indeksi se grade pri load-u."""
+
+    def __init__(self, days: Dict[str, Dict[str, Any]]) -> None:
+        self.days = days
+        self._by_league: Dict[int, List[str]] = {}
+        self._by_team: Dict[int, List[str]] = {}
+        for day in sorted(days):
+            for lid in days[day].get("leagues") or []:
+                self._by_league.setdefault(int(lid), []).append(day)
+            for tid in days[day].get("teams") or []:
+                self._by_team.setdefault(int(tid), []).append(day)
+
+    @classmethod
+    def load(cls, archive_dir: str | os.PathLike[str]) -> "ArchiveIndex":
+        path = Path(archive_dir) / "index.json"
+        if not path.exists():
+            return cls({})
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        return cls(dict(payload.get("days") or {}))
+
+    def list_days(self, *, start: Optional[date] = None, end: Optional[date] = None) -> List[date]:
+        out = [date.fromisoformat(d) for d in sorted(self.days)]
+        return [d for d in out if (start is None or d >= start) and (end is None or d <= end)]
+
+    def days_for_league(self, league_id: int) -> List[date]:
+        return [date.fromisoformat(d) for d in self._by_league.get(league_id, [])]
+
+    def days_for_team(self, team_id: int) -> List[date]:
+        return [date.fromisoformat(d) for d in self._by_team.get(team_id, [])]
+
+    def latest_day(self) -> Optional[date]:
+        return date.fromisoformat(max(self.days)) if self.days else None
+
+
+class DayColumns:
+    """Read-only pogled na jedan dan; numeričke kolone su memoryview nad mmap-om."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        self.day = date.fromisoformat(self.meta["date"])
+        self.rows: int = int(self.meta["rows"])
+        self._fh = None
+        self._mm: Optional[mmap.mmap] = None
+        self._columns: Dict[str, Sequence[Any]] = {}
+        if self.rows == 0:
+            for name in self.meta["int_columns"] + self.meta["float_columns"]:
+                self._columns[name] = ()
+            return
+
+        self._fh = open(path / "columns.bin", "rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        swap = self.meta.get("byteorder", sys.byteorder) != sys.byteorder
+        block = self.rows * 8
+        layout = [(n, "q") for n in self.meta["int_columns"]] + [(n, "d") for n in self.meta["float_columns"]]
+        view = memoryview(self._mm)
+        for i, (name, code) in enumerate(layout):
+            chunk = view[i * block : (i + 1) * block]
+            if swap:
+                arr = array(code, chunk.tobytes())
+                arr.byteswap()
+                self._columns[name] = arr
+            else:
+                self._columns[name] = chunk.cast(code)
+
+    def column(self, name: str) -> Sequence[Any]:
+        if name in self._columns:
+            return self._columns[name]
+        return self.meta["strings"][name]
+
+    def row_indexes_for_team(self, team_id: int) -> List[int]:
+        home, away = self.column("home_id"), self.column("away_id")
+        return [i for i in range(self.rows) if home[i] == team_id or away[i] == team_id]
+
+    def fixture(self, i: int) -> Dict[str, Any]:
+        """Red -> API-Football oblik (fixture/league/teams/goals + odds/stats) za engine i feature-e."""
+        col = self.column
+
+        def _int(name: str) -> Optional[int]:
+            v = col(name)[i]
+            return None if v == MISSING_INT else int(v)
+
+        def _float(name: str) -> Optional[float]:
+            v = col(name)[i]
+            return None if math.isnan(v) else float(v)
+
+        ts = _int("kickoff_ts")
+        odds = {k: v for k, v in (("btts_yes", _float("odds_btts_yes")), ("btts_no", _float("odds_btts_no"))) if v is not None}
+        stats = {k: v for k in STAT_KEYS if (v := _float(k)) is not None}
+        return {
+            "fixture": {
+                "id": _int("fixture_id"),
+                "date": datetime.fromtimestamp(ts, tz=timezone.utc).isoformat().replace("+00:00", "Z") if ts is not None else None,
+                "timestamp": ts,
+                "status": {"short": col("status_short")[i]},
+            },
+            "league": {"id": _int("league_id"), "name": col("league_name")[i], "season": _int("season")},
+            "teams": {
+                "home": {"id": _int("home_id"), "name": col("home_name")[i]},
+                "away": {"id": _int("away_id"), "name": col("away_name")[i]},
+            },
+            "goals": {"home": _int("goals_home"), "away": _int("goals_away")},
+            "odds": odds,
+            "stats": stats,
+        }
+
+    def to_fixtures(self) -> List[Dict[str, Any]]:
+        return [self.fixture(i) for i in range(self.rows)]
+
+    def close(self) -> None:
+        for value in self._columns.values():
+            if isinstance(value, memoryview):
+                value.release()
+        self._columns.clear()
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self) -> "DayColumns":
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
+
+
+def open_day(archive_dir: str | os.PathLike[str], day: date) -> DayColumns:
+    return DayColumns(Path(archive_dir) / day.isoformat())
+
+
+def load_day_fixtures(archive_dir: str | os.PathLike[str], day: date) -> List[Dict[str, Any]]:
+    with open_day(archive_dir, day) as cols:
+        return cols.to_fixtures()
+
+
+def iter_team_fixtures(
+    archive_dir: str | os.PathLike[str],
+    team_id: int,
+    *,
+    before: Optional[date] = None,
+    index: Optional[ArchiveIndex] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Mečevi tima od najnovijeg ka starijem (samo dani iz index-a gde tim igra)."""
+    index = index or ArchiveIndex.load(archive_dir)
+    for day in reversed(index.days_for_team(team_id)):
+        if before is not None and day >= before:
+            continue
+        with open_day(archive_dir, day) as cols:
+            rows = cols.row_indexes_for_team(team_id)
+            fixtures = [cols.fixture(i) for i in rows]
+        yield from sorted(fixtures, key=lambda f: f["fixture"]["timestamp"] or 0, reverse=True)
+
+
+def team_last_fixtures(
+    archive_dir: str | os.PathLike[str],
+    team_id: int,
+    *,
+    last: int = 10,
+    before: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """Poslednjih `last` odigranih mečeva tima (sa rezultatom), najnoviji prvi."""
+    out: List[Dict[str, Any]] = []
+    for fx in iter_team_fixtures(archive_dir, team_id, before=before):
+        goals = fx.get("goals") or {}
+        if goals.get("home") is None or goals.get("away") is None:
+            continue
+        out.append(fx)
+        if len(out) >= last:
+            break
+    return out
+
+
+def head_to_head(
+    archive_dir: str | os.PathLike[str],
+    team_a: int,
+    team_b: int,
+    *,
+    last: int = 10,
+) -> List[Dict[str, Any]]:
+    index = ArchiveIndex.load(archive_dir)
+    shared = set(index.days_for_team(team_a)) & set(index.days_for_team(team_b))
+    out: List[Dict[str, Any]] = []
+    for day in sorted(shared, reverse=True):
+        with open_day(archive_dir, day) as cols:
+            home, away = cols.column("home_id"), cols.column("away_id")
+            for i in range(cols.rows):
+                if {home[i], away[i]} == {team_a, team_b}:
+                    out.append(cols.fixture(i))
+        if len(out) >= last:
+            break
+    return out[:last]
@@ -0,0 +1,102 @@
+"""
+In-process event bus za live delte (poller -> SSE feed, board-ovi, delta sync).
+
+Svaki event dobija monoton `seq`; poslednjih N eventova se čuva u ring buffer-u pa
+potrošači mogu da nastave od poznatog `seq` (ili saznaju da moraju da urade resync).
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger("naksir.go_premium.live_bus")
+
+HISTORY_SIZE = 2000
+
+
+@dataclass(frozen=True)
+class LiveEvent:
+    seq: int
+    type: str
+    day: str
+    fixture_id: int
+    league_id: Optional[int]
+    data: Dict[str, Any] = field(default_factory=dict)
+    ts: float = 0.0
+
+
+Subscriber = Callable[[LiveEvent], None]
+
+
+class LiveEventBus:
+    def __init__(self, history_size: int = HISTORY_SIZE) -> None:
+        # epoch menja identitet toka pri restartu procesa (seq kreće ispočetka)
+        self.epoch = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self._history: Deque[LiveEvent] = deque(maxlen=history_size)
+        self._subscribers: List[Subscriber] = []
+
+    @property
+    def last_seq(self) -> int:
+        with self._lock:
+            return self._history[-1].seq if self._history else 0
+
+    def publish(
+        self,
+        type: str,
+        *,
+        day: str,
+        fixture_id: int,
+        league_id: Optional[int] = None,
+        data: Optional[Dict[str, Any]] = None,
+    ) -> LiveEvent:
+        with self._lock:
+            event = LiveEvent(
+                seq=next(self._seq),
+                type=type,
+                day=day,
+                fixture_id=fixture_id,
+                league_id=league_id,
+                data=dict(data or {}),
+                ts=time.time(),
+            )
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("live bus subscriber failed: %s", exc)
+        return event
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def _unsubscribe() -> None:
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+
+        return _unsubscribe
+
+    def since(self, seq: int) -> Optional[List[LiveEvent]]:
+        """Eventovi posle `seq`; None ako je `seq` ispao iz ring buffer-a (potreban resync)."""
+        with self._lock:
+            if not self._history:
+                return [] if seq == 0 else None
+            oldest = self._history[0].seq
+            if seq < oldest - 1 or seq > self._history[-1].seq:
+                return None
+            return [e for e in self._history if e.seq > seq]
+
+
+BUS = LiveEventBus()
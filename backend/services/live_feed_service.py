@@ -0,0 +1,174 @@
+"""
+Live feed (SSE) nad live_bus: kompaktne delte po meču za pretplatu na dan (+ opciono lige).
+
+- Event id je `{epoch}:{seq}`; `Last-Event-ID` nastavlja iz ring buffer-a bus-a. Ako je seq
+  ispao iz buffer-a ili je proces restartovan (drugi epoch), šalje se `resync` i klijent
+  jednom povlači celu listu.
+- Backpressure: svaka pretplata ima ograničen red. Spor klijent ne gomila memoriju –
+  red se isprazni i klijent dobija `resync` umesto izgubljenih delti.
+- Generator je async (event loop), pa otvorene konekcije ne drže threadpool workere;
+  bus callback (poller thread) predaje evente kroz `call_soon_threadsafe`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+
+from backend.services.ai_stream_service import format_sse
+from backend.services.live_bus import BUS, LiveEvent, LiveEventBus
+
+logger = logging.getLogger("naksir.go_premium.live_feed")
+
+QUEUE_SIZE = int(os.getenv("LIVE_FEED_QUEUE_SIZE", "256"))
+HEARTBEAT_SECONDS = float(os.getenv("LIVE_FEED_HEARTBEAT_SECONDS", "15"))
+# posle ovoga stream se zatvara; EventSource se sam reconnect-uje sa Last-Event-ID
+MAX_STREAM_SECONDS = float(os.getenv("LIVE_FEED_MAX_SECONDS", "900"))
+
+
+def event_id(bus: LiveEventBus, seq: int) -> str:
+    return f"{bus.epoch}:{seq}"
+
+
+def parse_event_id(raw: Optional[str]) -> Optional[Tuple[str, int]]:
+    if not raw or ":" not in raw:
+        return None
+    epoch, _, seq = raw.strip().partition(":")
+    try:
+        return epoch, int(seq)
+    except ValueError:
+        return None
+
+
+def compact_delta(event: LiveEvent) -> Dict[str, Any]:
+    """Payload koji ide klijentu: samo ono što kartica menja."""
+    data = event.data
+    out: Dict[str, Any] = {"fixture_id": event.fixture_id, "league_id": event.league_id}
+    if event.type == "badge":
+        out["btts_badge"] = data.get("btts_badge")
+        return out
+    for key in ("score", "minute", "state", "status", "red_cards"):
+        out[key] = data.get(key)
+    return out
+
+
+class LiveSubscription:
+    """Filter + ograničen red jedne SSE konekcije."""
+
+    def __init__(
+        self,
+        *,
+        day: str,
+        league_ids: Optional[Set[int]] = None,
+        app_id: Optional[str] = None,
+        maxsize: int = QUEUE_SIZE,
+    ) -> None:
+        self.day = day
+        self.league_ids = league_ids or None
+        self.app_id = app_id
+        self.maxsize = maxsize
+        self.overflowed = False
+        self._queue: Optional[asyncio.Queue[LiveEvent]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def matches(self, event: LiveEvent) -> bool:
+        if event.day != self.day:
+            return False
+        if self.league_ids is not None and event.league_id not in self.league_ids:
+            return False
+        if event.type == "badge" and event.data.get("app_id") != self.app_id:
+            return False
+        return True
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+
+    def on_event(self, event: LiveEvent) -> None:
+        """Bus callback (bilo koji thread)."""
+        if self._loop is None or not self.matches(event):
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._offer, event)
+        except RuntimeError:
+            # loop je zatvoren (klijent otišao); unsubscribe stiže iz finally bloka
+            pass
+
+    def _offer(self, event: LiveEvent) -> None:
+        assert self._queue is not None
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self._queue.empty():
+                self._queue.get_nowait()
+
+    async def next_event(self, timeout: float) -> Optional[LiveEvent]:
+        assert self._queue is not None
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+def _frame(bus: LiveEventBus, event: LiveEvent) -> str:
+    return format_sse(event.type, compact_delta(event), event_id=event_id(bus, event.seq))
+
+
+def _resync_frame(bus: LiveEventBus, seq: int, reason: str) -> str:
+    return format_sse("resync", {"reason": reason}, event_id=event_id(bus, seq))
+
+
+async def stream_live_feed(
+    subscription: LiveSubscription,
+    *,
+    last_event_id: Optional[str] = None,
+    bus: LiveEventBus = BUS,
+    heartbeat_seconds: Optional[float] = None,
+    max_seconds: Optional[float] = None,
+) -> AsyncIterator[str]:
+    heartbeat_seconds = HEARTBEAT_SECONDS if heartbeat_seconds is None else heartbeat_seconds
+    max_seconds = MAX_STREAM_SECONDS if max_seconds is None else max_seconds
+    subscription.bind(asyncio.get_running_loop())
+    # pretplata pre replay-a: ništa ne pada u rupu između istorije i živih eventova
+    unsubscribe = bus.subscribe(subscription.on_event)
+    try:
+        sent = bus.last_seq
+        resume = parse_event_id(last_event_id)
+        if resume is None:
+            yield format_sse("hello", {"day": subscription.day}, event_id=event_id(bus, sent))
+        else:
+            epoch, seq = resume
+            replay = bus.since(seq) if epoch == bus.epoch else None
+            if replay is None:
+                yield _resync_frame(bus, sent, "history_expired" if epoch == bus.epoch else "epoch_changed")
+            else:
+                for event in replay:
+                    if subscription.matches(event):
+                        yield _frame(bus, event)
+                    sent = event.seq
+                sent = max(sent, seq)
+
+        deadline = time.monotonic() + max_seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            event = await subscription.next_event(min(heartbeat_seconds, remaining))
+            if subscription.overflowed:
+                subscription.overflowed = False
+                sent = bus.last_seq
+                yield _resync_frame(bus, sent, "slow_consumer")
+                continue
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            if event.seq <= sent:
+                continue  # već poslat kroz replay
+            sent = event.seq
+            yield _frame(bus, event)
+    finally:
+        unsubscribe()
@@ -0,0 +1,265 @@
+"""
+Live poller: jedan `fixtures?live=all` poziv na kratkom intervalu, diff protiv prethodnog
+snapshot-a (rezultat, status, minut, crveni kartoni) i fan-out delti.
+
+Svaki proces vrti isti loop, ali samo lider (cache_claim lease) zove upstream i radi
+deljene side-effect-e:
+  - patch keširanog dnevnog slate-a (`fixtures?date=`) bez novog upstream poziva, uz
+    preostali TTL (slate i dalje ističe i refetch-uje se)
+  - invalidacija samo pogođenih izvedenih unosa (fixture po id-u, events, statistics)
+  - objava snapshot-a (live mečevi + nedavno završeni) pod `SNAPSHOT_KEY`
+Ostali procesi čitaju snapshot, ne keširan `fixtures?live=all` (TTL tog unosa je kraći od
+intervala, pa bi follower fazno pomeren za više od TTL-a uvek video prazan cache). Snapshot
+živi `SNAPSHOT_TTL_FACTOR` intervala. Svi procesi diff-uju lokalno, objavljuju delte na
+in-process bus (live_bus.BUS) i patch-uju svoje BTTS board-ove.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from backend import api_football
+from backend.cache import cache_claim, cache_delete, cache_get, cache_set, cache_update, make_cache_key
+from backend.config import TIMEZONE
+from backend.services.btts_board_service import apply_live_fixture, state_from_fixture
+from backend.services.live_bus import BUS, LiveEvent, LiveEventBus
+
+logger = logging.getLogger("naksir.go_premium.live_poller")
+
+POLL_SECONDS = float(os.getenv("LIVE_POLL_SECONDS", "15"))
+LEADER_KEY = "live_poller:leader"
+SNAPSHOT_KEY = "live_poller:snapshot"
+SNAPSHOT_TTL_FACTOR = 4  # >= 3 intervala: follower može biti fazno pomeren do celog intervala
+
+LiveState = Dict[str, Any]
+
+
+def _red_cards(fx: Dict[str, Any]) -> Tuple[int, int]:
+    home_id = ((fx.get("teams") or {}).get("home") or {}).get("id")
+    home = away = 0
+    for ev in fx.get("events") or []:
+        if (ev.get("type") or "").lower() != "card":
+            continue
+        detail = (ev.get("detail") or "").lower()
+        if "red" not in detail and "second yellow" not in detail:
+            continue
+        if (ev.get("team") or {}).get("id") == home_id:
+            home += 1
+        else:
+            away += 1
+    return home, away
+
+
+def live_state(fx: Dict[str, Any]) -> LiveState:
+    """Polja koja pratimo po meču."""
+    fixture = fx.get("fixture") or {}
+    status = fixture.get("status") or {}
+    goals = fx.get("goals") or {}
+    red_home, red_away = _red_cards(fx)
+    return {
+        "score": {"home": goals.get("home"), "away": goals.get("away")},
+        "status": status.get("short"),
+        "minute": status.get("elapsed"),
+        "red_cards": {"home": red_home, "away": red_away},
+        "state": state_from_fixture(fx),
+    }
+
+
+def diff_states(prev: Optional[LiveState], cur: LiveState) -> List[str]:
+    if prev is None:
+        return [k for k in ("score", "status", "minute", "red_cards")]
+    return [k for k in ("score", "status", "minute", "red_cards") if prev.get(k) != cur.get(k)]
+
+
+def fixture_day(fx: Dict[str, Any]) -> str:
+    raw = (fx.get("fixture") or {}).get("date")
+    try:
+        return datetime.fromisoformat(str(raw).replace("Z", "+00:00")).astimezone(ZoneInfo(TIMEZONE)).date().isoformat()
+    except ValueError:
+        return datetime.now(ZoneInfo(TIMEZONE)).date().isoformat()
+
+
+def _slate_key(day: str) -> str:
+    return make_cache_key("fixtures", {"date": day, "timezone": TIMEZONE})
+
+
+def _patched_slate(payload: Optional[Dict[str, Any]], changed: Dict[int, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Nova kopija slate payload-a sa live fixture/goals/score; None ako nema šta da se patch-uje."""
+    items = payload.get("response") if isinstance(payload, dict) else None
+    if not isinstance(items, list):
+        return None
+    patched_items: List[Any] = []
+    patched = False
+    for item in items:
+        fid = (item.get("fixture") or {}).get("id") if isinstance(item, dict) else None
+        live = changed.get(fid) if fid is not None else None
+        if live is not None:
+            item = dict(item)
+            for section in ("fixture", "goals", "score"):
+                if live.get(section) is not None:
+                    item[section] = live[section]
+            patched = True
+        patched_items.append(item)
+    if not patched:
+        return None
+    return {**payload, "response": patched_items}
+
+
+def patch_day_slate(day: str, changed: Dict[int, Dict[str, Any]]) -> int:
+    """
+    Upisuje live fixture/goals/score u keširan `fixtures?date=` payload; vraća broj patch-eva.
+
+    Upis ide kroz `cache_update` (CAS nad najnovijim payload-om, pa patch ne pregazi svež
+    upstream odgovor upisan u međuvremenu) i zadržava preostali TTL: slate i dalje ističe na
+    svom upstream TTL-u, pa se odlaganja, promene satnice i novi mečevi refetch-uju i dok
+    traju live mečevi.
+    """
+    key = _slate_key(day)
+    patched = cache_update(key, lambda payload: _patched_slate(payload, changed), None)
+    items = patched.get("response") if isinstance(patched, dict) else None
+    if not isinstance(items, list):
+        return 0
+    return sum(1 for item in items if isinstance(item, dict) and (item.get("fixture") or {}).get("id") in changed)
+
+
+def invalidate_derived(fixture_id: int, changes: List[str]) -> None:
+    cache_delete(make_cache_key("fixtures", {"id": fixture_id, "timezone": TIMEZONE}))
+    if "score" in changes or "red_cards" in changes:
+        cache_delete(make_cache_key("fixtures/events", {"fixture": fixture_id}))
+    if "status" in changes:
+        cache_delete(make_cache_key("fixtures/statistics", {"fixture": fixture_id}))
+
+
+class LivePoller:
+    def __init__(self, *, bus: LiveEventBus = BUS, owner: Optional[str] = None, interval: float = POLL_SECONDS) -> None:
+        self.bus = bus
+        self.owner = owner or f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.interval = interval
+        self._states: Dict[int, LiveState] = {}
+        self._fixtures: Dict[int, Dict[str, Any]] = {}
+        # lider: nedavno završeni mečevi (fid -> (monotonic, fixture)) koji idu u snapshot
+        self._finals: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+        # follower: završeni mečevi iz poslednjeg pročitanog snapshot-a
+        self._published_finals: Dict[int, Dict[str, Any]] = {}
+
+    @property
+    def snapshot_ttl(self) -> float:
+        return self.interval * SNAPSHOT_TTL_FACTOR
+
+    def _fetch(self, leader: bool) -> Optional[List[Dict[str, Any]]]:
+        if leader:
+            return api_football.get_live_fixtures()
+        snapshot = cache_get(SNAPSHOT_KEY)
+        if not isinstance(snapshot, dict) or not isinstance(snapshot.get("fixtures"), list):
+            return None
+        finals = snapshot.get("finals") or {}
+        self._published_finals = {int(fid): fx for fid, fx in finals.items()}
+        return snapshot["fixtures"]
+
+    def _final_fixture(self, fixture_id: int, leader: bool) -> Optional[Dict[str, Any]]:
+        """Meč je ispao iz live feed-a: lider dohvata konačan status, ostali ga čitaju iz snapshot-a."""
+        if not leader:
+            return self._published_finals.get(fixture_id)
+        cache_delete(make_cache_key("fixtures", {"id": fixture_id, "timezone": TIMEZONE}))
+        final = api_football.get_fixture_by_id(fixture_id)
+        if final is not None:
+            self._finals[fixture_id] = (time.monotonic(), final)
+        return final
+
+    def _publish_snapshot(self, fixtures: List[Dict[str, Any]]) -> None:
+        """Lider: live mečevi + završeni iz poslednjih `snapshot_ttl` sekundi, za sve followere."""
+        cutoff = time.monotonic() - self.snapshot_ttl
+        self._finals = {fid: entry for fid, entry in self._finals.items() if entry[0] >= cutoff}
+        cache_set(
+            SNAPSHOT_KEY,
+            {
+                "published_at": time.time(),
+                "fixtures": fixtures,
+                "finals": {str(fid): fx for fid, (_ts, fx) in self._finals.items()},
+            },
+            self.snapshot_ttl,
+        )
+
+    def poll_once(self) -> List[LiveEvent]:
+        leader = cache_claim(LEADER_KEY, self.owner, self.interval * 3)
+        fixtures = self._fetch(leader)
+        if fixtures is None:
+            # nema validnog payload-a (greška ili lider još nije upisao) – ne diff-uj prazno
+            return []
+
+        current: Dict[int, Dict[str, Any]] = {}
+        for fx in fixtures:
+            fid = (fx.get("fixture") or {}).get("id")
+            if isinstance(fid, int):
+                current[fid] = fx
+        for fid in set(self._fixtures) - set(current):
+            final = self._final_fixture(fid, leader)
+            if final is not None:
+                current[fid] = final
+        if leader:
+            self._publish_snapshot(fixtures)
+
+        events: List[LiveEvent] = []
+        by_day: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        for fid, fx in current.items():
+            state = live_state(fx)
+            changes = diff_states(self._states.get(fid), state)
+            if not changes:
+                continue
+            day = fixture_day(fx)
+            by_day.setdefault(day, {})[fid] = fx
+            if leader:
+                invalidate_derived(fid, changes)
+            apply_live_fixture(day, fx)
+            events.append(
+                self.bus.publish(
+                    "fixture",
+                    day=day,
+                    fixture_id=fid,
+                    league_id=(fx.get("league") or {}).get("id"),
+                    data={**state, "changed": changes},
+                )
+            )
+
+        if leader:
+            for day, changed in by_day.items():
+                patch_day_slate(day, changed)
+
+        self._states = {
+            fid: live_state(fx) for fid, fx in current.items() if state_from_fixture(fx) == "live"
+        }
+        self._fixtures = {fid: fx for fid, fx in current.items() if fid in self._states}
+        return events
+
+
+_POLLER_LOCK = threading.Lock()
+_POLLER: Optional[LivePoller] = None
+
+
+def start_live_poller(interval_seconds: float = POLL_SECONDS) -> None:
+    """Pokreće (jednom po procesu) daemon thread sa live poller-om."""
+    global _POLLER
+    if interval_seconds <= 0:
+        return
+    with _POLLER_LOCK:
+        if _POLLER is not None:
+            return
+        _POLLER = LivePoller(interval=interval_seconds)
+    poller = _POLLER
+
+    def _loop() -> None:
+        while True:
+            try:
+                poller.poll_once()
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("live poller tick failed: %s", exc)
+            time.sleep(interval_seconds)
+
+    threading.Thread(target=_loop, name="live-poller", daemon=True).start()
@@ -0,0 +1,112 @@
+"""
+Sabiranje metrika svih workera u deljenom cache-u (Redis hash, HINCRBYFLOAT).
+
+Svaki proces periodično (`METRICS_FLUSH_SECONDS`) prazni lokalni registry i dodaje delte
+u isti hash; scrape prvo flush-uje svoj proces pa čita zbir. Counteri zato ostaju
+monotoni i kad se pojedinačni worker restartuje.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from backend.cache import cache_get_fields, cache_incr_fields
+from backend.metrics import REGISTRY, Snapshot
+
+logger = logging.getLogger("naksir.go_premium.metrics")
+
+AGGREGATE_KEY = "metrics:aggregate"
+AGGREGATE_TTL_SECONDS = 7 * 24 * 3600
+FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "10"))
+
+_FLUSHER_LOCK = threading.Lock()
+_FLUSHER_STARTED = False
+
+
+def flush() -> int:
+    """Lokalne delte -> deljeni zbir; vraća broj polja."""
+    fields = REGISTRY.drain()
+    if not fields:
+        return 0
+    try:
+        cache_incr_fields(AGGREGATE_KEY, fields, AGGREGATE_TTL_SECONDS)
+    except Exception:
+        REGISTRY.restore(fields)
+        raise
+    return len(fields)
+
+
+def snapshot() -> Snapshot:
+    flush()
+    return Snapshot(cache_get_fields(AGGREGATE_KEY))
+
+
+def _latency(snap: Snapshot, name: str, label: str) -> Dict[str, Dict[str, Any]]:
+    out: Dict[str, Dict[str, Any]] = {}
+    for labels, series in snap.series(name):
+        label_map = dict(labels)
+        key = " ".join(filter(None, (label_map.get("method"), label_map.get(label)))) or "all"
+        count = sum(series[:-1])
+        out[key] = {
+            "count": int(count),
+            "mean_ms": round(series[-1] / count, 2) if count else None,
+            "p50_ms": _round(snap.quantile(name, 0.50, label_map)),
+            "p95_ms": _round(snap.quantile(name, 0.95, label_map)),
+            "p99_ms": _round(snap.quantile(name, 0.99, label_map)),
+        }
+    return out
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+
+def summary(snap: Optional[Snapshot] = None) -> Dict[str, Any]:
+    """Čitljiv pregled: p50/p95/p99 po ruti i upstream endpoint-u, cache hit ratio po porodici."""
+    snap = snap or snapshot()
+    cache: Dict[str, Dict[str, float]] = {}
+    for (name, labels), value in snap.counters.items():
+        if name != "cache_requests_total":
+            continue
+        label_map = dict(labels)
+        entry = cache.setdefault(label_map.get("family", "other"), {"hit": 0.0, "miss": 0.0})
+        entry[label_map.get("result", "miss")] = entry.get(label_map.get("result", "miss"), 0.0) + value
+    return {
+        "routes": _latency(snap, "http_request_duration_ms", "route"),
+        "upstream": _latency(snap, "upstream_request_duration_ms", "endpoint"),
+        "llm": _latency(snap, "llm_request_duration_ms", "kind"),
+        "db_queries": _latency(snap, "db_query_duration_ms", "route").get("all"),
+        "cache": {
+            family: {
+                "hits": int(v["hit"]),
+                "misses": int(v["miss"]),
+                "hit_ratio": round(v["hit"] / (v["hit"] + v["miss"]), 4) if v["hit"] + v["miss"] else None,
+            }
+            for family, v in sorted(cache.items())
+        },
+    }
+
+
+def start_metrics_flusher(interval_seconds: float = FLUSH_SECONDS) -> None:
+    """Pokreće (jednom po procesu) daemon thread koji periodično flush-uje lokalne metrike."""
+    global _FLUSHER_STARTED
+    if interval_seconds <= 0:
+        return
+    with _FLUSHER_LOCK:
+        if _FLUSHER_STARTED:
+            return
+        _FLUSHER_STARTED = True
+
+    def _loop() -> None:
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                flush()
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("metrics flush failed: %s", exc)
+
+    threading.Thread(target=_loop, name="metrics-flusher", daemon=True).start()
@@ -0,0 +1,210 @@
+"""
+Verzionisan change log po dnevnom slate-u (lista kartica), za `since=` delta sync.
+
+Stanje slate-a je u deljenom cache-u (Redis), pa svi workeri vide iste verzije:
+  {epoch, version, floor, hashes: {fixture_id: hash kartice}, prev: {fixture_id: [hash, version, ts]},
+   log: [[version, fixture_id, op], ...]}
+Upis je compare-and-set, a `prev` hvata workere čiji board kasni (vidi `_is_stale_revert`):
+bez toga bi dva workera naizmenično menjala verziju i brzo ispraznila log.
+Nova verzija nastaje samo kad se neka kartica doda, promeni ili nestane. Log je ograničen
+(`SLATE_CHANGELOG_ENTRIES`); `floor` je najstarija verzija od koje je delta još tačna.
+
+Verzija za klijenta je neproziran token `{epoch}-{version}`; epoch se menja kad stanje
+nestane (novi dan, flush cache-a), pa stari token nikad ne daje pogrešnu deltu.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from backend.cache import cache_update
+
+CHANGELOG_TTL_SECONDS = 2 * 24 * 3600
+MAX_LOG_ENTRIES = int(os.getenv("SLATE_CHANGELOG_ENTRIES", "500"))
+# koliko dugo se vraćanje kartice na prethodni hash tumači kao zakasneli worker, ne kao promena
+STALE_WRITER_SECONDS = float(os.getenv("SLATE_STALE_WRITER_SECONDS", "60"))
+
+# poslednje stanje koje je ovaj proces video, po slate ključu: pun odgovor sa nepromenjenim
+# karticama ne čita/piše Redis
+_SEEN: Dict[str, Tuple[Dict[str, str], str]] = {}
+_SEEN_LOCK = threading.Lock()
+
+
+def _key(slate: str, day: str) -> str:
+    return f"slate:changelog:{slate}:{day}"
+
+
+def card_hash(card: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(card, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+def _token(state: Dict[str, Any]) -> str:
+    return f"{state['epoch']}-{state['version']}"
+
+
+def _parse_token(token: str) -> Optional[Tuple[str, int]]:
+    epoch, _, version = token.strip().rpartition("-")
+    if not epoch:
+        return None
+    try:
+        return epoch, int(version)
+    except ValueError:
+        return None
+
+
+def _hashes(cards: Dict[int, Dict[str, Any]]) -> Dict[str, str]:
+    return {str(fid): card_hash(card) for fid, card in cards.items()}
+
+
+def _fresh_state() -> Dict[str, Any]:
+    return {"epoch": uuid.uuid4().hex[:8], "version": 0, "floor": 0, "hashes": {}, "prev": {}, "log": []}
+
+
+def _is_stale_revert(state: Dict[str, Any], fid: str, new_hash: str, now: float) -> bool:
+    """
+    Writer vraća karticu na hash koji je upravo zamenjen: njegov board kasni za drugim
+    workerom (npr. live tick mu još nije stigao). Takva "promena" ne pravi novu verziju.
+    """
+    prev = (state.get("prev") or {}).get(fid)
+    return (
+        prev is not None
+        and state["hashes"].get(fid) != new_hash
+        and prev[0] == new_hash
+        and now - float(prev[2]) < STALE_WRITER_SECONDS
+    )
+
+
+def _next_state(current: Optional[Dict[str, Any]], new: Dict[str, str], now: float) -> Optional[Dict[str, Any]]:
+    """Čista funkcija za cache_update: novo stanje ili None kad se verzija ne menja."""
+    state = current if isinstance(current, dict) and isinstance(current.get("hashes"), dict) else _fresh_state()
+    old: Dict[str, str] = state["hashes"]
+    effective = {
+        fid: (old[fid] if _is_stale_revert(state, fid, h, now) else h) for fid, h in new.items()
+    }
+    if effective == old and state["version"] > 0:
+        return None
+
+    version = int(state["version"]) + 1
+    entries: List[List[Any]] = [[version, int(fid), "upsert"] for fid, h in effective.items() if old.get(fid) != h]
+    entries += [[version, int(fid), "remove"] for fid in old if fid not in effective]
+    log = list(state["log"]) + entries
+    floor = int(state["floor"])
+    if len(log) > MAX_LOG_ENTRIES:
+        log = log[-MAX_LOG_ENTRIES:]
+        # najstarija verzija u logu je možda odsečena napola -> delta važi tek od nje
+        floor = max(floor, int(log[0][0]))
+
+    prev = {
+        fid: entry
+        for fid, entry in (state.get("prev") or {}).items()
+        if fid in effective and now - float(entry[2]) < STALE_WRITER_SECONDS
+    }
+    for fid, h in effective.items():
+        if fid in old and old[fid] != h:
+            prev[fid] = [old[fid], version, now]
+    return {"epoch": state["epoch"], "version": version, "floor": floor, "hashes": effective, "prev": prev, "log": log}
+
+
+def _writer_token(state: Dict[str, Any], new: Dict[str, str], now: float) -> str:
+    """
+    Token za writer-a koji kasni: verzija pre najstarije promene koju još nije video, pa
+    sledeći `since=` zahtev njegovog klijenta dobija te kartice u delti.
+    """
+    behind = [
+        int(state["prev"][fid][1]) for fid, h in new.items() if _is_stale_revert(state, fid, h, now)
+    ]
+    if not behind:
+        return _token(state)
+    return f"{state['epoch']}-{min(behind) - 1}"
+
+
+def record_slate(
+    slate: str,
+    day: str,
+    cards: Dict[int, Dict[str, Any]],
+    *,
+    hashes: Optional[Dict[str, str]] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Upisuje trenutni slate; vraća (version token, stanje). Bez promena verzija ostaje ista.
+    Upis je compare-and-set (cache_update), pa dva workera nikad ne izdaju istu verziju
+    za različite promene.
+    """
+    key = _key(slate, day)
+    new = hashes if hashes is not None else _hashes(cards)
+    now = time.time()
+    state = cache_update(key, lambda current: _next_state(current, new, now), CHANGELOG_TTL_SECONDS)
+    assert state is not None  # _next_state vraća None samo kad stanje već postoji
+    token = _writer_token(state, new, now)
+    _remember(key, new, token)
+    return token, state
+
+
+def _remember(key: str, hashes: Dict[str, str], token: str) -> None:
+    with _SEEN_LOCK:
+        _SEEN[key] = (hashes, token)
+
+
+def current_version(slate: str, day: str, cards: Dict[int, Dict[str, Any]]) -> str:
+    """Token za pun odgovor; Redis se dira samo kad se slate promenio od poslednjeg poziva."""
+    key = _key(slate, day)
+    hashes = _hashes(cards)
+    with _SEEN_LOCK:
+        seen = _SEEN.get(key)
+    if seen is not None and seen[0] == hashes:
+        return seen[1]
+    token, _ = record_slate(slate, day, cards, hashes=hashes)
+    return token
+
+
+def reset_slate_memo() -> None:
+    with _SEEN_LOCK:
+        _SEEN.clear()
+
+
+def changes_since(state: Dict[str, Any], since: str) -> Optional[Tuple[Set[int], Set[int]]]:
+    """(promenjeni/dodati, uklonjeni) fixture id-jevi posle `since`; None -> klijent dobija ceo slate."""
+    parsed = _parse_token(since)
+    if parsed is None:
+        return None
+    epoch, version = parsed
+    if epoch != state["epoch"] or version < int(state["floor"]) or version > int(state["version"]):
+        return None
+    upserted: Set[int] = set()
+    removed: Set[int] = set()
+    for entry_version, fid, op in state["log"]:
+        if entry_version <= version:
+            continue
+        if op == "remove":
+            removed.add(fid)
+            upserted.discard(fid)
+        else:
+            upserted.add(fid)
+            removed.discard(fid)
+    return upserted, removed
+
+
+def delta_response(
+    slate: str,
+    day: str,
+    cards: Dict[int, Dict[str, Any]],
+    since: str,
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Zajednički put za `since=` zahteve: upiše slate i, ako je token validan, vrati deltu
+    {items, removed, version, delta: True}. Inače (token, None) -> ruta vraća ceo odgovor.
+    Uvek čita deljeno stanje, jer je token možda izdao drugi worker.
+    """
+    token, state = record_slate(slate, day, cards)
+    changes = changes_since(state, since)
+    if changes is None:
+        return token, None
+    upserted, removed = changes
+    items = [cards[fid] for fid in cards if fid in upserted]
+    return token, {"items": items, "removed": sorted(removed), "version": token, "delta": True, "total": len(items)}
@@ -0,0 +1,301 @@
+"""
+Trajno brojanje potrošnje upstream servisa: API-Football pozivi i OpenAI tokeni.
+
+Tok podataka:
+- request / background posao -> `backend/usage.py` ledger (in-process, po satu),
+- `flush()` svakih `USAGE_FLUSH_SECONDS` -> Redis hash po satu (`usage:hour:YYYYMMDDHH`, HINCRBYFLOAT),
+- lider (cache_claim) svakih `USAGE_PERSIST_SECONDS` prepisuje apsolutne satne zbirove
+  poslednjih `PERSIST_WINDOW_HOURS` u `upstream_usage_hourly` (idempotentan upsert).
+
+`report()` spaja DB (istorija) i Redis (tekući sati) i daje projekciju dnevne potrošnje
+naspram API-Football kvote i OpenAI token budžeta. Sati su u UTC (API-Football kvota se
+resetuje u 00:00 UTC).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.api_football import QUOTA_CACHE_KEY
+from backend.cache import cache_claim, cache_get, cache_get_fields, cache_incr_fields
+from backend.db import SessionLocal
+from backend.models.upstream_usage import UpstreamUsageHourly
+from backend.usage import LEDGER, decode_field, encode_field, hour_bucket
+
+logger = logging.getLogger("naksir.go_premium.usage")
+
+HOUR_KEY_TTL_SECONDS = 8 * 24 * 3600
+FLUSH_SECONDS = float(os.getenv("USAGE_FLUSH_SECONDS", "30"))
+PERSIST_SECONDS = float(os.getenv("USAGE_PERSIST_SECONDS", "300"))
+PERSIST_WINDOW_HOURS = 26
+PERSIST_LEADER_KEY = "usage:persist:leader"
+PROJECTION_WINDOW_HOURS = 3
+
+API_FOOTBALL_DAILY_QUOTA = int(os.getenv("API_FOOTBALL_DAILY_QUOTA", "7500"))
+OPENAI_DAILY_TOKEN_BUDGET = int(os.getenv("OPENAI_DAILY_TOKEN_BUDGET", "0"))  # 0 -> bez budžeta
+# USD po 1M tokena (gpt-4.1-mini cenovnik); samo za procenu troška u izveštaju
+OPENAI_PRICE_INPUT_PER_1M = float(os.getenv("OPENAI_PRICE_INPUT_PER_1M", "0.40"))
+OPENAI_PRICE_OUTPUT_PER_1M = float(os.getenv("OPENAI_PRICE_OUTPUT_PER_1M", "1.60"))
+
+_FLUSHER_LOCK = threading.Lock()
+_FLUSHER_STARTED = False
+
+
+def hour_key(hour: str) -> str:
+    return f"usage:hour:{hour}"
+
+
+def _hour_start(hour: str) -> datetime:
+    return datetime.strptime(hour, "%Y%m%d%H").replace(tzinfo=timezone.utc)
+
+
+def recent_hours(count: int, now: Optional[datetime] = None) -> List[str]:
+    now = now or datetime.now(timezone.utc)
+    return [hour_bucket(now - timedelta(hours=offset)) for offset in range(count)]
+
+
+def flush() -> int:
+    """Lokalni ledger -> satni Redis hash-evi; vraća broj polja."""
+    drained = LEDGER.drain()
+    written = 0
+    for hour, fields in list(drained.items()):
+        try:
+            cache_incr_fields(hour_key(hour), fields, HOUR_KEY_TTL_SECONDS)
+        except Exception:
+            LEDGER.restore(drained)
+            raise
+        written += len(fields)
+        drained.pop(hour)
+    return written
+
+
+def persist(session: Session, hours: Iterable[str]) -> int:
+    """Apsolutni satni zbirovi iz Redis-a -> `upstream_usage_hourly` (upsert; ponavljanje je bezbedno)."""
+    now = datetime.utcnow()
+    values: List[Dict[str, Any]] = []
+    for hour in hours:
+        for field, value in cache_get_fields(hour_key(hour)).items():
+            try:
+                source, family, route, app_id, unit = decode_field(field)
+            except ValueError:
+                continue
+            values.append(
+                {
+                    "hour": _hour_start(hour),
+                    "source": source,
+                    "family": family[:128],
+                    "route": route[:200],
+                    "app_id": app_id,
+                    "unit": unit,
+                    "value": value,
+                    "updated_at": now,
+                }
+            )
+    if not values:
+        return 0
+
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        for value in values:
+            _merge_row(session, value)
+        session.commit()
+        return len(values)
+
+    stmt = dialect_insert(UpstreamUsageHourly).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[
+            UpstreamUsageHourly.hour,
+            UpstreamUsageHourly.source,
+            UpstreamUsageHourly.family,
+            UpstreamUsageHourly.route,
+            UpstreamUsageHourly.app_id,
+            UpstreamUsageHourly.unit,
+        ],
+        set_={"value": stmt.excluded.value, "updated_at": stmt.excluded.updated_at},
+    )
+    session.execute(stmt)
+    session.commit()
+    return len(values)
+
+
+def _merge_row(session: Session, value: Dict[str, Any]) -> None:
+    row = session.execute(
+        select(UpstreamUsageHourly).where(
+            UpstreamUsageHourly.hour == value["hour"],
+            UpstreamUsageHourly.source == value["source"],
+            UpstreamUsageHourly.family == value["family"],
+            UpstreamUsageHourly.route == value["route"],
+            UpstreamUsageHourly.app_id == value["app_id"],
+            UpstreamUsageHourly.unit == value["unit"],
+        )
+    ).scalar_one_or_none()
+    if row is None:
+        session.add(UpstreamUsageHourly(**value))
+        return
+    row.value = value["value"]
+    row.updated_at = value["updated_at"]
+
+
+def _day_fields(session: Session, day: date) -> Dict[str, Dict[str, float]]:
+    """hour -> polja za ceo (UTC) dan; Redis (svežiji) zamenjuje DB kopiju istog sata."""
+    start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    out: Dict[str, Dict[str, float]] = defaultdict(dict)
+    rows = session.execute(
+        select(UpstreamUsageHourly).where(
+            UpstreamUsageHourly.hour >= start,
+            UpstreamUsageHourly.hour < start + timedelta(days=1),
+        )
+    ).scalars()
+    for row in rows:
+        hour = hour_bucket(row.hour if row.hour.tzinfo else row.hour.replace(tzinfo=timezone.utc))
+        out[hour][encode_field(row.source, row.family, row.route, row.app_id, row.unit)] = row.value
+    for offset in range(24):
+        hour = hour_bucket(start + timedelta(hours=offset))
+        fields = cache_get_fields(hour_key(hour))
+        if fields:
+            out[hour] = dict(fields)
+    return out
+
+
+def _project(total: float, by_hour: Dict[str, float], day: date, now: datetime) -> float:
+    """Linearna projekcija do kraja dana po tempu poslednjih `PROJECTION_WINDOW_HOURS` sati."""
+    if day != now.date():
+        return total
+    elapsed = now.hour + now.minute / 60 + now.second / 3600
+    window_start = max(0, now.hour - PROJECTION_WINDOW_HOURS + 1)
+    window_hours = max(elapsed - window_start, 0.25)
+    recent = sum(v for hour, v in by_hour.items() if int(hour[-2:]) >= window_start)
+    return round(total + recent / window_hours * (24 - elapsed))
+
+
+def _top(counter: Counter, limit: int = 20) -> Dict[str, float]:
+    return {key: round(value, 2) for key, value in counter.most_common(limit)}
+
+
+def report(session: Session, day: Optional[date] = None, now: Optional[datetime] = None) -> Dict[str, Any]:
+    now = (now or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    day = day or now.date()
+
+    api: Dict[str, Counter] = {name: Counter() for name in ("endpoint", "route", "app_id", "hour")}
+    llm_units: Counter = Counter()
+    llm: Dict[str, Counter] = {name: Counter() for name in ("kind", "route", "app_id", "hour")}
+    combos: Counter = Counter()
+
+    for hour, fields in _day_fields(session, day).items():
+        hh = hour[-2:]
+        for field, value in fields.items():
+            try:
+                source, family, route, app_id, unit = decode_field(field)
+            except ValueError:
+                continue
+            if source == "api_football" and unit == "calls":
+                api["endpoint"][family] += value
+                api["route"][route] += value
+                api["app_id"][app_id] += value
+                api["hour"][hh] += value
+                combos[f"api_football {family} {route} {app_id}"] += value
+            elif source == "openai":
+                llm_units[unit] += value
+                if unit == "calls":
+                    continue
+                llm["kind"][family] += value
+                llm["route"][route] += value
+                llm["app_id"][app_id] += value
+                llm["hour"][hh] += value
+                combos[f"openai {family} {route} {app_id}"] += value
+
+    api_calls = sum(api["endpoint"].values())
+    api_projected = _project(api_calls, dict(api["hour"]), day, now)
+    tokens = llm_units["prompt_tokens"] + llm_units["completion_tokens"]
+    tokens_projected = _project(tokens, dict(llm["hour"]), day, now)
+    quota_header = cache_get(QUOTA_CACHE_KEY)
+
+    return {
+        "day": day.isoformat(),
+        "timezone": "UTC",
+        "generated_at": now.isoformat(),
+        "api_football": {
+            "calls": int(api_calls),
+            "daily_quota": API_FOOTBALL_DAILY_QUOTA,
+            "projected_calls": int(api_projected),
+            "projected_quota_pct": round(100 * api_projected / API_FOOTBALL_DAILY_QUOTA, 1)
+            if API_FOOTBALL_DAILY_QUOTA
+            else None,
+            "last_quota_header": quota_header,
+            "by_endpoint": _top(api["endpoint"]),
+            "by_route": _top(api["route"]),
+            "by_app_id": _top(api["app_id"]),
+            "by_hour": dict(sorted(api["hour"].items())),
+        },
+        "openai": {
+            "calls": int(llm_units["calls"]),
+            "prompt_tokens": int(llm_units["prompt_tokens"]),
+            "completion_tokens": int(llm_units["completion_tokens"]),
+            "estimated_cost_usd": round(
+                llm_units["prompt_tokens"] / 1e6 * OPENAI_PRICE_INPUT_PER_1M
+                + llm_units["completion_tokens"] / 1e6 * OPENAI_PRICE_OUTPUT_PER_1M,
+                4,
+            ),
+            "daily_token_budget": OPENAI_DAILY_TOKEN_BUDGET or None,
+            "projected_tokens": int(tokens_projected),
+            "projected_budget_pct": round(100 * tokens_projected / OPENAI_DAILY_TOKEN_BUDGET, 1)
+            if OPENAI_DAILY_TOKEN_BUDGET
+            else None,
+            "tokens_by_kind": _top(llm["kind"]),
+            "tokens_by_route": _top(llm["route"]),
+            "tokens_by_app_id": _top(llm["app_id"]),
+            "tokens_by_hour": dict(sorted(llm["hour"].items())),
+        },
+        "top_consumers": _top(combos),
+    }
+
+
+def start_usage_flusher(
+    flush_seconds: float = FLUSH_SECONDS, persist_seconds: float = PERSIST_SECONDS
+) -> None:
+    """Pokreće (jednom po procesu) daemon thread: flush ledger-a + periodičan DB persist (lider)."""
+    global _FLUSHER_STARTED
+    if flush_seconds <= 0:
+        return
+    with _FLUSHER_LOCK:
+        if _FLUSHER_STARTED:
+            return
+        _FLUSHER_STARTED = True
+
+    owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def _loop() -> None:
+        last_persist = time.monotonic()
+        while True:
+            time.sleep(flush_seconds)
+            try:
+                flush()
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("usage flush failed: %s", exc)
+                continue
+            if persist_seconds <= 0 or time.monotonic() - last_persist < persist_seconds:
+                continue
+            last_persist = time.monotonic()
+            try:
+                if not cache_claim(PERSIST_LEADER_KEY, owner, persist_seconds):
+                    continue
+                with SessionLocal() as session:
+                    persist(session, recent_hours(PERSIST_WINDOW_HOURS))
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("usage persist failed: %s", exc)
+
+    threading.Thread(target=_loop, name="usage-flusher", daemon=True).start()
@@ -1,12 +1,27 @@
 from __future__ import annotations
 
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import literal, select
 from sqlalchemy.orm import Session
 
+from backend.cache import cache_get, cache_set
 from backend.models import CoinsWallet, User
 from backend.models.enums import AuthProvider
 
 DEFAULT_APP_ID = "naksir.go_premium"
 
+IDENTITY_CACHE_TTL_SECONDS = int(os.getenv("USER_IDENTITY_CACHE_TTL_SECONDS", str(24 * 3600)))
+IDENTITY_LOCAL_TTL_SECONDS = float(os.getenv("USER_IDENTITY_LOCAL_TTL_SECONDS", "3600"))
+IDENTITY_LOCAL_MAX_ENTRIES = int(os.getenv("USER_IDENTITY_LOCAL_MAX_ENTRIES", "10000"))
+
 
 def get_or_create_user(
     session: Session, install_id: str, app_id: str = DEFAULT_APP_ID
@@ -34,6 +49,168 @@ def get_or_create_user(
     return user, wallet
 
 
+@dataclass(frozen=True)
+class UserIdentity:
+    user_id: uuid.UUID
+    wallet_id: uuid.UUID  # coins_wallet PK je user_id
+
+
+class _IdentityLRU:
+    """Mali in-process LRU sa TTL-om ispred Redis-a (identitet se ne menja, samo nastaje)."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._items: OrderedDict[str, tuple[float, UserIdentity]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[UserIdentity]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            expires_at, identity = entry
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return identity
+
+    def put(self, key: str, identity: UserIdentity) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl_seconds, identity)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+_LOCAL_IDENTITIES = _IdentityLRU(IDENTITY_LOCAL_MAX_ENTRIES, IDENTITY_LOCAL_TTL_SECONDS)
+
+
+def _identity_cache_key(install_id: str, app_id: str) -> str:
+    return f"user_identity:{app_id}:{install_id}"
+
+
+def _insert_identity(session: Session, install_id: str, app_id: str) -> Optional[uuid.UUID]:
+    """
+    Novi user + wallet bez prethodnog SELECT-a. Na Postgres-u jedan round-trip:
+    INSERT users ... ON CONFLICT (app_id, device_id) DO NOTHING RETURNING id kao CTE,
+    iz kog se puni coins_wallet. None ako user već postoji (konflikt).
+    """
+    now = datetime.utcnow()
+    user_values = {
+        "id": uuid.uuid4(),
+        "app_id": app_id,
+        "device_id": install_id,
+        "auth_provider": AuthProvider.device,
+        "is_banned": False,
+        "created_at": now,
+    }
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+
+        new_user = (
+            dialect_insert(User)
+            .values(user_values)
+            .on_conflict_do_nothing(index_elements=[User.app_id, User.device_id])
+            .returning(User.id)
+            .cte("new_user")
+        )
+        stmt = (
+            dialect_insert(CoinsWallet)
+            .from_select(
+                ["user_id", "balance", "free_reward_used", "updated_at"],
+                select(new_user.c.id, literal(0), literal(False), literal(now, CoinsWallet.updated_at.type)),
+            )
+            .on_conflict_do_nothing(index_elements=[CoinsWallet.user_id])
+            .returning(CoinsWallet.user_id)
+        )
+        return session.execute(stmt).scalar()
+    if dialect == "sqlite":
+        # sqlite ne podržava DML u CTE-u -> dva INSERT-a, i dalje bez SELECT-a
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+        user_id = session.execute(
+            dialect_insert(User)
+            .values(user_values)
+            .on_conflict_do_nothing(index_elements=[User.app_id, User.device_id])
+            .returning(User.id)
+        ).scalar()
+        if user_id is not None:
+            session.execute(
+                dialect_insert(CoinsWallet)
+                .values(user_id=user_id, balance=0, free_reward_used=False, updated_at=now)
+                .on_conflict_do_nothing(index_elements=[CoinsWallet.user_id])
+            )
+        return user_id
+
+    user, wallet = get_or_create_user(session, install_id, app_id)
+    session.flush()
+    return wallet.user_id
+
+
+def _load_identity(session: Session, install_id: str, app_id: str) -> tuple[UserIdentity, bool]:
+    """(identitet, da li je nešto upisano). User iz baze bez wallet-a (stari redovi) dobija wallet."""
+    user_id = _insert_identity(session, install_id, app_id)
+    if user_id is not None:
+        return UserIdentity(user_id=user_id, wallet_id=user_id), True
+
+    row = session.execute(
+        select(User.id, CoinsWallet.user_id)
+        .outerjoin(CoinsWallet, CoinsWallet.user_id == User.id)
+        .where(User.app_id == app_id, User.device_id == install_id)
+    ).one()
+    user_id, wallet_id = row
+    if wallet_id is not None:
+        return UserIdentity(user_id=user_id, wallet_id=wallet_id), False
+
+    _user, wallet = get_or_create_user(session, install_id, app_id)
+    session.flush()
+    return UserIdentity(user_id=user_id, wallet_id=wallet.user_id), True
+
+
+def get_user_identity(session: Session, install_id: str, app_id: str = DEFAULT_APP_ID) -> UserIdentity:
+    """
+    (install_id, app_id) -> (user_id, wallet_id), read-through: in-process LRU -> Redis -> DB.
+
+    Pogodak u kešu ne dira bazu. Promašaj radi INSERT ... ON CONFLICT DO NOTHING RETURNING
+    (novi korisnik) ili jedan SELECT (postojeći). Novi redovi se odmah commit-uju da keš
+    nikad ne pokazuje na identitet koji je kasnije rollback-ovan, zato se poziva pre
+    ostalog rada u sesiji. Za izmenu wallet-a koristi `get_or_create_user` (ORM objekti).
+    """
+    key = _identity_cache_key(install_id, app_id)
+    identity = _LOCAL_IDENTITIES.get(key)
+    if identity is not None:
+        return identity
+
+    cached = cache_get(key)
+    if isinstance(cached, dict) and cached.get("user_id") and cached.get("wallet_id"):
+        identity = UserIdentity(user_id=uuid.UUID(cached["user_id"]), wallet_id=uuid.UUID(cached["wallet_id"]))
+        _LOCAL_IDENTITIES.put(key, identity)
+        return identity
+
+    identity, created = _load_identity(session, install_id, app_id)
+    if created:
+        session.commit()
+    cache_set(
+        key,
+        {"user_id": str(identity.user_id), "wallet_id": str(identity.wallet_id)},
+        IDENTITY_CACHE_TTL_SECONDS,
+    )
+    _LOCAL_IDENTITIES.put(key, identity)
+    return identity
+
+
+def reset_identity_cache() -> None:
+    """Samo in-process sloj (testovi / posle brisanja korisnika u istom procesu)."""
+    _LOCAL_IDENTITIES.clear()
+
+
 def mark_free_reward_used(session: Session, wallet: CoinsWallet) -> CoinsWallet:
     wallet.free_reward_used = True
     session.add(wallet)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import pathlib
+import sys
+from datetime import datetime, timedelta
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tests.conftest  # noqa: E402,F401
+
+pytest_plugins = ["tests.conftest"]
+
+from backend.models.ai_analysis_cache import AiAnalysisCache  # noqa: E402
+from backend.services import ai_analysis_cache_service  # noqa: E402
+
+
+def _generating_row(cache_key: str, *, owner: str, expires_at: datetime) -> AiAnalysisCache:
+    return AiAnalysisCache(
+        fixture_id=555,
+        cache_key=cache_key,
+        status="generating",
+        analysis_version="v1",
+        lang="en",
+        model="default",
+        lease_owner=owner,
+        lease_expires_at=expires_at,
+    )
+
+
+def test_expired_lease_is_taken_over_live_lease_is_not(db_session) -> None:
+    cache_key = ai_analysis_cache_service.make_cache_key(fixture_id=555, prompt_version="v1", locale="en")
+    db_session.add(_generating_row(cache_key, owner="dead-worker", expires_at=datetime.utcnow() + timedelta(seconds=60)))
+    db_session.commit()
+
+    kwargs = {
+        "fixture_id": 555,
+        "cache_key": cache_key,
+        "prompt_version": "v1",
+        "locale": "en",
+        "model": "default",
+    }
+    assert not ai_analysis_cache_service.try_mark_generating(db_session, owner_id="worker-b", **kwargs)
+
+    row = ai_analysis_cache_service.get_cached_row(db_session, cache_key)
+    row.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db_session.commit()
+    assert ai_analysis_cache_service.is_lease_expired(row)
+
+    assert ai_analysis_cache_service.try_mark_generating(db_session, owner_id="worker-b", **kwargs)
+    # drugi pokušaj istog trenutka gubi: lease je upravo obnovljen
+    assert not ai_analysis_cache_service.try_mark_generating(db_session, owner_id="worker-c", **kwargs)
+
+    db_session.expire_all()
+    row = ai_analysis_cache_service.get_cached_row(db_session, cache_key)
+    assert row.lease_owner == "worker-b"
+    assert ai_analysis_cache_service.renew_lease(cache_key, owner_id="worker-b")
+    assert not ai_analysis_cache_service.renew_lease(cache_key, owner_id="dead-worker")
+
+
+def test_sweeper_marks_orphaned_rows_failed(db_session) -> None:
+    stale_key = ai_analysis_cache_service.make_cache_key(fixture_id=556, prompt_version="v1", locale="en")
+    live_key = ai_analysis_cache_service.make_cache_key(fixture_id=557, prompt_version="v1", locale="en")
+    now = datetime.utcnow()
+    db_session.add(_generating_row(stale_key, owner="dead", expires_at=now - timedelta(seconds=5)))
+    db_session.add(_generating_row(live_key, owner="alive", expires_at=now + timedelta(seconds=60)))
+    db_session.commit()
+
+    assert ai_analysis_cache_service.sweep_expired_leases(db_session, now=now) == 1
+
+    db_session.expire_all()
+    stale = ai_analysis_cache_service.get_cached_row(db_session, stale_key)
+    live = ai_analysis_cache_service.get_cached_row(db_session, live_key)
+    assert stale.status == "failed"
+    assert stale.error == ai_analysis_cache_service.STALE_LEASE_ERROR
+    assert stale.lease_owner is None
+    assert live.status == "generating"
+
+
+def test_late_save_from_expired_owner_does_not_touch_new_owner_row(db_session) -> None:
+    cache_key = ai_analysis_cache_service.make_cache_key(fixture_id=558, prompt_version="v1", locale="en")
+    kwargs = {
+        "fixture_id": 558,
+        "cache_key": cache_key,
+        "prompt_version": "v1",
+        "locale": "en",
+        "model": "default",
+    }
+    assert ai_analysis_cache_service.try_mark_generating(db_session, owner_id="worker-a", **kwargs)
+
+    # A je zaglavio, lease mu ističe i B preuzima generaciju
+    row = ai_analysis_cache_service.get_cached_row(db_session, cache_key)
+    row.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db_session.commit()
+    assert ai_analysis_cache_service.try_mark_generating(db_session, owner_id="worker-b", **kwargs)
+
+    late = {"analysis": {"btts_probability": {"yes": 70, "no": 30}}}
+    assert not ai_analysis_cache_service.save_ok(
+        db_session, cache_key=cache_key, fixture_id=558, analysis_json=late, owner_id="worker-a"
+    )
+    assert not ai_analysis_cache_service.save_failed(
+        db_session, cache_key=cache_key, fixture_id=558, error="timeout", owner_id="worker-a"
+    )
+
+    db_session.expire_all()
+    row = ai_analysis_cache_service.get_cached_row(db_session, cache_key)
+    assert (row.status, row.lease_owner, row.analysis_json, row.error) == ("generating", "worker-b", None, None)
+
+    fresh = {"analysis": {"summary": "b"}}
+    assert ai_analysis_cache_service.save_ok(
+        db_session, cache_key=cache_key, fixture_id=558, analysis_json=fresh, owner_id="worker-b"
+    )
+    db_session.expire_all()
+    row = ai_analysis_cache_service.get_cached_row(db_session, cache_key)
+    assert (row.status, row.lease_owner, row.analysis_json) == ("ready", None, fresh)
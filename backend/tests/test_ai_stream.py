@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import pathlib
+import sys
+import threading
+import time
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tests.conftest  # noqa: E402,F401
+
+pytest_plugins = ["tests.conftest"]
+
+from backend import api_football  # noqa: E402
+from backend.routers import ai as ai_router  # noqa: E402
+from backend.services import ai_analysis_cache_service  # noqa: E402
+from backend.services.ai_stream_service import AnalysisStream, IncrementalAnalysisParser  # noqa: E402
+
+
+def _parse_sse(body: str) -> list[tuple[str, Any]]:
+    events: list[tuple[str, Any]] = []
+    for frame in body.split("\n\n"):
+        name = None
+        data = None
+        for line in frame.splitlines():
+            if line.startswith("event: "):
+                name = line[len("event: ") :]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: ") :])
+        if name:
+            events.append((name, data))
+    return events
+
+
+def test_incremental_parser_emits_preview_then_blocks() -> None:
+    parser = IncrementalAnalysisParser()
+    chunks = ['{"prev', 'iew": "Home side ', 'looks sharp', '.", "btts": {"yes_pct": 6', "1}", "}"]
+    events: list[tuple[str, Any]] = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+
+    deltas = "".join(data["text"] for name, data in events if name == "preview_delta")
+    blocks = [data for name, data in events if name == "block"]
+    assert deltas == "Home side looks sharp."
+    assert [b["key"] for b in blocks] == ["preview", "btts"]
+    assert blocks[1]["value"] == {"yes_pct": 61}
+
+
+def test_ai_analysis_stream_persists_result(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient, db_session
+) -> None:
+    analysis = {"preview": "Streamed preview.", "key_factors": ["form"], "btts": {"yes_pct": 58}}
+    text = json.dumps(analysis)
+
+    monkeypatch.setattr(api_football, "get_fixture_by_id", lambda _fixture_id: {"league": {"id": 39}})
+    monkeypatch.setattr(ai_router, "build_full_match", lambda _fixture: {"odds": None})
+    monkeypatch.setattr(
+        ai_router,
+        "stream_ai_analysis",
+        lambda **_kwargs: iter([text[i : i + 7] for i in range(0, len(text), 7)]),
+    )
+
+    response = client.post(
+        "/matches/777/ai-analysis/stream",
+        headers={"X-API-Key": "test-token", "X-Install-Id": "dev-install-stream"},
+        json={},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(response.text)
+    names = [name for name, _ in events]
+    assert names[0] == "status"
+    assert "preview_delta" in names
+    assert names.index("preview_delta") < names.index("result")
+    assert names[-1] == "result"
+    result = events[-1][1]
+    assert result["analysis"]["preview"] == "Streamed preview."
+    assert result["cached"] is False
+
+    cache_key = ai_analysis_cache_service.make_cache_key(fixture_id=777, prompt_version="v1", locale="en")
+    row = ai_analysis_cache_service.get_cached_ok(db_session, cache_key)
+    assert row is not None
+    assert row.analysis_json["analysis"]["preview"] == "Streamed preview."
+
+
+def test_stream_subscriber_waits_on_event_loop_not_a_thread() -> None:
+    stream = AnalysisStream(app_id="naksir.go_premium", cache_key="ai:stream:test")
+    stream.publish("status", {"status": "generating"})
+
+    async def _collect(last_event_id: int | None = None) -> list[str]:
+        return [frame async for frame in stream.subscribe(last_event_id=last_event_id, heartbeat_seconds=0.05)]
+
+    def _produce() -> None:
+        time.sleep(0.15)  # bar jedan keep-alive pre sledećeg eventa
+        stream.publish("block", {"key": "preview", "value": "x"})
+        stream.finish("result", {"cached": False})
+
+    async def _run() -> tuple[list[str], list[str]]:
+        threads_before = threading.active_count()
+        viewers = [asyncio.create_task(_collect()) for _ in range(20)]
+        await asyncio.sleep(0.01)
+        # 20 gledalaca ne zauzima ni jedan dodatni thread
+        assert threading.active_count() == threads_before
+        producer = threading.Thread(target=_produce)
+        producer.start()
+        results = await asyncio.gather(*viewers)
+        producer.join()
+        return results[0], await _collect(last_event_id=0)
+
+    live, replay = asyncio.run(_run())
+    assert ": keep-alive\n\n" in live
+    assert [name for name, _ in _parse_sse("".join(live))] == ["status", "block", "result"]
+    assert "id: 2\nevent: result" in live[-1]
+    # završen stream: replay od Last-Event-ID bez čekanja
+    assert [name for name, _ in _parse_sse("".join(replay))] == ["block", "result"]
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import asyncio
+import pathlib
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tests.conftest  # noqa: E402,F401
+
+from backend import db  # noqa: E402
+
+pytest_plugins = ["tests.conftest"]
+
+
+def test_async_database_url_selection(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("ASYNC_DATABASE_URL", raising=False)
+    assert db._async_database_url("postgresql+psycopg://u:p@h/db") == "postgresql+psycopg://u:p@h/db"
+    assert db._async_database_url("sqlite:///./test.db") is None
+
+    monkeypatch.setenv("ASYNC_DATABASE_URL", "postgres://u:p@h/db")
+    assert db._async_database_url("sqlite:///./test.db") == "postgresql+psycopg://u:p@h/db"
+
+
+def test_get_async_db_falls_back_to_threaded_session_without_async_driver() -> None:
+    assert db.AsyncSessionLocal is None  # test DB je sqlite bez aiosqlite
+
+    async def _use() -> int:
+        gen = db.get_async_db()
+        session = await gen.__anext__()
+        assert isinstance(session, db.ThreadedSession)
+        value = await session.run_sync(lambda s, n: s.execute(text(f"SELECT {n}")).scalar_one(), 7)
+        await gen.aclose()
+        return value
+
+    assert asyncio.run(_use()) == 7
+
+
+def test_health_and_cached_matches_run_on_async_session(monkeypatch: pytest.MonkeyPatch, client: TestClient) -> None:
+    from backend.routers import ai as ai_router
+
+    monkeypatch.setattr(ai_router.api_football, "get_fixtures_next_days", lambda _days: [])
+    headers = {"X-API-Key": "test-token"}
+
+    assert client.get("/health", headers=headers).json() == {"status": "ok", "db": "ok"}
+    assert client.get("/ai/cached-matches", headers=headers).json() == {"items": [], "total": 0}
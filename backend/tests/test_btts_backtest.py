@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+from backend.services.btts_backtest_service import (
+    calibration,
+    expand_grid,
+    max_drawdown,
+    run_backtest,
+)
+from backend.services.history_archive import write_day
+
+YES_STATS = {
+    "home_scored_avg_5": 1.5,
+    "away_scored_avg_5": 1.4,
+    "home_conceded_avg_5": 1.2,
+    "away_conceded_avg_5": 1.1,
+    "both_btts_rate_10": 0.7,
+    "under_tendency": 0.2,
+}
+
+
+def _fixture(fid: int, league: int, day: date, odds: float, goals: tuple[int, int]) -> dict:
+    return {
+        "fixture": {"id": fid, "date": f"{day.isoformat()}T18:00:00Z", "status": {"short": "FT"}},
+        "league": {"id": league, "name": f"L{league}"},
+        "teams": {"home": {"id": fid * 10, "name": "H"}, "away": {"id": fid * 10 + 1, "name": "A"}},
+        "goals": {"home": goals[0], "away": goals[1]},
+        "odds": {"btts_yes": odds},
+        "stats": YES_STATS,
+    }
+
+
+def _write_archive(tmp_path: Path, days: int) -> Path:
+    rng = random.Random(11)
+    start = date(2026, 1, 1)
+    for d in range(days):
+        day = start + timedelta(days=d)
+        fixtures = [
+            _fixture(d * 100 + i, i, day, round(rng.uniform(1.30, 1.55), 2), (rng.randrange(3), rng.randrange(3)))
+            for i in range(1, 6)
+        ]
+        write_day(tmp_path, day, fixtures)
+    return tmp_path
+
+
+def test_backtest_reports_per_param_set_and_matches_across_workers(tmp_path: Path) -> None:
+    archive = _write_archive(tmp_path, 6)
+    grid = expand_grid(min_score_3=[75, 101])
+    inline = run_backtest(archive, grid, workers=1, top_league_ids={1, 2, 3, 4, 5})
+    parallel = run_backtest(archive, grid, workers=2, top_league_ids={1, 2, 3, 4, 5})
+    assert inline == parallel
+
+    three_legs, two_legs = inline
+    assert three_legs["days"] == 6
+    yes = three_legs["by_type"]["BTTS_YES"]
+    assert yes["tickets"] == 6 and yes["legs"] == 18
+    assert two_legs["by_type"]["BTTS_YES"]["legs"] == 12
+    assert three_legs["by_type"]["BTTS_NO"]["tickets"] == 0
+    assert 0 <= yes["hit_rate"] <= 1
+    assert yes["roi"] == round(yes["profit"] / yes["staked"], 4)
+
+
+def test_metrics_helpers() -> None:
+    assert max_drawdown([1.0, -1.0, -1.0, 2.0, -1.0]) == 2.0
+    cal = calibration([(0.86, True), (0.87, False), (0.61, True)])
+    assert [row["n"] for row in cal["bins"]] == [1, 2]
+    assert cal["bins"][1]["observed"] == 0.5
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import pathlib
+import random
+import sys
+from typing import Any
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tests.conftest  # noqa: E402,F401
+
+pytest_plugins = ["tests.conftest"]
+
+from backend.ai_analysis import build_btts_v1_analysis  # noqa: E402
+from backend.services import ai_analysis_cache_service  # noqa: E402
+from backend.services.btts_batch_service import (  # noqa: E402
+    BTTS_PROMPT_VERSION,
+    btts_features_from_full_match,
+    precompute_btts_board,
+    score_btts_slate,
+)
+
+
+def _maybe(rng: random.Random, value: Any) -> Any:
+    return value if rng.random() > 0.2 else None
+
+
+def _random_full_match(rng: random.Random) -> dict[str, Any]:
+    def side() -> dict[str, Any]:
+        return {
+            "btts_rate": _maybe(rng, rng.choice([0, 20, 40, 60, 80, 100])),
+            "scored_pg": _maybe(rng, round(rng.uniform(0, 2.5), 2)),
+            "conceded_pg": _maybe(rng, round(rng.uniform(0, 2.5), 2)),
+            "clean_sheet_rate": _maybe(rng, rng.choice([0, 20, 40, 60, 80])),
+            "scored_home_pg": _maybe(rng, round(rng.uniform(0, 2.5), 2)),
+            "scored_away_pg": _maybe(rng, round(rng.uniform(0, 2.5), 2)),
+        }
+
+    h2h = [
+        {"goals": {"home": _maybe(rng, rng.randint(0, 3)), "away": rng.randint(0, 3)}}
+        for _ in range(rng.randint(0, 5))
+    ]
+    return {
+        "form": {"home": side(), "away": side()},
+        "statistics": {"home": side(), "away": side()},
+        "h2h": {"matches": h2h} if rng.random() > 0.5 else h2h,
+        "absences": {"home_key_def_absent": rng.random() > 0.8},
+        "importance": rng.choice([None, "final", "regular"]),
+        "league": {"name": rng.choice(["Bundesliga", "Serie A", "Premier League"])},
+        "odds": {"flat_probabilities": {"btts_yes": _maybe(rng, rng.choice([0.45, 0.52, 0.6, 58.0]))}},
+    }
+
+
+def test_batch_scoring_matches_scalar_scorer() -> None:
+    rng = random.Random(7)
+    matches = {fid: _random_full_match(rng) for fid in range(1, 301)}
+
+    features = [btts_features_from_full_match(fid, fm) for fid, fm in matches.items()]
+    blocks = score_btts_slate(features)
+
+    for fid, full_match in matches.items():
+        assert blocks[fid] == build_btts_v1_analysis(full_match)["btts"], fid
+
+
+def test_precompute_board_bulk_upserts(db_session) -> None:
+    rng = random.Random(11)
+    features = [btts_features_from_full_match(fid, _random_full_match(rng)) for fid in (10, 11, 12)]
+
+    assert precompute_btts_board(db_session, features, app_id="btts.predictor") == 3
+    # drugi prolaz radi update postojećih redova (ON CONFLICT), bez duplikata
+    assert precompute_btts_board(db_session, features[:2], app_id="btts.predictor") == 2
+
+    rows = ai_analysis_cache_service.list_cached_ready_for_fixture_ids(
+        db_session, [10, 11, 12], app_id="btts.predictor"
+    )
+    assert sorted(rows) == [10, 11, 12]
+    row = rows[10]
+    assert row.cache_key == ai_analysis_cache_service.make_cache_key(
+        fixture_id=10, prompt_version=BTTS_PROMPT_VERSION, locale="en"
+    )
+    assert "yes_pct" in row.analysis_json["analysis"]["btts"]
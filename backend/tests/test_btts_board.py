@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import pathlib
+import sys
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tests.conftest  # noqa: E402,F401
+
+pytest_plugins = ["tests.conftest"]
+
+from backend.routers import btts as btts_router  # noqa: E402
+from backend.services import ai_analysis_cache_service  # noqa: E402
+from backend.services.btts_board_service import DayBoard  # noqa: E402
+
+APP_ID = "btts.predictor"
+HEADERS = {"X-API-Key": "test-token", "X-App-Id": APP_ID}
+
+
+def _fixture(fid: int, short: str = "NS", goals: tuple[Any, Any] = (None, None)) -> dict[str, Any]:
+    return {
+        "fixture": {"id": fid, "date": f"2026-10-19T{10 + fid:02d}:00:00Z", "status": {"short": short}},
+        "league": {"id": 39, "name": "Premier League"},
+        "teams": {"home": {"id": fid * 10, "name": "H"}, "away": {"id": fid * 10 + 1, "name": "A"}},
+        "goals": {"home": goals[0], "away": goals[1]},
+    }
+
+
+def _item(fx: dict[str, Any], badge: dict[str, Any] | None) -> dict[str, Any]:
+    return btts_router._build_flashscore_item(fx, btts_badge=badge)
+
+
+def test_board_rebuilds_only_changed_items_and_reindexes_states() -> None:
+    board = DayBoard(APP_ID, "2026-10-19", _item)
+    badge_calls: list[list[int]] = []
+
+    def _badges(ids: list[int]) -> dict[int, dict[str, Any]]:
+        badge_calls.append(list(ids))
+        return {2: {"yes_pct": 70}}
+
+    board.sync([_fixture(1), _fixture(2), _fixture(3)], badge_version="v1", load_badges=_badges)
+    assert board.rebuilt_items == 3
+    assert [it["fixture_id"] for it in board.slice("prematch")] == [1, 2, 3]
+
+    board.sync([_fixture(1, "1H", (1, 0)), _fixture(2), _fixture(3)], badge_version="v1", load_badges=_badges)
+    assert board.rebuilt_items == 4
+    assert badge_calls == [[1, 2, 3]]
+    live = board.slice("live")
+    assert [it["fixture_id"] for it in live] == [1]
+    assert live[0]["score"] == {"home": 1, "away": 0}
+    assert [it["fixture_id"] for it in board.slice("prematch")] == [2, 3]
+
+    board.sync([_fixture(1, "FT", (1, 1)), _fixture(2)], badge_version="v1", load_badges=_badges)
+    assert [it["fixture_id"] for it in board.slice("all")] == [1, 2]
+    assert [it["fixture_id"] for it in board.slice("finished")] == [1]
+
+    assert board.slice("all", include_badge=False)[1]["btts_badge"] is None
+    assert board.slice("all")[1]["btts_badge"] == {"yes_pct": 70}
+
+    board.apply_badge(1, {"yes_pct": 55})
+    assert board.slice("finished")[0]["btts_badge"] == {"yes_pct": 55}
+
+
+def test_board_reloads_badges_when_version_changes() -> None:
+    board = DayBoard(APP_ID, "2026-10-19", _item)
+    badges: dict[int, dict[str, Any]] = {}
+    board.sync([_fixture(1), _fixture(2)], badge_version="v1", load_badges=lambda ids: dict(badges))
+    assert board.rebuilt_items == 2
+
+    badges[2] = {"yes_pct": 61}
+    assert not board.needs_sync("v1", now=board.synced_at + 1)
+    assert board.needs_sync("v2", now=board.synced_at + 1)
+    board.sync([_fixture(1), _fixture(2)], badge_version="v2", load_badges=lambda ids: dict(badges))
+    assert board.rebuilt_items == 3
+    assert board.slice("all")[1]["btts_badge"] == {"yes_pct": 61}
+
+
+def test_today_route_serves_board_until_badge_written(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient, db_session
+) -> None:
+    calls = {"fetch": 0}
+
+    def _fetch(_offset: int) -> list[dict[str, Any]]:
+        calls["fetch"] += 1
+        return [_fixture(1), _fixture(2, "2H", (0, 1))]
+
+    monkeypatch.setattr(btts_router, "_fetch_fixtures_for_day", _fetch)
+
+    resp = client.get("/btts/matches/today", params={"filter": "live"}, headers=HEADERS)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert {k: body[k] for k in ("total", "day", "delta")} == {"total": 1, "day": "today", "delta": False}
+    assert body["version"]
+    assert resp.json()["items"][0]["fixture_id"] == 2
+
+    resp = client.get("/btts/matches/today", headers=HEADERS)
+    assert [it["fixture_id"] for it in resp.json()["items"]] == [1, 2]
+    assert calls["fetch"] == 1
+
+    ai_analysis_cache_service.save_ok(
+        db_session,
+        cache_key=ai_analysis_cache_service.make_cache_key(fixture_id=1, prompt_version="btts-v1", locale="en"),
+        fixture_id=1,
+        analysis_json={"analysis": {"btts": {"yes_pct": 58, "no_pct": 42}}},
+        app_id=APP_ID,
+    )
+    resp = client.get("/btts/matches/today", params={"filter": "prematch"}, headers=HEADERS)
+    assert calls["fetch"] == 2
+    assert resp.json()["items"][0]["btts_badge"]["yes_pct"] == 58
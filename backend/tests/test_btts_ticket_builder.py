@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import pathlib
+import sys
+import threading
+import time
+from datetime import date
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tests.conftest  # noqa: E402,F401
+
+pytest_plugins = ["tests.conftest"]
+
+from backend.routers import btts_tickets as btts_tickets_router  # noqa: E402
+from backend.services import btts_service, btts_ticket_builder  # noqa: E402
+
+HEADERS = {"X-API-Key": "test-token", "X-App-Id": "btts.predictor"}
+STATS = {
+    "home_scored_avg_5": 1.5,
+    "away_scored_avg_5": 1.4,
+    "home_conceded_avg_5": 1.2,
+    "away_conceded_avg_5": 1.1,
+    "both_btts_rate_10": 0.7,
+}
+
+
+def _fixtures(odds: float = 1.40, stats: dict[str, Any] | None = None) -> list[dict[str, Any]]:
+    return [
+        {
+            "fixture": {"id": fid, "date": "2026-10-19T18:00:00Z", "status": {"short": "NS"}},
+            "league": {"id": fid, "name": f"L{fid}"},
+            "teams": {"home": {"id": fid * 10, "name": "H"}, "away": {"id": fid * 10 + 1, "name": "A"}},
+            "odds": {"btts_yes": odds + fid / 100},
+            "stats": STATS if stats is None else stats,
+        }
+        for fid in (1, 2, 3)
+    ]
+
+
+@pytest.fixture
+def day(monkeypatch: pytest.MonkeyPatch) -> date:
+    # svaki test dobija svoj dan, da artefakti iz cache-a ne cure između testova
+    unique = date.fromordinal(date(2030, 1, 1).toordinal() + time.time_ns() % 100_000)
+    monkeypatch.setattr(btts_ticket_builder, "today_local", lambda: unique)
+    monkeypatch.setattr(btts_tickets_router, "today_local", lambda: unique)
+    return unique
+
+
+def test_concurrent_cold_start_builds_once(day: date) -> None:
+    calls = {"n": 0}
+
+    def _slow_fixtures() -> list[dict[str, Any]]:
+        calls["n"] += 1
+        time.sleep(0.2)
+        return _fixtures()
+
+    results: list[Any] = []
+    threads = [
+        threading.Thread(target=lambda: results.append(btts_ticket_builder.ensure_tickets(day, _slow_fixtures)))
+        for _ in range(6)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls["n"] == 1
+    assert {r.version for r in results} == {1}
+
+
+def test_rebuilds_only_when_odds_change(day: date) -> None:
+    first = btts_ticket_builder.refresh(day, _fixtures)
+    same = btts_ticket_builder.refresh(day, _fixtures)
+    assert first["version"] == same["version"] == 1
+
+    moved = btts_ticket_builder.refresh(day, lambda: _fixtures(odds=1.45))
+    assert moved["version"] == 2
+    history = btts_ticket_builder.get_history(day)
+    assert [v["version"] for v in history] == [1, 2]
+    assert history[0]["fingerprint"] != history[1]["fingerprint"]
+
+
+def test_rebuilds_when_team_features_warm_up(day: date) -> None:
+    # hladan start: feature-i još nisu učitani, engine rangira na fallback verovatnoćama
+    cold = btts_ticket_builder.refresh(day, lambda: _fixtures(stats={}))
+    assert cold["version"] == 1
+
+    warm = btts_ticket_builder.refresh(day, _fixtures)  # iste kvote, zagrejani stats
+    assert warm["version"] == 2
+    assert warm["fingerprint"] != cold["fingerprint"]
+    assert btts_ticket_builder.refresh(day, _fixtures)["version"] == 2
+
+
+def test_timed_out_cold_start_returns_503_without_unlocked_build(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient, day: date
+) -> None:
+    loads: list[int] = []
+    monkeypatch.setattr(btts_service, "get_btts_today_fixtures", lambda: loads.append(1) or _fixtures())
+    # lider build-a nije upisao artefakt pre isteka čekanja
+    monkeypatch.setattr(btts_ticket_builder, "refresh", lambda *_a, **_k: None)
+
+    with pytest.raises(btts_ticket_builder.TicketsUnavailable):
+        btts_ticket_builder.ensure_tickets(day, btts_service.get_btts_today_fixtures)
+    resp = client.get("/btts/tickets/today", headers=HEADERS)
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "5"
+    assert loads == []
+
+
+def test_endpoint_serves_artifact_and_history(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient, day: date
+) -> None:
+    current = {"odds": 1.40}
+    monkeypatch.setattr(btts_service, "get_btts_today_fixtures", lambda: _fixtures(current["odds"]))
+
+    resp = client.get("/btts/tickets/today", headers=HEADERS)
+    assert resp.status_code == 200
+    assert resp.json()["version"] == 1
+
+    current["odds"] = 1.45
+    # endpoint ne gradi sam: servira v1 dok scheduler ne napravi novu verziju
+    assert client.get("/btts/tickets/today", headers=HEADERS).json()["version"] == 1
+    btts_ticket_builder.refresh(day, btts_service.get_btts_today_fixtures)
+    assert client.get("/btts/tickets/today", headers=HEADERS).json()["version"] == 2
+
+    old = client.get("/btts/tickets/today", params={"version": 1}, headers=HEADERS).json()
+    assert old["version"] == 1
+    assert client.get("/btts/tickets/today", params={"version": 9}, headers=HEADERS).status_code == 404
+
+    hist = client.get("/btts/tickets/history", params={"day": day.isoformat()}, headers=HEADERS).json()
+    assert hist["total"] == 2
+    assert hist["versions"][1]["yes_ticket"]["ticket_id"].startswith("BTTSYES-")
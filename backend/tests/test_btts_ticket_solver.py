@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import itertools
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from math import prod
+
+from backend.services.btts_ticket_engine import (
+    Candidate,
+    TicketConstraints,
+    leg_value,
+    select_2_or_3,
+    select_ranked_tickets,
+    solve_tickets,
+)
+
+BASE = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+
+
+def _cand(fid: int, league: int, odds: float, minutes: int = 0) -> Candidate:
+    return Candidate(
+        fixture_id=fid,
+        kickoff_utc=BASE + timedelta(minutes=minutes),
+        league_id=league,
+        league_name=f"L{league}",
+        league_logo=None,
+        home_id=None,
+        home_name="H",
+        home_logo=None,
+        away_id=None,
+        away_name="A",
+        away_logo=None,
+        odds=odds,
+    )
+
+
+def _brute_force(scored, constraints: TicketConstraints, top_k: int) -> list[float]:
+    lo, hi = constraints.odds_range
+    pool = [x for x in scored if x[1] >= constraints.min_score]
+    evs = []
+    for combo in itertools.combinations(pool, constraints.legs):
+        if len({c.league_id for c, _ in combo}) < constraints.legs:
+            continue
+        total = prod(c.odds for c, _ in combo)
+        if not lo <= total <= hi:
+            continue
+        kicks = [c.kickoff_utc for c, _ in combo]
+        if max(kicks) - min(kicks) > constraints.max_kickoff_spread:
+            continue
+        evs.append(prod(leg_value(c, sc) for c, sc in combo))
+    return sorted(evs, reverse=True)[:top_k]
+
+
+def _random_scored(rng: random.Random, n: int, leagues: int):
+    return [
+        (
+            _cand(i, rng.randrange(leagues), round(rng.uniform(1.30, 1.55), 2), rng.randrange(0, 16 * 60)),
+            rng.choice(range(60, 101, 5)),
+        )
+        for i in range(n)
+    ]
+
+
+def test_greedy_miss_is_found() -> None:
+    # greedy top3 po score-u ima total odds 1.30^3 = 2.197 < 2.20 i pada na 2 leg
+    scored = [
+        (_cand(1, 1, 1.30), 90),
+        (_cand(2, 2, 1.30), 90),
+        (_cand(3, 3, 1.30), 85),
+        (_cand(4, 4, 1.45), 80),
+    ]
+    picked = select_2_or_3(scored)
+    assert len(picked) == 3
+    assert 2.20 <= prod(c.odds for c, _ in picked) <= 3.70
+    assert {c.fixture_id for c, _ in picked} == {1, 2, 4}
+
+
+def test_solver_matches_brute_force() -> None:
+    rng = random.Random(7)
+    for _ in range(25):
+        scored = _random_scored(rng, 14, 6)
+        for constraints in (
+            TicketConstraints(3, 75, (2.20, 3.70), timedelta(hours=6)),
+            TicketConstraints(2, 70, max_kickoff_spread=timedelta(hours=3)),
+        ):
+            got = [round(t.expected_value, 9) for t in solve_tickets(scored, constraints, top_k=4)]
+            want = [round(ev, 9) for ev in _brute_force(scored, constraints, 4)]
+            assert got == want
+
+
+def test_ranked_tickets_fill_with_two_legs_and_respect_leagues() -> None:
+    scored = [(_cand(1, 1, 1.40), 90), (_cand(2, 1, 1.50), 90), (_cand(3, 2, 1.35), 80)]
+    ranked = select_ranked_tickets(scored, top_k=3)
+    assert [len(t.picks) for t in ranked] == [2, 2]
+    for t in ranked:
+        assert len({c.league_id for c, _ in t.picks}) == len(t.picks)
+
+
+def test_solver_is_fast_for_500_candidates() -> None:
+    scored = _random_scored(random.Random(3), 500, 40)
+    start = time.perf_counter()
+    ranked = select_ranked_tickets(scored, top_k=5)
+    elapsed = time.perf_counter() - start
+    assert len(ranked) == 5
+    assert all(len(t.picks) == 3 for t in ranked)
+    assert elapsed < 1.0
+
+
+def test_solver_is_fast_when_few_leagues_cannot_fill_a_ticket() -> None:
+    rng = random.Random(5)
+    # 2 lige: 3-leg tiket je nemoguć (max 1 po ligi)
+    two_leagues = _random_scored(rng, 500, 2)
+    # 3 lige, ali treća igra 13h posle prve dve: 3-leg ne staje u kickoff raspon
+    split = [
+        (_cand(c.fixture_id, c.league_id, c.odds, 0 if c.league_id < 2 else 13 * 60), sc)
+        for c, sc in _random_scored(rng, 500, 3)
+    ]
+    for scored in (two_leagues, split):
+        start = time.perf_counter()
+        ranked = select_ranked_tickets(scored, top_k=3)
+        elapsed = time.perf_counter() - start
+        assert [len(t.picks) for t in ranked] == [2, 2, 2]
+        assert elapsed < 0.2
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import pathlib
+import sys
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tests.conftest  # noqa: E402,F401
+
+pytest_plugins = ["tests.conftest"]
+
+from backend.routers import btts as btts_router  # noqa: E402
+from backend.services import ai_analysis_cache_service  # noqa: E402
+
+APP_ID = "btts.predictor"
+HEADERS = {"X-API-Key": "test-token", "X-App-Id": APP_ID}
+
+
+def _fixture(fid: int) -> dict[str, Any]:
+    return {
+        "fixture": {"id": fid, "date": "2026-10-19T18:00:00Z", "status": {"short": "NS"}},
+        "league": {"id": 39, "name": "Premier League"},
+        "teams": {"home": {"id": fid * 10, "name": "H"}, "away": {"id": fid * 10 + 1, "name": "A"}},
+        "goals": {"home": None, "away": None},
+    }
+
+
+def _save_badge(session, fid: int, yes_pct: int) -> None:
+    ai_analysis_cache_service.save_ok(
+        session,
+        cache_key=ai_analysis_cache_service.make_cache_key(fixture_id=fid, prompt_version="btts-v1", locale="en"),
+        fixture_id=fid,
+        analysis_json={"analysis": {"btts": {"yes_pct": yes_pct, "no_pct": 100 - yes_pct}}},
+        app_id=APP_ID,
+    )
+
+
+def test_top3_ranks_in_one_pass_and_invalidates_on_badge_change(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient, db_session
+) -> None:
+    monkeypatch.setattr(btts_router, "_fetch_fixtures_for_day", lambda _offset: [_fixture(f) for f in range(1, 7)])
+    for fid, pct in [(1, 40), (2, 71), (3, 55), (4, 66), (5, 80)]:
+        _save_badge(db_session, fid, pct)
+
+    resp = client.get("/btts/matches/top3-today", params={"market": "yes"}, headers=HEADERS)
+    assert resp.status_code == 200
+    assert [it["fixture_id"] for it in resp.json()["items"]] == [5, 2, 4]
+
+    resp = client.get("/btts/matches/top3-today", params={"market": "no"}, headers=HEADERS)
+    assert [it["fixture_id"] for it in resp.json()["items"]] == [1, 3, 4]
+
+    _save_badge(db_session, 6, 90)
+    resp = client.get("/btts/matches/top3-today", params={"market": "yes"}, headers=HEADERS)
+    items = resp.json()["items"]
+    assert [it["fixture_id"] for it in items] == [6, 5, 2]
+    assert items[0]["featured"]["headline"] == "BTTS YES 90%"
+
+
+def test_save_ok_persists_badge_projection_for_list_queries(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient, db_session
+) -> None:
+    monkeypatch.setattr(btts_router, "_fetch_fixtures_for_day", lambda _offset: [_fixture(11), _fixture(12)])
+    ai_analysis_cache_service.save_ok(
+        db_session,
+        cache_key=ai_analysis_cache_service.make_cache_key(fixture_id=11, prompt_version="btts-v1", locale="en"),
+        fixture_id=11,
+        analysis_json={
+            "analysis": {
+                "btts": {
+                    "yes_pct": 64,
+                    "no_pct": 36,
+                    "recommended_btts_market": "YES",
+                    "confidence_pct": 64,
+                    "avoid_flags": ["LOW_SCORING_TEAM"],
+                    "reasoning_short": "Open game.",
+                    "key_factors": ["not part of the badge"],
+                }
+            }
+        },
+        app_id=APP_ID,
+    )
+
+    row = ai_analysis_cache_service.get_cached_row(
+        db_session,
+        ai_analysis_cache_service.make_cache_key(fixture_id=11, prompt_version="btts-v1", locale="en"),
+        app_id=APP_ID,
+    )
+    assert row.btts_yes_pct == 64.0
+    assert row.btts_no_pct == 36.0
+    assert row.btts_badge == {
+        "yes_pct": 64,
+        "no_pct": 36,
+        "recommended": "YES",
+        "confidence": 64,
+        "reasoning_short": "Open game.",
+        "avoid_flags": ["LOW_SCORING_TEAM"],
+    }
+
+    resp = client.get("/btts/matches/today", headers=HEADERS)
+    badges = {it["fixture_id"]: it["btts_badge"] for it in resp.json()["items"]}
+    assert badges[11] == row.btts_badge
+    assert badges[12] is None
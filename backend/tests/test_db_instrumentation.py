@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import pathlib
+import sys
+from typing import Any
+
+import pytest
+from sqlalchemy import text
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tests.conftest  # noqa: E402,F401
+
+from backend import observability  # noqa: E402
+from backend.db import SessionLocal, statement_fingerprint  # noqa: E402
+from backend.observability import ObservabilityMiddleware  # noqa: E402
+
+
+def test_statement_fingerprint_strips_literals_and_params() -> None:
+    a = statement_fingerprint("SELECT *  FROM users\n WHERE id = 42 AND name = 'x''y'")
+    b = statement_fingerprint("SELECT * FROM users WHERE id = 7 AND name = 'z'")
+    assert a == b == "SELECT * FROM users WHERE id = ? AND name = ?"
+    assert statement_fingerprint("SELECT 1 FROM t WHERE id IN (?, ?, ?)") == statement_fingerprint(
+        "SELECT 1 FROM t WHERE id IN (%(id_1)s, %(id_2)s)"
+    )
+    assert statement_fingerprint("SELECT c2 FROM t2 WHERE c1 = :v") == "SELECT c2 FROM t2 WHERE c1 = ?"
+
+
+def _run(app, headers: list[tuple[bytes, bytes]] | None = None) -> dict[str, str]:
+    sent: dict[str, str] = {}
+
+    async def _send(message) -> None:
+        if message["type"] == "http.response.start":
+            sent.update((k.decode(), v.decode()) for k, v in message["headers"])
+
+    async def _receive() -> dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    scope = {"type": "http", "method": "GET", "path": "/q", "headers": headers or []}
+    asyncio.run(ObservabilityMiddleware(app)(scope, _receive, _send))
+    return sent
+
+
+def _app_running(queries: int):
+    async def _app(scope, receive, send) -> None:
+        db = SessionLocal()
+        try:
+            for i in range(queries):
+                db.execute(text("SELECT :v"), {"v": i})
+        finally:
+            db.close()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    return _app
+
+
+def test_queries_are_counted_per_request() -> None:
+    headers = _run(_app_running(3))
+    assert headers["x-db-queries"] == "3"
+    assert float(headers["x-db-time-ms"]) > 0
+
+
+def test_repeated_statement_logs_n_plus_one_once(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    monkeypatch.setattr(observability, "N_PLUS_ONE_THRESHOLD", 4)
+    with caplog.at_level(logging.WARNING, logger="naksir.go_premium.observability"):
+        headers = _run(_app_running(9), headers=[(b"x-request-id", b"rid-n1")])
+    assert headers["x-db-queries"] == "9"
+    warnings = [r.getMessage() for r in caplog.records if "N+1" in r.getMessage()]
+    assert len(warnings) == 1
+    assert "rid-n1" in warnings[0] and "SELECT ?" in warnings[0]
+
+
+def test_no_request_context_is_a_noop() -> None:
+    db = SessionLocal()
+    try:
+        assert db.execute(text("SELECT 1")).scalar() == 1
+    finally:
+        db.close()
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import pathlib
+import sys
+import time
+from collections import deque
+from typing import Any
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tests.conftest  # noqa: E402,F401
+
+pytest_plugins = ["tests.conftest"]
+
+from backend import api_football  # noqa: E402
+from backend.ai_analysis import compute_btts_yes_probability_v1  # noqa: E402
+from backend.services import feature_extraction  # noqa: E402
+from backend.services.feature_extraction import FeatureSlate, compute_team_features  # noqa: E402
+
+
+def _played(fid: int, date: str, home_id: int, away_id: int, gh: int, ga: int) -> dict[str, Any]:
+    return {
+        "fixture": {"id": fid, "date": date, "status": {"short": "FT"}},
+        "teams": {"home": {"id": home_id}, "away": {"id": away_id}},
+        "goals": {"home": gh, "away": ga},
+    }
+
+
+HISTORY = [
+    _played(1, "2026-10-01T18:00:00Z", 10, 99, 2, 1),
+    _played(2, "2026-10-05T18:00:00Z", 98, 10, 1, 1),
+    _played(3, "2026-10-09T18:00:00Z", 10, 97, 0, 0),
+    _played(4, "2026-10-12T18:00:00Z", 96, 10, 3, 0),
+]
+
+
+def test_compute_team_features_from_last_fixtures() -> None:
+    tf = compute_team_features(10, 2026, HISTORY)
+
+    assert tf.matches == 4
+    assert tf.scored_pg == pytest.approx(0.75)
+    assert tf.conceded_pg == pytest.approx(1.25)
+    assert tf.btts_rate == 50.0
+    assert tf.clean_sheet_rate == 25.0
+    assert tf.scored_home_pg == pytest.approx(1.0)
+    assert tf.btts_rate_10 == pytest.approx(0.5)
+    assert tf.under_rate_10 == pytest.approx(0.5)
+
+
+def test_slate_fetches_each_team_once_and_feeds_scorers(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: list[int] = []
+
+    def _fake_last(team_id: int, last: int = 10, season: int | None = None) -> list[dict[str, Any]]:
+        calls.append(team_id)
+        return HISTORY if team_id == 10 else [_played(5, "2026-10-10T18:00:00Z", team_id, 95, 2, 2)]
+
+    monkeypatch.setattr(api_football, "get_team_last_fixtures", _fake_last)
+    monkeypatch.setattr(api_football, "get_team_stats", lambda *_args: None)
+    monkeypatch.setattr(feature_extraction, "cache_get", lambda _key: None)
+    monkeypatch.setattr(feature_extraction, "cache_set", lambda *_args: None)
+
+    def fixture(home: int, away: int) -> dict[str, Any]:
+        return {"league": {"id": 39, "season": 2026}, "teams": {"home": {"id": home}, "away": {"id": away}}}
+
+    slate = FeatureSlate()
+    sections = slate.match_sections(fixture(10, 20))
+    stats = slate.candidate_stats(fixture(30, 10))
+
+    assert sorted(calls) == [10, 20, 30]
+    assert sections["form"]["home"]["btts_rate"] == 50.0
+    assert stats["away_scored_avg_5"] == pytest.approx(0.75)
+    assert stats["both_btts_rate_10"] == pytest.approx(0.75)
+
+    yes_pct, factors, _ = compute_btts_yes_probability_v1(sections)
+    assert any(f.startswith("Recent form") for f in factors)
+    assert yes_pct != 50
+
+
+def test_empty_features_are_negative_cached_and_list_path_never_calls_upstream(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls: list[int] = []
+    store: dict[str, tuple[dict[str, Any], int]] = {}
+
+    def _fake_last(team_id: int, last: int = 10, season: int | None = None) -> list[dict[str, Any]]:
+        calls.append(team_id)
+        return []  # nema istorije / upstream greška
+
+    monkeypatch.setattr(api_football, "get_team_last_fixtures", _fake_last)
+    monkeypatch.setattr(api_football, "get_team_stats", lambda *_args: None)
+    monkeypatch.setattr(feature_extraction, "cache_get", lambda key: (store.get(key) or (None,))[0])
+    monkeypatch.setattr(feature_extraction, "cache_set", lambda key, value, ttl: store.__setitem__(key, (value, ttl)))
+
+    fixture = {"league": {"id": 39, "season": 2026}, "teams": {"home": {"id": 41}, "away": {"id": 42}}}
+
+    # request path: samo cache, nezagrejani timovi idu u `missing`
+    cold = FeatureSlate(cached_only=True)
+    assert cold.candidate_stats(fixture) == {}
+    assert calls == [] and [team for team, _, _ in cold.missing] == [41, 42]
+
+    # pozadinski posao greje; prazan rezultat se kešira sa kratkim TTL-om
+    FeatureSlate().candidate_stats(fixture)
+    assert sorted(calls) == [41, 42]
+    assert {ttl for _, ttl in store.values()} == {feature_extraction.TEAM_FEATURES_EMPTY_TTL_SECONDS}
+
+    FeatureSlate().candidate_stats(fixture)
+    warm = FeatureSlate(cached_only=True)
+    warm.candidate_stats(fixture)
+    assert sorted(calls) == [41, 42] and warm.missing == []
+
+
+def test_team_history_is_not_exempt_from_open_circuit(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(api_football, "RATE_LIMIT_EVENTS", deque([time.time()] * api_football.RATE_LIMIT_THRESHOLD))
+
+    assert api_football._circuit_open("odds")
+    assert not api_football._circuit_open("fixtures", {"date": "2026-10-19"})
+    assert api_football._circuit_open("fixtures", {"team": 10, "last": 10})
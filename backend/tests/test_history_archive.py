@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import math
+import pathlib
+import sys
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tests.conftest  # noqa: E402,F401
+
+pytest_plugins = ["tests.conftest"]
+
+from backend.config import TIMEZONE  # noqa: E402
+from backend.services import archive_pipeline, history_archive  # noqa: E402
+
+TZ = ZoneInfo(TIMEZONE)
+
+
+def _fx(fid: int, home: int, away: int, goals=(1, 1), status: str = "FT", day: str = "2026-10-18") -> dict:
+    return {
+        "fixture": {"id": fid, "date": f"{day}T18:00:00+00:00", "status": {"short": status}},
+        "league": {"id": 39, "name": "Premier League", "season": 2026},
+        "teams": {"home": {"id": home, "name": f"T{home}"}, "away": {"id": away, "name": f"T{away}"}},
+        "goals": {"home": goals[0], "away": goals[1]},
+    }
+
+
+def test_write_and_read_day_roundtrip(tmp_path: Path) -> None:
+    day = date(2026, 10, 18)
+    fx = _fx(1, 10, 20, goals=(2, 0))
+    fx["odds"] = {"btts_yes": 1.45}
+    fx["stats"] = {"home_scored_avg_5": 1.6, "under_tendency": 0.3}
+    rows = history_archive.write_day(tmp_path, day, [fx, _fx(2, 30, 40, goals=(None, None), status="PST")])
+    assert rows == 2
+
+    with history_archive.open_day(tmp_path, day) as cols:
+        assert list(cols.column("fixture_id")) == [1, 2]
+        assert list(cols.column("goals_home")) == [2, history_archive.MISSING_INT]
+        assert cols.column("odds_btts_yes")[0] == 1.45
+        assert math.isnan(cols.column("odds_btts_no")[0])
+        back = cols.fixture(0)
+    assert back["odds"] == {"btts_yes": 1.45}
+    assert back["stats"] == {"home_scored_avg_5": 1.6, "under_tendency": 0.3}
+    assert back["goals"] == {"home": 2, "away": 0}
+    assert back["teams"]["home"] == {"id": 10, "name": "T10"}
+    assert back["fixture"]["date"] == "2026-10-18T18:00:00Z"
+
+    index = history_archive.ArchiveIndex.load(tmp_path)
+    assert index.list_days() == [day]
+    assert index.days_for_team(40) == [day]
+    assert index.days_for_league(39) == [day]
+
+
+def test_team_history_and_h2h_read_locally(tmp_path: Path) -> None:
+    history_archive.write_day(tmp_path, date(2026, 10, 1), [_fx(1, 10, 20, day="2026-10-01")])
+    history_archive.write_day(tmp_path, date(2026, 10, 8), [_fx(2, 20, 30, day="2026-10-08")])
+    history_archive.write_day(tmp_path, date(2026, 10, 15), [_fx(3, 20, 10, goals=(0, 3), day="2026-10-15")])
+    history_archive.write_day(tmp_path, date(2026, 10, 16), [])
+
+    last = history_archive.team_last_fixtures(tmp_path, 20, last=2)
+    assert [f["fixture"]["id"] for f in last] == [3, 2]
+    h2h = history_archive.head_to_head(tmp_path, 10, 20)
+    assert [f["fixture"]["id"] for f in h2h] == [3, 1]
+    assert history_archive.load_day_fixtures(tmp_path, date(2026, 10, 16)) == []
+
+
+def test_archive_settled_day_merges_staged_odds(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    day = date(2026, 10, 18)
+    monkeypatch.setattr(archive_pipeline, "ARCHIVE_DIR", str(tmp_path))
+    pre = _fx(5, 50, 60, goals=(None, None), status="NS")
+    pre["odds"] = {"btts_yes": 1.5, "btts_no": 2.4}
+    pre["stats"] = {"both_btts_rate_10": 0.6}
+    archive_pipeline.stage_prematch(day, [pre])
+
+    monkeypatch.setattr(archive_pipeline.api_football, "get_fixtures_by_date", lambda *_a, **_k: [pre])
+    assert archive_pipeline.archive_settled_day(day, now=datetime(2026, 10, 19, 9, tzinfo=TZ)) is None
+
+    monkeypatch.setattr(
+        archive_pipeline.api_football,
+        "get_fixtures_by_date",
+        lambda date_str, **_k: [_fx(5, 50, 60, goals=(1, 2))] if date_str == day.isoformat() else [],
+    )
+    assert archive_pipeline.archive_pending_days(today=date(2026, 10, 19)) == [date(2026, 10, 17), day]
+    assert archive_pipeline.archive_pending_days(today=date(2026, 10, 19)) == []
+    (row,) = history_archive.load_day_fixtures(tmp_path, day)
+    assert row["odds"] == {"btts_yes": 1.5, "btts_no": 2.4}
+    assert row["stats"] == {"both_btts_rate_10": 0.6}
+    assert row["goals"] == {"home": 1, "away": 2}
+
+
+def test_abandoned_and_stuck_fixtures_do_not_block_the_day(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    day = date(2026, 10, 18)
+    monkeypatch.setattr(archive_pipeline, "ARCHIVE_DIR", str(tmp_path))
+    slates = {
+        "2026-10-18": [_fx(1, 10, 20, goals=(2, 1)), _fx(2, 30, 40, goals=(3, 0), status="AWD")],
+        "2026-10-17": [
+            _fx(3, 10, 20, goals=(1, 1), day="2026-10-17"),
+            _fx(4, 50, 60, goals=(0, 0), status="SUSP", day="2026-10-17"),
+        ],
+    }
+    monkeypatch.setattr(
+        archive_pipeline.api_football, "get_fixtures_by_date", lambda date_str, **_k: slates.get(date_str, [])
+    )
+
+    # dodeljen meč je terminalan: dan se arhivira odmah, bez njega
+    assert archive_pipeline.archive_settled_day(day, now=datetime(2026, 10, 19, 1, tzinfo=TZ)) == 1
+    assert [f["fixture"]["id"] for f in history_archive.load_day_fixtures(tmp_path, day)] == [1]
+
+    # prekinut meč čeka do cutoff-a (36h od početka dana), pa se dan upisuje bez njega
+    day = date(2026, 10, 17)
+    assert archive_pipeline.archive_settled_day(day, now=datetime(2026, 10, 18, 10, tzinfo=TZ)) is None
+    assert archive_pipeline.archive_pending_days(now=datetime(2026, 10, 18, 13, tzinfo=TZ)) == [date(2026, 10, 16), day]
+    assert [f["fixture"]["id"] for f in history_archive.load_day_fixtures(tmp_path, day)] == [3]
+
+
+def test_only_elected_archiver_writes(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(archive_pipeline, "LEADER_KEY", f"history_archive:leader:{uuid.uuid4().hex}")
+    runs: list[str] = []
+    monkeypatch.setattr(archive_pipeline, "archive_pending_days", lambda: runs.append("run") or [])
+
+    assert archive_pipeline.archive_tick("worker-a") == []
+    assert archive_pipeline.archive_tick("worker-b") is None  # drugi proces ne dira arhivu
+    assert archive_pipeline.archive_tick("worker-a") == []
+    assert runs == ["run", "run"]
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import pathlib
+import sys
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tests.conftest  # noqa: E402,F401
+
+pytest_plugins = ["tests.conftest"]
+
+from backend.routers import btts as btts_router  # noqa: E402
+from backend.services import live_feed_service  # noqa: E402
+from backend.services.btts_board_service import apply_btts_badge, get_day_board  # noqa: E402
+from backend.services.live_bus import BUS, LiveEventBus  # noqa: E402
+from backend.services.live_feed_service import LiveSubscription, stream_live_feed  # noqa: E402
+
+DAY = "2031-04-01"
+
+
+def _parse_sse(body: str) -> list[tuple[str, str | None, Any]]:
+    events: list[tuple[str, str | None, Any]] = []
+    for frame in body.split("\n\n"):
+        name = event_id = data = None
+        for line in frame.splitlines():
+            if line.startswith("id: "):
+                event_id = line[len("id: ") :]
+            elif line.startswith("event: "):
+                name = line[len("event: ") :]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: ") :])
+        if name:
+            events.append((name, event_id, data))
+    return events
+
+
+def _publish(bus: LiveEventBus, fid: int, *, day: str = DAY, league_id: int = 39, minute: int = 10) -> None:
+    bus.publish(
+        "fixture",
+        day=day,
+        fixture_id=fid,
+        league_id=league_id,
+        data={"score": {"home": 0, "away": 0}, "minute": minute, "state": "live", "status": "1H", "red_cards": {}},
+    )
+
+
+def _collect(bus: LiveEventBus, subscription: LiveSubscription, *, during=None, last_event_id: str | None = None, max_seconds: float = 0.3) -> list[tuple[str, str | None, Any]]:
+    async def _run() -> list[str]:
+        frames: list[str] = []
+        stream = stream_live_feed(
+            subscription, last_event_id=last_event_id, bus=bus, heartbeat_seconds=0.05, max_seconds=max_seconds
+        )
+        async for frame in stream:
+            frames.append(frame)
+            if len(frames) == 1 and during is not None:
+                # publish iz drugog threada, kao poller
+                await asyncio.get_running_loop().run_in_executor(None, during)
+        return frames
+
+    return _parse_sse("".join(asyncio.run(_run())))
+
+
+def test_stream_filters_by_day_and_league() -> None:
+    bus = LiveEventBus()
+
+    def _during() -> None:
+        _publish(bus, 1)
+        _publish(bus, 2, league_id=140)
+        _publish(bus, 3, day="2031-04-02")
+
+    events = _collect(bus, LiveSubscription(day=DAY, league_ids={39}), during=_during)
+    assert events[0][0] == "hello"
+    fixtures = [data for name, _, data in events if name == "fixture"]
+    assert [f["fixture_id"] for f in fixtures] == [1]
+    assert fixtures[0]["minute"] == 10
+    assert "data" not in fixtures[0]
+
+
+def test_last_event_id_replays_missed_events_once() -> None:
+    bus = LiveEventBus()
+    _publish(bus, 1, minute=1)
+    _publish(bus, 1, minute=2)
+    _publish(bus, 1, minute=3)
+
+    events = _collect(bus, LiveSubscription(day=DAY), last_event_id=f"{bus.epoch}:1")
+    assert [(name, eid) for name, eid, _ in events] == [("fixture", f"{bus.epoch}:2"), ("fixture", f"{bus.epoch}:3")]
+
+
+def test_unknown_epoch_or_expired_history_asks_for_resync() -> None:
+    bus = LiveEventBus(history_size=2)
+    for minute in range(5):
+        _publish(bus, 1, minute=minute)
+
+    stale = _collect(bus, LiveSubscription(day=DAY), last_event_id=f"{bus.epoch}:1", max_seconds=0.1)
+    restarted = _collect(bus, LiveSubscription(day=DAY), last_event_id="deadbeef:4", max_seconds=0.1)
+    assert stale[0][0] == "resync" and stale[0][2]["reason"] == "history_expired"
+    assert restarted[0][0] == "resync" and restarted[0][2]["reason"] == "epoch_changed"
+
+
+def test_slow_consumer_gets_resync_instead_of_unbounded_queue() -> None:
+    bus = LiveEventBus()
+
+    def _burst() -> None:
+        for minute in range(20):
+            _publish(bus, 1, minute=minute)
+
+    events = _collect(bus, LiveSubscription(day=DAY, maxsize=4), during=_burst)
+    names = [name for name, _, _ in events]
+    assert "resync" in names
+    assert names.count("fixture") <= 4
+
+
+def test_badge_event_only_for_matching_app() -> None:
+    bus = LiveEventBus()
+    sub = LiveSubscription(day=DAY, app_id="btts.predictor")
+    badge = bus.publish("badge", day=DAY, fixture_id=1, league_id=39, data={"app_id": "btts.predictor", "btts_badge": {"yes_pct": 61}})
+    other = bus.publish("badge", day=DAY, fixture_id=1, league_id=39, data={"app_id": "other.app", "btts_badge": None})
+    assert sub.matches(badge)
+    assert not sub.matches(other)
+    assert live_feed_service.compact_delta(badge) == {"fixture_id": 1, "league_id": 39, "btts_badge": {"yes_pct": 61}}
+
+
+def test_saved_badge_is_published_from_board() -> None:
+    board = get_day_board("btts.predictor", DAY, lambda fx, badge: btts_router._build_flashscore_item(fx, btts_badge=badge))
+    board.sync(
+        [{"fixture": {"id": 9, "date": f"{DAY}T12:00:00Z", "status": {"short": "NS"}}, "league": {"id": 39}, "teams": {}}],
+        badge_version="1",
+        load_badges=lambda ids: {},
+    )
+    before = BUS.last_seq
+    apply_btts_badge("btts.predictor", 9, {"yes_pct": 70})
+    apply_btts_badge("btts.predictor", 9, {"yes_pct": 70})  # isti badge -> bez novog eventa
+
+    events = BUS.since(before)
+    assert [(e.type, e.fixture_id, e.data["btts_badge"]) for e in events] == [("badge", 9, {"yes_pct": 70})]
+    assert board.slice("all")[0]["btts_badge"] == {"yes_pct": 70}
+
+
+def test_live_stream_route_replays_from_last_event_id(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(live_feed_service, "MAX_STREAM_SECONDS", 0.2)
+    monkeypatch.setattr(live_feed_service, "HEARTBEAT_SECONDS", 0.05)
+    start = BUS.last_seq
+    _publish(BUS, 77, day=DAY)
+
+    with client.stream(
+        "GET",
+        f"/live/stream?day={DAY}",
+        headers={"X-API-Key": "test-token", "Last-Event-ID": f"{BUS.epoch}:{start}"},
+    ) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    events = _parse_sse(body)
+    assert [(name, data["fixture_id"]) for name, _, data in events] == [("fixture", 77)]
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import pathlib
+import sys
+import time
+import uuid
+from typing import Any
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tests.conftest  # noqa: E402,F401
+
+pytest_plugins = ["tests.conftest"]
+
+from backend import api_football  # noqa: E402
+from backend import cache as cache_module  # noqa: E402
+from backend.cache import cache_delete, cache_get, cache_set, make_cache_key  # noqa: E402
+from backend.config import TIMEZONE  # noqa: E402
+from backend.routers import btts as btts_router  # noqa: E402
+from backend.services import live_poller  # noqa: E402
+from backend.services.btts_board_service import get_day_board  # noqa: E402
+from backend.services.live_bus import LiveEventBus  # noqa: E402
+
+
+def _fx(fid: int, day: str, short: str = "1H", elapsed: int = 10, goals: tuple[Any, Any] = (0, 0), events: list | None = None) -> dict[str, Any]:
+    return {
+        "fixture": {"id": fid, "date": f"{day}T12:00:00+00:00", "status": {"short": short, "elapsed": elapsed}},
+        "league": {"id": 39, "name": "Premier League"},
+        "teams": {"home": {"id": fid * 10, "name": "H"}, "away": {"id": fid * 10 + 1, "name": "A"}},
+        "goals": {"home": goals[0], "away": goals[1]},
+        "events": events or [],
+    }
+
+
+@pytest.fixture
+def poller(monkeypatch: pytest.MonkeyPatch) -> live_poller.LivePoller:
+    # svaki test ima svoj leader ključ, da lease iz prethodnog testa ne smeta
+    monkeypatch.setattr(live_poller, "LEADER_KEY", f"live_poller:leader:{uuid.uuid4().hex}")
+    monkeypatch.setattr(live_poller, "SNAPSHOT_KEY", f"live_poller:snapshot:{uuid.uuid4().hex}")
+    return live_poller.LivePoller(bus=LiveEventBus(), owner="a", interval=15)
+
+
+def test_live_state_counts_red_cards_per_side() -> None:
+    events = [
+        {"type": "Card", "detail": "Red Card", "team": {"id": 10}},
+        {"type": "Card", "detail": "Second Yellow card", "team": {"id": 11}},
+        {"type": "Card", "detail": "Yellow Card", "team": {"id": 11}},
+        {"type": "Goal", "detail": "Normal Goal", "team": {"id": 10}},
+    ]
+    state = live_poller.live_state(_fx(1, "2026-10-19", events=events))
+    assert state["red_cards"] == {"home": 1, "away": 1}
+    assert state["state"] == "live"
+
+
+def test_diff_states_reports_only_changed_fields() -> None:
+    prev = live_poller.live_state(_fx(1, "2026-10-19", elapsed=10))
+    cur = live_poller.live_state(_fx(1, "2026-10-19", elapsed=11, goals=(1, 0)))
+    assert live_poller.diff_states(prev, cur) == ["score", "minute"]
+    assert live_poller.diff_states(cur, cur) == []
+
+
+def test_leader_publishes_deltas_patches_slate_and_invalidates(
+    poller: live_poller.LivePoller, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    day = "2031-03-01"
+    feed = {"fixtures": [_fx(1, day), _fx(2, day)]}
+    monkeypatch.setattr(api_football, "get_live_fixtures", lambda: feed["fixtures"])
+
+    slate_key = make_cache_key("fixtures", {"date": day, "timezone": TIMEZONE})
+    cache_set(slate_key, {"response": [_fx(1, day, short="NS", goals=(None, None)), _fx(2, day, short="NS")]}, 60)
+
+    first = poller.poll_once()
+    assert {e.fixture_id for e in first} == {1, 2}
+
+    events_key = make_cache_key("fixtures/events", {"fixture": 1})
+    by_id_key = make_cache_key("fixtures", {"id": 1, "timezone": TIMEZONE})
+    cache_set(events_key, {"response": []}, 60)
+    cache_set(by_id_key, {"response": []}, 60)
+
+    feed["fixtures"] = [_fx(1, day, elapsed=23, goals=(1, 0)), _fx(2, day)]
+    second = poller.poll_once()
+
+    assert [(e.fixture_id, e.data["changed"]) for e in second] == [(1, ["score", "minute"])]
+    assert second[0].data["score"] == {"home": 1, "away": 0}
+    assert cache_get(events_key) is None
+    assert cache_get(by_id_key) is None
+
+    slate = cache_get(slate_key)["response"]
+    assert slate[0]["goals"] == {"home": 1, "away": 0}
+    assert slate[0]["fixture"]["status"]["elapsed"] == 23
+
+    # nepromenjen tick ne emituje ništa
+    assert poller.poll_once() == []
+
+
+def test_finished_fixture_is_fetched_once_and_updates_board(
+    poller: live_poller.LivePoller, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    day = "2031-03-02"
+    board = get_day_board("btts.predictor", day, lambda fx, badge: btts_router._build_flashscore_item(fx, btts_badge=badge))
+    board.sync([_fx(5, day, short="NS", elapsed=0, goals=(None, None))], badge_version=1, load_badges=lambda ids: {})
+    assert [i["fixture_id"] for i in board.slice("prematch")] == [5]
+
+    feed = {"fixtures": [_fx(5, day, elapsed=80, goals=(1, 1))]}
+    monkeypatch.setattr(api_football, "get_live_fixtures", lambda: feed["fixtures"])
+    calls: list[int] = []
+
+    def _by_id(fid: int) -> dict[str, Any]:
+        calls.append(fid)
+        return _fx(fid, day, short="FT", elapsed=90, goals=(2, 1))
+
+    monkeypatch.setattr(api_football, "get_fixture_by_id", _by_id)
+
+    poller.poll_once()
+    assert [i["fixture_id"] for i in board.slice("live")] == [5]
+
+    feed["fixtures"] = []
+    events = poller.poll_once()
+    assert calls == [5]
+    assert events[0].data["state"] == "finished"
+    assert [i["fixture_id"] for i in board.slice("finished")] == [5]
+
+    # završen meč više nije praćen
+    assert poller.poll_once() == []
+    assert calls == [5]
+
+
+def test_follower_reads_leader_snapshot_without_upstream_call(
+    poller: live_poller.LivePoller, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    day = "2031-03-03"
+    leader = poller
+    follower = live_poller.LivePoller(bus=LiveEventBus(), owner="b", interval=15)
+
+    monkeypatch.setattr(api_football, "get_live_fixtures", lambda: [_fx(7, day)])
+    leader.poll_once()
+    snapshot = cache_get(live_poller.SNAPSHOT_KEY)
+    cache_delete(live_poller.SNAPSHOT_KEY)
+
+    def _upstream() -> None:
+        raise AssertionError("follower must not call upstream")
+
+    monkeypatch.setattr(api_football, "get_live_fixtures", _upstream)
+    assert follower.poll_once() == []  # nema snapshot-a – ne diff-uj prazno
+
+    cache_set(live_poller.SNAPSHOT_KEY, snapshot, 60)
+    events = follower.poll_once()
+    assert [e.fixture_id for e in events] == [7]
+
+
+class _Clock:
+    """Zamena za `time` modul unutar backend.cache: TTL-ovi prate lažni sat."""
+
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(time, name)
+
+
+def test_follower_ticking_12s_after_leader_sees_live_and_final(
+    poller: live_poller.LivePoller, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    clock = _Clock()
+    monkeypatch.setattr(cache_module, "_BACKEND", cache_module.LocalCacheBackend())
+    monkeypatch.setattr(cache_module, "time", clock)
+
+    day = "2031-03-04"
+    leader = poller
+    follower = live_poller.LivePoller(bus=LiveEventBus(), owner="b", interval=15)
+    feed = {"fixtures": [_fx(8, day, elapsed=30)]}
+    monkeypatch.setattr(api_football, "get_live_fixtures", lambda: feed["fixtures"])
+    monkeypatch.setattr(api_football, "get_fixture_by_id", lambda fid: _fx(fid, day, short="FT", elapsed=90, goals=(1, 1)))
+
+    leader.poll_once()  # t=0
+    clock.now += 12
+    assert [e.data["state"] for e in follower.poll_once()] == ["live"]  # t=12, live=all unos je istekao
+
+    clock.now += 3
+    feed["fixtures"] = []
+    leader.poll_once()  # t=15: meč je završen, lider dohvata konačan status
+    clock.now += 12
+    events = follower.poll_once()  # t=27
+    assert [(e.fixture_id, e.data["state"]) for e in events] == [(8, "finished")]
+
+
+class _SlateResponse:
+    status_code = 200
+    text = "{}"
+    headers: dict[str, str] = {}
+
+    def __init__(self, payload: dict[str, Any]) -> None:
+        self._payload = payload
+
+    def json(self) -> dict[str, Any]:
+        return self._payload
+
+
+def test_patched_slate_still_expires_and_is_refetched_while_live(
+    poller: live_poller.LivePoller, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    clock = _Clock()
+    monkeypatch.setattr(cache_module, "_BACKEND", cache_module.LocalCacheBackend())
+    monkeypatch.setattr(cache_module, "time", clock)
+
+    day = "2031-03-05"
+    upstream = {"slate": [_fx(9, day, short="NS", elapsed=0, goals=(None, None))], "calls": 0}
+
+    def _get(*_a: Any, **_kw: Any) -> _SlateResponse:
+        upstream["calls"] += 1
+        return _SlateResponse({"response": upstream["slate"]})
+
+    monkeypatch.setattr(api_football.SESSION, "get", _get)
+    assert [f["fixture"]["id"] for f in api_football.get_fixtures_by_date(day)] == [9]
+    assert upstream["calls"] == 1
+
+    # meč je live i minut se menja svaki tick – lider patch-uje slate svakih 15s
+    feed = {"fixtures": [_fx(9, day, elapsed=1)]}
+    monkeypatch.setattr(api_football, "get_live_fixtures", lambda: feed["fixtures"])
+    for minute in (1, 2, 3):
+        feed["fixtures"] = [_fx(9, day, elapsed=minute)]
+        assert poller.poll_once()
+        slate = cache_get(make_cache_key("fixtures", {"date": day, "timezone": TIMEZONE}))
+        assert slate["response"][0]["fixture"]["status"]["elapsed"] == minute
+        clock.now += 15
+
+    # t=45: upstream TTL je istekao uprkos patch-evima; novi meč dodat upstream-u se vidi
+    upstream["slate"] = [_fx(9, day, elapsed=45), _fx(10, day, short="NS", elapsed=0, goals=(None, None))]
+    clock.now += 1
+    assert [f["fixture"]["id"] for f in api_football.get_fixtures_by_date(day)] == [9, 10]
+    assert upstream["calls"] == 2
+
+
+def test_slate_patch_keeps_remaining_ttl_on_redis(
+    poller: live_poller.LivePoller, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    backend = cache_module.RedisCacheBackend("redis://fake", use_fake=True)
+    monkeypatch.setattr(cache_module, "_BACKEND", backend)
+    day = "2031-03-06"
+    slate_key = make_cache_key("fixtures", {"date": day, "timezone": TIMEZONE})
+    cache_set(slate_key, {"response": [_fx(11, day, short="NS")]}, 20)
+
+    assert live_poller.patch_day_slate(day, {11: _fx(11, day, elapsed=5)}) == 1
+    assert cache_get(slate_key)["response"][0]["fixture"]["status"]["elapsed"] == 5
+    assert 0 < backend.client.pttl(backend._namespaced(slate_key)) <= 20_000
+
+    cache_delete(slate_key)
+    assert live_poller.patch_day_slate(day, {11: _fx(11, day, elapsed=6)}) == 0
+    assert cache_get(slate_key) is None
+
+
+class _RacingPipeline:
+    """Pipeline koji, odmah posle GET-a, pusti drugog workera da preuzme istekli lease."""
+
+    def __init__(self, pipe: Any, client: Any) -> None:
+        self._pipe = pipe
+        self._client = client
+
+    def __enter__(self) -> "_RacingPipeline":
+        self._pipe.__enter__()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._pipe.__exit__(*exc)
+
+    def get(self, name: Any) -> Any:
+        value = self._pipe.get(name)
+        self._client.set(name, "b", px=5_000)
+        return value
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._pipe, name)
+
+
+def test_lease_renewal_never_extends_another_owners_lease() -> None:
+    backend = cache_module.RedisCacheBackend("redis://fake", use_fake=True)
+    key = f"live_poller:leader:{uuid.uuid4().hex}"
+    lock_key = backend._lock_key(key)
+
+    assert backend.claim(key, "a", 10)
+    assert backend.claim(key, "a", 20)  # produženje sopstvenog lease-a
+    assert 10_000 < backend.client.pttl(lock_key) <= 20_000
+    assert not backend.claim(key, "b", 20)
+
+    # lease je istekao i "b" ga preuzima između GET-a i PEXPIRE-a: "a" ne sme da produži tuđi
+    real_pipeline = backend.client.pipeline
+    backend.client.pipeline = lambda *a, **kw: _RacingPipeline(real_pipeline(*a, **kw), backend.client)
+    assert not backend.claim(key, "a", 60)
+    backend.client.pipeline = real_pipeline
+    assert backend.client.get(lock_key) == b"b"
+    assert backend.client.pttl(lock_key) <= 5_000
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import pathlib
+import sys
+
+from fastapi.testclient import TestClient
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tests.conftest  # noqa: E402,F401
+
+pytest_plugins = ["tests.conftest"]
+
+from backend import metrics  # noqa: E402
+from backend.cache import cache_delete, cache_get_fields, cache_incr_fields  # noqa: E402
+from backend.metrics import MetricsRegistry, Snapshot, histogram_quantile, render_prometheus  # noqa: E402
+from backend.services import metrics_aggregator  # noqa: E402
+
+HEADERS = {"X-API-Key": "test-token"}
+
+
+def test_drained_deltas_sum_across_registries() -> None:
+    # dva "workera" flush-uju u isti hash
+    key = "metrics:test:sum"
+    for _ in range(2):
+        registry = MetricsRegistry()
+        registry.inc("requests_total", {"route": "/a"})
+        registry.observe("latency_ms", 7.0, {"route": "/a"})
+        registry.observe("latency_ms", 700.0, {"route": "/a"})
+        cache_incr_fields(key, registry.drain(), 60)
+        assert registry.drain() == {}
+
+    snap = Snapshot(cache_get_fields(key))
+    assert snap.counters[("requests_total", (("route", "/a"),))] == 2
+    series = snap.histograms[("latency_ms", (("route", "/a"),))]
+    assert sum(series[:-1]) == 4
+    assert series[-1] == 1414.0
+
+
+def test_histogram_quantile_interpolates_within_bucket() -> None:
+    buckets = (10.0, 100.0, 1000.0)
+    # 90 brzih (<=10ms), 10 sporih (100..1000ms)
+    counts = [90.0, 0.0, 10.0, 0.0]
+    assert histogram_quantile(0.5, buckets, counts) == 10 * (50 / 90)
+    assert histogram_quantile(0.95, buckets, counts) == 100 + 900 * 0.5
+    assert histogram_quantile(0.5, buckets, [0.0, 0.0, 0.0, 0.0]) is None
+
+
+def test_render_prometheus_cumulative_buckets() -> None:
+    registry = MetricsRegistry(buckets=(10.0, 100.0))
+    registry.observe("lat_ms", 5.0, {"route": "/x"})
+    registry.observe("lat_ms", 50.0, {"route": "/x"})
+    registry.observe("lat_ms", 500.0, {"route": "/x"})
+    text = render_prometheus(Snapshot(registry.drain(), buckets=(10.0, 100.0)))
+    assert "# TYPE lat_ms histogram" in text
+    assert 'lat_ms_bucket{route="/x",le="10"} 1' in text
+    assert 'lat_ms_bucket{route="/x",le="100"} 2' in text
+    assert 'lat_ms_bucket{route="/x",le="+Inf"} 3' in text
+    assert 'lat_ms_count{route="/x"} 3' in text
+
+
+def test_cache_family() -> None:
+    assert metrics.cache_family('naksir:cache:fixtures:{"date": "x"}', "naksir:cache:") == "fixtures"
+    assert metrics.cache_family("btts:tickets:2026-10-19:current") == "btts:tickets"
+    assert metrics.cache_family("slate:changelog:btts:btts.predictor:2026-10-19") == "slate:changelog"
+
+
+def test_metrics_endpoints_report_route_templates(client: TestClient) -> None:
+    metrics.REGISTRY.reset()
+    cache_delete(metrics_aggregator.AGGREGATE_KEY)
+    # različiti id-jevi -> jedna serija po templateu rute
+    for fixture_id in ("a", "b", "c"):
+        client.get(f"/matches/{fixture_id}", headers=HEADERS)
+    client.get("/does-not-exist", headers=HEADERS)
+
+    assert client.get("/metrics").status_code == 401
+    resp = client.get("/metrics", headers=HEADERS)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_ms_bucket{method="GET",route="/matches/{fixture_id}",le="+Inf"} 3' in resp.text
+    assert 'route="/does-not-exist"' not in resp.text
+
+    summary = client.get("/_debug/metrics", headers=HEADERS).json()
+    route = summary["routes"]["GET /matches/{fixture_id}"]
+    assert route["count"] == 3
+    assert route["p95_ms"] is not None
+    assert "unmatched" in " ".join(summary["routes"])
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import asyncio
+import pathlib
+import sys
+from typing import Any
+
+from fastapi.testclient import TestClient
+from starlette.middleware.base import BaseHTTPMiddleware
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tests.conftest  # noqa: E402,F401
+
+pytest_plugins = ["tests.conftest"]
+
+from backend.app import app  # noqa: E402
+from backend.observability import ObservabilityMiddleware, add_cache_hit, get_request_id  # noqa: E402
+
+
+def test_single_pure_asgi_layer() -> None:
+    classes = [m.cls for m in app.user_middleware]
+    assert ObservabilityMiddleware in classes
+    assert not any(isinstance(c, type) and issubclass(c, BaseHTTPMiddleware) for c in classes)
+
+
+def test_response_headers_and_request_id(client: TestClient) -> None:
+    resp = client.get("/_debug/ops", headers={"X-API-Key": "test-token", "X-Request-Id": "rid-123"})
+    assert resp.status_code == 200
+    assert resp.headers["X-Request-Id"] == "rid-123"
+    for header in ("X-Response-Time-Ms", "X-Cache-Hits", "X-Cache-Misses", "X-Upstream-Calls", "X-DB-Time-Ms", "X-API-Time-Ms"):
+        assert header in resp.headers
+    assert int(resp.headers["X-Cache-Misses"]) + int(resp.headers["X-Cache-Hits"]) >= 1
+
+
+def test_streaming_body_is_forwarded_chunk_by_chunk() -> None:
+    events: list[Any] = []
+
+    async def _app(scope, receive, send) -> None:
+        add_cache_hit()
+        events.append(("rid", get_request_id()))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"a", "more_body": True})
+        events.append("app:after-first-chunk")
+        await send({"type": "http.response.body", "body": b"b", "more_body": False})
+
+    async def _send(message) -> None:
+        events.append((message["type"], dict((k.decode(), v.decode()) for k, v in message.get("headers", []))))
+
+    async def _receive() -> dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    scope = {"type": "http", "method": "GET", "path": "/stream", "headers": [(b"x-request-id", b"abc")]}
+    asyncio.run(ObservabilityMiddleware(_app)(scope, _receive, _send))
+
+    assert events[0] == ("rid", "abc")
+    start = events[1]
+    assert start[0] == "http.response.start"
+    assert start[1]["x-request-id"] == "abc"
+    assert start[1]["x-cache-hits"] == "1"
+    # prvi chunk je prosleđen pre nego što app nastavi -> nema baferovanja
+    assert [e if isinstance(e, str) else e[0] for e in events[2:]] == [
+        "http.response.body",
+        "app:after-first-chunk",
+        "http.response.body",
+    ]
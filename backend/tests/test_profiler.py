@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import pathlib
+import sys
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tests.conftest  # noqa: E402,F401
+
+pytest_plugins = ["tests.conftest"]
+
+from backend import profiler  # noqa: E402
+
+HEADERS = {"X-API-Key": "test-token"}
+
+
+def _burn(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_sampler_collapses_busy_thread_stacks() -> None:
+    stop = threading.Event()
+    worker = threading.Thread(target=_burn, args=(stop,), name="burner")
+    worker.start()
+    try:
+        result = profiler.run_for(0.2, 0.002)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert result is not None and result.samples > 0
+    lines = result.collapsed().splitlines()
+    burner = [line for line in lines if line.startswith("burner;")]
+    assert burner and any("_burn (backend/tests/test_profiler.py:" in line for line in burner)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+def test_collapsed_can_be_limited_to_request_threads() -> None:
+    stop = threading.Event()
+    workers = [threading.Thread(target=_burn, args=(stop,), name=name) for name in ("request-thread", "other")]
+    for worker in workers:
+        worker.start()
+    try:
+        result = profiler.run_for(0.2, 0.002)
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+    assert result is not None
+    scoped = result.collapsed([workers[0].ident]).splitlines()
+    assert scoped and all(line.startswith("request-thread;") for line in scoped)
+    assert any(line.startswith("other;") for line in result.collapsed().splitlines())
+
+
+def test_only_one_profiler_per_process() -> None:
+    first = profiler.SamplingProfiler()
+    assert first.start()
+    try:
+        assert profiler.run_for(0.01) is None
+    finally:
+        first.stop()
+    assert profiler.run_for(0.01) is not None
+
+
+def test_profile_endpoint_returns_collapsed_text(client: TestClient) -> None:
+    assert client.get("/_debug/profile", params={"seconds": 0.05}).status_code == 401
+    resp = client.get("/_debug/profile", params={"seconds": 0.1, "idle": True}, headers=HEADERS)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert int(resp.headers["X-Profile-Samples"]) > 0
+    assert resp.text.strip()
+
+
+def test_request_profile_opt_in_header(monkeypatch: pytest.MonkeyPatch, client: TestClient) -> None:
+    resp = client.get("/_debug/ops", headers={**HEADERS, "X-Profile": "secret"})
+    assert "X-Profile-Id" not in resp.headers  # PROFILE_TOKEN nije podešen
+
+    monkeypatch.setattr(profiler, "PROFILE_TOKEN", "secret")
+    assert "X-Profile-Id" not in client.get("/_debug/ops", headers={**HEADERS, "X-Profile": "wrong"}).headers
+
+    resp = client.get("/_debug/ops", headers={**HEADERS, "X-Profile": "secret", "X-Request-Id": f"prof-{time.time_ns()}"})
+    profile_id = resp.headers["X-Profile-Id"]
+    stored = client.get(f"/_debug/profile/{profile_id}", headers=HEADERS)
+    assert stored.status_code == 200
+    assert "X-Profile-Samples" in stored.headers
+    assert client.get("/_debug/profile/missing", headers=HEADERS).status_code == 404
+
+
+def _request_burn(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(i * i for i in range(1000))
+
+
+def test_request_profile_keeps_only_threads_that_served_the_request(monkeypatch: pytest.MonkeyPatch) -> None:
+    from fastapi import FastAPI
+
+    from backend.cache import cache_get
+    from backend.observability import ObservabilityMiddleware
+
+    app = FastAPI()
+    app.add_middleware(ObservabilityMiddleware)
+
+    @app.get("/slow")
+    def slow() -> dict:
+        cache_get("profile-test:any")  # označava threadpool thread kao thread ovog request-a
+        _request_burn(0.2)
+        return {}
+
+    monkeypatch.setattr(profiler, "PROFILE_TOKEN", "secret")
+    stop = threading.Event()
+    background = threading.Thread(target=_burn, args=(stop,), name="unrelated")
+    background.start()
+    try:
+        rid = f"prof-{time.time_ns()}"
+        TestClient(app).get("/slow", headers={"X-Profile": "secret", "X-Request-Id": rid})
+    finally:
+        stop.set()
+        background.join()
+
+    stored = profiler.load_request_profile(rid)
+    assert stored["scope"] == "request-threads"
+    assert "_request_burn" in stored["collapsed"]
+    assert "unrelated;" not in stored["collapsed"]
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import pathlib
+import sys
+import threading
+import time
+import uuid
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tests.conftest  # noqa: E402,F401
+
+pytest_plugins = ["tests.conftest"]
+
+from backend import api_football  # noqa: E402
+from backend.cache import cache_get  # noqa: E402
+from backend.routers import btts as btts_router  # noqa: E402
+from backend.services import slate_changelog  # noqa: E402
+from backend.services.btts_board_service import get_day_board  # noqa: E402
+
+HEADERS = {"X-API-Key": "test-token", "X-App-Id": "btts.predictor"}
+
+
+def _slate() -> str:
+    # cache stanje preživljava između testova -> svaki test svoj slate
+    return f"test:{uuid.uuid4().hex[:8]}"
+
+
+def test_versions_advance_only_on_change_and_track_removals() -> None:
+    slate = _slate()
+    v1, _ = slate_changelog.record_slate(slate, "2031-05-01", {1: {"s": 0}, 2: {"s": 0}})
+    same, _ = slate_changelog.record_slate(slate, "2031-05-01", {1: {"s": 0}, 2: {"s": 0}})
+    assert same == v1
+
+    slate_changelog.record_slate(slate, "2031-05-01", {1: {"s": 1}, 2: {"s": 0}, 3: {"s": 0}})
+    v3, state = slate_changelog.record_slate(slate, "2031-05-01", {1: {"s": 1}, 3: {"s": 0}})
+    assert v3 != v1
+    assert slate_changelog.changes_since(state, v1) == ({1, 3}, {2})
+    assert slate_changelog.changes_since(state, v3) == (set(), set())
+
+
+def test_unknown_or_trimmed_versions_require_full_response(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(slate_changelog, "MAX_LOG_ENTRIES", 3)
+    slate = _slate()
+    v1, _ = slate_changelog.record_slate(slate, "2031-05-01", {1: {"s": 0}, 2: {"s": 0}})
+    for score in range(1, 4):
+        token, state = slate_changelog.record_slate(slate, "2031-05-01", {1: {"s": score}, 2: {"s": 0}})
+
+    assert slate_changelog.changes_since(state, v1) is None  # ispalo iz loga
+    assert slate_changelog.changes_since(state, "other-1") is None  # drugi epoch
+    assert slate_changelog.changes_since(state, "garbage") is None
+    epoch = token.rsplit("-", 1)[0]
+    assert slate_changelog.changes_since(state, f"{epoch}-99") is None
+
+
+def test_concurrent_writers_never_reuse_a_version(monkeypatch: pytest.MonkeyPatch) -> None:
+    slate = _slate()
+    real_next_state = slate_changelog._next_state
+
+    def _slow_next_state(*args: Any) -> Any:
+        time.sleep(0.02)  # proširi prozor između čitanja i upisa
+        return real_next_state(*args)
+
+    monkeypatch.setattr(slate_changelog, "_next_state", _slow_next_state)
+    barrier = threading.Barrier(6)
+    tokens: list[str] = []
+
+    def _writer(worker: int) -> None:
+        barrier.wait()
+        token, _ = slate_changelog.record_slate(slate, "2031-05-02", {worker: {"s": worker}})
+        tokens.append(token)
+
+    threads = [threading.Thread(target=_writer, args=(worker,)) for worker in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(int(t.rsplit("-", 1)[1]) for t in tokens) == [1, 2, 3, 4, 5, 6]
+    state = cache_get(slate_changelog._key(slate, "2031-05-02"))
+    assert state["version"] == 6
+    assert sorted({entry[0] for entry in state["log"]}) == [1, 2, 3, 4, 5, 6]
+
+
+def test_lagging_writer_does_not_churn_versions() -> None:
+    slate = _slate()
+    fresh = {1: {"minute": 31}, 2: {"s": 0}}
+    lagging = {1: {"minute": 30}, 2: {"s": 0}}
+    v1, _ = slate_changelog.record_slate(slate, "2031-05-03", lagging)
+    v2, _ = slate_changelog.record_slate(slate, "2031-05-03", fresh)
+
+    # worker čiji board još nije video live tick: verzija ostaje, a token je pre promene
+    behind, state = slate_changelog.record_slate(slate, "2031-05-03", lagging)
+    assert behind == v1
+    assert state["version"] == 2 and len(state["log"]) == 3
+    assert slate_changelog.changes_since(state, behind) == ({1}, set())
+
+    again, state = slate_changelog.record_slate(slate, "2031-05-03", fresh)
+    assert again == v2 and state["version"] == 2
+
+
+def _fixture(fid: int, short: str = "NS", goals: tuple[Any, Any] = (None, None)) -> dict[str, Any]:
+    return {
+        "fixture": {"id": fid, "date": f"2026-10-19T{10 + fid:02d}:00:00Z", "status": {"short": short, "elapsed": 30}},
+        "league": {"id": 39, "name": "Premier League"},
+        "teams": {"home": {"id": fid * 10, "name": "H"}, "away": {"id": fid * 10 + 1, "name": "A"}},
+        "goals": {"home": goals[0], "away": goals[1]},
+    }
+
+
+def test_btts_today_since_returns_only_changed_cards(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient
+) -> None:
+    feed = {"fixtures": [_fixture(1), _fixture(2), _fixture(3)]}
+    monkeypatch.setattr(btts_router, "_fetch_fixtures_for_day", lambda _offset: feed["fixtures"])
+
+    full = client.get("/btts/matches/today", headers=HEADERS).json()
+    assert full["delta"] is False and full["total"] == 3
+
+    feed["fixtures"] = [_fixture(1, "1H", (1, 0)), _fixture(2)]
+    board = get_day_board("btts.predictor", btts_router._day_for_offset(0), btts_router._board_item)
+    board.synced_at = 0.0  # forsiraj resync
+
+    delta = client.get("/btts/matches/today", params={"since": full["version"]}, headers=HEADERS).json()
+    assert delta["delta"] is True
+    assert [it["fixture_id"] for it in delta["items"]] == [1]
+    assert delta["removed"] == [3]
+    assert delta["version"] != full["version"]
+
+    # filter: kartica koja je promenom stanja napustila `prematch` ide u removed
+    prematch = client.get(
+        "/btts/matches/today", params={"since": full["version"], "filter": "prematch"}, headers=HEADERS
+    ).json()
+    assert prematch["items"] == []
+    assert prematch["removed"] == [1, 3]
+
+    stale = client.get("/btts/matches/today", params={"since": "nope-1"}, headers=HEADERS).json()
+    assert stale["delta"] is False and stale["total"] == 2
+
+
+def test_matches_today_since(monkeypatch: pytest.MonkeyPatch, client: TestClient) -> None:
+    feed = {"fixtures": [_fixture(1), _fixture(2)]}
+    monkeypatch.setattr(api_football, "get_fixtures_next_days", lambda *_args, **_kw: feed["fixtures"])
+
+    full = client.get("/matches/today", headers={"X-API-Key": "test-token"}).json()
+    assert full["delta"] is False and full["total"] == 2
+
+    feed["fixtures"] = [_fixture(1), _fixture(2, "1H", (0, 1))]
+    delta = client.get("/matches/today", params={"since": full["version"]}, headers={"X-API-Key": "test-token"}).json()
+    assert delta["delta"] is True
+    assert [it["fixture_id"] for it in delta["items"]] == [2]
+    assert delta["removed"] == []
+    assert delta["next_cursor"] is None
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+import pathlib
+import sys
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tests.conftest  # noqa: E402,F401
+
+pytest_plugins = ["tests.conftest"]
+
+from backend import api_football, tracing  # noqa: E402
+from backend.db import SessionLocal  # noqa: E402
+
+
+@pytest.fixture()
+def trace_file(monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path) -> pathlib.Path:
+    path = tmp_path / "traces.jsonl"
+    tracing.flush()
+    monkeypatch.setattr(tracing, "ENABLED", True)
+    monkeypatch.setattr(tracing, "SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(tracing, "COLLECTOR_URL", "")
+    monkeypatch.setattr(tracing, "EXPORT_PATH", str(path))
+    return path
+
+
+def _spans(path: pathlib.Path) -> list[dict[str, Any]]:
+    tracing.flush()
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class _FakeResponse:
+    status_code = 200
+    text = "{}"
+    headers: dict[str, str] = {}
+
+    def json(self) -> dict[str, Any]:
+        return {"response": []}
+
+
+def test_disabled_tracing_is_noop(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(tracing, "ENABLED", False)
+    assert tracing.start_trace("GET /x") is None
+    with tracing.span("child") as span:
+        assert span is tracing.NOOP_SPAN
+
+
+def test_full_match_trace_links_sections_to_upstream(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient, trace_file: pathlib.Path
+) -> None:
+    fixture = {
+        "fixture": {"id": 987654, "status": {"short": "NS"}},
+        "league": {"id": 39, "season": 2031},
+        "teams": {"home": {"id": 1}, "away": {"id": 2}},
+    }
+    monkeypatch.setattr(api_football, "get_fixture_by_id", lambda _fid: fixture)
+    monkeypatch.setattr(api_football.SESSION, "get", lambda *_a, **_kw: _FakeResponse())
+
+    resp = client.get("/matches/987654/full", params={"sections": "stats"}, headers={"X-API-Key": "test-token"})
+    assert resp.status_code == 200
+    trace_id = resp.headers["X-Trace-Id"]
+
+    spans = [s for s in _spans(trace_file) if s["traceId"] == trace_id]
+    by_id = {s["id"]: s for s in spans}
+    by_name = {s["name"]: s for s in spans}
+
+    root = by_name["GET /matches/{fixture_id}/full"]
+    assert root["parentId"] is None
+    assert root["tags"]["http.status_code"] == "200"
+
+    def parent_name(span: dict[str, Any]) -> str:
+        return by_id[span["parentId"]]["name"]
+
+    assert parent_name(by_name["match_full.build"]) == root["name"]
+    assert parent_name(by_name["match_full.fixture_stats"]) == "match_full.build"
+    call = by_name["api_football.call"]
+    assert parent_name(call) == "match_full.fixture_stats"
+    assert call["tags"]["cache"] == "miss"
+    assert parent_name(by_name["api_football.http"]) == "api_football.call"
+    assert parent_name(by_name["serialize.json"]) == root["name"]
+    assert all(s["duration"] > 0 for s in spans)
+
+
+def test_db_statements_are_child_spans(trace_file: pathlib.Path) -> None:
+    root = tracing.start_trace("job")
+    token = tracing.activate(root)
+    try:
+        db = SessionLocal()
+        try:
+            db.execute(text("SELECT :v"), {"v": 1})
+        finally:
+            db.close()
+    finally:
+        tracing.deactivate(token)
+        root.finish()
+
+    spans = [s for s in _spans(trace_file) if s["traceId"] == root.trace_id]
+    statements = [s for s in spans if s["name"] == "db.statement"]
+    assert statements and all(s["parentId"] == root.span_id for s in statements)
+    assert any(s["tags"]["db.statement"] == "SELECT ?" for s in statements)
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import pathlib
+import sys
+import time
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tests.conftest  # noqa: E402,F401
+
+pytest_plugins = ["tests.conftest"]
+
+from backend import ai_analysis, api_football, usage  # noqa: E402
+from backend.cache import cache_delete  # noqa: E402
+from backend.observability import add_usage  # noqa: E402
+from backend.routers import ai as ai_router  # noqa: E402
+from backend.services import usage_accounting  # noqa: E402
+
+HEADERS = {"X-API-Key": "test-token"}
+
+
+class _FakeResponse:
+    status_code = 200
+    text = "{}"
+    headers = {"x-ratelimit-requests-limit": "7500", "x-ratelimit-requests-remaining": "7000"}
+
+    def json(self) -> dict[str, Any]:
+        return {"response": []}
+
+
+def test_request_usage_is_attributed_to_route_and_app(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient
+) -> None:
+    fixture = {
+        "fixture": {"id": 555001, "status": {"short": "NS"}},
+        "league": {"id": 39, "season": 2032},
+        "teams": {"home": {"id": 1}, "away": {"id": 2}},
+    }
+    monkeypatch.setattr(api_football, "get_fixture_by_id", lambda _fid: fixture)
+    monkeypatch.setattr(api_football.SESSION, "get", lambda *_a, **_kw: _FakeResponse())
+
+    before = client.get("/_debug/usage", headers=HEADERS).json()["api_football"]
+    resp = client.get(
+        "/matches/555001/full",
+        params={"sections": "stats"},
+        headers={**HEADERS, "X-App-Id": "usage.test"},
+    )
+    assert resp.status_code == 200
+    report = client.get("/_debug/usage", headers=HEADERS).json()["api_football"]
+
+    assert report["calls"] == before["calls"] + 1
+    assert report["by_app_id"]["usage.test"] == 1
+    assert report["by_route"]["/matches/{fixture_id}/full"] >= 1
+    assert report["last_quota_header"]["remaining"] == 7000
+    assert report["daily_quota"] == usage_accounting.API_FOOTBALL_DAILY_QUOTA
+
+
+def test_streamed_tokens_are_attributed_to_stream_route_and_app(
+    monkeypatch: pytest.MonkeyPatch, client: TestClient
+) -> None:
+    monkeypatch.setattr(api_football, "get_fixture_by_id", lambda _fid: {"league": {"id": 39}})
+    monkeypatch.setattr(ai_router, "build_full_match", lambda _fixture: {"odds": None})
+
+    def _stream(**_kwargs: Any) -> Any:
+        yield '{"preview": "Streamed."}'
+        ai_analysis._record_llm_tokens("stream", SimpleNamespace(prompt_tokens=200, completion_tokens=40))
+
+    monkeypatch.setattr(ai_router, "stream_ai_analysis", _stream)
+    usage.LEDGER.reset()
+
+    resp = client.post(
+        "/matches/555002/ai-analysis/stream",
+        headers={**HEADERS, "X-App-Id": "usage.test", "X-Install-Id": "usage-stream-install"},
+        json={},
+    )
+    assert resp.status_code == 200
+
+    # producer thread upisuje svoj brojač tek kad završi (posle `result` eventa)
+    family = f"stream:{ai_analysis.AI_MODEL}"
+    route = "/matches/{fixture_id}/ai-analysis/stream"
+    field = usage.encode_field("openai", family, route, "usage.test", "prompt_tokens")
+    fields: dict[str, float] = {}
+    deadline = time.monotonic() + 2
+    while field not in fields and time.monotonic() < deadline:
+        for hour_fields in usage.LEDGER.drain().values():
+            fields.update(hour_fields)
+        time.sleep(0.01)
+
+    assert fields[field] == 200
+    assert fields[usage.encode_field("openai", family, route, "usage.test", "completion_tokens")] == 40
+    assert not any(f.startswith("openai") and usage.BACKGROUND_ROUTE in f for f in fields)
+
+
+def test_usage_outside_request_goes_to_background() -> None:
+    usage.LEDGER.reset()
+    add_usage("api_football", "fixtures")
+    ai_analysis._record_llm_tokens("analysis", SimpleNamespace(prompt_tokens=120, completion_tokens=30))
+
+    fields = next(iter(usage.LEDGER.drain().values()))
+    family = f"analysis:{ai_analysis.AI_MODEL}"
+    assert fields[usage.encode_field("api_football", "fixtures", "background", "-", "calls")] == 1
+    assert fields[usage.encode_field("openai", family, "background", "-", "prompt_tokens")] == 120
+    assert fields[usage.encode_field("openai", family, "background", "-", "completion_tokens")] == 30
+
+
+def test_persist_is_idempotent_and_report_reads_db(db_session) -> None:
+    hour = "2031010203"
+    usage.LEDGER.reset()
+    usage.LEDGER.add_request("/matches/{fixture_id}/full", "btts.predictor", {("api_football", "odds", "calls"): 4}, hour=hour)
+    usage.LEDGER.add_request(
+        "/ai/analysis", "btts.predictor", {("openai", "analysis:m", "prompt_tokens"): 1_000_000}, hour=hour
+    )
+    usage_accounting.flush()
+
+    assert usage_accounting.persist(db_session, [hour]) == 2
+    assert usage_accounting.persist(db_session, [hour]) == 2  # apsolutne vrednosti, ne sabira dvaput
+    cache_delete(usage_accounting.hour_key(hour))
+
+    report = usage_accounting.report(db_session, date(2031, 1, 2), now=datetime(2031, 1, 5, tzinfo=timezone.utc))
+    assert report["api_football"]["calls"] == 4
+    assert report["api_football"]["by_endpoint"] == {"odds": 4}
+    assert report["api_football"]["by_hour"] == {"03": 4}
+    assert report["api_football"]["projected_calls"] == 4  # prošli dan -> bez projekcije
+    assert report["openai"]["prompt_tokens"] == 1_000_000
+    assert report["openai"]["estimated_cost_usd"] == usage_accounting.OPENAI_PRICE_INPUT_PER_1M
+
+
+def test_projection_uses_recent_hourly_rate() -> None:
+    now = datetime(2031, 1, 2, 12, 0, tzinfo=timezone.utc)
+    by_hour = {"00": 50, "09": 10, "10": 10, "11": 10}
+    # prozor 10..12h: 20 poziva u 2h -> 10/h * 12h preostalo
+    assert usage_accounting._project(80, by_hour, now.date(), now) == 80 + 120
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import pathlib
+import sys
+import uuid
+from typing import Any
+
+from sqlalchemy import event, select
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import tests.conftest  # noqa: E402,F401
+
+from backend.db import SessionLocal, engine  # noqa: E402
+from backend.models import CoinsWallet, User  # noqa: E402
+from backend.models.enums import AuthProvider  # noqa: E402
+from backend.services import users_service  # noqa: E402
+
+pytest_plugins = ["tests.conftest"]
+
+
+class _Statements:
+    def __init__(self) -> None:
+        self.sql: list[str] = []
+
+    def __call__(self, _conn: Any, _cursor: Any, statement: str, *_args: Any) -> None:
+        self.sql.append(statement.split()[0].upper())
+
+    def __enter__(self) -> "_Statements":
+        event.listen(engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        event.remove(engine, "before_cursor_execute", self)
+
+
+def _install() -> str:
+    return f"install-{uuid.uuid4().hex[:8]}"
+
+
+def test_new_install_is_created_with_inserts_only_and_then_served_from_cache() -> None:
+    install_id = _install()
+    with SessionLocal() as session, _Statements() as statements:
+        identity = users_service.get_user_identity(session, install_id)
+    assert "SELECT" not in statements.sql
+    assert statements.sql.count("INSERT") == 2  # sqlite: user + wallet (Postgres: jedan CTE)
+
+    with SessionLocal() as session:
+        user = session.execute(select(User).where(User.device_id == install_id)).scalar_one()
+        assert user.id == identity.user_id
+        assert session.get(CoinsWallet, identity.wallet_id).balance == 0
+
+    with SessionLocal() as session, _Statements() as statements:
+        assert users_service.get_user_identity(session, install_id) == identity
+        users_service.reset_identity_cache()  # in-process sloj prazan -> Redis
+        assert users_service.get_user_identity(session, install_id) == identity
+    assert statements.sql == []
+
+
+def test_existing_user_is_resolved_and_legacy_user_gets_wallet() -> None:
+    existing, legacy = _install(), _install()
+    with SessionLocal() as session:
+        user, _wallet = users_service.get_or_create_user(session, existing)
+        session.add(User(device_id=legacy, auth_provider=AuthProvider.device))
+        session.commit()
+        existing_id = user.id
+
+    with SessionLocal() as session:
+        identity = users_service.get_user_identity(session, existing)
+        assert identity == users_service.UserIdentity(user_id=existing_id, wallet_id=existing_id)
+
+        legacy_identity = users_service.get_user_identity(session, legacy)
+    with SessionLocal() as session:
+        legacy_user = session.execute(select(User).where(User.device_id == legacy)).scalar_one()
+        assert legacy_identity.user_id == legacy_user.id
+        assert session.get(CoinsWallet, legacy_identity.wallet_id) is not None
+
+
+def test_identity_lru_evicts_oldest_and_expires() -> None:
+    lru = users_service._IdentityLRU(max_entries=2, ttl_seconds=60)
+    ident = users_service.UserIdentity(user_id=uuid.uuid4(), wallet_id=uuid.uuid4())
+    lru.put("a", ident)
+    lru.put("b", ident)
+    assert lru.get("a") == ident
+    lru.put("c", ident)
+    assert lru.get("b") is None and lru.get("a") == ident
+
+    expired = users_service._IdentityLRU(max_entries=2, ttl_seconds=-1)
+    expired.put("a", ident)
+    assert expired.get("a") is None
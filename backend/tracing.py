@@ -0,0 +1,217 @@
+"""
+Lagani tracing (spanovi sa parent/child vezom), bez spoljnih zavisnosti. Podrazumevano isključen.
+
+`ObservabilityMiddleware` otvara root span po request-u; ispod njega `span()` pravi decu
+(`_call_api`, sekcije `build_full_match`, SQL statementi, OpenAI pozivi, JSON render).
+Van request-a (background workeri) `span()` je no-op, pa nema šuma.
+
+Završeni spanovi idu u bounded queue; daemon thread ih batch-uje u Zipkin v2 JSON:
+- `TRACE_COLLECTOR_URL` (npr. `http://localhost:9411/api/v2/spans`) -> POST lokalnom collectoru,
+- inače JSON lines u `TRACE_EXPORT_PATH`.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+from starlette.responses import JSONResponse
+
+from . import metrics
+
+logger = logging.getLogger("naksir.go_premium.tracing")
+
+ENABLED = os.getenv("TRACING_ENABLED", "0").lower() in {"1", "true", "yes"}
+SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "traces.jsonl")
+COLLECTOR_URL = os.getenv("TRACE_COLLECTOR_URL", "")
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "naksir-go-premium-api")
+EXPORT_INTERVAL_SECONDS = 1.0
+EXPORT_BATCH_SIZE = 512
+
+_QUEUE: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=int(os.getenv("TRACE_QUEUE_SIZE", "10000")))
+_EXPORT_LOCK = threading.Lock()
+_EXPORTER_LOCK = threading.Lock()
+_EXPORTER_STARTED = False
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "tags", "_timestamp_us", "_started", "_finished")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], tags: Dict[str, Any]) -> None:
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.tags = {k: v for k, v in tags.items() if v is not None}
+        self._timestamp_us = time.time_ns() // 1000
+        self._started = time.perf_counter()
+        self._finished = False
+
+    def set_tag(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.tags[key] = value
+
+    def child(self, name: str, **tags: Any) -> "Span":
+        return Span(name, self.trace_id, self.span_id, tags)
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        if self._finished:
+            return
+        self._finished = True
+        if error is not None:
+            self.tags["error"] = f"{type(error).__name__}: {error}"[:200]
+        duration_us = max(1, int((time.perf_counter() - self._started) * 1_000_000))
+        _enqueue(
+            {
+                "traceId": self.trace_id,
+                "id": self.span_id,
+                "parentId": self.parent_id,
+                "name": self.name,
+                "timestamp": self._timestamp_us,
+                "duration": duration_us,
+                "localEndpoint": {"serviceName": SERVICE_NAME},
+                "tags": {k: str(v) for k, v in self.tags.items()},
+            }
+        )
+
+
+class _NoopSpan:
+    trace_id = None
+    span_id = None
+
+    def set_tag(self, key: str, value: Any) -> None:
+        return None
+
+    def child(self, name: str, **tags: Any) -> "_NoopSpan":
+        return self
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        return None
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def start_trace(name: str, **tags: Any) -> Optional[Span]:
+    """Root span (middleware). None ako je tracing isključen ili request nije uzorkovan."""
+    if not ENABLED or random.random() >= SAMPLE_RATE:
+        return None
+    return Span(name, f"{random.getrandbits(128):032x}", None, tags)
+
+
+def activate(span: Optional[Span]):
+    return _current.set(span)
+
+
+def deactivate(token) -> None:
+    _current.reset(token)
+
+
+def start_span(name: str, **tags: Any):
+    """Dete tekućeg spana, bez aktiviranja (generatori, engine eventi); završava se sa `finish()`."""
+    parent = _current.get()
+    if parent is None:
+        return NOOP_SPAN
+    return parent.child(name, **tags)
+
+
+@contextmanager
+def span(name: str, **tags: Any) -> Iterator[Any]:
+    """Dete tekućeg spana koje je aktivno unutar bloka (ugnežđeni pozivi postaju njegova deca)."""
+    parent = _current.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    child = parent.child(name, **tags)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as exc:
+        child.finish(error=exc)
+        raise
+    finally:
+        _current.reset(token)
+        child.finish()
+
+
+def _enqueue(record: Dict[str, Any]) -> None:
+    try:
+        _QUEUE.put_nowait(record)
+    except queue.Full:
+        metrics.inc("trace_spans_dropped_total")
+        return
+    _ensure_exporter()
+
+
+def flush() -> int:
+    """Prazni queue i izvozi batch-eve; vraća broj izvezenih spanova."""
+    exported = 0
+    with _EXPORT_LOCK:
+        while True:
+            batch: List[Dict[str, Any]] = []
+            while len(batch) < EXPORT_BATCH_SIZE:
+                try:
+                    batch.append(_QUEUE.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return exported
+            try:
+                _export(batch)
+                exported += len(batch)
+            except Exception as exc:  # noqa: BLE001
+                metrics.inc("trace_spans_dropped_total", value=len(batch))
+                logger.warning("trace export failed (%s spans): %s", len(batch), exc)
+
+
+def _export(batch: List[Dict[str, Any]]) -> None:
+    if COLLECTOR_URL:
+        resp = requests.post(COLLECTOR_URL, json=batch, timeout=5)
+        resp.raise_for_status()
+        return
+    with open(EXPORT_PATH, "a", encoding="utf-8") as fh:
+        for record in batch:
+            fh.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def _ensure_exporter() -> None:
+    global _EXPORTER_STARTED
+    if _EXPORTER_STARTED:
+        return
+    with _EXPORTER_LOCK:
+        if _EXPORTER_STARTED:
+            return
+        _EXPORTER_STARTED = True
+
+    def _loop() -> None:
+        while True:
+            time.sleep(EXPORT_INTERVAL_SECONDS)
+            flush()
+
+    threading.Thread(target=_loop, name="trace-exporter", daemon=True).start()
+
+
+class TracedJSONResponse(JSONResponse):
+    """Default response klasa: JSON render (često najskuplji deo velikih payload-a) kao span."""
+
+    def render(self, content: Any) -> bytes:
+        with span("serialize.json") as sp:
+            body = super().render(content)
+            sp.set_tag("bytes", len(body))
+        return body
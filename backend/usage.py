@@ -0,0 +1,76 @@
+"""
+In-process ledger potrošnje spoljnih servisa (API-Football pozivi, OpenAI tokeni).
+
+Brojači su po satu (UTC, kao i dnevni API-Football quota reset), izvoru, porodici
+(endpoint / `kind:model`), ruti i app_id-u. Request skuplja svoju potrošnju u
+`RequestMetrics.usage`, a middleware je na kraju upisuje ovde sa templateom rute i
+app_id-em; pozivi van request-a (poller, prefetch, scheduler) idu pod rutu `background`.
+`services/usage_accounting.py` periodično prazni ledger u deljeni cache i DB.
+"""
+
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Mapping, Optional, Tuple
+
+BACKGROUND_ROUTE = "background"
+NO_APP = "-"
+
+# (source, family, unit) -> vrednost; oblik u kome request skuplja potrošnju
+UsageCounts = Mapping[Tuple[str, str, str], float]
+
+_FIELD_SEP = "\x1f"
+
+
+def hour_bucket(now: Optional[datetime] = None) -> str:
+    return (now or datetime.now(timezone.utc)).astimezone(timezone.utc).strftime("%Y%m%d%H")
+
+
+def encode_field(source: str, family: str, route: str, app_id: str, unit: str) -> str:
+    return _FIELD_SEP.join((source, family, route, app_id[:64], unit))
+
+
+def decode_field(field: str) -> Tuple[str, str, str, str, str]:
+    source, family, route, app_id, unit = field.split(_FIELD_SEP)
+    return source, family, route, app_id, unit
+
+
+class UsageLedger:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # hour -> field -> vrednost
+        self._hours: Dict[str, Dict[str, float]] = {}
+
+    def add_request(self, route: str, app_id: str, counts: UsageCounts, hour: Optional[str] = None) -> None:
+        if not counts:
+            return
+        hour = hour or hour_bucket()
+        with self._lock:
+            fields = self._hours.setdefault(hour, {})
+            for (source, family, unit), value in counts.items():
+                field = encode_field(source, family, route, app_id, unit)
+                fields[field] = fields.get(field, 0.0) + value
+
+    def add(self, source: str, family: str, unit: str, value: float = 1.0) -> None:
+        """Potrošnja van request-a."""
+        self.add_request(BACKGROUND_ROUTE, NO_APP, {(source, family, unit): value})
+
+    def drain(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            hours, self._hours = self._hours, {}
+        return hours
+
+    def restore(self, hours: Mapping[str, Mapping[str, float]]) -> None:
+        with self._lock:
+            for hour, fields in hours.items():
+                target = self._hours.setdefault(hour, {})
+                for field, value in fields.items():
+                    target[field] = target.get(field, 0.0) + value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hours.clear()
+
+
+LEDGER = UsageLedger()
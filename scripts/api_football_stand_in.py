@@ -0,0 +1,386 @@
+"""
+Record/replay stand-in za API-Football (`/fixtures`, `/odds`, `/predictions`, ...).
+
+Backend ga koristi bez izmena koda preko `API_FOOTBALL_BASE_URL`:
+
+    # snimanje: proxy ka pravom API-ju, svaki 200 odgovor ide na disk
+    python scripts/api_football_stand_in.py --mode record --port 8901 --dir recordings/api_football
+    API_FOOTBALL_BASE_URL=http://127.0.0.1:8901 uvicorn backend.main:app
+
+    # replay: bez mreže, sa latencijom i 429 injekcijom
+    python scripts/api_football_stand_in.py --dir recordings/api_football --latency lognormal:-2.5,0.5 --rate-limit-rate 0.05
+
+Snimci su ključevani isto kao backend cache (`make_cache_key(endpoint, params)`), s tim
+što se vrednosti parametara normalizuju u string (query string ne zna za int). Jedan
+snimak = jedan JSON fajl (`<sha1(key)[:20]>.json`) sa endpoint-om, parametrima, statusom,
+`x-ratelimit-*` headerima i telom.
+
+Kada tačnog snimka nema, replay (osim uz `--strict`) vraća poslednji snimak istog
+endpoint-a sa istim *imenima* parametara (npr. `fixtures?date=` za bilo koji datum),
+pa jednom snimljen dan može da se vrti i sutra. `GET /_stats` vraća broj poziva po
+endpoint-u i raspodelu exact/fallback/miss/429/500.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Mapping, Optional
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# Env pre importa backend-a (config validira ključeve pri importu)
+os.environ.setdefault("APP_ENV", "dev")
+os.environ.setdefault("API_FOOTBALL_KEY", "stand-in")
+os.environ.setdefault("OPENAI_API_KEY", "stand-in")
+os.environ.setdefault("DATABASE_URL", "sqlite:///./stand_in.db")
+os.environ.setdefault("USE_FAKE_REDIS", "true")
+
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from backend.cache import make_cache_key  # noqa: E402
+from scripts.fake_openai_server import parse_latency  # noqa: E402
+
+UPSTREAM_BASE_URL = "https://v3.football.api-sports.io"
+BENCH_DATA_DIR = ROOT / "scripts" / "bench_data"
+DEFAULT_RECORDINGS_DIR = ROOT / "recordings" / "api_football"
+
+_FORWARD_HEADERS = ("x-ratelimit-requests-limit", "x-ratelimit-requests-remaining")
+_SHAPE_WILDCARD = "*"
+
+
+def recording_key(endpoint: str, params: Mapping[str, Any]) -> str:
+    endpoint = endpoint.strip("/")
+    return make_cache_key(endpoint, {str(k): str(v) for k, v in params.items()})
+
+
+def _shape_key(endpoint: str, params: Mapping[str, Any]) -> str:
+    return recording_key(endpoint, {k: _SHAPE_WILDCARD for k in params})
+
+
+def _empty_payload(endpoint: str, params: Mapping[str, Any]) -> Dict[str, Any]:
+    """Oblik koji API-Football vraća kad nema rezultata."""
+    return {"get": endpoint, "parameters": dict(params), "errors": [], "results": 0, "response": []}
+
+
+class RecordingStore:
+    """Snimci na disku + in-memory indeks (tačan ključ i oblik parametara)."""
+
+    def __init__(self, directory: os.PathLike[str] | str) -> None:
+        self.directory = pathlib.Path(directory)
+        self._lock = threading.Lock()
+        self._exact: Dict[str, Dict[str, Any]] = {}
+        self._by_shape: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    @staticmethod
+    def _filename(key: str) -> str:
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:20] + ".json"
+
+    def _index(self, record: Dict[str, Any]) -> None:
+        self._exact[record["key"]] = record
+        shape = _shape_key(record["endpoint"], record["params"])
+        current = self._by_shape.get(shape)
+        if current is None or record.get("recorded_at", 0) >= current.get("recorded_at", 0):
+            self._by_shape[shape] = record
+
+    def _load(self) -> None:
+        if not self.directory.is_dir():
+            return
+        for path in sorted(self.directory.glob("*.json")):
+            try:
+                self._index(json.loads(path.read_text(encoding="utf-8")))
+            except (ValueError, KeyError) as exc:
+                print(f"[stand-in] skipping broken recording {path.name}: {exc}", file=sys.stderr)
+
+    def save(
+        self,
+        endpoint: str,
+        params: Mapping[str, Any],
+        body: Dict[str, Any],
+        *,
+        status: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> Dict[str, Any]:
+        endpoint = endpoint.strip("/")
+        str_params = {str(k): str(v) for k, v in params.items()}
+        key = recording_key(endpoint, str_params)
+        record = {
+            "key": key,
+            "endpoint": endpoint,
+            "params": str_params,
+            "status": status,
+            "headers": dict(headers or {}),
+            "recorded_at": time.time(),
+            "body": body,
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / self._filename(key)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(record, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, path)
+        with self._lock:
+            self._index(record)
+        return record
+
+    def fixture_ids(self) -> list[int]:
+        """Fixture id-evi za koje postoji `fixtures?id=` snimak."""
+        with self._lock:
+            records = list(self._exact.values())
+        return sorted(
+            int(r["params"]["id"]) for r in records if r["endpoint"] == "fixtures" and r["params"].get("id", "").isdigit()
+        )
+
+    def lookup(self, endpoint: str, params: Mapping[str, Any], *, fallback: bool = True) -> tuple[Optional[Dict[str, Any]], str]:
+        """(snimak, "exact" | "fallback" | "miss")."""
+        endpoint = endpoint.strip("/")
+        with self._lock:
+            record = self._exact.get(recording_key(endpoint, params))
+            if record is not None:
+                return record, "exact"
+            if fallback:
+                record = self._by_shape.get(_shape_key(endpoint, params))
+                if record is not None:
+                    return record, "fallback"
+        return None, "miss"
+
+
+def seed_from_bench(store: RecordingStore, timezone: str = "Europe/Belgrade", limit: Optional[int] = None) -> list[int]:
+    """
+    Upisuje sintetičke odgovore iz `scripts/bench_data/` (u obliku API-Football-a: slate od
+    400 mečeva, odds sa 12 kladionica) kao početni set za load test bez mreže: dnevni slate + `fixtures?id=` i `odds?fixture=`
+    za prvih `limit` mečeva. Vraća fixture id-eve za koje postoje snimci.
+    """
+    slate = json.loads((BENCH_DATA_DIR / "fixtures_slate.json").read_text(encoding="utf-8"))
+    odds = json.loads((BENCH_DATA_DIR / "odds_fixture.json").read_text(encoding="utf-8"))
+    fixtures = slate.get("response") or []
+
+    store.save("fixtures", {"date": slate.get("parameters", {}).get("date", "2026-10-19"), "timezone": timezone}, slate)
+    fixture_ids = []
+    for fx in fixtures[:limit]:
+        fixture_id = fx["fixture"]["id"]
+        fixture_ids.append(fixture_id)
+        store.save(
+            "fixtures",
+            {"id": fixture_id, "timezone": timezone},
+            {"get": "fixtures", "parameters": {"id": str(fixture_id)}, "errors": [], "results": 1, "response": [fx]},
+        )
+        fixture_odds = json.loads(json.dumps(odds))
+        for item in fixture_odds.get("response") or []:
+            item.setdefault("fixture", {})["id"] = fixture_id
+        store.save("odds", {"fixture": fixture_id, "page": 1}, fixture_odds)
+    return fixture_ids
+
+
+@dataclass
+class StandInConfig:
+    recordings_dir: str = str(DEFAULT_RECORDINGS_DIR)
+    mode: str = "replay"  # replay | record
+    latency: str = "none"
+    rate_limit_rate: float = 0.0  # udeo 429 odgovora
+    error_rate: float = 0.0  # udeo 500 odgovora
+    strict: bool = False  # bez fallback-a na snimak istog oblika
+    upstream_url: str = UPSTREAM_BASE_URL
+    seed: Optional[int] = None
+
+
+@dataclass
+class StandInStats:
+    calls: int = 0
+    exact: int = 0
+    fallback: int = 0
+    miss: int = 0
+    recorded: int = 0
+    rate_limited: int = 0
+    errors: int = 0
+    inflight: int = 0
+    max_inflight: int = 0
+    per_endpoint: Dict[str, int] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "exact": self.exact,
+                "fallback": self.fallback,
+                "miss": self.miss,
+                "recorded": self.recorded,
+                "rate_limited": self.rate_limited,
+                "errors": self.errors,
+                "inflight": self.inflight,
+                "max_inflight": self.max_inflight,
+                "per_endpoint": dict(self.per_endpoint),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = self.exact = self.fallback = self.miss = self.recorded = 0
+            self.rate_limited = self.errors = 0
+            self.max_inflight = self.inflight
+            self.per_endpoint.clear()
+
+
+def create_stand_in_app(config: StandInConfig, store: Optional[RecordingStore] = None) -> FastAPI:
+    app = FastAPI(title="API-Football stand-in")
+    store = store if store is not None else RecordingStore(config.recordings_dir)
+    rng = random.Random(config.seed)
+    rng_lock = threading.Lock()
+    sample_latency = parse_latency(config.latency)
+    stats = StandInStats()
+    app.state.stats = stats
+    app.state.store = store
+
+    def _record(endpoint: str, params: Dict[str, str], request: Request) -> Any:
+        import requests
+
+        api_key = request.headers.get("x-apisports-key", "")
+        resp = requests.get(
+            f"{config.upstream_url.rstrip('/')}/{endpoint}",
+            headers={"x-apisports-key": api_key},
+            params=params,
+            timeout=15,
+        )
+        forwarded = {h: resp.headers[h] for h in _FORWARD_HEADERS if h in resp.headers}
+        try:
+            body = resp.json()
+        except ValueError:
+            return JSONResponse(status_code=resp.status_code, content={"errors": [resp.text[:500]]}, headers=forwarded)
+        if resp.status_code == 200 and not body.get("errors"):
+            store.save(endpoint, params, body, headers=forwarded)
+            with stats._lock:
+                stats.recorded += 1
+        return JSONResponse(status_code=resp.status_code, content=body, headers=forwarded)
+
+    @app.get("/_stats")
+    def get_stats() -> Dict[str, Any]:
+        return {**stats.snapshot(), "recordings": len(store)}
+
+    @app.post("/_stats/reset")
+    def reset_stats() -> Dict[str, Any]:
+        stats.reset()
+        return {"ok": True}
+
+    @app.get("/{endpoint:path}")
+    def api_football(endpoint: str, request: Request) -> Any:
+        endpoint = endpoint.strip("/")
+        params = dict(request.query_params)
+        with rng_lock:
+            delay = max(0.0, sample_latency(rng))
+            roll = rng.random()
+        with stats._lock:
+            stats.calls += 1
+            stats.per_endpoint[endpoint] = stats.per_endpoint.get(endpoint, 0) + 1
+            stats.inflight += 1
+            stats.max_inflight = max(stats.max_inflight, stats.inflight)
+        try:
+            if config.mode == "record":
+                return _record(endpoint, params, request)
+
+            time.sleep(delay)
+            if roll < config.rate_limit_rate:
+                with stats._lock:
+                    stats.rate_limited += 1
+                return JSONResponse(
+                    status_code=429,
+                    content={"errors": {"requests": "stand-in rate limit"}},
+                    headers={"x-ratelimit-requests-remaining": "0"},
+                )
+            if roll < config.rate_limit_rate + config.error_rate:
+                with stats._lock:
+                    stats.errors += 1
+                return JSONResponse(status_code=500, content={"errors": {"server": "stand-in server error"}})
+
+            record, outcome = store.lookup(endpoint, params, fallback=not config.strict)
+            with stats._lock:
+                setattr(stats, outcome, getattr(stats, outcome) + 1)
+            if record is None:
+                return JSONResponse(content=_empty_payload(endpoint, params))
+            return JSONResponse(status_code=record["status"], content=record["body"], headers=record.get("headers") or {})
+        finally:
+            with stats._lock:
+                stats.inflight -= 1
+
+    return app
+
+
+def start_in_thread(
+    config: StandInConfig,
+    store: Optional[RecordingStore] = None,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> tuple[Any, str]:
+    """Pokreće stand-in u background thread-u; vraća (uvicorn server, base_url)."""
+    import uvicorn
+
+    server = uvicorn.Server(
+        uvicorn.Config(create_stand_in_app(config, store), host=host, port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, name="api-football-stand-in", daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("API-Football stand-in failed to start")
+        time.sleep(0.05)
+    bound_port = server.servers[0].sockets[0].getsockname()[1]
+    return server, f"http://{host}:{bound_port}"
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="API-Football record/replay stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--dir", default=str(DEFAULT_RECORDINGS_DIR), help="Direktorijum sa snimcima")
+    parser.add_argument("--mode", choices=("replay", "record"), default="replay")
+    parser.add_argument("--latency", default="none", help="fixed:S | uniform:A,B | lognormal:MU,SIGMA | none")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--strict", action="store_true", help="Samo tačni snimci (bez fallback-a po obliku)")
+    parser.add_argument("--upstream", default=UPSTREAM_BASE_URL)
+    parser.add_argument("--seed-bench", type=int, default=0, metavar="N", help="Upiši sintetičke odgovore iz scripts/bench_data za N mečeva")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser
+
+
+def config_from_args(args: argparse.Namespace) -> StandInConfig:
+    return StandInConfig(
+        recordings_dir=args.dir,
+        mode=args.mode,
+        latency=args.latency,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate,
+        strict=args.strict,
+        upstream_url=args.upstream,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    import uvicorn
+
+    args = _build_arg_parser().parse_args()
+    config = config_from_args(args)
+    store = RecordingStore(config.recordings_dir)
+    if args.seed_bench:
+        seed_from_bench(store, limit=args.seed_bench)
+    print(f"[stand-in] mode={config.mode} recordings={len(store)} dir={config.recordings_dir}")
+    uvicorn.run(create_stand_in_app(config, store), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
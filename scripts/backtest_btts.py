@@ -0,0 +1,91 @@
+"""
+BTTS ticket engine backtest nad lokalnom arhivom (backend/services/history_archive.py).
+
+    python scripts/backtest_btts.py --archive data/archive --start 2025-08-01 --end 2026-05-31 \
+        --sweep min_score_3=70,75,80 --sweep odds_band=1.30-1.55,1.25-1.60 --workers 8
+
+Svaki `--sweep` je jedna osa grid-a (polje EngineParams); vrednosti su int, float ili
+opseg `lo-hi`. Izveštaj je sortiran po ROI; `--json` upisuje i kompletan rezultat.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import pathlib
+import sys
+import time
+from datetime import date
+from typing import Any, Dict, List
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.services.btts_backtest_service import expand_grid, run_backtest  # noqa: E402
+
+
+def parse_value(raw: str) -> Any:
+    raw = raw.strip()
+    if "-" in raw[1:]:
+        lo, hi = raw.split("-", 1)
+        return (float(lo), float(hi))
+    try:
+        return int(raw)
+    except ValueError:
+        return float(raw)
+
+
+def parse_sweeps(specs: List[str]) -> Dict[str, List[Any]]:
+    axes: Dict[str, List[Any]] = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if not name or not values:
+            raise SystemExit(f"invalid --sweep {spec!r}, expected name=v1,v2")
+        axes[name.strip()] = [parse_value(v) for v in values.split(",") if v.strip()]
+    return axes
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="BTTS ticket engine backtest")
+    parser.add_argument("--archive", required=True, help="HISTORY_ARCHIVE_DIR (index.json + dnevni direktorijumi)")
+    parser.add_argument("--start", type=date.fromisoformat, default=None)
+    parser.add_argument("--end", type=date.fromisoformat, default=None)
+    parser.add_argument("--sweep", action="append", default=[], help="name=v1,v2 (ponovljivo)")
+    parser.add_argument("--top-leagues", default="", help="Liste league id-jeva, npr. 39,140,135")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--json", dest="json_path", default=None)
+    return parser
+
+
+def main() -> None:
+    args = _build_parser().parse_args()
+    grid = expand_grid(**parse_sweeps(args.sweep))
+    top_leagues = {int(x) for x in args.top_leagues.split(",") if x.strip()}
+
+    started = time.perf_counter()
+    reports = run_backtest(
+        args.archive,
+        grid,
+        start=args.start,
+        end=args.end,
+        workers=args.workers,
+        top_league_ids=top_leagues,
+    )
+    elapsed = time.perf_counter() - started
+
+    ranked = sorted(reports, key=lambda r: r["overall"]["roi"] if r["overall"]["roi"] is not None else float("-inf"), reverse=True)
+    print(f"===== BTTS backtest: {len(grid)} param sets, {reports[0]['days'] if reports else 0} days, {elapsed:.1f}s =====")
+    for report in ranked:
+        o = report["overall"]
+        params = {k: v for k, v in report["params"].items() if v is not None}
+        print(
+            f"roi={o['roi']} hit={o['hit_rate']} leg_hit={o['leg_hit_rate']} tickets={o['tickets']} "
+            f"dd={o['max_drawdown']} brier={o['calibration']['brier']} params={params}"
+        )
+    if args.json_path:
+        pathlib.Path(args.json_path).write_text(json.dumps(ranked, indent=2, default=str), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Mikro-benchmark suite za hot pure-Python putanje (odds parsing, kartice, BTTS, cache).
+
+Ulazi u `scripts/bench_data/` su sintetički podaci u obliku API-Football odgovora
+(slate od 400 meča, odds odgovor sa 12 kladionica, full_match kontekst), ne snimljen
+saobraćaj – rezultati su ponovljivi i bez mreže. Svaki case se kalibriše (`timeit.autorange`), meri `--repeat`
+puta i prijavljuje median/min po operaciji u mikrosekundama.
+
+    python scripts/bench.py                                  # rezultat + poređenje sa baseline-om
+    python scripts/bench.py --only odds --repeat 3
+    python scripts/bench.py --save-baseline                  # upiši novi baseline
+    python scripts/bench.py --output bench_results.json --threshold 0.25
+
+Izlaz: JSON (`--output`) + tabela. Exit code 1 ako je neki case sporiji od baseline-a
+za više od `--threshold` (relativno, po medianu). Baseline je vezan za mašinu – osveži ga
+na istom CI runneru na kome se poredi.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import pathlib
+import platform
+import statistics
+import sys
+import timeit
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# Env pre importa backend-a (config validira ključeve pri importu)
+os.environ.setdefault("APP_ENV", "dev")
+os.environ.setdefault("API_FOOTBALL_KEY", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+os.environ.setdefault("USE_FAKE_REDIS", "true")
+
+DATA_DIR = ROOT / "scripts" / "bench_data"
+DEFAULT_BASELINE = DATA_DIR / "baseline.json"
+DEFAULT_THRESHOLD = 0.25
+
+Case = Callable[[], Any]
+
+
+def _load(name: str) -> Any:
+    with open(DATA_DIR / name, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _ticket_fixtures(slate: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Slate obogaćen BTTS kvotama i formom (oblik koji btts_ticket_builder predaje engine-u)."""
+    out = []
+    for fx in slate:
+        fid = fx["fixture"]["id"]
+        enriched = dict(fx)
+        enriched["odds"] = {"btts_yes": 1.28 + (fid % 37) / 100, "btts_no": 1.30 + (fid % 31) / 100}
+        enriched["stats"] = {
+            "home_scored_avg_5": 0.8 + (fid % 13) / 10,
+            "away_scored_avg_5": 0.7 + (fid % 11) / 10,
+            "home_conceded_avg_5": 0.6 + (fid % 9) / 10,
+            "away_conceded_avg_5": 0.9 + (fid % 7) / 10,
+            "both_btts_rate_10": 0.3 + (fid % 50) / 100,
+            "under_tendency": (fid % 5) / 10,
+        }
+        out.append(enriched)
+    return out
+
+
+def build_cases() -> Dict[str, Case]:
+    from backend.ai_analysis import compute_btts_yes_probability_v1
+    from backend.cache import LocalCacheBackend, RedisCacheBackend, make_cache_key
+    from backend.match_full import build_match_summary
+    from backend.odds_normalizer import normalize_odds
+    from backend.odds_summary import build_odds_probabilities, build_odds_summary
+    from backend.services.btts_ticket_engine import build_daily_btts_tickets
+
+    slate = _load("fixtures_slate.json")["response"]
+    odds_raw = _load("odds_fixture.json")["response"]
+    full_match = _load("full_match_btts.json")
+    flat_odds = build_odds_summary(odds_raw)
+    ticket_fixtures = _ticket_fixtures(slate)
+    top_leagues = {39, 140, 135, 78, 61}
+    today = date(2026, 10, 19)
+    cache_payload = {"response": slate[:50]}
+    cache_params = {"date": "2026-10-19", "timezone": "Europe/Belgrade", "league": 39, "season": 2026}
+
+    local = LocalCacheBackend()
+    redis = RedisCacheBackend("", use_fake=True)
+    for backend in (local, redis):
+        backend.set("bench:hit", cache_payload, 3600)
+
+    return {
+        "odds.build_odds_summary": lambda: build_odds_summary(odds_raw),
+        "odds.normalize_odds": lambda: normalize_odds(odds_raw),
+        "odds.build_odds_probabilities": lambda: build_odds_probabilities(flat_odds),
+        "cards.build_match_summary_x400": lambda: [build_match_summary(fx) for fx in slate],
+        "btts.build_daily_tickets_x400": lambda: build_daily_btts_tickets(
+            today=today, fixtures=ticket_fixtures, top_league_ids=top_leagues
+        ),
+        "btts.compute_yes_probability_v1": lambda: compute_btts_yes_probability_v1(full_match),
+        "cache.make_cache_key": lambda: make_cache_key("fixtures", cache_params),
+        "cache.local.get": lambda: local.get("bench:hit"),
+        "cache.local.set": lambda: local.set("bench:set", cache_payload, 3600),
+        "cache.fakeredis.get": lambda: redis.get("bench:hit"),
+        "cache.fakeredis.set": lambda: redis.set("bench:set", cache_payload, 3600),
+    }
+
+
+def measure(fn: Case, repeat: int) -> Dict[str, Any]:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    runs_us = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "median_us": round(statistics.median(runs_us), 3),
+        "min_us": round(min(runs_us), 3),
+        "loops": number,
+        "repeat": repeat,
+    }
+
+
+def run(only: Optional[str] = None, repeat: int = 7) -> Dict[str, Any]:
+    results = {}
+    for name, fn in build_cases().items():
+        if only and only not in name:
+            continue
+        results[name] = measure(fn, repeat)
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Po case-u: odnos median-a naspram baseline-a; `regression` ako je > 1 + threshold."""
+    rows = []
+    base_results = baseline.get("results") or {}
+    for name, result in sorted(current["results"].items()):
+        base = base_results.get(name)
+        ratio = result["median_us"] / base["median_us"] if base and base.get("median_us") else None
+        rows.append(
+            {
+                "case": name,
+                "median_us": result["median_us"],
+                "baseline_us": base["median_us"] if base else None,
+                "ratio": round(ratio, 3) if ratio is not None else None,
+                "regression": bool(ratio is not None and ratio > 1 + threshold),
+            }
+        )
+    return rows
+
+
+def _print_table(rows: List[Dict[str, Any]]) -> None:
+    print(f"{'case':40} {'median_us':>12} {'baseline_us':>12} {'ratio':>7}")
+    for row in rows:
+        baseline = f"{row['baseline_us']:.3f}" if row["baseline_us"] is not None else "-"
+        ratio = f"{row['ratio']:.3f}" if row["ratio"] is not None else "-"
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['case']:40} {row['median_us']:12.3f} {baseline:>12} {ratio:>7}{flag}")
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Hot-path micro benchmarks")
+    parser.add_argument("--only", default=None, help="Samo case-ovi čije ime sadrži ovaj string")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Dozvoljeno relativno usporenje")
+    parser.add_argument("--output", default=None, help="Upiši rezultate (JSON) u fajl")
+    parser.add_argument("--save-baseline", action="store_true", help="Upiši rezultate kao novi baseline")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _build_parser().parse_args(argv)
+    current = run(args.only, args.repeat)
+
+    baseline_path = pathlib.Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    rows = compare(current, baseline, args.threshold)
+    current["comparison"] = {"baseline": str(baseline_path), "threshold": args.threshold, "cases": rows}
+
+    if args.output:
+        pathlib.Path(args.output).write_text(json.dumps(current, indent=2, sort_keys=True) + "\n")
+    if args.save_baseline:
+        baseline_results = dict(baseline.get("results") or {}) if args.only else {}
+        baseline_results.update(current["results"])
+        saved = {"meta": current["meta"], "results": baseline_results}
+        baseline_path.write_text(json.dumps(saved, indent=2, sort_keys=True) + "\n")
+        print(f"baseline saved -> {baseline_path}")
+
+    _print_table(rows)
+    regressions = [row["case"] for row in rows if row["regression"]]
+    if regressions and not args.save_baseline:
+        print(f"regressions (> {args.threshold:.0%} slower than baseline): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,292 @@
+"""
+Lokalni OpenAI-kompatibilan stand-in za /v1/chat/completions.
+
+Backend ga koristi bez izmena koda: OpenAI SDK poštuje `OPENAI_BASE_URL`, pa je dovoljno
+
+    python scripts/fake_openai_server.py --port 8900 --latency lognormal:-0.2,0.4 --error-rate 0.02
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 uvicorn backend.main:app
+
+Podržava stream i non-stream odgovore, konfigurisane latencije, 500/429 greške
+i canned JSON analizu. `GET /_stats` vraća broj poziva (ukupno i po fixture-u).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_ANALYSIS: Dict[str, Any] = {
+    "preview": (
+        "Stand-in preview: both sides arrive in steady form. "
+        "The home side has the stronger attack, the visitors defend deep. "
+        "Expect a measured first half and more space after the break. "
+        "Set pieces could decide it. Data is synthetic."
+    ),
+    "key_factors": ["Synthetic form data", "Home attack vs deep block"],
+    "winner_probabilities": {"home_win_pct": 46.0, "draw_pct": 27.0, "away_win_pct": 27.0},
+    "goals_probabilities": {
+        "over_0_5_ht_pct": 68.0,
+        "over_1_5_pct": 74.0,
+        "over_2_5_pct": 52.0,
+        "over_3_5_pct": 28.0,
+        "under_3_5_pct": 72.0,
+        "under_4_5_pct": 86.0,
+    },
+    "team_goals": {"home_over_0_5_pct": 78.0, "away_over_0_5_pct": 64.0},
+    "btts": {"yes_pct": 55.0, "no_pct": 45.0},
+    "value_bet": {
+        "market": "Double Chance + Over/Under",
+        "selection": "1X & Over 1.5",
+        "bookmaker_odd": 1.72,
+        "model_probability_pct": 61.0,
+        "edge_pct": 4.9,
+        "comment": "Synthetic stand-in output.",
+    },
+    "correct_scores_top2": [
+        {"score": "1-1", "probability_pct": 12.0},
+        {"score": "2-1", "probability_pct": 10.0},
+    ],
+    "corners_probabilities": {"over_8_5_pct": 58.0, "over_9_5_pct": 46.0, "over_10_5_pct": 33.0},
+    "cards_probabilities": {"over_3_5_pct": 55.0, "over_4_5_pct": 38.0, "over_5_5_pct": 22.0},
+    "risk_flags": ["stand-in response"],
+    "disclaimer": "This is NOT financial advice.",
+}
+
+_FIXTURE_ID_RE = re.compile(r'"fixture_id"\s*:\s*(\d+)')
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Latencija u sekundama:
+    `fixed:0.8`, `uniform:0.3,1.5`, `lognormal:mu,sigma` (exp(N(mu, sigma))), `none`.
+    """
+    kind, _, raw = spec.partition(":")
+    kind = kind.strip().lower()
+    args = [float(x) for x in raw.split(",") if x.strip()]
+    if kind in {"", "none"}:
+        return lambda _rng: 0.0
+    if kind == "fixed" and len(args) == 1:
+        return lambda _rng: args[0]
+    if kind == "uniform" and len(args) == 2:
+        return lambda rng: rng.uniform(args[0], args[1])
+    if kind == "lognormal" and len(args) == 2:
+        return lambda rng: rng.lognormvariate(args[0], args[1])
+    raise ValueError(f"unsupported latency spec: {spec!r}")
+
+
+@dataclass
+class StandInConfig:
+    latency: str = "fixed:0.5"
+    error_rate: float = 0.0  # udeo 500 odgovora
+    rate_limit_rate: float = 0.0  # udeo 429 odgovora
+    stream_chunk_chars: int = 24
+    stream_chunk_delay: float = 0.02
+    response_path: Optional[str] = None
+    seed: Optional[int] = None
+
+
+@dataclass
+class StandInStats:
+    calls: int = 0
+    stream_calls: int = 0
+    errors: int = 0
+    rate_limited: int = 0
+    inflight: int = 0
+    max_inflight: int = 0
+    per_fixture: Dict[str, int] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "stream_calls": self.stream_calls,
+                "errors": self.errors,
+                "rate_limited": self.rate_limited,
+                "inflight": self.inflight,
+                "max_inflight": self.max_inflight,
+                "per_fixture": dict(self.per_fixture),
+            }
+
+
+def _fixture_id_from_messages(messages: Any) -> str:
+    for message in messages or []:
+        content = message.get("content") if isinstance(message, dict) else None
+        if isinstance(content, str):
+            match = _FIXTURE_ID_RE.search(content)
+            if match:
+                return match.group(1)
+    return "unknown"
+
+
+def _completion_body(content: str, model: str) -> Dict[str, Any]:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": 0, "completion_tokens": len(content) // 4, "total_tokens": len(content) // 4},
+    }
+
+
+def _stream_chunks(content: str, model: str, config: StandInConfig) -> Iterator[str]:
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+    step = max(1, config.stream_chunk_chars)
+    for i in range(0, len(content), step):
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": content[i : i + step]}, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        if config.stream_chunk_delay:
+            time.sleep(config.stream_chunk_delay)
+    final = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+    }
+    yield f"data: {json.dumps(final)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def create_stand_in_app(config: StandInConfig) -> FastAPI:
+    app = FastAPI(title="OpenAI stand-in")
+    rng = random.Random(config.seed)
+    rng_lock = threading.Lock()
+    sample_latency = parse_latency(config.latency)
+    canned = DEFAULT_ANALYSIS
+    if config.response_path:
+        canned = json.loads(Path(config.response_path).read_text(encoding="utf-8"))
+    content = json.dumps(canned, ensure_ascii=False)
+    stats = StandInStats()
+    app.state.stats = stats
+
+    @app.post("/v1/chat/completions")
+    def chat_completions(body: Dict[str, Any]) -> Any:
+        model = str(body.get("model") or "stand-in")
+        fixture_key = _fixture_id_from_messages(body.get("messages"))
+        with rng_lock:
+            delay = max(0.0, sample_latency(rng))
+            roll = rng.random()
+        with stats._lock:
+            stats.calls += 1
+            stats.stream_calls += 1 if body.get("stream") else 0
+            stats.per_fixture[fixture_key] = stats.per_fixture.get(fixture_key, 0) + 1
+            stats.inflight += 1
+            stats.max_inflight = max(stats.max_inflight, stats.inflight)
+        try:
+            time.sleep(delay)
+            if roll < config.rate_limit_rate:
+                with stats._lock:
+                    stats.rate_limited += 1
+                return JSONResponse(
+                    status_code=429,
+                    content={"error": {"message": "stand-in rate limit", "type": "rate_limit_error"}},
+                )
+            if roll < config.rate_limit_rate + config.error_rate:
+                with stats._lock:
+                    stats.errors += 1
+                return JSONResponse(
+                    status_code=500,
+                    content={"error": {"message": "stand-in server error", "type": "server_error"}},
+                )
+        finally:
+            with stats._lock:
+                stats.inflight -= 1
+
+        if body.get("stream"):
+            return StreamingResponse(_stream_chunks(content, model, config), media_type="text/event-stream")
+        return JSONResponse(content=_completion_body(content, model))
+
+    @app.get("/_stats")
+    def get_stats() -> Dict[str, Any]:
+        return stats.snapshot()
+
+    @app.post("/_stats/reset")
+    def reset_stats(request: Request) -> Dict[str, Any]:
+        with stats._lock:
+            stats.calls = stats.stream_calls = stats.errors = stats.rate_limited = 0
+            stats.max_inflight = stats.inflight
+            stats.per_fixture.clear()
+        return {"ok": True}
+
+    return app
+
+
+def start_in_thread(config: StandInConfig, host: str = "127.0.0.1", port: int = 0) -> tuple[Any, str]:
+    """Pokreće stand-in u background thread-u; vraća (uvicorn server, base_url sa /v1)."""
+    import uvicorn
+
+    server = uvicorn.Server(
+        uvicorn.Config(create_stand_in_app(config), host=host, port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, name="openai-stand-in", daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("OpenAI stand-in failed to start")
+        time.sleep(0.05)
+    bound_port = server.servers[0].sockets[0].getsockname()[1]
+    return server, f"http://{host}:{bound_port}/v1"
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", default="fixed:0.5", help="fixed:S | uniform:A,B | lognormal:MU,SIGMA | none")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--chunk-chars", type=int, default=24)
+    parser.add_argument("--chunk-delay", type=float, default=0.02)
+    parser.add_argument("--response", default=None, help="Path do canned JSON analize")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser
+
+
+def config_from_args(args: argparse.Namespace) -> StandInConfig:
+    return StandInConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        stream_chunk_chars=args.chunk_chars,
+        stream_chunk_delay=args.chunk_delay,
+        response_path=args.response,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    import uvicorn
+
+    args = _build_arg_parser().parse_args()
+    uvicorn.run(create_stand_in_app(config_from_args(args)), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Load harness za AI path (`GET/POST /matches/{id}/ai-analysis`) bez pravog OpenAI-ja.
+
+Pokreće OpenAI stand-in (scripts/fake_openai_server.py) u background thread-u, usmerava
+`ai_analysis.client` na njega i vozi konkurentan GET/POST saobraćaj kroz app in-process.
+API-Football je zamenjen sintetičkim fixture-ima da bi merenje pokrivalo samo AI/cache/DB put.
+
+    python scripts/load_ai.py --fixtures 20 --requests 400 --concurrency 32 --latency lognormal:-0.5,0.4
+
+Izveštaj: throughput, p50/p90/p99 (ukupno i po GET/POST), statusi, X-Cache raspodela,
+DB upiti po zahtevu i LLM pozivi po fixture-u (iz stand-in /_stats).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import pathlib
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# Env pre importa backend-a (config validira ključeve pri importu)
+os.environ.setdefault("APP_ENV", "dev")
+os.environ.setdefault("API_FOOTBALL_KEY", "load-test")
+os.environ.setdefault("OPENAI_API_KEY", "stand-in")
+os.environ.setdefault("DATABASE_URL", "sqlite:///./load_ai.db")
+os.environ.setdefault("API_AUTH_TOKENS", "load-token")
+os.environ.setdefault("USE_FAKE_REDIS", "true")
+
+from scripts.fake_openai_server import StandInConfig, start_in_thread  # noqa: E402
+from scripts.load_common import (  # noqa: E402
+    QueryCounter,
+    RequestSample,
+    allow_jsonb_on_sqlite,
+    print_report,
+    summarize_samples,
+)
+
+
+def _synthetic_fixture(fixture_id: int) -> Dict[str, Any]:
+    return {
+        "fixture": {"id": fixture_id, "date": "2026-10-19T18:00:00Z", "status": {"short": "NS"}},
+        "league": {"id": 39, "name": "Premier League", "season": 2026},
+        "teams": {"home": {"id": fixture_id * 10, "name": "Home"}, "away": {"id": fixture_id * 10 + 1, "name": "Away"}},
+        "goals": {"home": None, "away": None},
+    }
+
+
+def _synthetic_full_match(fixture: Dict[str, Any]) -> Dict[str, Any]:
+    fixture_id = (fixture.get("fixture") or {}).get("id")
+    return {"meta": {"fixture_id": fixture_id}, "summary": {}, "odds": None}
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="AI path load harness")
+    parser.add_argument("--fixtures", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--post-ratio", type=float, default=0.5, help="Udeo POST zahteva (ostalo GET)")
+    parser.add_argument("--latency", default="lognormal:-0.7,0.4")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_path", default=None, help="Upiši izveštaj i u JSON fajl")
+    return parser
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from fastapi.testclient import TestClient
+    from openai import OpenAI
+
+    from backend import ai_analysis, api_football
+    from backend.db import engine
+    from backend.main import create_app
+    from backend.models import Base
+    from backend.routers import ai as ai_router
+
+    if engine.dialect.name == "sqlite":
+        allow_jsonb_on_sqlite()
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    server, base_url = start_in_thread(
+        StandInConfig(
+            latency=args.latency,
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+            seed=args.seed,
+        )
+    )
+    ai_analysis.client = OpenAI(api_key="stand-in", base_url=base_url, max_retries=0)
+    api_football.get_fixture_by_id = _synthetic_fixture  # type: ignore[assignment]
+    ai_router.build_full_match = _synthetic_full_match  # type: ignore[assignment]
+
+    rng = random.Random(args.seed)
+    plan = [
+        ("POST" if rng.random() < args.post_ratio else "GET", 100_000 + rng.randrange(args.fixtures))
+        for _ in range(args.requests)
+    ]
+    headers = {"X-API-Key": "load-token"}
+
+    samples: List[RequestSample] = []
+    with TestClient(create_app()) as client, QueryCounter(engine) as queries:
+
+        def _one(i: int) -> RequestSample:
+            method, fixture_id = plan[i]
+            req_headers = {**headers, "X-Install-Id": f"load-install-{i % 50}"}
+            start = time.perf_counter()
+            if method == "POST":
+                resp = client.post(f"/matches/{fixture_id}/ai-analysis", headers=req_headers, json={})
+            else:
+                resp = client.get(f"/matches/{fixture_id}/ai-analysis", headers=req_headers)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            return RequestSample(method, resp.status_code, elapsed_ms, {k.lower(): v for k, v in resp.headers.items()})
+
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            samples = list(pool.map(_one, range(len(plan))))
+        wall = time.perf_counter() - wall_start
+
+    import httpx
+
+    llm_stats = httpx.get(base_url.rsplit("/v1", 1)[0] + "/_stats").json()
+    server.should_exit = True
+
+    per_fixture = llm_stats.get("per_fixture") or {}
+    report = summarize_samples(samples, wall)
+    report["db_queries_total"] = queries.count
+    report["db_queries_per_request"] = round(queries.count / len(samples), 2) if samples else None
+    report["llm"] = {
+        "calls": llm_stats.get("calls"),
+        "errors": llm_stats.get("errors"),
+        "rate_limited": llm_stats.get("rate_limited"),
+        "max_inflight": llm_stats.get("max_inflight"),
+        "fixtures_called": len(per_fixture),
+        "calls_per_fixture_mean": round(sum(per_fixture.values()) / len(per_fixture), 2) if per_fixture else 0,
+        "calls_per_fixture_max": max(per_fixture.values()) if per_fixture else 0,
+    }
+    report["config"] = vars(args)
+    return report
+
+
+def main() -> None:
+    args = _build_parser().parse_args()
+    report = run(args)
+    print_report("AI load harness", report)
+    if args.json_path:
+        pathlib.Path(args.json_path).write_text(json.dumps(report, indent=2, sort_keys=True), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Zajednički helperi za load/benchmark skripte (percentili, brojanje DB upita, izveštaj)."""
+
+from __future__ import annotations
+
+import json
+import math
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def allow_jsonb_on_sqlite() -> None:
+    """Lokalni sqlite run: JSONB kolone kompajliraj kao JSON (isto kao tests/conftest.py)."""
+    from sqlalchemy.dialects.sqlite.base import SQLiteTypeCompiler
+
+    SQLiteTypeCompiler.visit_JSONB = SQLiteTypeCompiler.visit_JSON  # type: ignore[attr-defined]
+
+
+def percentile(values: Sequence[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentil (pct 0-100); None za praznu listu."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def latency_summary(latencies_ms: Sequence[float]) -> Dict[str, Optional[float]]:
+    def _r(v: Optional[float]) -> Optional[float]:
+        return round(v, 2) if v is not None else None
+
+    return {
+        "count": len(latencies_ms),
+        "p50_ms": _r(percentile(latencies_ms, 50)),
+        "p90_ms": _r(percentile(latencies_ms, 90)),
+        "p99_ms": _r(percentile(latencies_ms, 99)),
+        "max_ms": _r(max(latencies_ms) if latencies_ms else None),
+    }
+
+
+@dataclass
+class RequestSample:
+    name: str
+    status: int
+    latency_ms: float
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+class QueryCounter:
+    """Broji SQL upite na engine-u (before_cursor_execute) dok je aktivan."""
+
+    def __init__(self, engine: Engine) -> None:
+        self._engine = engine
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def _on_execute(self, *_args: Any, **_kwargs: Any) -> None:
+        with self._lock:
+            self.count += 1
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self._engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        event.remove(self._engine, "before_cursor_execute", self._on_execute)
+
+
+def summarize_samples(samples: Iterable[RequestSample], wall_seconds: float) -> Dict[str, Any]:
+    samples = list(samples)
+    by_name: Dict[str, List[float]] = {}
+    for s in samples:
+        by_name.setdefault(s.name, []).append(s.latency_ms)
+    return {
+        "requests": len(samples),
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_rps": round(len(samples) / wall_seconds, 2) if wall_seconds > 0 else None,
+        "latency": latency_summary([s.latency_ms for s in samples]),
+        "latency_by_name": {name: latency_summary(vals) for name, vals in sorted(by_name.items())},
+        "status_counts": dict(Counter(str(s.status) for s in samples)),
+        "cache_status_counts": dict(Counter(s.headers.get("x-cache", "-") for s in samples)),
+    }
+
+
+def print_report(title: str, report: Dict[str, Any]) -> None:
+    print(f"===== {title} =====")
+    print(json.dumps(report, indent=2, sort_keys=True))
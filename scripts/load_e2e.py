@@ -0,0 +1,285 @@
+"""
+End-to-end load harness: ceo app in-process, API-Football i OpenAI preko lokalnih stand-in-ova.
+
+API-Football odgovori dolaze iz snimaka (scripts/api_football_stand_in.py, `--recordings`);
+bez snimaka se seed-uje sintetički set iz `scripts/bench_data/`. Backend ide preko pravog HTTP puta
+(`SESSION`, cache, inflight, 429 backoff), samo je `API_FOOTBALL_BASE_URL` usmeren na stand-in.
+
+    python scripts/load_e2e.py --scenarios list,full,ai_storm,btts_board --requests 300 --concurrency 32
+    python scripts/load_e2e.py --recordings recordings/api_football --upstream-latency lognormal:-2.5,0.5 --rate-limit-rate 0.02
+
+Scenariji:
+- `list`       – polling `GET /matches/today` (prve strane paginacije),
+- `full`       – `GET /matches/{id}/full` preko N mečeva (ceo fan-out ka API-Football-u),
+- `ai_storm`   – konkurentni `POST /matches/{id}/ai-analysis` na par mečeva,
+- `btts_board` – `GET /btts/matches/today` + `/btts/tickets/today` (X-App-Id=btts.predictor).
+
+Izveštaj po scenariju: throughput (RPS), p50/p90/p99, statusi, upstream pozivi po
+zahtevu (X-Upstream-Calls i stand-in brojač, koji uključuje i background workere),
+cache hit ratio (X-Cache-Hits / X-Cache-Misses) i replay exact/fallback/miss.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import pathlib
+import random
+import socket
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# Env pre importa backend-a (config validira ključeve pri importu)
+os.environ.setdefault("APP_ENV", "dev")
+os.environ.setdefault("API_FOOTBALL_KEY", "load-test")
+os.environ.setdefault("OPENAI_API_KEY", "stand-in")
+os.environ.setdefault("DATABASE_URL", "sqlite:///./load_e2e.db")
+os.environ.setdefault("API_AUTH_TOKENS", "load-token")
+os.environ.setdefault("USE_FAKE_REDIS", "true")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# config čita API_FOOTBALL_BASE_URL pri importu, pa se port stand-in-a bira pre importa backend-a
+FOOTBALL_PORT = _free_port()
+os.environ["API_FOOTBALL_BASE_URL"] = f"http://127.0.0.1:{FOOTBALL_PORT}"
+
+from scripts import api_football_stand_in as football  # noqa: E402
+from scripts.fake_openai_server import StandInConfig, start_in_thread  # noqa: E402
+from scripts.load_common import (  # noqa: E402
+    QueryCounter,
+    RequestSample,
+    allow_jsonb_on_sqlite,
+    print_report,
+    summarize_samples,
+)
+
+SCENARIOS = ("list", "full", "ai_storm", "btts_board")
+API_TOKEN = "load-token"
+BTTS_APP_ID = "btts.predictor"
+
+# (ime, metoda, path, headeri, json body)
+Call = Tuple[str, str, str, Dict[str, str], Any]
+
+
+def plan_scenario(name: str, fixture_ids: List[int], requests: int, rng: random.Random) -> List[Call]:
+    auth = {"X-API-Key": API_TOKEN}
+    if name == "list":
+        return [
+            ("matches_today", "GET", f"/matches/today?cursor={rng.choice((0, 0, 0, 10, 20))}&limit=10", auth, None)
+            for _ in range(requests)
+        ]
+    if name == "full":
+        return [
+            ("match_full", "GET", f"/matches/{rng.choice(fixture_ids)}/full", auth, None)
+            for _ in range(requests)
+        ]
+    if name == "ai_storm":
+        hot = fixture_ids[:3] or fixture_ids
+        return [
+            (
+                "ai_post",
+                "POST",
+                f"/matches/{rng.choice(hot)}/ai-analysis",
+                {**auth, "X-Install-Id": f"load-install-{i % 50}"},
+                {},
+            )
+            for i in range(requests)
+        ]
+    if name == "btts_board":
+        btts = {**auth, "X-App-Id": BTTS_APP_ID}
+        return [
+            ("btts_matches_today", "GET", "/btts/matches/today", btts, None)
+            if rng.random() < 0.7
+            else ("btts_tickets_today", "GET", "/btts/tickets/today", btts, None)
+            for _ in range(requests)
+        ]
+    raise ValueError(f"unknown scenario: {name!r}")
+
+
+def _header_int(sample: RequestSample, name: str) -> int:
+    try:
+        return int(sample.headers.get(name, 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def scenario_report(
+    samples: List[RequestSample],
+    wall: float,
+    upstream_delta: Dict[str, Any],
+    llm_calls: int,
+    db_queries: int,
+) -> Dict[str, Any]:
+    report = summarize_samples(samples, wall)
+    count = len(samples) or 1
+    upstream_in_request = sum(_header_int(s, "x-upstream-calls") for s in samples)
+    hits = sum(_header_int(s, "x-cache-hits") for s in samples)
+    misses = sum(_header_int(s, "x-cache-misses") for s in samples)
+    report["upstream"] = {
+        "calls_per_request": round(upstream_in_request / count, 3),
+        "stand_in_calls": upstream_delta.get("calls", 0),
+        "stand_in_calls_per_request": round(upstream_delta.get("calls", 0) / count, 3),
+        "replay": {k: upstream_delta.get(k, 0) for k in ("exact", "fallback", "miss", "rate_limited", "errors")},
+        "per_endpoint": upstream_delta.get("per_endpoint", {}),
+    }
+    report["cache"] = {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else None,
+    }
+    report["llm_calls"] = llm_calls
+    report["db_queries_per_request"] = round(db_queries / count, 2)
+    return report
+
+
+def _delta(after: Dict[str, Any], before: Dict[str, Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for key, value in after.items():
+        if isinstance(value, (int, float)):
+            out[key] = value - before.get(key, 0)
+    before_endpoints = before.get("per_endpoint") or {}
+    out["per_endpoint"] = {
+        endpoint: calls - before_endpoints.get(endpoint, 0)
+        for endpoint, calls in (after.get("per_endpoint") or {}).items()
+        if calls - before_endpoints.get(endpoint, 0)
+    }
+    return out
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="End-to-end load harness (API-Football replay + OpenAI stand-in)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Zarezom odvojeno: {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=200, help="Zahteva po scenariju")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--fixtures", type=int, default=20, help="Broj mečeva u full/AI scenarijima")
+    parser.add_argument("--recordings", default=None, help="Direktorijum sa API-Football snimcima (default: seed iz bench_data)")
+    parser.add_argument("--strict", action="store_true", help="Replay samo tačnih snimaka")
+    parser.add_argument("--upstream-latency", default="lognormal:-2.5,0.5")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Udeo 429 odgovora API-Football stand-in-a")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Udeo 500 odgovora API-Football stand-in-a")
+    parser.add_argument("--llm-latency", default="lognormal:-0.7,0.4")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_path", default=None, help="Upiši izveštaj i u JSON fajl")
+    return parser
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = sorted(set(scenarios) - set(SCENARIOS))
+    if unknown:
+        raise SystemExit(f"unknown scenarios: {', '.join(unknown)}")
+
+    recordings_dir = args.recordings or tempfile.mkdtemp(prefix="api_football_recordings_")
+    store = football.RecordingStore(recordings_dir)
+    if args.recordings is None:
+        fixture_ids = football.seed_from_bench(store, limit=args.fixtures)
+    else:
+        fixture_ids = store.fixture_ids()[: args.fixtures]
+    if not fixture_ids:
+        raise SystemExit(f"no fixtures?id= recordings in {recordings_dir}")
+
+    football_server, football_url = football.start_in_thread(
+        football.StandInConfig(
+            recordings_dir=recordings_dir,
+            latency=args.upstream_latency,
+            rate_limit_rate=args.rate_limit_rate,
+            error_rate=args.error_rate,
+            strict=args.strict,
+            seed=args.seed,
+        ),
+        store,
+        port=FOOTBALL_PORT,
+    )
+    llm_server, llm_url = start_in_thread(StandInConfig(latency=args.llm_latency, seed=args.seed))
+
+    from fastapi.testclient import TestClient
+    from openai import OpenAI
+
+    from backend import ai_analysis
+    from backend.db import engine
+    from backend.main import create_app
+    from backend.models import Base
+
+    ai_analysis.client = OpenAI(api_key="stand-in", base_url=llm_url, max_retries=0)
+
+    if engine.dialect.name == "sqlite":
+        allow_jsonb_on_sqlite()
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    rng = random.Random(args.seed)
+    reports: Dict[str, Any] = {}
+    with httpx.Client() as stats_client, TestClient(create_app()) as client:
+
+        def _stand_in_stats(base: str) -> Dict[str, Any]:
+            return stats_client.get(f"{base}/_stats").json()
+
+        for name in scenarios:
+            plan = plan_scenario(name, fixture_ids, args.requests, rng)
+
+            def _one(call: Call) -> RequestSample:
+                label, method, path, headers, body = call
+                start = time.perf_counter()
+                resp = client.request(method, path, headers=headers, json=body)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                return RequestSample(label, resp.status_code, elapsed_ms, {k.lower(): v for k, v in resp.headers.items()})
+
+            football_before = _stand_in_stats(football_url)
+            llm_before = _stand_in_stats(llm_url.rsplit("/v1", 1)[0])
+            with QueryCounter(engine) as queries:
+                wall_start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                    samples = list(pool.map(_one, plan))
+                wall = time.perf_counter() - wall_start
+            upstream_delta = _delta(_stand_in_stats(football_url), football_before)
+            llm_calls = _stand_in_stats(llm_url.rsplit("/v1", 1)[0])["calls"] - llm_before["calls"]
+            reports[name] = scenario_report(samples, wall, upstream_delta, llm_calls, queries.count)
+
+    football_server.should_exit = True
+    llm_server.should_exit = True
+    return {
+        "scenarios": reports,
+        "recordings": {"dir": recordings_dir, "count": len(store), "fixtures": len(fixture_ids)},
+        "config": vars(args),
+    }
+
+
+def _print_summary(reports: Dict[str, Any]) -> None:
+    print(f"{'scenario':12} {'rps':>8} {'p50_ms':>9} {'p90_ms':>9} {'p99_ms':>9} {'upstream/req':>13} {'cache_hit':>10}")
+    for name, report in reports.items():
+        latency = report["latency"]
+        hit_ratio = report["cache"]["hit_ratio"]
+        print(
+            f"{name:12} {report['throughput_rps'] or 0:8.1f} {latency['p50_ms'] or 0:9.1f} "
+            f"{latency['p90_ms'] or 0:9.1f} {latency['p99_ms'] or 0:9.1f} "
+            f"{report['upstream']['calls_per_request']:13.3f} "
+            f"{'-' if hit_ratio is None else f'{hit_ratio:.3f}':>10}"
+        )
+
+
+def main() -> None:
+    args = _build_parser().parse_args()
+    report = run(args)
+    print_report("E2E load harness", report)
+    _print_summary(report["scenarios"])
+    if args.json_path:
+        pathlib.Path(args.json_path).write_text(json.dumps(report, indent=2, sort_keys=True), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -26,7 +26,9 @@ from backend.app import app  # noqa: E402
 from backend.db import SessionLocal, engine  # noqa: E402
 from backend.models import Base, Entitlement  # noqa: E402
 from backend.models.enums import EntitlementStatus  # noqa: E402
-from backend.services.users_service import get_or_create_user  # noqa: E402
+from backend.services.btts_board_service import reset_day_boards  # noqa: E402
+from backend.services.slate_changelog import reset_slate_memo  # noqa: E402
+from backend.services.users_service import get_or_create_user, reset_identity_cache  # noqa: E402
 
 
 # Allow PostgreSQL JSONB type to compile on SQLite during tests
@@ -37,6 +39,9 @@ SQLiteTypeCompiler.visit_JSONB = SQLiteTypeCompiler.visit_JSON
 def reset_database() -> None:
     Base.metadata.drop_all(engine)
     Base.metadata.create_all(engine)
+    reset_day_boards()
+    reset_slate_memo()
+    reset_identity_cache()
     yield
 
 
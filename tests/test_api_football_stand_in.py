@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import random
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from scripts.api_football_stand_in import (  # noqa: E402
+    RecordingStore,
+    StandInConfig,
+    create_stand_in_app,
+    recording_key,
+)
+from scripts.load_common import RequestSample  # noqa: E402
+from scripts.load_e2e import plan_scenario, scenario_report  # noqa: E402
+
+from backend.cache import make_cache_key  # noqa: E402
+
+
+def _payload(fixture_id: int) -> dict:
+    return {"get": "fixtures", "errors": [], "results": 1, "response": [{"fixture": {"id": fixture_id}}]}
+
+
+def test_replay_exact_fallback_and_miss(tmp_path: Path) -> None:
+    store = RecordingStore(tmp_path)
+    store.save("fixtures", {"id": 7, "timezone": "Europe/Belgrade"}, _payload(7))
+    store.save("fixtures", {"date": "2026-10-19", "timezone": "Europe/Belgrade"}, _payload(8))
+
+    # ključ je make_cache_key nad string parametrima, a snimci preživljavaju restart
+    assert recording_key("/fixtures", {"id": 7}) == make_cache_key("fixtures", {"id": "7"})
+    assert len(RecordingStore(tmp_path)) == 2
+    assert RecordingStore(tmp_path).fixture_ids() == [7]
+
+    client = TestClient(create_stand_in_app(StandInConfig(recordings_dir=str(tmp_path)), store))
+    exact = client.get("/fixtures", params={"id": 7, "timezone": "Europe/Belgrade"})
+    fallback = client.get("/fixtures", params={"date": "2026-10-20", "timezone": "Europe/Belgrade"})
+    miss = client.get("/odds", params={"fixture": 7, "page": 1})
+
+    assert exact.json()["response"][0]["fixture"]["id"] == 7
+    assert fallback.json()["response"][0]["fixture"]["id"] == 8
+    assert miss.status_code == 200 and miss.json()["response"] == []
+
+    stats = client.get("/_stats").json()
+    assert (stats["exact"], stats["fallback"], stats["miss"]) == (1, 1, 1)
+    assert stats["per_endpoint"] == {"fixtures": 2, "odds": 1}
+
+    strict = TestClient(create_stand_in_app(StandInConfig(recordings_dir=str(tmp_path), strict=True), store))
+    assert strict.get("/fixtures", params={"date": "2026-10-20", "timezone": "Europe/Belgrade"}).json()["results"] == 0
+
+
+def test_rate_limit_injection_and_scenario_report(tmp_path: Path) -> None:
+    client = TestClient(create_stand_in_app(StandInConfig(recordings_dir=str(tmp_path), rate_limit_rate=1.0)))
+    resp = client.get("/fixtures", params={"id": 1})
+    assert resp.status_code == 429
+    assert client.get("/_stats").json()["rate_limited"] == 1
+
+    plan = plan_scenario("ai_storm", [1, 2, 3, 4], 10, random.Random(1))
+    assert len(plan) == 10 and {call[1] for call in plan} == {"POST"}
+
+    samples = [
+        RequestSample("match_full", 200, 10.0, {"x-upstream-calls": "4", "x-cache-hits": "1", "x-cache-misses": "3"}),
+        RequestSample("match_full", 200, 30.0, {"x-upstream-calls": "0", "x-cache-hits": "4", "x-cache-misses": "0"}),
+    ]
+    report = scenario_report(samples, 1.0, {"calls": 5, "exact": 4, "miss": 1, "per_endpoint": {"odds": 5}}, 0, 6)
+    assert report["throughput_rps"] == 2.0
+    assert report["upstream"]["calls_per_request"] == 2.0
+    assert report["upstream"]["stand_in_calls_per_request"] == 2.5
+    assert report["cache"]["hit_ratio"] == 0.625
+    assert report["db_queries_per_request"] == 3.0
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from scripts import bench  # noqa: E402
+
+
+def test_compare_flags_only_cases_over_threshold() -> None:
+    current = {"results": {"a": {"median_us": 130.0}, "b": {"median_us": 110.0}, "new": {"median_us": 5.0}}}
+    baseline = {"results": {"a": {"median_us": 100.0}, "b": {"median_us": 100.0}}}
+
+    rows = {row["case"]: row for row in bench.compare(current, baseline, threshold=0.25)}
+    assert rows["a"]["regression"] is True and rows["a"]["ratio"] == 1.3
+    assert rows["b"]["regression"] is False
+    assert rows["new"]["baseline_us"] is None and rows["new"]["regression"] is False
+
+
+def test_recorded_inputs_and_baseline_cover_all_cases() -> None:
+    cases = bench.build_cases()
+    baseline = bench.json.loads(bench.DEFAULT_BASELINE.read_text())
+    assert set(cases) == set(baseline["results"])
+    assert len(bench._load("fixtures_slate.json")["response"]) == 400
+    # svaki case se izvršava na snimljenim ulazima
+    result = bench.run(only="cache.make_cache_key", repeat=1)
+    assert list(result["results"]) == ["cache.make_cache_key"]
+    assert result["results"]["cache.make_cache_key"]["median_us"] > 0
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from scripts.fake_openai_server import DEFAULT_ANALYSIS, StandInConfig, create_stand_in_app  # noqa: E402
+from scripts.load_common import percentile  # noqa: E402
+
+
+def test_stand_in_serves_completions_and_streams() -> None:
+    client = TestClient(create_stand_in_app(StandInConfig(latency="none", stream_chunk_delay=0)))
+    messages = [{"role": "user", "content": 'MATCH_JSON: {"meta": {"fixture_id": 77}}'}]
+
+    resp = client.post("/v1/chat/completions", json={"model": "m", "messages": messages})
+    assert resp.status_code == 200
+    assert json.loads(resp.json()["choices"][0]["message"]["content"]) == DEFAULT_ANALYSIS
+
+    streamed = client.post("/v1/chat/completions", json={"model": "m", "messages": messages, "stream": True})
+    deltas = [
+        json.loads(line[len("data: ") :])["choices"][0]["delta"].get("content", "")
+        for line in streamed.text.splitlines()
+        if line.startswith("data: {")
+    ]
+    assert json.loads("".join(deltas)) == DEFAULT_ANALYSIS
+
+    stats = client.get("/_stats").json()
+    assert stats["calls"] == 2
+    assert stats["per_fixture"] == {"77": 2}
+
+
+def test_stand_in_error_rate_and_percentile() -> None:
+    client = TestClient(create_stand_in_app(StandInConfig(latency="none", error_rate=1.0)))
+    resp = client.post("/v1/chat/completions", json={"model": "m", "messages": []})
+    assert resp.status_code == 500
+
+    assert percentile([5, 1, 3, 2, 4], 50) == 3
+    assert percentile(list(range(1, 101)), 99) == 99